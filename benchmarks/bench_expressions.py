@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for expression parsing.
+
+Each case wraps one large expression in a minimal contract, so the timing is
+dominated by the expression parser. Use --against REV to compare with the
+parser at a git revision:
+
+    python benchmarks/bench_expressions.py --sizes 50 200 --against HEAD~1
+"""
+import argparse
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_parser import DafnyParser, load_parser_at, time_parse
+
+
+def nested_arithmetic(depth: int) -> str:
+    """((((x0 + 1) * x1 - 2) % x2 + 3) * ...) nested `depth` levels deep."""
+    expr = "x0"
+    for i in range(1, depth + 1):
+        op = "+-*%"[i % 4]
+        expr = f"({expr} {op} x{i})"
+    return expr
+
+
+def arithmetic_chain(length: int) -> str:
+    """x0 + x1 * 2 - x2 + x3 * 2 - ... with no parentheses."""
+    terms = [f"x{i} * 2" if i % 2 else f"x{i}" for i in range(length)]
+    return " + ".join(terms)
+
+
+def boolean_guard(length: int) -> str:
+    """a long guard mixing comparisons, &&, || and !."""
+    clauses = []
+    for i in range(length):
+        clause = f"balances[x{i}] + {i} >= x{i}"
+        if i % 3 == 0:
+            clause = f"!({clause})"
+        clauses.append(clause)
+    return " && ".join(f"({c} || x{i} == 0)" for i, c in enumerate(clauses))
+
+
+def nested_if(size: int) -> str:
+    """if c0 then (if c1 then ... else 1) else 0, size // 2 levels deep."""
+    expr = "0"
+    for i in reversed(range(size // 2)):
+        expr = f"if x{i} > {i} then ({expr}) else {i}"
+    return expr
+
+
+CASES = {
+    "nested-arith": nested_arithmetic,
+    "arith-chain": arithmetic_chain,
+    "bool-guard": boolean_guard,
+    "nested-if": nested_if,
+}
+
+
+def wrap(expr: str) -> str:
+    return (
+        "class Expressions {\n"
+        "  var balances: mapping<address, uint256>\n"
+        "  method f() returns (r: uint256) {\n"
+        f"    return {expr};\n"
+        "  }\n"
+        "}\n"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark expression parsing")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[20, 80, 200],
+                        help="Nesting depth / chain length per case")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per case (best is reported)")
+    parser.add_argument("--against", metavar="REV", help="Also time the parser at this git revision")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        baseline = load_parser_at(args.against, Path(tmp)) if args.against else None
+
+        header = f"{'case':>13} {'size':>6} {'current (ms)':>13}"
+        if baseline:
+            header += f" {args.against + ' (ms)':>16} {'speedup':>8}"
+        print(header)
+
+        for name, build in CASES.items():
+            for size in args.sizes:
+                source = wrap(build(size))
+                current = time_parse(DafnyParser, source, args.repeat)
+                row = f"{name:>13} {size:>6} {current * 1000:>13.2f}"
+                if baseline:
+                    try:
+                        old = time_parse(baseline, source, args.repeat)
+                        row += f" {old * 1000:>16.2f} {old / current:>7.1f}x"
+                    except RecursionError:
+                        row += f" {'recursion limit':>16}"
+                print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Parse-time benchmark for DafnyParser.
+
+Generates a synthetic contract with many fields, events and methods and times
+DafnyParser.parse() on it. Pass --against REV to time the parser as it existed
+at a git revision on the same input, e.g. to compare against the old
+multi-pass implementation:
+
+    python benchmarks/bench_parser.py --methods 500 --against HEAD~1
+"""
+import argparse
+import importlib
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from src.parser.dafny_parser import DafnyParser
+
+
+def generate_contract(methods: int) -> str:
+    """Build a contract of roughly 16 lines per method."""
+    lines = ["class Generated {"]
+    lines.append("  var owner: address")
+    lines.append("  var balances: mapping<address, uint256>")
+    for i in range(methods):
+        lines.append(f"  var counter{i}: uint256")
+    for i in range(methods):
+        lines.append(f"  event Updated{i}(who: address, value: uint256)")
+    lines.append("")
+    for i in range(methods):
+        lines.append(f"  method update{i}(to: address, amount: uint256) returns (ok: bool)")
+        lines.append(f"    requires amount > 0 && amount <= 1000")
+        lines.append(f"    requires balances[to] + amount >= balances[to]")
+        lines.append(f"    modifies this")
+        lines.append(f"    ensures counter{i} == old(counter{i}) + amount")
+        lines.append("  {")
+        lines.append(f"    var previous: uint256 := counter{i};")
+        lines.append(f"    if (previous < amount * 2 + 1) {{")
+        lines.append(f"      counter{i} := previous + amount;")
+        lines.append("    }")
+        lines.append(f"    balances[to] := balances[to] + amount;")
+        lines.append(f"    emit Updated{i}(msg.sender, amount);")
+        lines.append("    return true;")
+        lines.append("  }")
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+
+def load_parser_at(rev: str, workdir: Path):
+    """Import the parser package as it existed at a git revision."""
+    package = workdir / "parser_at_rev"
+    package.mkdir()
+    (package / "__init__.py").write_text("")
+    listing = subprocess.run(
+        ["git", "ls-tree", "--name-only", rev, "src/parser/"],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout.split()
+    for path in listing:
+        if path.endswith(".py"):
+            source = subprocess.run(
+                ["git", "show", f"{rev}:{path}"],
+                cwd=ROOT, capture_output=True, text=True, check=True
+            ).stdout
+            (package / Path(path).name).write_text(source)
+    sys.path.insert(0, str(workdir))
+    return importlib.import_module("parser_at_rev.dafny_parser").DafnyParser
+
+
+def time_parse(parser_cls, source: str, repeat: int) -> float:
+    """Best-of-N wall time in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parser_cls(source).parse()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark DafnyParser.parse()")
+    parser.add_argument("--methods", type=int, nargs="+", default=[50, 200, 500],
+                        help="Method counts to benchmark")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per size (best is reported)")
+    parser.add_argument("--against", metavar="REV", help="Also time the parser at this git revision")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        baseline = load_parser_at(args.against, Path(tmp)) if args.against else None
+
+        header = f"{'methods':>8} {'lines':>7} {'current (ms)':>13}"
+        if baseline:
+            header += f" {args.against + ' (ms)':>16} {'speedup':>8}"
+        print(header)
+
+        for count in args.methods:
+            source = generate_contract(count)
+            current = time_parse(DafnyParser, source, args.repeat)
+            row = f"{count:>8} {source.count(chr(10)):>7} {current * 1000:>13.1f}"
+            if baseline:
+                old = time_parse(baseline, source, args.repeat)
+                row += f" {old * 1000:>16.1f} {old / current:>7.1f}x"
+            print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Guard cost of short-circuit && lowering.
+
+The guards of the wallet and vault examples (nested ifs and stacked
+requires clauses) are rewritten as single `require(a && b && ...)`
+conditions, added to the example contract and compiled. For each guard the
+estimated gas is reported for the lowering the generator emits and for
+eager evaluation (every operand computed, then combined with `and`):
+
+    python benchmarks/bench_short_circuit.py
+
+"pass" is the cost when every operand holds, "fail" the cost when the
+first operand tested fails. Gas is estimated with src/translator/costs.py
+(cold storage reads, base cost for everything else), not measured. CSE is
+off so loads shared with the method body are still counted in the guard.
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.parser.dafny_parser import DafnyParser
+from src.translator.costs import BUILTIN_GAS, GAS_BRANCH, estimate_gas
+from src.translator.yul_ast import Call, If, functions_of
+from src.translator.yul_generator import YulGenerator
+
+ROOT = Path(__file__).resolve().parent.parent
+
+GUARDS = [
+    ('_ModernWallet.dfy', 'withdraw', 'amount: uint256',
+     'amount > 0 && amount <= balance && msg.sender == owner'),
+    ('_ModernWallet.dfy', 'withdrawWithAllowance', 'amount: uint256',
+     'amount > 0 && allowances[msg.sender] >= amount && balance >= amount'),
+    ('_ModernWallet.dfy', 'setAllowance', 'spender: address, amount: uint256',
+     'msg.sender == owner && spender != 0'),
+    ('_AdvancedVault.dfy', 'withdraw', 'amount: uint256',
+     'msg.sender == owner && !paused && amount <= balance'),
+    ('_AdvancedVault.dfy', 'transferOwnership', 'newOwner: address',
+     'msg.sender == owner && newOwner != 0'),
+]
+
+
+def guard_contract(source: str, params: str, condition: str) -> str:
+    """The example with a guard method added before its closing brace."""
+    body = source.rstrip()
+    assert body.endswith('}')
+    return body[:-1] + f"\n  method guard({params}) {{\n    require({condition});\n  }}\n}}\n"
+
+
+def check_conditions(function) -> list:
+    """Conditions of the `if iszero(c) { revert }` checks, in evaluation order."""
+    return [stmt.condition.args[0] for stmt in function.body.statements
+            if isinstance(stmt, If) and isinstance(stmt.condition, Call) and stmt.condition.name == 'iszero']
+
+
+def check_gas(condition) -> int:
+    # ISZERO plus the conditional jump around the revert
+    return estimate_gas(condition) + BUILTIN_GAS + GAS_BRANCH
+
+
+def main():
+    print(f"{'guard':<40} {'checks':>6} {'pass':>6} {'fail':>6} {'eager':>6}")
+    for example, method, params, condition in GUARDS:
+        generator = YulGenerator(cse=False)
+        contract = DafnyParser(guard_contract((ROOT / 'examples' / example).read_text(), params, condition)).parse()
+        runtime = generator.generate_ir(contract).objects[0]
+        guard = next(f for f in functions_of(runtime) if f.name == 'guard')
+        checks = check_conditions(guard)
+        passed = sum(check_gas(c) for c in checks)
+        failed = check_gas(checks[0])
+
+        # Eager: every operand evaluated and combined with `and`
+        method_ast = next(m for m in contract.methods if m.name == 'guard')
+        operands = YulGenerator._logical_chain(method_ast.body[0].condition)
+        generator.current_method = method_ast
+        values = [generator._generate_expr(operand) for operand in operands]
+        eager = sum(estimate_gas(value) for value in values) + BUILTIN_GAS * (len(values) - 1) + BUILTIN_GAS + GAS_BRANCH
+
+        name = f"{example[1:-4]}.{method}"
+        print(f"{name:<40} {len(checks):>6} {passed:>6} {failed:>6} {eager:>6}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Wall-clock scaling of parallel verification.
+
+Verifies each contract with 1, 2, 4, ... dafny worker processes (no cache,
+so every run does the full SMT work) and reports the speedup over a single
+whole-file run. Requires dafny on PATH or in ~/.dotnet/tools.
+
+    python benchmarks/bench_verification.py --jobs 1 2 4 8 16 32
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from src.verifier.dafny_verifier import DafnyVerifier
+
+DEFAULT_CONTRACTS = [
+    ROOT / "examples" / "_FullyVerifiedToken.dfy",
+    ROOT / "examples" / "ERC20Verified.dfy",
+]
+
+
+def default_jobs():
+    jobs = [1]
+    while jobs[-1] * 2 <= (os.cpu_count() or 1):
+        jobs.append(jobs[-1] * 2)
+    return jobs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark parallel Dafny verification")
+    parser.add_argument("contracts", nargs="*", type=Path, default=DEFAULT_CONTRACTS)
+    parser.add_argument("--jobs", type=int, nargs="+", default=default_jobs(),
+                        help="Worker counts to benchmark (default: powers of two up to the CPU count)")
+    parser.add_argument("--timeout", type=int, default=120, help="Seconds allowed per dafny run")
+    args = parser.parse_args()
+
+    try:
+        DafnyVerifier()
+    except FileNotFoundError as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+
+    print(f"{'contract':>24} {'jobs':>5} {'wall (s)':>9} {'speedup':>8} {'methods':>8} verified")
+    for contract in args.contracts:
+        source = contract.read_text()
+        baseline = None
+        for jobs in args.jobs:
+            # jobs=1 is a single whole-file dafny run (the non-sharded path);
+            # larger counts shard per method across that many processes
+            verifier = DafnyVerifier(jobs=jobs, timeout=args.timeout)
+            start = time.perf_counter()
+            result = verifier.verify(source)
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            units = len(result.get('units', {})) or '-'
+            print(f"{contract.name:>24} {jobs:>5} {elapsed:>9.2f} {baseline / elapsed:>7.2f}x {units:>8} {result['verified']}")
+
+if __name__ == "__main__":
+    main()
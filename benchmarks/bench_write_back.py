@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Gas saved by write-back caching of storage slots.
+
+Generates Yul for a contract whose methods update the same fields and
+mapping entries several times, with and without the write-back pass, runs
+each call on `src/translator/yul_interpreter.py` and reports the gas used:
+
+    python benchmarks/bench_write_back.py
+
+The figures follow the interpreter's gas model (EIP-2929/EIP-2200 storage
+pricing), not solc's bytecode. Both versions must return the same data and
+leave storage the same.
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.parser.dafny_parser import DafnyParser
+from src.translator.yul_generator import YulGenerator
+from src.translator.yul_interpreter import YulInterpreter
+
+SOURCE = """
+class Vault {
+    var balance: uint256
+    var fees: uint256
+    var deposits: uint256
+    var credits: mapping<address, uint256>
+
+    method deposit(amount: uint256)
+        modifies this
+    {
+        var fee: uint256 := amount / 100;
+        balance := balance + amount;
+        balance := balance - fee;
+        fees := fees + fee;
+        deposits := deposits + 1;
+        credits[msg.sender] := credits[msg.sender] + amount;
+        credits[msg.sender] := credits[msg.sender] - fee;
+    }
+
+    method settle(amount: uint256)
+        modifies this
+    {
+        require(balance >= amount);
+        balance := balance - amount;
+        if (balance < 10) {
+            balance := 0;
+            return;
+        }
+        deposits := deposits + 1;
+    }
+}
+"""
+# Calls in order on one contract, starting from this storage (slot -> value)
+STORAGE = {0: 500, 2: 1}
+CALLS = [
+    ('deposit', [1000]),
+    ('settle', [100]),
+    ('settle', [1385]),
+    ('settle', [10 ** 6]),
+]
+
+
+def run(runtime):
+    interpreter = YulInterpreter(runtime, STORAGE)
+    results = [interpreter.call(method, args) for method, args in CALLS]
+    return results, interpreter.storage
+
+
+def main():
+    contract = DafnyParser(SOURCE).parse()
+    before, storage_before = run(YulGenerator().generate_ir(contract).objects[0])
+    after, storage_after = run(YulGenerator(write_back=True).generate_ir(contract).objects[0])
+    if storage_before != storage_after:
+        raise SystemExit("storage differs with write-back")
+    print(f"{'call':<16} {'outcome':>8} {'gas without':>12} {'gas with':>10} {'saved':>7}")
+    for (method, args), old, new in zip(CALLS, before, after):
+        if (old.success, old.return_data) != (new.success, new.return_data):
+            raise SystemExit(f"{method}{tuple(args)} behaves differently with write-back")
+        call = f"{method}({', '.join(map(str, args))})"
+        outcome = 'ok' if old.success else 'reverted'
+        print(f"{call:<16} {outcome:>8} {old.gas_used:>12} {new.gas_used:>10} {old.gas_used - new.gas_used:>7}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,59 +1,60 @@
 #!/usr/bin/env python3
 import sys
+import os
+import glob
+import json
 import argparse
 from pathlib import Path
+from src.compiler.bytecode import MAX_RUNTIME_SIZE
 from src.dafny_compiler import DafnyEVMCompiler
+from src.profiling import chrome_trace
+from src.translator.dispatch import DISPATCH_STRATEGIES
 
-def main():
-    parser = argparse.ArgumentParser(description='Dafny to EVM Compiler with Formal Verification')
-    parser.add_argument('input', help='Input Dafny file')
-    parser.add_argument('-o', '--output', help='Output directory', default='build')
-    parser.add_argument('--solc', help='Path to solc', default='solc')
-    parser.add_argument('--yul-only', action='store_true', help='Generate Yul only')
-    parser.add_argument('--skip-verification', action='store_true', help='Skip formal verification')
-    parser.add_argument('--no-verify', action='store_true', help='Disable verification (same as --skip-verification)')
-    parser.add_argument('--verify-only', action='store_true', help='Only run Dafny verification, no compilation')
-    parser.add_argument('--verbose', '-v', action='store_true', help='Show detailed verification output')
-    
-    args = parser.parse_args()
-    
-    # Verify-only mode: just run Dafny verification
-    if args.verify_only:
-        compiler = DafnyEVMCompiler(args.solc, verify=True, verbose=args.verbose)
-        result = compiler.compile_file(args.input, skip_verification=False, verify_only=True)
-        
-        if not result['success']:
-            print(f"Verification failed: {result['error']}", file=sys.stderr)
-            if 'verification_errors' in result:
-                print("\nVerification errors:", file=sys.stderr)
-                for error in result['verification_errors']:
-                    print(f"  {error}", file=sys.stderr)
-            if args.verbose and 'verification_output' in result and result['verification_output']:
-                print("\nFull verification output:", file=sys.stderr)
-                print(result['verification_output'], file=sys.stderr)
-            sys.exit(1)
-        
-        print("✓ Formal verification PASSED")
-        if args.verbose and 'verification_output' in result:
-            print("\nVerification details:")
-            print(result['verification_output'])
-        sys.exit(0)
-    
-    skip_verify = args.skip_verification or args.no_verify
-    compiler = DafnyEVMCompiler(args.solc, verify=not skip_verify, verbose=args.verbose)
-    result = compiler.compile_file(args.input, skip_verification=skip_verify)
-    
-    if not result['success']:
-        print(f"Compilation failed: {result['error']}", file=sys.stderr)
-        if 'verification_errors' in result:
-            print("\nVerification errors:", file=sys.stderr)
-            for error in result['verification_errors']:
-                print(f"  {error}", file=sys.stderr)
-        if args.verbose and 'verification_output' in result and result['verification_output']:
-            print("\nFull verification output:", file=sys.stderr)
-            print(result['verification_output'], file=sys.stderr)
-        sys.exit(1)
-    
+def expand_inputs(patterns: list) -> list:
+    """Expand glob patterns (for shells that pass them through unexpanded)."""
+    paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True)) if glob.has_magic(pattern) else []
+        # A pattern without matches is kept so it is reported as a missing file
+        paths.extend(matches or [pattern])
+    return list(dict.fromkeys(paths))
+
+def write_profile(results: dict, args):
+    """Write the per-contract profile reports as JSON or a Chrome trace."""
+    reports = {path: result['profile'] for path, result in results.items() if 'profile' in result}
+    document = chrome_trace(reports) if args.profile_format == 'chrome' else reports
+    with open(args.profile, 'w') as f:
+        json.dump(document, f, indent=2)
+    print(f"Wrote profile: {args.profile}", file=sys.stderr)
+
+def report_failure(result: dict, args, heading: str):
+    print(f"{heading}: {result['error']}", file=sys.stderr)
+    if 'verification_errors' in result:
+        print("\nVerification errors:", file=sys.stderr)
+        for error in result['verification_errors']:
+            print(f"  {error}", file=sys.stderr)
+    if args.verbose and 'verification_output' in result and result['verification_output']:
+        print("\nFull verification output:", file=sys.stderr)
+        print(result['verification_output'], file=sys.stderr)
+
+def report_verification(result: dict, args):
+    print(f"✓ Formal verification PASSED")
+    if args.verbose and result['verification_cache']['hit']:
+        print("(cached result, dafny skipped)")
+    if args.verbose and result.get('verification_output'):
+        print("\nVerification details:")
+        print(result['verification_output'])
+
+def report_gas(estimates: dict):
+    """Print the best/typical/worst execution gas of each entry point."""
+    for signature, gas in estimates.items():
+        if gas['best'] is None:
+            print(f"Gas {signature}: always reverts")
+            continue
+        worst = gas['worst'] if gas['worst'] is not None else "unbounded"
+        print(f"Gas {signature}: best {gas['best']}, typical {gas['typical']}, worst {worst}")
+
+def write_outputs(result: dict, args, skip_verify: bool):
     output_dir = Path(args.output)
     output_dir.mkdir(exist_ok=True)
     
@@ -61,10 +62,7 @@ def main():
     
     # Show verification status
     if result.get('verified'):
-        print(f"✓ Formal verification PASSED")
-        if args.verbose and result.get('verification_output'):
-            print("\nVerification details:")
-            print(result['verification_output'])
+        report_verification(result, args)
     elif not skip_verify:
         print(f"⚠ Verification skipped or unavailable")
     
@@ -73,6 +71,25 @@ def main():
         f.write(result['yul_code'])
     print(f"Generated Yul: {yul_file}")
     
+    layout_file = output_dir / f"{contract_name}.storage.json"
+    with open(layout_file, 'w') as f:
+        json.dump(result['storage_layout'], f, indent=2)
+    print(f"Generated storage layout: {layout_file}")
+    
+    abi_file = output_dir / f"{contract_name}.abi.json"
+    with open(abi_file, 'w') as f:
+        f.write(result['abi'])
+    print(f"Generated ABI: {abi_file}")
+    
+    gas_file = output_dir / f"{contract_name}.gas.json"
+    with open(gas_file, 'w') as f:
+        json.dump(result['gas_estimates'], f, indent=2)
+    print(f"Generated gas estimates: {gas_file}")
+    report_gas(result['gas_estimates'])
+    
+    for name, saved in result.get('elided_checks', {}).items():
+        print(f"Elided {saved['checks']} proven check(s) in {name}: ~{saved['gas']} gas per call, ~{saved['bytes']} bytes")
+    
     if not args.yul_only:
         bin_file = output_dir / f"{contract_name}.bin"
         with open(bin_file, 'w') as f:
@@ -83,8 +100,103 @@ def main():
         with open(runtime_file, 'w') as f:
             f.write(result['runtime_bytecode'])
         print(f"Generated runtime bytecode: {runtime_file}")
+        if result.get('runtime_size') is not None:
+            metadata = f" ({result['metadata_size']} of them metadata)" if result['metadata_size'] else ""
+            print(f"Runtime size: {result['runtime_size']}/{MAX_RUNTIME_SIZE} bytes{metadata}")
         
-        print(f"Gas estimate: {result['gas_estimate']} bytes")
+        if args.verbose and result['bytecode_cache']['hit']:
+            print("Bytecode: cache hit (solc skipped)")
+
+def main():
+    parser = argparse.ArgumentParser(description='Dafny to EVM Compiler with Formal Verification')
+    parser.add_argument('input', nargs='+', help='Input Dafny file(s) or glob patterns')
+    parser.add_argument('-o', '--output', help='Output directory', default='build')
+    parser.add_argument('--solc', help='Path to solc', default='solc')
+    parser.add_argument('--solc-backend', choices=['cli', 'standard-json'], default='cli', help='Assemble with `solc --strict-assembly` text output (cli) or `solc --standard-json` (adds opcodes and source maps; several files are assembled as one batch)')
+    parser.add_argument('--yul-only', action='store_true', help='Generate Yul only')
+    parser.add_argument('--skip-verification', action='store_true', help='Skip formal verification')
+    parser.add_argument('--no-verify', action='store_true', help='Disable verification (same as --skip-verification)')
+    parser.add_argument('--verify-only', action='store_true', help='Only run Dafny verification, no compilation')
+    parser.add_argument('--verbose', '-v', action='store_true', help='Show detailed verification output')
+    parser.add_argument('--jobs', '-j', type=int, default=os.cpu_count() or 1, metavar='N', help='Compile up to N input files in parallel (default: CPU count)')
+    parser.add_argument('--no-cache', action='store_true', help='Bypass the bytecode and verification caches')
+    parser.add_argument('--incremental', action='store_true', help='Verify per method, re-checking only methods whose fingerprint changed')
+    parser.add_argument('--verify-jobs', type=int, default=1, metavar='N', help='Verify methods in N parallel dafny processes')
+    parser.add_argument('--fail-fast', action='store_true', help='Stop verifying after the first failing method')
+    parser.add_argument('--overlap-verification', action='store_true', help='Parse, generate code and run solc while verification is still running')
+    parser.add_argument('--dafny-server', action='store_true', help='Verify through a persistent `dafny server` process instead of one dafny run per check')
+    parser.add_argument('--dispatch', choices=DISPATCH_STRATEGIES, default='linear', help='Selector dispatch strategy (default: linear)')
+    parser.add_argument('--dispatch-profile', metavar='FILE', help='JSON call counts keyed by signature or selector, used to put hot methods first')
+    parser.add_argument('--no-pack-storage', action='store_true', help='Give every field its own storage slot instead of packing small types')
+    parser.add_argument('--reorder-storage', action='store_true', help='Reorder small fields to use fewer slots (changes the storage layout)')
+    parser.add_argument('--no-cse', action='store_true', help='Recompute slot hashes and SLOADs at every use instead of reusing them within a function')
+    parser.add_argument('--elide-verified-checks', action='store_true', help='When verification passes, leave out runtime checks Dafny proved (internal method preconditions, asserts)')
+    parser.add_argument('--no-dse', action='store_true', help='Keep SSTOREs that cannot change storage (constructor zero-initialization, overwritten stores)')
+    parser.add_argument('--no-licm', action='store_true', help='Keep loop-invariant SLOADs and slot hashes inside loops, and store to storage on every iteration')
+    parser.add_argument('--write-back', action='store_true', help='Keep storage fields in locals within each method and store each changed one once, before returning or calling out')
+    parser.add_argument('--profile', metavar='FILE', help='Write per-stage timings, subprocess durations, cache hits and peak RSS to FILE')
+    parser.add_argument('--profile-format', choices=['json', 'chrome'], default='json', help='Profile format: summary JSON or Chrome trace events (chrome://tracing, Perfetto)')
+    parser.add_argument('--cache-dir', help='Cache directory (default: $DAFNY_EVM_CACHE_DIR or ~/.cache/dafny-evm-compiler)')
+    
+    args = parser.parse_args()
+    paths = expand_inputs(args.input)
+    dispatch_profile = None
+    if args.dispatch_profile:
+        with open(args.dispatch_profile) as f:
+            dispatch_profile = json.load(f)
+    skip_verify = (args.skip_verification or args.no_verify) and not args.verify_only
+    compiler = DafnyEVMCompiler(args.solc, verify=not skip_verify, verbose=args.verbose,
+                                use_cache=not args.no_cache, cache_dir=args.cache_dir,
+                                incremental=args.incremental, verify_jobs=args.verify_jobs,
+                                fail_fast=args.fail_fast, dafny_server=args.dafny_server,
+                                profile=bool(args.profile), overlap_verification=args.overlap_verification,
+                                dispatch=args.dispatch, dispatch_profile=dispatch_profile,
+                                pack_storage=not args.no_pack_storage, reorder_storage=args.reorder_storage,
+                                cse=not args.no_cse, dse=not args.no_dse,
+                                elide_verified_checks=args.elide_verified_checks, licm=not args.no_licm,
+                                write_back=args.write_back, solc_backend=args.solc_backend)
+    
+    if len(paths) > 1:
+        results = compiler.compile_many(paths, jobs=args.jobs, skip_verification=skip_verify,
+                                        verify_only=args.verify_only)
+        if args.profile:
+            write_profile(results, args)
+        failed = [path for path, result in results.items() if not result['success']]
+        for path, result in results.items():
+            print(f"== {path}")
+            if not result['success']:
+                report_failure(result, args, "Verification failed" if args.verify_only else "Compilation failed")
+            elif args.verify_only:
+                report_verification(result, args)
+            else:
+                write_outputs(result, args, skip_verify)
+        print(f"\n{len(paths) - len(failed)}/{len(paths)} contracts succeeded")
+        for path in failed:
+            print(f"  failed: {path}", file=sys.stderr)
+        sys.exit(1 if failed else 0)
+    
+    # Verify-only mode: just run Dafny verification
+    if args.verify_only:
+        result = compiler.compile_file(paths[0], skip_verification=False, verify_only=True)
+        if args.profile:
+            write_profile({paths[0]: result}, args)
+        
+        if not result['success']:
+            report_failure(result, args, "Verification failed")
+            sys.exit(1)
+        
+        report_verification(result, args)
+        sys.exit(0)
+    
+    result = compiler.compile_file(paths[0], skip_verification=skip_verify)
+    if args.profile:
+        write_profile({paths[0]: result}, args)
+    
+    if not result['success']:
+        report_failure(result, args, "Compilation failed")
+        sys.exit(1)
+    
+    write_outputs(result, args, skip_verify)
     
     print("Compilation successful!")
 
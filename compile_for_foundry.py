@@ -1,25 +1,12 @@
 #!/usr/bin/env python3
 """Compile Dafny contracts for Foundry integration tests."""
 
-import sys
-import subprocess
+import argparse
+import os
 from pathlib import Path
 
-def compile_contract(dafny_file: str):
-    """Compile a Dafny contract, skipping verification."""
-    result = subprocess.run(
-        ["python3", "cli.py", dafny_file, "--skip-verification"],
-        capture_output=True,
-        text=True
-    )
-    
-    if result.returncode != 0:
-        print(f"❌ Failed to compile {dafny_file}")
-        print(result.stderr)
-        return False
-    
-    print(f"✅ Compiled {dafny_file}")
-    return True
+from cli import write_outputs
+from src.dafny_compiler import DafnyEVMCompiler
 
 def main():
     contracts = [
@@ -28,12 +15,22 @@ def main():
         "examples/MyToken.dfy",
         "examples/ERC20Token.dfy",
     ]
+    existing = [contract for contract in contracts if Path(contract).exists()]
+    
+    # Verification is skipped; all contracts compile in one parallel batch
+    compiler = DafnyEVMCompiler(verify=False)
+    results = compiler.compile_many(existing, jobs=os.cpu_count() or 1, skip_verification=True)
+    output_args = argparse.Namespace(output='build', yul_only=False, verbose=False)
     
     success_count = 0
-    for contract in contracts:
-        if Path(contract).exists():
-            if compile_contract(contract):
-                success_count += 1
+    for contract, result in results.items():
+        if not result['success']:
+            print(f"❌ Failed to compile {contract}")
+            print(result['error'])
+            continue
+        write_outputs(result, output_args, skip_verify=True)
+        print(f"✅ Compiled {contract}")
+        success_count += 1
     
     print(f"\n✅ Compiled {success_count}/{len(contracts)} contracts")
 
@@ -0,0 +1,71 @@
+"""
+Runtime (deployed) code of an assembled contract.
+
+The creation code returned by solc holds the runtime object as a data
+section: the constructor copies it out with `datacopy` and returns it. The
+runtime is what ends up on chain, so it is what the EIP-170 size limit and
+a deployed-code cache key apply to.
+
+- `split_metadata` separates a trailing CBOR metadata section (the
+  `a1`/`a2` ... map ending in its two-byte length that solc appends to
+  Solidity output) from the code. It counts towards the deployed size, but
+  changes with compiler settings rather than with the code.
+- `runtime_info` reports the exact deployed size, the metadata size, where
+  the runtime starts in the creation code, and the offsets of immutables:
+  placeholder bytes the constructor fills in, so they differ between the
+  embedded copy and the deployed code.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+# EIP-170 limit on deployed code, EIP-3860 limit on creation code (bytes)
+MAX_RUNTIME_SIZE = 24576
+MAX_INITCODE_SIZE = 2 * MAX_RUNTIME_SIZE
+
+# Keys solc writes into the metadata map
+_METADATA_KEYS = (b'ipfs', b'bzzr0', b'bzzr1', b'solc', b'experimental')
+
+
+def split_metadata(code_hex: str) -> Tuple[str, str]:
+    """(code, metadata) of hex bytecode; metadata is '' when there is none."""
+    code = bytes.fromhex(code_hex)
+    if len(code) < 2:
+        return code_hex, ''
+    length = int.from_bytes(code[-2:], 'big')
+    start = len(code) - 2 - length
+    if length == 0 or start < 0:
+        return code_hex, ''
+    section = code[start:-2]
+    # A CBOR map of one to five entries, keyed by solc's text keys
+    if not 0xa1 <= section[0] <= 0xa5 or not any(key in section for key in _METADATA_KEYS):
+        return code_hex, ''
+    return code[:start].hex(), code[start:].hex()
+
+
+def runtime_info(creation_hex: str, runtime_hex: str,
+                 immutable_references: Optional[Dict[str, List[dict]]] = None) -> dict:
+    """
+    Size report for a runtime: `runtime_size` (bytes deployed, metadata
+    included), `metadata_size`, `runtime_offset` (byte offset of the runtime
+    in the creation code, or None when it is not embedded as is) and
+    `immutable_references` ({id: [{'start', 'length'}]}, as solc reports).
+    """
+    _, metadata = split_metadata(runtime_hex)
+    return {
+        'runtime_size': len(runtime_hex) // 2,
+        'metadata_size': len(metadata) // 2,
+        'runtime_offset': _find(creation_hex, runtime_hex, immutable_references or {}),
+        'immutable_references': immutable_references or {},
+    }
+
+
+def _find(creation_hex: str, runtime_hex: str, immutable_references: Dict[str, List[dict]]) -> Optional[int]:
+    if not runtime_hex:
+        return None
+    # Immutable placeholders are zero in the embedded copy
+    runtime = bytearray.fromhex(runtime_hex)
+    for references in immutable_references.values():
+        for reference in references:
+            runtime[reference['start']:reference['start'] + reference['length']] = bytes(reference['length'])
+    offset = bytes.fromhex(creation_hex).find(bytes(runtime))
+    return offset if offset >= 0 else None
@@ -0,0 +1,114 @@
+"""
+Content-addressed on-disk cache for build artifacts.
+
+Entries are small JSON documents stored under a hash of everything that
+determines them (input text, tool version, flags). Writes go to a temporary
+file in the same directory and are moved into place with os.replace, so
+several processes can share one cache directory without readers ever seeing
+a partial entry. Reads refresh the entry's mtime, and the least recently
+used entries are evicted once the directory grows past max_bytes.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+
+def default_cache_dir(namespace: str) -> Path:
+    """$DAFNY_EVM_CACHE_DIR/<namespace>, falling back to the XDG cache home."""
+    root = os.environ.get('DAFNY_EVM_CACHE_DIR')
+    if not root:
+        xdg = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+        root = os.path.join(xdg, 'dafny-evm-compiler')
+    return Path(root) / namespace
+
+
+class DiskCache:
+    def __init__(self, directory, max_bytes: int = 64 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(*parts: str) -> str:
+        """Hash the parts that identify an entry into a cache key."""
+        digest = hashlib.sha256()
+        for part in parts:
+            data = part.encode()
+            # Length-prefix each part so ('ab', 'c') and ('a', 'bc') differ
+            digest.update(len(data).to_bytes(8, 'big'))
+            digest.update(data)
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[dict]:
+        path = self._path(key)
+        try:
+            with open(path, 'r') as f:
+                value = json.load(f)
+        except (OSError, ValueError):
+            # Missing, evicted by another process, or unreadable: treat as a miss
+            self.misses += 1
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return value
+
+    def put(self, key: str, value: dict):
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix='.tmp-', suffix='.json')
+            try:
+                with os.fdopen(fd, 'w') as f:
+                    json.dump(value, f)
+                os.replace(tmp_name, path)
+            except BaseException:
+                Path(tmp_name).unlink(missing_ok=True)
+                raise
+        except OSError:
+            # A cache that cannot be written must never fail the build
+            return
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        total = 0
+        for path in self.directory.glob('*/*.json'):
+            if path.name.startswith('.tmp-'):
+                continue
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        if total <= self.max_bytes:
+            return
+        entries.sort()
+        for _, size, path in entries:
+            path.unlink(missing_ok=True)
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def clear(self):
+        for path in self.directory.glob('*/*.json'):
+            path.unlink(missing_ok=True)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
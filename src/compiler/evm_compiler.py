@@ -1,41 +1,237 @@
 import json
 import subprocess
 import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Dict, Optional
+
+from .bytecode import runtime_info
+from .cache import DiskCache
+from ..profiling import Profiler, subprocess_span
+from ..translator.yul_ast import iter_objects
+
+BACKENDS = ('cli', 'standard-json')
+
+# Result fields only the standard-json backend fills in
+STANDARD_JSON_ARTIFACTS = ('opcodes', 'runtime_opcodes', 'source_map', 'runtime_source_map', 'solc_gas_estimates')
+
+# Runtime size fields every successful result has (see bytecode.runtime_info)
+RUNTIME_FIELDS = ('runtime_size', 'metadata_size', 'runtime_offset', 'immutable_references')
+
+# Artifacts requested from `solc --standard-json`
+STANDARD_JSON_OUTPUTS = [
+    'evm.bytecode.object', 'evm.bytecode.opcodes', 'evm.bytecode.sourceMap',
+    'evm.deployedBytecode.object', 'evm.deployedBytecode.opcodes', 'evm.deployedBytecode.sourceMap',
+    'evm.deployedBytecode.immutableReferences',
+    'evm.gasEstimates',
+]
+
+def runtime_object_source(yul_code: str) -> Optional[str]:
+    """Text of the object nested first in the top-level one (the runtime), or None."""
+    objects = list(iter_objects(yul_code))
+    if len(objects) < 2 or objects[1][1] >= objects[0][2]:
+        return None
+    _, start, end = objects[1]
+    return yul_code[start:end]
+
 
 class EVMCompiler:
-    def __init__(self, solc_path: str = "solc"):
+    SOLC_FLAGS = ('--strict-assembly', '--optimize', '--bin')
+    STANDARD_JSON_FLAGS = ('--standard-json',)
+    # Part of the cache key; bumped when the fields of a cached result change
+    RESULT_FORMAT = '2'
+
+    def __init__(self, solc_path: str = "solc", cache: Optional[DiskCache] = None, backend: str = 'cli'):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown solc backend '{backend}' (expected one of {', '.join(BACKENDS)})")
         self.solc_path = solc_path
+        self.cache = cache
+        # 'cli' scrapes `solc --strict-assembly` text output; 'standard-json'
+        # reads the structured output of `solc --standard-json`
+        self.backend = backend
+        self._solc_version = None
     
-    def compile_yul(self, yul_code: str) -> dict:
+    def solc_version(self) -> str:
+        if self._solc_version is None:
+            try:
+                result = subprocess.run(
+                    [self.solc_path, '--version'],
+                    capture_output=True,
+                    text=True,
+                    check=True
+                )
+                self._solc_version = result.stdout.strip()
+            except (OSError, subprocess.CalledProcessError):
+                self._solc_version = ''
+        return self._solc_version
+    
+    def compile_yul(self, yul_code: str, profiler: Optional[Profiler] = None) -> dict:
+        if self.backend == 'standard-json':
+            return self.compile_yul_batch({'contract': yul_code}, profiler=profiler)['contract']
+        cache_key = self._cache_key(yul_code)
+        if cache_key:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                cached['cache_hit'] = True
+                return cached
+        
+        try:
+            bytecode = self._run_cli(yul_code, profiler)
+            # solc prints only the creation code, so the runtime is assembled on its own
+            runtime_source = runtime_object_source(yul_code)
+            runtime = self._run_cli(runtime_source, profiler) if runtime_source else ''
+        except subprocess.CalledProcessError as e:
+            return {
+                'success': False,
+                'error': e.stderr
+            }
+        
+        compiled = {
+            'bytecode': bytecode,
+            'runtime_bytecode': runtime,
+            **runtime_info(bytecode, runtime),
+            'success': True
+        }
+        if cache_key:
+            self.cache.put(cache_key, compiled)
+        compiled['cache_hit'] = False
+        return compiled
+    
+    def _run_cli(self, yul_code: str, profiler: Optional[Profiler]) -> str:
+        """Creation code solc prints for one Yul object; raises CalledProcessError."""
         with tempfile.NamedTemporaryFile(mode='w', suffix='.yul', delete=False) as f:
             f.write(yul_code)
             yul_file = f.name
         
         try:
-            result = subprocess.run(
-                [self.solc_path, '--strict-assembly', '--optimize', '--bin', yul_file],
-                capture_output=True,
-                text=True,
-                check=True
-            )
-            
-            output = result.stdout
-            bytecode = self._extract_bytecode(output, 'Binary representation:')
-            
-            return {
-                'bytecode': bytecode,
-                'runtime_bytecode': bytecode,
-                'success': True
-            }
+            command = [self.solc_path, *self.SOLC_FLAGS, yul_file]
+            with subprocess_span(profiler, 'solc', command):
+                result = subprocess.run(
+                    command,
+                    capture_output=True,
+                    text=True,
+                    check=True
+                )
+            return self._extract_bytecode(result.stdout, 'Binary representation:')
+        finally:
+            Path(yul_file).unlink(missing_ok=True)
+    
+    def compile_yul_batch(self, sources: Dict[str, str], jobs: int = 1,
+                          profiler: Optional[Profiler] = None) -> Dict[str, dict]:
+        """
+        Assemble several Yul objects with `solc --standard-json`, over up to
+        `jobs` concurrent solc processes.
+
+        `sources` maps a name to Yul code; the result maps each name to a
+        compile result, in input order. solc's Yul mode takes one source per
+        invocation, so each miss is one process, fed through stdin: no
+        temporary files. Results are cached like `compile_yul`'s.
+        """
+        results = {}
+        pending = {}
+        for name, yul_code in sources.items():
+            key = self._cache_key(yul_code, self.STANDARD_JSON_FLAGS)
+            cached = self.cache.get(key) if key else None
+            if cached is not None:
+                cached['cache_hit'] = True
+                results[name] = cached
+            else:
+                pending[name] = (yul_code, key)
         
+        def assemble(name: str) -> dict:
+            yul_code, key = pending[name]
+            compiled = self._run_standard_json(yul_code, profiler)
+            if key and compiled['success']:
+                self.cache.put(key, compiled)
+            compiled['cache_hit'] = False
+            return compiled
+        
+        jobs = max(1, min(jobs, len(pending)))
+        if jobs == 1:
+            results.update((name, assemble(name)) for name in pending)
+        else:
+            with ThreadPoolExecutor(max_workers=jobs, thread_name_prefix='solc') as pool:
+                results.update(zip(pending, pool.map(assemble, pending)))
+        return {name: results[name] for name in sources}
+    
+    def _run_standard_json(self, yul_code: str, profiler: Optional[Profiler]) -> dict:
+        compiled = self._standard_json(yul_code, profiler)
+        if compiled['success'] and not compiled['runtime_bytecode']:
+            # Older solc leave out deployedBytecode for Yul: assemble the runtime object on its own
+            runtime_source = runtime_object_source(yul_code)
+            runtime = self._standard_json(runtime_source, profiler) if runtime_source else None
+            if runtime is not None and not runtime['success']:
+                return runtime
+            if runtime is not None:
+                compiled.update(runtime_bytecode=runtime['bytecode'], runtime_opcodes=runtime['opcodes'],
+                                runtime_source_map=runtime['source_map'])
+        references = compiled.pop('immutable_references', {})
+        if compiled['success']:
+            compiled.update(runtime_info(compiled['bytecode'], compiled['runtime_bytecode'], references))
+        return compiled
+    
+    def _standard_json(self, yul_code: str, profiler: Optional[Profiler]) -> dict:
+        request = {
+            'language': 'Yul',
+            'sources': {'contract.yul': {'content': yul_code}},
+            'settings': {
+                'optimizer': {'enabled': True},
+                'outputSelection': {'*': {'*': STANDARD_JSON_OUTPUTS}},
+            },
+        }
+        command = [self.solc_path, *self.STANDARD_JSON_FLAGS]
+        try:
+            with subprocess_span(profiler, 'solc', command):
+                result = subprocess.run(command, input=json.dumps(request), capture_output=True,
+                                        text=True, check=True)
+            output = json.loads(result.stdout)
         except subprocess.CalledProcessError as e:
+            return {'success': False, 'error': e.stderr}
+        except (OSError, ValueError) as e:
+            return {'success': False, 'error': str(e)}
+        return self._read_standard_json(output)
+    
+    @staticmethod
+    def _read_standard_json(output: dict) -> dict:
+        """A compile result from the JSON solc writes for one Yul source."""
+        errors = [error for error in output.get('errors', []) if error.get('severity') == 'error']
+        if errors:
             return {
                 'success': False,
-                'error': e.stderr
+                'error': '\n'.join(error.get('formattedMessage') or error.get('message', '') for error in errors)
             }
-        finally:
-            Path(yul_file).unlink(missing_ok=True)
+        objects = [contract for source in output.get('contracts', {}).values() for contract in source.values()]
+        if not objects:
+            return {'success': False, 'error': 'solc returned no contract'}
+        evm = objects[0].get('evm', {})
+        creation = evm.get('bytecode', {})
+        deployed = evm.get('deployedBytecode', {})
+        return {
+            'bytecode': creation.get('object', ''),
+            'runtime_bytecode': deployed.get('object', ''),
+            'opcodes': creation.get('opcodes', ''),
+            'runtime_opcodes': deployed.get('opcodes', ''),
+            'source_map': creation.get('sourceMap', ''),
+            'runtime_source_map': deployed.get('sourceMap', ''),
+            'immutable_references': deployed.get('immutableReferences', {}),
+            # solc only estimates gas for Solidity sources; None when absent
+            'solc_gas_estimates': evm.get('gasEstimates'),
+            'success': True
+        }
+    
+    def _cache_key(self, yul_code: str, flags=SOLC_FLAGS) -> Optional[str]:
+        if self.cache is None:
+            return None
+        version = self.solc_version()
+        # Without a version the key could outlive a solc upgrade, so skip caching
+        if not version:
+            return None
+        return DiskCache.key(yul_code, version, ' '.join(flags), self.RESULT_FORMAT)
+    
+    def cache_stats(self) -> dict:
+        if self.cache is None:
+            return {'hits': 0, 'misses': 0, 'hit_rate': 0.0}
+        return self.cache.stats()
     
     def _extract_bytecode(self, output: str, marker: str) -> str:
         lines = output.split('\n')
@@ -45,11 +241,18 @@ class EVMCompiler:
                     return lines[i + 1].strip()
         return ""
     
-    def compile_and_verify(self, yul_code: str) -> dict:
-        result = self.compile_yul(yul_code)
-        
+    def compile_and_verify(self, yul_code: str, profiler: Optional[Profiler] = None) -> dict:
+        return self._verified(self.compile_yul(yul_code, profiler))
+    
+    def compile_and_verify_batch(self, sources: Dict[str, str], jobs: int = 1,
+                                 profiler: Optional[Profiler] = None) -> Dict[str, dict]:
+        """compile_and_verify over `compile_yul_batch`."""
+        return {name: self._verified(result)
+                for name, result in self.compile_yul_batch(sources, jobs, profiler).items()}
+    
+    @staticmethod
+    def _verified(result: dict) -> dict:
         if result['success']:
-            result['gas_estimate'] = len(result['bytecode']) // 2
             result['verified'] = True
         
         return result
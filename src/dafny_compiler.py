@@ -1,68 +1,140 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, Iterable, Optional
 from .parser.dafny_parser import DafnyParser
 from .translator.yul_generator import YulGenerator
-from .compiler.evm_compiler import EVMCompiler
+from .compiler.evm_compiler import RUNTIME_FIELDS, STANDARD_JSON_ARTIFACTS, EVMCompiler
+from .compiler.cache import DiskCache, default_cache_dir
 from .compiler.abi_generator import ABIGenerator
 from .verifier.dafny_verifier import DafnyVerifier
+from .profiling import ProfileHook, Profiler, stage
 
 class DafnyEVMCompiler:
-    def __init__(self, solc_path: str = "solc", verify: bool = True, verbose: bool = False):
-        self.yul_generator = YulGenerator()
-        self.evm_compiler = EVMCompiler(solc_path)
+    def __init__(self, solc_path: str = "solc", verify: bool = True, verbose: bool = False,
+                 use_cache: bool = True, cache_dir: Optional[str] = None, incremental: bool = False,
+                 verify_jobs: int = 1, fail_fast: bool = False, dafny_server: bool = False,
+                 profile: bool = False, profile_hooks: Iterable[ProfileHook] = (),
+                 overlap_verification: bool = False, dispatch: str = 'linear',
+                 dispatch_profile: Optional[Dict[str, float]] = None, pack_storage: bool = True,
+                 reorder_storage: bool = False, cse: bool = True, dse: bool = True,
+                 elide_verified_checks: bool = False, licm: bool = True, write_back: bool = False,
+                 solc_backend: str = 'cli'):
+        profile_hooks = list(profile_hooks)
+        # Constructor arguments, replayed to build one compiler per worker process. Hooks stay in this
+        # process: workers only profile, and compile_many passes their reports to the hooks here
+        self._config = dict(solc_path=solc_path, verify=verify, verbose=verbose, use_cache=use_cache,
+                            cache_dir=cache_dir, incremental=incremental, verify_jobs=verify_jobs,
+                            fail_fast=fail_fast, dafny_server=dafny_server, profile=profile or bool(profile_hooks),
+                            overlap_verification=overlap_verification,
+                            dispatch=dispatch, dispatch_profile=dispatch_profile,
+                            pack_storage=pack_storage, reorder_storage=reorder_storage, cse=cse, dse=dse,
+                            elide_verified_checks=elide_verified_checks, licm=licm, write_back=write_back,
+                            solc_backend=solc_backend)
+        self.yul_generator = YulGenerator(dispatch, dispatch_profile, pack_storage=pack_storage,
+                                          reorder_storage=reorder_storage, cse=cse, dse=dse, licm=licm,
+                                          write_back=write_back)
+        self.evm_compiler = EVMCompiler(solc_path, cache=self._make_cache(use_cache, cache_dir, 'bytecode'),
+                                        backend=solc_backend)
         self.abi_generator = ABIGenerator()
         self.verify_enabled = verify
         self.verbose = verbose
+        # Hooks imply profiling; results then carry a 'profile' report
+        self.profile_hooks = profile_hooks
+        self.profile = profile or bool(self.profile_hooks)
+        # Run verification concurrently with parse/codegen/solc
+        self.overlap_verification = overlap_verification
+        # Leave out runtime checks Dafny proved, when verification passes
+        self.elide_verified_checks = elide_verified_checks
         self.verifier = None
         
         if verify:
             try:
-                self.verifier = DafnyVerifier(verbose=verbose)
+                self.verifier = DafnyVerifier(
+                    verbose=verbose, cache=self._make_cache(use_cache, cache_dir, 'verification'),
+                    incremental=incremental, jobs=verify_jobs, fail_fast=fail_fast,
+                    server=dafny_server)
             except FileNotFoundError:
                 self.verify_enabled = False
     
-    def compile(self, dafny_source: str, skip_verification: bool = False, verify_only: bool = False) -> dict:
+    @staticmethod
+    def _make_cache(use_cache: bool, cache_dir: Optional[str], namespace: str) -> Optional[DiskCache]:
+        if not use_cache:
+            return None
+        return DiskCache(Path(cache_dir) / namespace if cache_dir else default_cache_dir(namespace))
+    
+    def _verification_cache_info(self, verification_result: Optional[dict]) -> Optional[dict]:
+        if verification_result is None:
+            return None
+        return {'hit': verification_result.get('cache_hit', False), **self.verifier.cache_stats()}
+    
+    def compile(self, dafny_source: str, skip_verification: bool = False, verify_only: bool = False,
+                assemble: bool = True) -> dict:
+        """
+        Verify and compile a contract. With `assemble=False` the result stops
+        at Yul: solc is not run and it has no bytecode yet.
+        """
+        profiler = Profiler(self.profile_hooks) if self.profile else None
+        result = self._compile(dafny_source, skip_verification, verify_only, profiler, assemble)
+        if profiler is not None:
+            result['profile'] = profiler.report()
+        return result
+    
+    def _compile(self, dafny_source: str, skip_verification: bool, verify_only: bool,
+                 profiler: Optional[Profiler], assemble: bool = True) -> dict:
         try:
-            # Step 1: Formal verification (if enabled)
             verification_result = None
-            if self.verify_enabled and not skip_verification and self.verifier:
-                verification_result = self.verifier.verify(dafny_source)
-                
+            verify = self.verify_enabled and not skip_verification and self.verifier
+            
+            if verify and self.overlap_verification and not verify_only:
+                # Parsing, codegen and solc do not depend on the verdict, so
+                # they run while dafny works; the result is gated on both
+                with ThreadPoolExecutor(max_workers=1, thread_name_prefix='verify') as executor:
+                    pending = executor.submit(self._verify, dafny_source, profiler)
+                    try:
+                        # The build is only used if verification passes, so it can assume it does
+                        build = self._build(dafny_source, profiler, proven=self.elide_verified_checks,
+                                            assemble=assemble)
+                    except Exception as e:
+                        build = e
+                    verification_result = pending.result()
+                # A verification failure takes precedence, as in serial mode
                 if not verification_result['verified']:
-                    return {
-                        'success': False,
-                        'verified': False,
-                        'error': 'Formal verification failed',
-                        'verification_errors': verification_result['errors'],
-                        'verification_output': verification_result['output']
-                    }
+                    return self._verification_failed(verification_result)
+                if isinstance(build, Exception):
+                    raise build
+            else:
+                # Step 1: Formal verification (if enabled)
+                if verify:
+                    verification_result = self._verify(dafny_source, profiler)
+                    if not verification_result['verified']:
+                        return self._verification_failed(verification_result)
+                    
+                    # If verify-only mode, return success after verification
+                    if verify_only:
+                        return {
+                            'success': True,
+                            'verified': True,
+                            'verification_output': verification_result['output'],
+                            'verification_cache': self._verification_cache_info(verification_result)
+                        }
                 
-                # If verify-only mode, return success after verification
-                if verify_only:
-                    return {
-                        'success': True,
-                        'verified': True,
-                        'verification_output': verification_result['output']
-                    }
-            
-            # Step 2: Parse and compile
-            parser = DafnyParser(dafny_source)
-            contract_ast = parser.parse()
-            
-            yul_code = self.yul_generator.generate(contract_ast)
-            abi_json = self.abi_generator.generate(contract_ast)
-            
-            result = self.evm_compiler.compile_and_verify(yul_code)
+                # Step 2: Parse and compile
+                build = self._build(dafny_source, profiler,
+                                    proven=bool(verify) and self.elide_verified_checks, assemble=assemble)
             
+            contract_ast, yul_code, abi_json, storage_layout, elided_checks, gas_estimates, result = build
             return {
                 'success': result['success'],
                 'verified': verification_result['verified'] if verification_result else False,
                 'contract_name': contract_ast.name,
                 'yul_code': yul_code,
                 'abi': abi_json,
-                'bytecode': result.get('bytecode', ''),
-                'runtime_bytecode': result.get('runtime_bytecode', ''),
-                'gas_estimate': result.get('gas_estimate', 0),
+                'storage_layout': storage_layout,
+                'elided_checks': elided_checks,
+                'gas_estimates': gas_estimates,
                 'verification_output': verification_result['output'] if verification_result else None,
-                'error': result.get('error')
+                'verification_cache': self._verification_cache_info(verification_result),
+                **self._assembly_fields(result)
             }
         
         except Exception as e:
@@ -72,7 +144,133 @@ class DafnyEVMCompiler:
                 'error': str(e)
             }
     
-    def compile_file(self, filepath: str, skip_verification: bool = False, verify_only: bool = False) -> dict:
+    def _assembly_fields(self, result: dict) -> dict:
+        """The fields of a compile result that come from solc."""
+        fields = {
+            'bytecode': result.get('bytecode', ''),
+            'runtime_bytecode': result.get('runtime_bytecode', ''),
+            'bytecode_cache': {'hit': result.get('cache_hit', False), **self.evm_compiler.cache_stats()},
+            'error': result.get('error')
+        }
+        fields.update({key: result[key] for key in RUNTIME_FIELDS + STANDARD_JSON_ARTIFACTS if key in result})
+        return fields
+    
+    def _verify(self, dafny_source: str, profiler: Optional[Profiler]) -> dict:
+        with stage(profiler, 'verify'):
+            verification_result = self.verifier.verify(dafny_source, profiler=profiler)
+        if profiler is not None:
+            profiler.record_cache('verification', verification_result.get('cache_hit', False))
+        return verification_result
+    
+    def _verification_failed(self, verification_result: dict) -> dict:
+        return {
+            'success': False,
+            'verified': False,
+            'error': 'Formal verification failed',
+            'verification_errors': verification_result['errors'],
+            'verification_output': verification_result['output'],
+            'verification_cache': self._verification_cache_info(verification_result)
+        }
+    
+    def _build(self, dafny_source: str, profiler: Optional[Profiler], proven: bool = False,
+               assemble: bool = True) -> tuple:
+        """
+        Parse, generate Yul and ABI, and assemble: (ast, yul, abi, storage
+        layout, elided checks, gas estimates, solc result). `proven` is only passed once
+        verification has succeeded. Without `assemble` the solc result is a
+        bare success.
+        """
+        with stage(profiler, 'parse'):
+            parser = DafnyParser(dafny_source)
+            contract_ast = parser.parse()
+        
+        with stage(profiler, 'yul'):
+            yul_code = self.yul_generator.generate(contract_ast, proven=proven)
+            storage_layout = self.yul_generator.storage_layout()
+            elided_checks = self.yul_generator.elided_checks()
+            gas_estimates = self.yul_generator.gas_estimates()
+        with stage(profiler, 'abi'):
+            abi_json = self.abi_generator.generate(contract_ast)
+        
+        if not assemble:
+            return contract_ast, yul_code, abi_json, storage_layout, elided_checks, gas_estimates, {'success': True}
+        with stage(profiler, 'solc'):
+            result = self.evm_compiler.compile_and_verify(yul_code, profiler)
+        if profiler is not None:
+            profiler.record_cache('bytecode', result.get('cache_hit', False))
+        return contract_ast, yul_code, abi_json, storage_layout, elided_checks, gas_estimates, result
+    
+    def compile_file(self, filepath: str, skip_verification: bool = False, verify_only: bool = False,
+                     assemble: bool = True) -> dict:
         with open(filepath, 'r') as f:
             source = f.read()
-        return self.compile(source, skip_verification, verify_only)
+        return self.compile(source, skip_verification, verify_only, assemble)
+    
+    def compile_many(self, paths: Iterable[str], jobs: int = 1, skip_verification: bool = False,
+                     verify_only: bool = False) -> Dict[str, dict]:
+        """
+        Compile several files, fanning out over `jobs` worker processes.
+        
+        Returns a result per path, in input order. A file that fails (including
+        one that cannot be read or whose worker crashed) gets a failed result;
+        the other files are unaffected.
+        
+        With the standard-json solc backend, the files' Yul is assembled
+        together once every file is through code generation, over up to
+        `jobs` concurrent solc processes.
+        
+        Profile hooks stay in this process: each worker's records are passed
+        to them when its file is done.
+        """
+        paths = list(dict.fromkeys(str(p) for p in paths))
+        jobs = max(1, min(jobs, len(paths)))
+        batch = self.evm_compiler.backend == 'standard-json' and not verify_only
+        if jobs == 1:
+            results = {path: _compile_path(self, path, skip_verification, verify_only, not batch) for path in paths}
+        else:
+            results = {}
+            with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                     initargs=(self._config,)) as pool:
+                futures = {
+                    pool.submit(_compile_in_worker, path, skip_verification, verify_only, not batch): path
+                    for path in paths
+                }
+                for future in as_completed(futures):
+                    path = futures[future]
+                    try:
+                        results[path] = future.result()
+                    except Exception as e:
+                        results[path] = {'success': False, 'verified': False, 'error': f"Worker failed: {e}"}
+                    if self.profile_hooks and 'profile' in results[path]:
+                        Profiler(self.profile_hooks).replay(results[path]['profile'])
+        if batch:
+            self._assemble_batch(results, jobs)
+        return {path: results[path] for path in paths}
+    
+    def _assemble_batch(self, results: Dict[str, dict], jobs: int):
+        """Run solc over every result that got as far as Yul, in place."""
+        sources = {path: result['yul_code'] for path, result in results.items()
+                   if result['success'] and 'yul_code' in result}
+        for path, compiled in self.evm_compiler.compile_and_verify_batch(sources, jobs).items():
+            results[path].update(success=compiled['success'], **self._assembly_fields(compiled))
+
+
+def _compile_path(compiler: DafnyEVMCompiler, path: str, skip_verification: bool, verify_only: bool,
+                  assemble: bool = True) -> dict:
+    try:
+        return compiler.compile_file(path, skip_verification, verify_only, assemble)
+    except OSError as e:
+        return {'success': False, 'verified': False, 'error': str(e)}
+
+
+# Per-process compiler used by compile_many workers
+_worker_compiler: Optional[DafnyEVMCompiler] = None
+
+
+def _init_worker(config: dict):
+    global _worker_compiler
+    _worker_compiler = DafnyEVMCompiler(**config)
+
+
+def _compile_in_worker(path: str, skip_verification: bool, verify_only: bool, assemble: bool) -> dict:
+    return _compile_path(_worker_compiler, path, skip_verification, verify_only, assemble)
@@ -0,0 +1,4 @@
+from .chain import CallResult, Deployment, DeploymentError, LocalChain
+from .vm import EVM, Receipt
+
+__all__ = ['CallResult', 'Deployment', 'DeploymentError', 'EVM', 'LocalChain', 'Receipt']
@@ -0,0 +1,211 @@
+"""
+ABI encoding and decoding of call data, return data and events.
+
+Covers the types `ABIGenerator` emits: `uintN`, `intN`, `bool`, `address`,
+`bytesN`, `bytes`, `string`, arrays (`T[]`, `T[k]`) and tuples, written as
+`(T1,T2)` or as ABI JSON entries with `components`. Addresses decode to
+0x-prefixed hex strings and are accepted as hex strings or ints.
+"""
+
+from typing import List, Sequence, Tuple
+
+WORD_BYTES = 32
+
+
+def keccak(data: bytes) -> bytes:
+    from Crypto.Hash import keccak as _keccak
+    return _keccak.new(digest_bits=256, data=data).digest()
+
+
+def selector(signature: str) -> bytes:
+    """The 4-byte function selector of a signature such as 'transfer(address,uint256)'."""
+    return keccak(signature.encode())[:4]
+
+
+def canonical_type(param: dict) -> str:
+    """The type of an ABI JSON input or output, with tuples spelled out."""
+    kind = param['type']
+    if kind.startswith('tuple'):
+        if 'components' not in param:
+            raise ValueError(f"Tuple parameter '{param.get('name', '')}' has no components")
+        return '(' + ','.join(canonical_type(component) for component in param['components']) + ')' + kind[5:]
+    return kind
+
+
+def signature(entry: dict) -> str:
+    """Canonical signature of an ABI JSON function or event entry."""
+    return f"{entry['name']}({','.join(canonical_type(param) for param in entry.get('inputs', []))})"
+
+
+def split_types(types: str) -> List[str]:
+    """Top-level types of a comma-separated list, e.g. 'uint256,(bool,address)[]'."""
+    parts, depth, start = [], 0, 0
+    for index, char in enumerate(types):
+        depth += {'(': 1, ')': -1}.get(char, 0)
+        if char == ',' and depth == 0:
+            parts.append(types[start:index])
+            start = index + 1
+    if types:
+        parts.append(types[start:])
+    return parts
+
+
+def signature_types(signature: str) -> List[str]:
+    """Parameter types of a signature such as 'transfer(address,uint256)'."""
+    return split_types(signature[signature.index('(') + 1:-1])
+
+
+def _array(kind: str) -> Tuple[str, int]:
+    """(element type, length) of an array type; length is -1 for T[]."""
+    element, _, length = kind[:-1].rpartition('[')
+    return element, int(length) if length else -1
+
+
+def _tuple(kind: str) -> List[str]:
+    return split_types(kind[1:-1])
+
+
+def is_dynamic(kind: str) -> bool:
+    if kind in ('bytes', 'string'):
+        return True
+    if kind.endswith(']'):
+        element, length = _array(kind)
+        return length < 0 or is_dynamic(element)
+    if kind.startswith('('):
+        return any(is_dynamic(component) for component in _tuple(kind))
+    return False
+
+
+def _head_size(kind: str) -> int:
+    if is_dynamic(kind):
+        return WORD_BYTES
+    if kind.endswith(']'):
+        element, length = _array(kind)
+        return length * _head_size(element)
+    if kind.startswith('('):
+        return sum(_head_size(component) for component in _tuple(kind))
+    return WORD_BYTES
+
+
+def _bits(kind: str, prefix: str) -> int:
+    bits = int(kind[len(prefix):] or 256)
+    if bits % 8 or not 8 <= bits <= 256:
+        raise ValueError(f"Invalid ABI type '{kind}'")
+    return bits
+
+
+def _as_bytes(value) -> bytes:
+    if isinstance(value, str):
+        return bytes.fromhex(value[2:] if value.startswith('0x') else value)
+    return bytes(value)
+
+
+def encode(types: Sequence[str], values: Sequence) -> bytes:
+    """ABI encoding of values as a tuple of types (call arguments or return data)."""
+    if len(types) != len(values):
+        raise ValueError(f"Expected {len(types)} values, got {len(values)}")
+    heads, tails = [], []
+    offset = sum(_head_size(kind) for kind in types)
+    for kind, value in zip(types, values):
+        encoded = _encode_value(kind, value)
+        if is_dynamic(kind):
+            heads.append(offset.to_bytes(WORD_BYTES, 'big'))
+            tails.append(encoded)
+            offset += len(encoded)
+        else:
+            heads.append(encoded)
+    return b''.join(heads + tails)
+
+
+def _encode_value(kind: str, value) -> bytes:
+    if kind.endswith(']'):
+        element, length = _array(kind)
+        values = list(value)
+        if length >= 0 and len(values) != length:
+            raise ValueError(f"Expected {length} elements for {kind}, got {len(values)}")
+        body = encode([element] * len(values), values)
+        return body if length >= 0 else len(values).to_bytes(WORD_BYTES, 'big') + body
+    if kind.startswith('('):
+        return encode(_tuple(kind), list(value))
+    if kind in ('bytes', 'string'):
+        data = value.encode() if kind == 'string' else _as_bytes(value)
+        padded = data + bytes(-len(data) % WORD_BYTES)
+        return len(data).to_bytes(WORD_BYTES, 'big') + padded
+    if kind == 'bool':
+        return int(bool(value)).to_bytes(WORD_BYTES, 'big')
+    if kind == 'address':
+        number = int(value, 16) if isinstance(value, str) else int(value)
+        if not 0 <= number < 1 << 160:
+            raise ValueError(f"Address out of range: {value!r}")
+        return number.to_bytes(WORD_BYTES, 'big')
+    if kind.startswith('uint'):
+        bits = _bits(kind, 'uint')
+        if not 0 <= value < 1 << bits:
+            raise ValueError(f"Value out of range for {kind}: {value}")
+        return value.to_bytes(WORD_BYTES, 'big')
+    if kind.startswith('int'):
+        bits = _bits(kind, 'int')
+        if not -(1 << (bits - 1)) <= value < 1 << (bits - 1):
+            raise ValueError(f"Value out of range for {kind}: {value}")
+        return (value % (1 << 256)).to_bytes(WORD_BYTES, 'big')
+    if kind.startswith('bytes'):
+        size = int(kind[5:])
+        data = _as_bytes(value)
+        if not 1 <= size <= 32 or len(data) > size:
+            raise ValueError(f"Value too long for {kind}: {len(data)} bytes")
+        return data.ljust(WORD_BYTES, b'\0')
+    raise ValueError(f"Unsupported ABI type '{kind}'")
+
+
+def decode(types: Sequence[str], data: bytes) -> tuple:
+    """Values of a tuple of types encoded in data; raises ValueError if data is too short."""
+    values, position = [], 0
+    for kind in types:
+        if is_dynamic(kind):
+            values.append(_decode_value(kind, data, _word(data, position)))
+        else:
+            values.append(_decode_value(kind, data, position))
+        position += _head_size(kind)
+    return tuple(values)
+
+
+def _word(data: bytes, position: int) -> int:
+    if position + WORD_BYTES > len(data):
+        raise ValueError(f"ABI data too short: need {position + WORD_BYTES} bytes, have {len(data)}")
+    return int.from_bytes(data[position:position + WORD_BYTES], 'big')
+
+
+def _decode_value(kind: str, data: bytes, position: int):
+    if kind.endswith(']'):
+        element, length = _array(kind)
+        if length < 0:
+            length = _word(data, position)
+            position += WORD_BYTES
+        return list(decode([element] * length, data[position:]))
+    if kind.startswith('('):
+        return decode(_tuple(kind), data[position:])
+    if kind in ('bytes', 'string'):
+        size = _word(data, position)
+        if position + WORD_BYTES + size > len(data):
+            raise ValueError(f"ABI data too short for {kind} of {size} bytes")
+        raw = data[position + WORD_BYTES:position + WORD_BYTES + size]
+        return raw.decode() if kind == 'string' else raw
+    word = _word(data, position)
+    if kind == 'bool':
+        return bool(word)
+    if kind == 'address':
+        return '0x' + (word & ((1 << 160) - 1)).to_bytes(20, 'big').hex()
+    if kind.startswith('uint'):
+        return word & ((1 << _bits(kind, 'uint')) - 1)
+    if kind.startswith('int'):
+        bits = _bits(kind, 'int')
+        word &= (1 << bits) - 1
+        return word - (1 << bits) if word >> (bits - 1) else word
+    if kind.startswith('bytes'):
+        return data[position:position + int(kind[5:])]
+    raise ValueError(f"Unsupported ABI type '{kind}'")
+
+
+def encode_call(signature: str, values: Sequence) -> bytes:
+    """Call data: the selector of signature followed by the encoded arguments."""
+    return selector(signature) + encode(signature_types(signature), values)
@@ -0,0 +1,161 @@
+"""
+Local chain for deploying compile results and calling them through their ABI.
+
+    chain = LocalChain()
+    token = chain.deploy(DafnyEVMCompiler().compile(source), 1000)
+    result = token.call('transfer', chain.accounts[1], 10)
+    result.gas_used, result.value, result.events, result.storage_changes
+
+Methods are named as in the ABI, or by full signature (`'balance()'`) for
+the getters of public fields, which the dispatcher serves but the ABI does
+not list. A call is a transaction: its effects persist and its gas
+includes the 21000 base cost and the calldata.
+"""
+
+import json
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Union
+
+from . import abi
+from .vm import DEFAULT_GAS_LIMIT, EVM, Log, Receipt
+
+# Selector of Error(string), the standard revert reason
+ERROR_SELECTOR = abi.selector('Error(string)')
+
+
+class DeploymentError(Exception):
+    """The creation transaction failed; `receipt` says why."""
+
+    def __init__(self, message: str, receipt: Optional[Receipt] = None):
+        super().__init__(message)
+        self.receipt = receipt
+
+
+@dataclass
+class CallResult:
+    success: bool
+    gas_used: int
+    return_data: bytes
+    # Decoded outputs: None for no outputs, the value for one, a tuple for more
+    value: object = None
+    logs: List[Log] = field(default_factory=list)
+    # (event name, {param: value}) for each log matching an ABI event
+    events: List[tuple] = field(default_factory=list)
+    # slot -> new value in the called contract
+    storage_changes: Dict[int, int] = field(default_factory=dict)
+    # Why the call failed: the Error(string) reason if there is one
+    error: Optional[str] = None
+
+
+def _address(value: Union[int, str]) -> int:
+    return int(value, 16) if isinstance(value, str) else value
+
+
+class Deployment:
+    """A contract deployed on a `LocalChain`."""
+
+    def __init__(self, chain: 'LocalChain', address: int, abi_json: List[dict], receipt: Receipt):
+        self.chain = chain
+        self.address = address
+        self.abi = abi_json
+        self.receipt = receipt
+        self._events = {int.from_bytes(abi.keccak(abi.signature(entry).encode()), 'big'): entry
+                        for entry in abi_json if entry['type'] == 'event' and not entry.get('anonymous')}
+
+    def function(self, method: str) -> dict:
+        """The ABI entry of a method given by name or signature; getters get a synthesized entry."""
+        if '(' in method:
+            for entry in self.abi:
+                if entry['type'] == 'function' and abi.signature(entry) == method:
+                    return entry
+            return {'type': 'function', 'name': method[:method.index('(')],
+                    'inputs': [{'name': '', 'type': kind} for kind in abi.signature_types(method)],
+                    'outputs': [{'name': '', 'type': 'uint256'}]}
+        matches = [entry for entry in self.abi if entry['type'] == 'function' and entry['name'] == method]
+        if len(matches) != 1:
+            raise ValueError(f"{'No' if not matches else 'Ambiguous'} method '{method}'; give its signature")
+        return matches[0]
+
+    def call(self, method: str, *args, sender: Union[int, str, None] = None, value: int = 0,
+             gas_limit: int = DEFAULT_GAS_LIMIT) -> CallResult:
+        """
+        Send a transaction calling method with args. Getters called by
+        signature are decoded as a single uint256.
+        """
+        entry = self.function(method)
+        types = [abi.canonical_type(param) for param in entry['inputs']]
+        data = abi.selector(abi.signature(entry)) + abi.encode(types, args)
+        sender = self.chain.accounts[0] if sender is None else _address(sender)
+        receipt = self.chain.evm.transact(sender, self.address, data, value, gas_limit)
+        result = CallResult(receipt.success, receipt.gas_used, receipt.return_data, logs=receipt.logs,
+                            storage_changes=receipt.storage_changes.get(self.address, {}))
+        if receipt.success:
+            outputs = abi.decode([abi.canonical_type(param) for param in entry.get('outputs', [])],
+                                 receipt.return_data)
+            result.value = outputs[0] if len(outputs) == 1 else (outputs or None)
+            result.events = [self.decode_log(log) for log in receipt.logs if self.decode_log(log)]
+        else:
+            result.error = revert_reason(receipt)
+        return result
+
+    def decode_log(self, log: Log) -> Optional[tuple]:
+        """(event name, {param: value}) of a log this contract's ABI describes, else None."""
+        entry = self._events.get(log.topics[0]) if log.topics else None
+        if entry is None or log.address != self.address:
+            return None
+        indexed = [param for param in entry['inputs'] if param.get('indexed')]
+        data = [param for param in entry['inputs'] if not param.get('indexed')]
+        values = dict(zip((param['name'] for param in data),
+                          abi.decode([abi.canonical_type(param) for param in data], log.data)))
+        for param, topic in zip(indexed, log.topics[1:]):
+            kind = abi.canonical_type(param)
+            # Dynamic indexed values are stored as their hash
+            values[param['name']] = (topic.to_bytes(32, 'big') if abi.is_dynamic(kind)
+                                     else abi.decode([kind], topic.to_bytes(32, 'big'))[0])
+        return entry['name'], {param['name']: values[param['name']] for param in entry['inputs']}
+
+    def storage(self, slot: int) -> int:
+        return self.chain.evm.account(self.address).storage.get(slot, 0)
+
+
+def revert_reason(receipt: Receipt) -> str:
+    """The Error(string) message of a failed receipt, or how it failed."""
+    data = receipt.return_data
+    if receipt.error == 'revert' and data[:4] == ERROR_SELECTOR:
+        try:
+            return abi.decode(['string'], data[4:])[0]
+        except (ValueError, UnicodeDecodeError):
+            pass
+    if receipt.error == 'revert' and data:
+        return f"revert 0x{data.hex()}"
+    return receipt.error
+
+
+class LocalChain:
+    """An `EVM` with funded accounts to deploy and call contracts from."""
+
+    def __init__(self, accounts: int = 10, balance: int = 10 ** 24):
+        self.evm = EVM()
+        self.accounts = [0x1000 + index for index in range(accounts)]
+        for address in self.accounts:
+            self.evm.account(address).balance = balance
+
+    def deploy(self, result: dict, *args, sender: Union[int, str, None] = None, value: int = 0,
+               gas_limit: int = DEFAULT_GAS_LIMIT) -> Deployment:
+        """
+        Deploy a `DafnyEVMCompiler.compile` result, with args ABI-encoded
+        after the creation code as constructor arguments. Raises
+        `DeploymentError` if the result has no bytecode or the creation fails.
+        """
+        if not result.get('success') or not result.get('bytecode'):
+            raise DeploymentError(f"No bytecode to deploy: {result.get('error') or 'compile result has none'}")
+        abi_json = json.loads(result['abi']) if isinstance(result['abi'], str) else result['abi']
+        constructor = next((entry for entry in abi_json if entry['type'] == 'constructor'), {'inputs': []})
+        code = result['bytecode']
+        initcode = bytes.fromhex(code[2:] if code.startswith('0x') else code)
+        initcode += abi.encode([abi.canonical_type(param) for param in constructor['inputs']], args)
+        sender = self.accounts[0] if sender is None else _address(sender)
+        receipt = self.evm.transact(sender, None, initcode, value, gas_limit)
+        if not receipt.success:
+            raise DeploymentError(f"Deployment failed: {revert_reason(receipt)}", receipt)
+        return Deployment(self, receipt.contract_address, abi_json, receipt)
@@ -0,0 +1,731 @@
+"""
+Pure-Python EVM for running compiled contracts in process.
+
+Executes bytecode with the Cancun rules and gas schedule, so a transaction
+costs what it would on chain:
+
+- Intrinsic gas: 21000, 4 per zero and 16 per non-zero calldata byte, and
+  for a creation 32000 plus 2 per initcode word (EIP-3860).
+- EIP-2929 access lists: the first touch of an account costs 2600 and of a
+  storage slot 2100, later ones 100. The sender, the recipient, the
+  coinbase and the precompile addresses start warm.
+- SSTORE follows EIP-2200 with the EIP-3529 refunds, which are capped at a
+  fifth of the gas used.
+- Memory expansion, copies, KECCAK256, LOG, EXP, CALL (value transfer,
+  new accounts, the 63/64 rule and the 2300 stipend) and CREATE/CREATE2
+  (code deposit, size limits) are priced as in the yellow paper.
+
+The world is a dict of `Account`s keyed by integer address. Block values
+(`number`, `timestamp`, `chain_id`, ...) are attributes of the `EVM`. Gas
+price and base fee are zero, so gas is counted but not paid for.
+Precompiled contracts are not implemented: calling one raises
+`UnsupportedOperation`.
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from .abi import keccak
+
+WORD = (1 << 256) - 1
+ADDRESS_MASK = (1 << 160) - 1
+
+DEFAULT_GAS_LIMIT = 30_000_000
+MAX_CODE_SIZE = 24576
+MAX_INITCODE_SIZE = 2 * MAX_CODE_SIZE
+MAX_DEPTH = 1024
+MAX_STACK = 1024
+
+GAS_TX = 21000
+GAS_TX_CREATE = 32000
+GAS_TX_DATA_ZERO = 4
+GAS_TX_DATA_NONZERO = 16
+GAS_INITCODE_WORD = 2
+GAS_CODE_DEPOSIT = 200
+GAS_COLD_ACCOUNT = 2600
+GAS_COLD_SLOAD = 2100
+GAS_WARM_ACCESS = 100
+GAS_SSTORE_SET = 20000
+GAS_SSTORE_RESET = 2900
+GAS_SSTORE_STIPEND = 2300
+REFUND_SSTORE_CLEAR = 4800
+GAS_CALL_VALUE = 9000
+GAS_CALL_STIPEND = 2300
+GAS_NEW_ACCOUNT = 25000
+GAS_SELFDESTRUCT = 5000
+MAX_REFUND_QUOTIENT = 5
+
+PRECOMPILES = range(1, 11)
+
+# Opcode -> (name, static gas); dynamic parts are charged by the handlers
+OPCODES = {
+    0x00: ('STOP', 0), 0x01: ('ADD', 3), 0x02: ('MUL', 5), 0x03: ('SUB', 3), 0x04: ('DIV', 5),
+    0x05: ('SDIV', 5), 0x06: ('MOD', 5), 0x07: ('SMOD', 5), 0x08: ('ADDMOD', 8), 0x09: ('MULMOD', 8),
+    0x0a: ('EXP', 10), 0x0b: ('SIGNEXTEND', 5),
+    0x10: ('LT', 3), 0x11: ('GT', 3), 0x12: ('SLT', 3), 0x13: ('SGT', 3), 0x14: ('EQ', 3),
+    0x15: ('ISZERO', 3), 0x16: ('AND', 3), 0x17: ('OR', 3), 0x18: ('XOR', 3), 0x19: ('NOT', 3),
+    0x1a: ('BYTE', 3), 0x1b: ('SHL', 3), 0x1c: ('SHR', 3), 0x1d: ('SAR', 3),
+    0x20: ('KECCAK256', 30),
+    0x30: ('ADDRESS', 2), 0x31: ('BALANCE', 0), 0x32: ('ORIGIN', 2), 0x33: ('CALLER', 2),
+    0x34: ('CALLVALUE', 2), 0x35: ('CALLDATALOAD', 3), 0x36: ('CALLDATASIZE', 2), 0x37: ('CALLDATACOPY', 3),
+    0x38: ('CODESIZE', 2), 0x39: ('CODECOPY', 3), 0x3a: ('GASPRICE', 2), 0x3b: ('EXTCODESIZE', 0),
+    0x3c: ('EXTCODECOPY', 0), 0x3d: ('RETURNDATASIZE', 2), 0x3e: ('RETURNDATACOPY', 3), 0x3f: ('EXTCODEHASH', 0),
+    0x40: ('BLOCKHASH', 20), 0x41: ('COINBASE', 2), 0x42: ('TIMESTAMP', 2), 0x43: ('NUMBER', 2),
+    0x44: ('PREVRANDAO', 2), 0x45: ('GASLIMIT', 2), 0x46: ('CHAINID', 2), 0x47: ('SELFBALANCE', 5),
+    0x48: ('BASEFEE', 2), 0x49: ('BLOBHASH', 3), 0x4a: ('BLOBBASEFEE', 2),
+    0x50: ('POP', 2), 0x51: ('MLOAD', 3), 0x52: ('MSTORE', 3), 0x53: ('MSTORE8', 3), 0x54: ('SLOAD', 0),
+    0x55: ('SSTORE', 0), 0x56: ('JUMP', 8), 0x57: ('JUMPI', 10), 0x58: ('PC', 2), 0x59: ('MSIZE', 2),
+    0x5a: ('GAS', 2), 0x5b: ('JUMPDEST', 1), 0x5c: ('TLOAD', 100), 0x5d: ('TSTORE', 100), 0x5e: ('MCOPY', 3),
+    0x5f: ('PUSH0', 2),
+    **{0x60 + i: (f'PUSH{i + 1}', 3) for i in range(32)},
+    **{0x80 + i: (f'DUP{i + 1}', 3) for i in range(16)},
+    **{0x90 + i: (f'SWAP{i + 1}', 3) for i in range(16)},
+    **{0xa0 + i: (f'LOG{i}', 375 * (i + 1)) for i in range(5)},
+    0xf0: ('CREATE', 32000), 0xf1: ('CALL', 0), 0xf2: ('CALLCODE', 0), 0xf3: ('RETURN', 0),
+    0xf4: ('DELEGATECALL', 0), 0xf5: ('CREATE2', 32000), 0xfa: ('STATICCALL', 0), 0xfd: ('REVERT', 0),
+    0xfe: ('INVALID', 0), 0xff: ('SELFDESTRUCT', GAS_SELFDESTRUCT),
+}
+OPCODE_VALUES = {name: opcode for opcode, (name, _) in OPCODES.items()}
+
+_STATE_CHANGING = {'SSTORE', 'TSTORE', 'CREATE', 'CREATE2', 'SELFDESTRUCT', 'LOG0', 'LOG1', 'LOG2', 'LOG3', 'LOG4'}
+
+
+class UnsupportedOperation(Exception):
+    """The code used a feature this EVM does not implement."""
+
+
+class _Halt(Exception):
+    """Exceptional halt: the frame fails and its gas is gone."""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+@dataclass
+class Account:
+    balance: int = 0
+    nonce: int = 0
+    code: bytes = b''
+    storage: Dict[int, int] = field(default_factory=dict)
+
+    def copy(self) -> 'Account':
+        return Account(self.balance, self.nonce, self.code, dict(self.storage))
+
+    def is_empty(self) -> bool:
+        return not self.balance and not self.nonce and not self.code
+
+
+class Log(NamedTuple):
+    address: int
+    topics: Tuple[int, ...]
+    data: bytes
+
+
+@dataclass
+class Receipt:
+    """Outcome of a transaction."""
+    success: bool
+    # Gas charged to the sender: intrinsic and execution gas, less refunds
+    gas_used: int
+    return_data: bytes = b''
+    logs: List[Log] = field(default_factory=list)
+    # address -> {slot: value} of every slot whose value changed
+    storage_changes: Dict[int, Dict[int, int]] = field(default_factory=dict)
+    contract_address: Optional[int] = None
+    # Why execution failed: 'revert', 'out of gas', 'invalid opcode 0x..', ...
+    error: Optional[str] = None
+    gas_refund: int = 0
+
+
+@dataclass
+class _Frame:
+    caller: int
+    address: int
+    code: bytes
+    data: bytes
+    value: int
+    gas: int
+    depth: int
+    is_static: bool
+    stack: List[int] = field(default_factory=list)
+    memory: bytearray = field(default_factory=bytearray)
+    return_data: bytes = b''
+
+
+def _memory_cost(words: int) -> int:
+    return 3 * words + words * words // 512
+
+
+def _words(size: int) -> int:
+    return (size + 31) // 32
+
+
+def _signed(value: int) -> int:
+    return value - (1 << 256) if value >> 255 else value
+
+
+def _jump_destinations(code: bytes) -> set:
+    destinations, pc = set(), 0
+    while pc < len(code):
+        opcode = code[pc]
+        if opcode == 0x5b:
+            destinations.add(pc)
+        pc += 1 + (opcode - 0x5f if 0x60 <= opcode <= 0x7f else 0)
+    return destinations
+
+
+def _rlp_bytes(data: bytes) -> bytes:
+    if len(data) == 1 and data[0] < 0x80:
+        return data
+    return bytes([0x80 + len(data)]) + data
+
+
+def create_address(sender: int, nonce: int) -> int:
+    """Address of the contract a CREATE from sender with nonce makes."""
+    nonce_bytes = nonce.to_bytes((nonce.bit_length() + 7) // 8, 'big') if nonce else b''
+    payload = _rlp_bytes(sender.to_bytes(20, 'big')) + _rlp_bytes(nonce_bytes)
+    return int.from_bytes(keccak(bytes([0xc0 + len(payload)]) + payload)[12:], 'big')
+
+
+def create2_address(sender: int, salt: int, initcode: bytes) -> int:
+    data = b'\xff' + sender.to_bytes(20, 'big') + salt.to_bytes(32, 'big') + keccak(initcode)
+    return int.from_bytes(keccak(data)[12:], 'big')
+
+
+def intrinsic_gas(data: bytes, create: bool) -> int:
+    zeros = data.count(0)
+    gas = GAS_TX + GAS_TX_DATA_ZERO * zeros + GAS_TX_DATA_NONZERO * (len(data) - zeros)
+    if create:
+        gas += GAS_TX_CREATE + GAS_INITCODE_WORD * _words(len(data))
+    return gas
+
+
+class EVM:
+    """World state and transaction execution."""
+
+    def __init__(self):
+        self.accounts: Dict[int, Account] = {}
+        self.number = 1
+        self.timestamp = 1
+        self.chain_id = 1
+        self.coinbase = 0
+        self.prevrandao = 0
+        self.block_gas_limit = DEFAULT_GAS_LIMIT
+
+    def account(self, address: int) -> Account:
+        return self.accounts.setdefault(address, Account())
+
+    def transact(self, sender: int, to: Optional[int], data: bytes = b'', value: int = 0,
+                 gas_limit: int = DEFAULT_GAS_LIMIT) -> Receipt:
+        """
+        Run a transaction: a call to `to`, or with `to=None` a contract
+        creation whose initcode is `data`. Raises ValueError for a
+        transaction no block would include (gas below the intrinsic cost,
+        initcode too large, value above the sender's balance).
+        """
+        create = to is None
+        intrinsic = intrinsic_gas(data, create)
+        if gas_limit < intrinsic:
+            raise ValueError(f"Gas limit {gas_limit} below intrinsic gas {intrinsic}")
+        if create and len(data) > MAX_INITCODE_SIZE:
+            raise ValueError(f"Initcode of {len(data)} bytes exceeds {MAX_INITCODE_SIZE}")
+        if self.account(sender).balance < value:
+            raise ValueError("Sender balance below transaction value")
+
+        self.origin = sender
+        self._original = {address: dict(account.storage) for address, account in self.accounts.items()}
+        self._warm_accounts = {sender, self.coinbase, *PRECOMPILES}
+        self._warm_slots = set()
+        self._transient = {}
+        self._refund = 0
+        self._logs = []
+        self._created = set()
+
+        gas = gas_limit - intrinsic
+        if create:
+            nonce = self.account(sender).nonce
+            self.account(sender).nonce += 1
+            address = create_address(sender, nonce)
+            self._warm_accounts.add(address)
+            success, output, gas_left, error = self._create(sender, address, data, value, gas, 0)
+            contract_address = address if success else None
+        else:
+            self.account(sender).nonce += 1
+            self._warm_accounts.add(to)
+            success, output, gas_left, error = self._call(sender, to, to, data, value, gas, 0, False)
+            contract_address = None
+
+        gas_used = gas_limit - gas_left
+        refund = min(self._refund, gas_used // MAX_REFUND_QUOTIENT) if success else 0
+        changes = {}
+        for address, account in self.accounts.items():
+            original = self._original.get(address, {})
+            changed = {slot: value for slot, value in account.storage.items() if original.get(slot, 0) != value}
+            changed.update({slot: 0 for slot in original if slot not in account.storage})
+            if changed:
+                changes[address] = changed
+        return Receipt(success, gas_used - refund, output, list(self._logs) if success else [], changes,
+                       contract_address, error, refund)
+
+    # Frames
+
+    def _snapshot(self):
+        return ({address: account.copy() for address, account in self.accounts.items()}, set(self._warm_accounts),
+                set(self._warm_slots), dict(self._transient), self._refund, len(self._logs), set(self._created))
+
+    def _restore(self, snapshot):
+        self.accounts, self._warm_accounts, self._warm_slots, self._transient, self._refund, logs, \
+            self._created = snapshot
+        del self._logs[logs:]
+
+    def _transfer(self, sender: int, recipient: int, value: int):
+        if value:
+            self.account(sender).balance -= value
+            self.account(recipient).balance += value
+
+    def _call(self, caller: int, address: int, code_address: int, data: bytes, value: int, gas: int, depth: int,
+              is_static: bool, transfer: bool = True) -> Tuple[bool, bytes, int, Optional[str]]:
+        """(success, output, gas left, error) of a message call."""
+        if code_address in PRECOMPILES:
+            raise UnsupportedOperation(f"Precompiled contract {code_address:#x} is not implemented")
+        snapshot = self._snapshot()
+        if transfer:
+            self._transfer(caller, address, value)
+        code = self.accounts[code_address].code if code_address in self.accounts else b''
+        frame = _Frame(caller, address, code, data, value, gas, depth, is_static)
+        success, output, error = self._execute(frame)
+        if not success:
+            self._restore(snapshot)
+        return success, output, frame.gas if error in (None, 'revert') else 0, error
+
+    def _create(self, caller: int, address: int, initcode: bytes, value: int, gas: int,
+                depth: int) -> Tuple[bool, bytes, int, Optional[str]]:
+        existing = self.accounts.get(address)
+        if existing is not None and (existing.nonce or existing.code or existing.storage):
+            return False, b'', 0, 'address collision'
+        snapshot = self._snapshot()
+        account = self.account(address)
+        account.nonce = 1
+        self._created.add(address)
+        self._transfer(caller, address, value)
+        frame = _Frame(caller, address, initcode, b'', value, gas, depth, False)
+        success, output, error = self._execute(frame)
+        if success:
+            deposit = GAS_CODE_DEPOSIT * len(output)
+            if len(output) > MAX_CODE_SIZE:
+                success, error = False, f"code size {len(output)} exceeds {MAX_CODE_SIZE}"
+            elif output[:1] == b'\xef':
+                success, error = False, 'code starts with 0xEF'
+            elif frame.gas < deposit:
+                success, error = False, 'out of gas'
+            else:
+                frame.gas -= deposit
+                self.accounts[address].code = output
+                return True, b'', frame.gas, None
+        self._restore(snapshot)
+        return False, output if error == 'revert' else b'', frame.gas if error == 'revert' else 0, error
+
+    # Interpreter
+
+    def _execute(self, frame: _Frame) -> Tuple[bool, bytes, Optional[str]]:
+        """Run a frame's code: (success, output, error)."""
+        try:
+            return self._run(frame)
+        except _Halt as halt:
+            frame.gas = 0
+            return False, b'', halt.reason
+
+    def _use(self, frame: _Frame, gas: int):
+        frame.gas -= gas
+        if frame.gas < 0:
+            raise _Halt('out of gas')
+
+    def _expand(self, frame: _Frame, offset: int, size: int):
+        if size == 0:
+            return
+        end = offset + size
+        if end > 1 << 32:
+            raise _Halt('out of gas')
+        words = _words(end)
+        old = len(frame.memory) // 32
+        if words > old:
+            self._use(frame, _memory_cost(words) - _memory_cost(old))
+            frame.memory.extend(bytes(32 * (words - old)))
+
+    def _read(self, frame: _Frame, offset: int, size: int) -> bytes:
+        if size == 0:
+            return b''
+        self._expand(frame, offset, size)
+        return bytes(frame.memory[offset:offset + size])
+
+    def _write(self, frame: _Frame, offset: int, data: bytes):
+        if data:
+            self._expand(frame, offset, len(data))
+            frame.memory[offset:offset + len(data)] = data
+
+    def _access_account(self, frame: _Frame, address: int):
+        if address in self._warm_accounts:
+            self._use(frame, GAS_WARM_ACCESS)
+        else:
+            self._warm_accounts.add(address)
+            self._use(frame, GAS_COLD_ACCOUNT)
+
+    def _copy(self, frame: _Frame, source: bytes, dest: int, offset: int, size: int):
+        """The *COPY opcodes: per-word cost, then source bytes (zero past its end) into memory."""
+        self._use(frame, 3 * _words(size))
+        if size:
+            self._expand(frame, dest, size)
+            chunk = source[offset:offset + size] if offset < len(source) else b''
+            self._write(frame, dest, chunk.ljust(size, b'\0'))
+
+    def _run(self, frame: _Frame) -> Tuple[bool, bytes, Optional[str]]:
+        code, stack = frame.code, frame.stack
+        destinations = _jump_destinations(code)
+        pop, push = stack.pop, stack.append
+        pc = 0
+        while pc < len(code):
+            opcode = code[pc]
+            if opcode not in OPCODES:
+                raise _Halt(f"invalid opcode {opcode:#04x}")
+            name, gas = OPCODES[opcode]
+            self._use(frame, gas)
+            if frame.is_static and (name in _STATE_CHANGING or (name == 'CALL' and len(stack) >= 3 and stack[-3])):
+                raise _Halt(f"{name} in a static call")
+            inputs = _INPUTS.get(name, 0)
+            if len(stack) < inputs:
+                raise _Halt('stack underflow')
+            pc += 1
+
+            if 0x60 <= opcode <= 0x7f:
+                size = opcode - 0x5f
+                push(int.from_bytes(code[pc:pc + size].ljust(size, b'\0'), 'big'))
+                pc += size
+            elif opcode == 0x5f:
+                push(0)
+            elif 0x80 <= opcode <= 0x8f:
+                position = opcode - 0x7f
+                if len(stack) < position:
+                    raise _Halt('stack underflow')
+                push(stack[-position])
+            elif 0x90 <= opcode <= 0x9f:
+                position = opcode - 0x8e
+                if len(stack) < position:
+                    raise _Halt('stack underflow')
+                stack[-1], stack[-position] = stack[-position], stack[-1]
+            elif name in _ARITHMETIC:
+                args = [pop() for _ in range(inputs)]
+                if name == 'EXP':
+                    self._use(frame, 50 * ((args[1].bit_length() + 7) // 8))
+                push(_ARITHMETIC[name](*args) & WORD)
+            elif name == 'STOP':
+                return True, b'', None
+            elif name == 'KECCAK256':
+                offset, size = pop(), pop()
+                self._use(frame, 6 * _words(size))
+                push(int.from_bytes(keccak(self._read(frame, offset, size)), 'big'))
+            elif name == 'ADDRESS':
+                push(frame.address)
+            elif name == 'BALANCE':
+                address = pop() & ADDRESS_MASK
+                self._access_account(frame, address)
+                push(self.accounts[address].balance if address in self.accounts else 0)
+            elif name == 'ORIGIN':
+                push(self.origin)
+            elif name == 'CALLER':
+                push(frame.caller)
+            elif name == 'CALLVALUE':
+                push(frame.value)
+            elif name == 'CALLDATALOAD':
+                offset = pop()
+                push(int.from_bytes(frame.data[offset:offset + 32].ljust(32, b'\0'), 'big')
+                     if offset < len(frame.data) else 0)
+            elif name == 'CALLDATASIZE':
+                push(len(frame.data))
+            elif name in ('CALLDATACOPY', 'CODECOPY', 'RETURNDATACOPY'):
+                dest, offset, size = pop(), pop(), pop()
+                source = {'CALLDATACOPY': frame.data, 'CODECOPY': code, 'RETURNDATACOPY': frame.return_data}[name]
+                if name == 'RETURNDATACOPY' and offset + size > len(source):
+                    raise _Halt('return data out of bounds')
+                self._copy(frame, source, dest, offset, size)
+            elif name == 'CODESIZE':
+                push(len(code))
+            elif name in ('GASPRICE', 'BASEFEE', 'BLOBHASH', 'BLOCKHASH'):
+                if name in ('BLOBHASH', 'BLOCKHASH'):
+                    pop()
+                push(0)
+            elif name == 'BLOBBASEFEE':
+                push(1)
+            elif name in ('EXTCODESIZE', 'EXTCODEHASH', 'EXTCODECOPY'):
+                address = pop() & ADDRESS_MASK
+                self._access_account(frame, address)
+                account = self.accounts.get(address)
+                if name == 'EXTCODESIZE':
+                    push(len(account.code) if account else 0)
+                elif name == 'EXTCODEHASH':
+                    push(0 if account is None or account.is_empty() else int.from_bytes(keccak(account.code), 'big'))
+                else:
+                    dest, offset, size = pop(), pop(), pop()
+                    self._copy(frame, account.code if account else b'', dest, offset, size)
+            elif name == 'RETURNDATASIZE':
+                push(len(frame.return_data))
+            elif name == 'COINBASE':
+                push(self.coinbase)
+            elif name == 'TIMESTAMP':
+                push(self.timestamp)
+            elif name == 'NUMBER':
+                push(self.number)
+            elif name == 'PREVRANDAO':
+                push(self.prevrandao)
+            elif name == 'GASLIMIT':
+                push(self.block_gas_limit)
+            elif name == 'CHAINID':
+                push(self.chain_id)
+            elif name == 'SELFBALANCE':
+                push(self.account(frame.address).balance)
+            elif name == 'POP':
+                pop()
+            elif name == 'MLOAD':
+                offset = pop()
+                push(int.from_bytes(self._read(frame, offset, 32), 'big'))
+            elif name == 'MSTORE':
+                offset, value = pop(), pop()
+                self._write(frame, offset, value.to_bytes(32, 'big'))
+            elif name == 'MSTORE8':
+                offset, value = pop(), pop()
+                self._write(frame, offset, bytes([value & 0xff]))
+            elif name == 'SLOAD':
+                slot = pop()
+                self._access_slot(frame, slot)
+                push(self.account(frame.address).storage.get(slot, 0))
+            elif name == 'SSTORE':
+                self._sstore(frame, pop(), pop())
+            elif name == 'JUMP':
+                pc = self._jump(pop(), destinations)
+            elif name == 'JUMPI':
+                destination, condition = pop(), pop()
+                if condition:
+                    pc = self._jump(destination, destinations)
+            elif name == 'PC':
+                push(pc - 1)
+            elif name == 'MSIZE':
+                push(len(frame.memory))
+            elif name == 'GAS':
+                push(frame.gas)
+            elif name == 'JUMPDEST':
+                pass
+            elif name == 'TLOAD':
+                push(self._transient.get((frame.address, pop()), 0))
+            elif name == 'TSTORE':
+                slot, value = pop(), pop()
+                self._transient[(frame.address, slot)] = value
+            elif name == 'MCOPY':
+                dest, offset, size = pop(), pop(), pop()
+                self._use(frame, 3 * _words(size))
+                if size:
+                    self._expand(frame, max(dest, offset), size)
+                    self._write(frame, dest, self._read(frame, offset, size))
+            elif name.startswith('LOG'):
+                offset, size = pop(), pop()
+                topics = tuple(pop() for _ in range(int(name[3:])))
+                self._use(frame, 8 * size)
+                self._logs.append(Log(frame.address, topics, self._read(frame, offset, size)))
+            elif name in ('CREATE', 'CREATE2'):
+                push(self._create_op(frame, name))
+            elif name in ('CALL', 'CALLCODE', 'DELEGATECALL', 'STATICCALL'):
+                push(self._call_op(frame, name))
+            elif name == 'RETURN':
+                offset, size = pop(), pop()
+                return True, self._read(frame, offset, size), None
+            elif name == 'REVERT':
+                offset, size = pop(), pop()
+                return False, self._read(frame, offset, size), 'revert'
+            elif name == 'INVALID':
+                raise _Halt('invalid opcode 0xfe')
+            elif name == 'SELFDESTRUCT':
+                self._selfdestruct(frame, pop() & ADDRESS_MASK)
+                return True, b'', None
+            if len(stack) > MAX_STACK:
+                raise _Halt('stack overflow')
+        return True, b'', None
+
+    @staticmethod
+    def _jump(destination: int, destinations: set) -> int:
+        if destination not in destinations:
+            raise _Halt(f"invalid jump destination {destination}")
+        return destination
+
+    # Storage
+
+    def _access_slot(self, frame: _Frame, slot: int) -> bool:
+        """Charge for reading a slot; True if it was cold."""
+        key = (frame.address, slot)
+        if key in self._warm_slots:
+            self._use(frame, GAS_WARM_ACCESS)
+            return False
+        self._warm_slots.add(key)
+        self._use(frame, GAS_COLD_SLOAD)
+        return True
+
+    def _sstore(self, frame: _Frame, slot: int, value: int):
+        if frame.gas <= GAS_SSTORE_STIPEND:
+            raise _Halt('out of gas')
+        key = (frame.address, slot)
+        if key not in self._warm_slots:
+            self._warm_slots.add(key)
+            self._use(frame, GAS_COLD_SLOAD)
+        storage = self.account(frame.address).storage
+        original = self._original.get(frame.address, {}).get(slot, 0)
+        current = storage.get(slot, 0)
+        if current == value:
+            self._use(frame, GAS_WARM_ACCESS)
+        elif original == current:
+            self._use(frame, GAS_SSTORE_SET if original == 0 else GAS_SSTORE_RESET)
+            if original and not value:
+                self._refund += REFUND_SSTORE_CLEAR
+        else:
+            self._use(frame, GAS_WARM_ACCESS)
+            if original:
+                if not current:
+                    self._refund -= REFUND_SSTORE_CLEAR
+                elif not value:
+                    self._refund += REFUND_SSTORE_CLEAR
+            if original == value:
+                self._refund += (GAS_SSTORE_SET if original == 0 else GAS_SSTORE_RESET) - GAS_WARM_ACCESS
+        if value:
+            storage[slot] = value
+        else:
+            storage.pop(slot, None)
+
+    # Calls
+
+    def _call_op(self, frame: _Frame, name: str) -> int:
+        stack = frame.stack
+        requested, address = stack.pop(), stack.pop() & ADDRESS_MASK
+        value = stack.pop() if name in ('CALL', 'CALLCODE') else 0
+        if len(stack) < 4:
+            raise _Halt('stack underflow')
+        in_offset, in_size, out_offset, out_size = (stack.pop() for _ in range(4))
+        if in_size:
+            self._expand(frame, in_offset, in_size)
+        if out_size:
+            self._expand(frame, out_offset, out_size)
+        self._access_account(frame, address)
+        if value:
+            self._use(frame, GAS_CALL_VALUE)
+            if name == 'CALL' and self.accounts.get(address, Account()).is_empty():
+                self._use(frame, GAS_NEW_ACCOUNT)
+        available = frame.gas - frame.gas // 64
+        gas = min(requested, available)
+        self._use(frame, gas)
+        if value:
+            gas += GAS_CALL_STIPEND
+        frame.return_data = b''
+        if frame.depth + 1 > MAX_DEPTH or self.account(frame.address).balance < value:
+            frame.gas += gas
+            return 0
+        data = self._read(frame, in_offset, in_size)
+        if name == 'CALL':
+            result = self._call(frame.address, address, address, data, value, gas, frame.depth + 1, frame.is_static)
+        elif name == 'STATICCALL':
+            result = self._call(frame.address, address, address, data, 0, gas, frame.depth + 1, True)
+        elif name == 'CALLCODE':
+            result = self._call(frame.address, frame.address, address, data, value, gas, frame.depth + 1,
+                                frame.is_static)
+        else:
+            result = self._delegate(frame, address, data, gas)
+        success, output, gas_left, _ = result
+        frame.gas += gas_left
+        frame.return_data = output
+        if out_size:
+            self._write(frame, out_offset, output[:out_size])
+        return int(success)
+
+    def _delegate(self, frame: _Frame, code_address: int, data: bytes, gas: int):
+        if code_address in PRECOMPILES:
+            raise UnsupportedOperation(f"Precompiled contract {code_address:#x} is not implemented")
+        snapshot = self._snapshot()
+        code = self.accounts[code_address].code if code_address in self.accounts else b''
+        child = _Frame(frame.caller, frame.address, code, data, frame.value, gas, frame.depth + 1, frame.is_static)
+        success, output, error = self._execute(child)
+        if not success:
+            self._restore(snapshot)
+        return success, output, child.gas if error in (None, 'revert') else 0, error
+
+    def _create_op(self, frame: _Frame, name: str) -> int:
+        stack = frame.stack
+        value, offset, size = stack.pop(), stack.pop(), stack.pop()
+        salt = stack.pop() if name == 'CREATE2' else 0
+        if size > MAX_INITCODE_SIZE:
+            raise _Halt('initcode too large')
+        self._use(frame, GAS_INITCODE_WORD * _words(size) + (6 * _words(size) if name == 'CREATE2' else 0))
+        initcode = self._read(frame, offset, size)
+        frame.return_data = b''
+        sender = self.account(frame.address)
+        if frame.depth + 1 > MAX_DEPTH or sender.balance < value:
+            return 0
+        address = (create2_address(frame.address, salt, initcode) if name == 'CREATE2'
+                   else create_address(frame.address, sender.nonce))
+        sender.nonce += 1
+        self._warm_accounts.add(address)
+        gas = frame.gas - frame.gas // 64
+        self._use(frame, gas)
+        success, output, gas_left, _ = self._create(frame.address, address, initcode, value, gas, frame.depth + 1)
+        frame.gas += gas_left
+        frame.return_data = output
+        return address if success else 0
+
+    def _selfdestruct(self, frame: _Frame, beneficiary: int):
+        if beneficiary not in self._warm_accounts:
+            self._warm_accounts.add(beneficiary)
+            self._use(frame, GAS_COLD_ACCOUNT)
+        balance = self.account(frame.address).balance
+        if balance and self.accounts.get(beneficiary, Account()).is_empty():
+            self._use(frame, GAS_NEW_ACCOUNT)
+        self._transfer(frame.address, beneficiary, balance)
+        # EIP-6780: the account is only removed in the transaction that created it
+        if frame.address in self._created:
+            del self.accounts[frame.address]
+
+
+_ARITHMETIC = {
+    'ADD': lambda a, b: a + b,
+    'MUL': lambda a, b: a * b,
+    'SUB': lambda a, b: a - b,
+    'DIV': lambda a, b: a // b if b else 0,
+    'SDIV': lambda a, b: (abs(_signed(a)) // abs(_signed(b)) * (-1 if (_signed(a) < 0) != (_signed(b) < 0) else 1)
+                          if b else 0),
+    'MOD': lambda a, b: a % b if b else 0,
+    'SMOD': lambda a, b: (abs(_signed(a)) % abs(_signed(b)) * (-1 if _signed(a) < 0 else 1) if b else 0),
+    'ADDMOD': lambda a, b, n: (a + b) % n if n else 0,
+    'MULMOD': lambda a, b, n: (a * b) % n if n else 0,
+    'EXP': lambda a, b: pow(a, b, 1 << 256),
+    'SIGNEXTEND': lambda b, x: (x | (WORD << (8 * b + 8)) if x >> (8 * b + 7) & 1 else x & ((1 << (8 * b + 8)) - 1))
+                               if b < 31 else x,
+    'LT': lambda a, b: int(a < b),
+    'GT': lambda a, b: int(a > b),
+    'SLT': lambda a, b: int(_signed(a) < _signed(b)),
+    'SGT': lambda a, b: int(_signed(a) > _signed(b)),
+    'EQ': lambda a, b: int(a == b),
+    'ISZERO': lambda a: int(a == 0),
+    'AND': lambda a, b: a & b,
+    'OR': lambda a, b: a | b,
+    'XOR': lambda a, b: a ^ b,
+    'NOT': lambda a: ~a,
+    'BYTE': lambda i, x: (x >> (8 * (31 - i))) & 0xff if i < 32 else 0,
+    'SHL': lambda shift, value: value << shift if shift < 256 else 0,
+    'SHR': lambda shift, value: value >> shift if shift < 256 else 0,
+    'SAR': lambda shift, value: _signed(value) >> min(shift, 256),
+}
+
+# Stack items each opcode takes (DUP/SWAP check their own depth)
+_INPUTS = {
+    **{name: 2 for name in ('ADD', 'MUL', 'SUB', 'DIV', 'SDIV', 'MOD', 'SMOD', 'EXP', 'SIGNEXTEND', 'LT', 'GT', 'SLT',
+                            'SGT', 'EQ', 'AND', 'OR', 'XOR', 'BYTE', 'SHL', 'SHR', 'SAR', 'KECCAK256', 'MSTORE',
+                            'MSTORE8', 'SSTORE', 'JUMPI', 'TSTORE', 'RETURN', 'REVERT')},
+    **{name: 1 for name in ('ISZERO', 'NOT', 'BALANCE', 'CALLDATALOAD', 'EXTCODESIZE', 'EXTCODEHASH', 'BLOCKHASH',
+                            'BLOBHASH', 'POP', 'MLOAD', 'SLOAD', 'JUMP', 'TLOAD', 'SELFDESTRUCT')},
+    **{name: 3 for name in ('ADDMOD', 'MULMOD', 'CALLDATACOPY', 'CODECOPY', 'RETURNDATACOPY', 'MCOPY', 'CREATE')},
+    'EXTCODECOPY': 4, 'CREATE2': 4, 'CALL': 7, 'CALLCODE': 7, 'DELEGATECALL': 6, 'STATICCALL': 6,
+    **{f'LOG{i}': 2 + i for i in range(5)},
+}
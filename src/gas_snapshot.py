@@ -0,0 +1,174 @@
+"""
+Gas snapshots of the example contracts.
+
+Each example has a declared scenario: constructor arguments and an ordered
+list of calls, together covering every public method in its ABI. Running
+the scenarios gives the gas of the deployment and of each call; a snapshot
+of those figures is committed, and a later run is compared against it so a
+change that makes any of them more expensive shows up per method.
+
+Scenarios are JSON keyed by example file name (without `.dfy`):
+
+    {"Counter": {"constructor": [],
+                 "calls": [{"method": "increment()"},
+                           {"method": "setMaxValue(uint256)", "args": [2000]},
+                           {"method": "withdraw(uint256)", "args": [1], "reverts": true}]}}
+
+A call may also give `value` (wei sent) and `sender`. The string
+`"caller"` as an address argument stands for the sender. A call whose
+outcome differs from its `reverts` flag (default false) fails the run, so
+a scenario keeps measuring the path it was written for.
+
+The code runs on `YulInterpreter`, through the runtime's dispatcher, with
+calldata encoded from the ABI; constructor arguments are encoded after the
+creation code, as a deployment carries them. Gas follows the interpreter's model of the
+EVM (execution only, without the 21000 base cost or calldata), so figures
+need no solc and are the same on every machine.
+"""
+
+import json
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+from .compiler.abi_generator import ABIGenerator
+from .evm import abi
+from .parser.dafny_parser import DafnyParser
+from .translator.yul_generator import YulGenerator
+from .translator.yul_interpreter import DEFAULT_CALLER, YulInterpreter
+
+# A call may cost this fraction more than its snapshot before it counts as a regression
+DEFAULT_THRESHOLD = 0.01
+
+DEPLOY = 'deploy'
+
+
+class ScenarioError(Exception):
+    """A scenario is missing, does not cover its contract, or did not run as declared."""
+
+
+class GasChange(NamedTuple):
+    contract: str
+    # DEPLOY, or the call's label: its signature, with ' #n' for the n-th call of a method
+    label: str
+    # None when the entry is new (before) or gone (after)
+    before: Optional[int]
+    after: Optional[int]
+
+    def is_regression(self, threshold: float = DEFAULT_THRESHOLD) -> bool:
+        """More expensive than the snapshot allows, or missing on either side."""
+        if self.before is None or self.after is None:
+            return True
+        return self.after > self.before * (1 + threshold)
+
+
+def _address(value, sender: int):
+    return sender if value == 'caller' else value
+
+
+def _arguments(types: List[str], values: list, sender: int) -> list:
+    return [_address(value, sender) if kind == 'address' else
+            [_address(item, sender) for item in value] if kind == 'address[]' else value
+            for kind, value in zip(types, values)]
+
+
+def run_scenario(source: str, scenario: dict, generator: Optional[YulGenerator] = None) -> Dict[str, int]:
+    """
+    Deploy a contract and run its scenario: label -> gas used, with the
+    deployment under `DEPLOY`. Raises ScenarioError if a public method is
+    never called or a call's outcome is not the declared one.
+    """
+    generator = generator or YulGenerator()
+    contract = DafnyParser(source).parse()
+    obj = generator.generate_ir(contract)
+    entries = json.loads(ABIGenerator().generate(contract))
+    functions = {abi.signature(entry): entry for entry in entries if entry['type'] == 'function'}
+    constructor = next((entry for entry in entries if entry['type'] == 'constructor'), {'inputs': []})
+
+    calls = scenario.get('calls', [])
+    missing = set(functions) - {call['method'] for call in calls}
+    if missing:
+        raise ScenarioError(f"{contract.name}: no call to {', '.join(sorted(missing))}")
+
+    creation = YulInterpreter(obj)
+    types = [abi.canonical_type(param) for param in constructor['inputs']]
+    args = _arguments(types, scenario.get('constructor', []), DEFAULT_CALLER)
+    # Arguments follow the creation code; a creation has no calldata
+    creation.arguments = abi.encode(types, args)
+    deployed = creation.transact(b'')
+    if not deployed.success:
+        raise ScenarioError(f"{contract.name}: deployment reverted")
+    runtime = YulInterpreter(obj.objects[0], creation.storage)
+
+    gas = {DEPLOY: deployed.gas_used}
+    counts: Dict[str, int] = {}
+    for call in calls:
+        method = call['method']
+        if method not in functions:
+            raise ScenarioError(f"{contract.name}: {method} is not in the ABI")
+        sender = call.get('sender', DEFAULT_CALLER)
+        runtime.caller = int(sender, 16) if isinstance(sender, str) else sender
+        runtime.callvalue = call.get('value', 0)
+        types = [abi.canonical_type(param) for param in functions[method]['inputs']]
+        data = abi.selector(method) + abi.encode(types, _arguments(types, call.get('args', []), runtime.caller))
+        result = runtime.transact(data)
+        if result.success == call.get('reverts', False):
+            raise ScenarioError(f"{contract.name}: {method} {'succeeded' if result.success else 'reverted'}"
+                                f" but the scenario says it {'reverts' if result.success else 'succeeds'}")
+        counts[method] = counts.get(method, 0) + 1
+        gas[method if counts[method] == 1 else f"{method} #{counts[method]}"] = result.gas_used
+    return gas
+
+
+def take_snapshot(examples: Path, scenarios: Dict[str, dict],
+                  generator: Optional[YulGenerator] = None) -> Dict[str, Dict[str, int]]:
+    """Gas of every example's scenario, keyed by example name; every example needs a scenario."""
+    snapshot = {}
+    for path in sorted(Path(examples).glob('*.dfy')):
+        if path.stem not in scenarios:
+            raise ScenarioError(f"No scenario for {path.name}")
+        snapshot[path.stem] = run_scenario(path.read_text(), scenarios[path.stem], generator)
+    return snapshot
+
+
+def compare(recorded: Dict[str, Dict[str, int]], measured: Dict[str, Dict[str, int]]) -> List[GasChange]:
+    """Every entry whose gas differs between two snapshots, or that only one of them has."""
+    changes = []
+    for contract in sorted(set(recorded) | set(measured)):
+        before, after = recorded.get(contract, {}), measured.get(contract, {})
+        for label in sorted(set(before) | set(after), key=lambda label: (label != DEPLOY, label)):
+            if before.get(label) != after.get(label):
+                changes.append(GasChange(contract, label, before.get(label), after.get(label)))
+    return changes
+
+
+def format_changes(changes: List[GasChange], threshold: float = DEFAULT_THRESHOLD) -> str:
+    """One line per change: before, after, difference, and whether it is a regression."""
+    if not changes:
+        return "No gas changes"
+    rows = []
+    for change in changes:
+        name = f"{change.contract}::{change.label}"
+        if change.before is None:
+            rows.append((name, '-', str(change.after), 'new', 'not in snapshot'))
+        elif change.after is None:
+            rows.append((name, str(change.before), '-', 'removed', 'not measured'))
+        else:
+            difference = change.after - change.before
+            percent = 100 * difference / change.before if change.before else float('inf')
+            rows.append((name, str(change.before), str(change.after), f"{difference:+d} ({percent:+.2f}%)",
+                         'REGRESSION' if change.is_regression(threshold) else
+                         'within threshold' if difference > 0 else 'improved'))
+    widths = [max(len(row[column]) for row in rows) for column in range(4)]
+    return '\n'.join(f"{row[0]:<{widths[0]}}  {row[1]:>{widths[1]}} -> {row[2]:>{widths[2]}}  "
+                     f"{row[3]:>{widths[3]}}  {row[4]}" for row in rows)
+
+
+def load(path: Path) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def save(snapshot: Dict[str, Dict[str, int]], path: Path):
+    with open(path, 'w') as f:
+        json.dump(snapshot, f, indent=2, sort_keys=True)
+        f.write('\n')
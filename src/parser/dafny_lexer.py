@@ -0,0 +1,64 @@
+"""
+Tokenizer for the Dafny EVM subset.
+
+The source is scanned exactly once with a single compiled pattern. Comments
+and whitespace are dropped; every other lexeme becomes a Token that remembers
+its character span so the parser can recover the original text of any token
+range without re-scanning.
+"""
+
+import re
+from typing import List, NamedTuple
+
+
+class Token(NamedTuple):
+    kind: str   # IDENT, NUMBER, STRING, OP
+    value: str
+    start: int  # Offset of first character in the source
+    end: int    # Offset one past the last character
+
+
+# Multi-character operators must come before their single-character prefixes
+_MULTI_CHAR_OPERATORS = ['<==>', '==>', '<==', ':=', '::', '==', '!=', '<=', '>=', '&&', '||', '..', '=>']
+_SINGLE_CHAR_OPERATORS = "()[]{}<>,;:.+-*/%!=|&^?@#~\\'`$"
+
+# Each match consumes leading whitespace and comments plus one token, so the
+# scan performs exactly one regex match per token.
+_TOKEN_RE = re.compile(
+    r'(?:\s+|//[^\n]*|/\*.*?\*/)*'
+    r'(?:(?P<IDENT>[A-Za-z_][A-Za-z0-9_\']*)'
+    r'|(?P<NUMBER>0[xX][0-9a-fA-F_]+|\d[\d_]*(?:\.\d+)?)'
+    r'|(?P<STRING>"(?:[^"\\\n]|\\.)*")'
+    r'|(?P<OP>' + '|'.join(re.escape(op) for op in _MULTI_CHAR_OPERATORS)
+    + '|[' + re.escape(_SINGLE_CHAR_OPERATORS) + '])'
+    r'|(?P<ERROR>.)'
+    r'|$)',
+    re.DOTALL,
+)
+
+
+class LexerError(SyntaxError):
+    pass
+
+
+def line_of(source: str, offset: int) -> int:
+    """1-based line number of a character offset."""
+    return source.count('\n', 0, offset) + 1
+
+
+def tokenize(source: str) -> List[Token]:
+    """Split source into tokens in a single left-to-right scan."""
+    tokens = []
+    append = tokens.append
+    # tuple.__new__ skips the Python-level NamedTuple constructor
+    new_token = tuple.__new__
+    for m in _TOKEN_RE.finditer(source):
+        kind = m.lastgroup
+        if kind is None:
+            # Trailing whitespace/comments at end of input
+            continue
+        start, end = m.span(kind)
+        if kind == 'ERROR':
+            raise LexerError(f"Line {line_of(source, start)}: unexpected character {source[start]!r}")
+        append(new_token(Token, (kind, source[start:end], start, end)))
+    return tokens
@@ -1,144 +1,353 @@
-import re
 from typing import List, Optional, Dict, Any
 from .dafny_ast import *
+from .dafny_lexer import Token, line_of, tokenize
+
+# Keywords that can only start a new declaration; they terminate any
+# clause or expression that is still open.
+DECLARATION_KEYWORDS = {
+    'class', 'interface', 'trait', 'import', 'include', 'module', 'datatype',
+    'newtype', 'type', 'struct', 'event', 'error', 'modifier', 'constructor',
+    'method', 'function', 'predicate', 'lemma', 'twostate', 'ghost', 'var',
+    'const', 'invariant', 'public', 'private', 'internal', 'external', 'view',
+    'pure', 'payable', 'static',
+}
+VISIBILITY_KEYWORDS = {'public', 'private', 'internal', 'external'}
+MUTABILITY_KEYWORDS = {'view', 'pure', 'payable'}
+SPEC_CLAUSE_KEYWORDS = {'requires', 'ensures', 'modifies', 'reads', 'decreases'}
+LOOP_CLAUSE_KEYWORDS = {'invariant', 'decreases', 'modifies'}
+
+# Binary operator precedence, loosest first. Only '==>' associates to the right.
+BINARY_PRECEDENCE = {
+    '<==>': 1,
+    '==>': 2, '<==': 2,
+    '||': 3,
+    '&&': 4,
+    '==': 5, '!=': 5, '<': 5, '>': 5, '<=': 5, '>=': 5, 'in': 5,
+    '+': 6, '-': 6,
+    '*': 7, '/': 7, '%': 7,
+}
+RIGHT_ASSOCIATIVE = {'==>'}
+CONTRACT_CALL_METHODS = {'call', 'delegatecall', 'staticcall'}
+# Expression forms the code generator cannot lower; kept verbatim as VarRef
+EXPRESSION_KEYWORDS = {'forall', 'exists', 'var', 'match', 'then', 'else', 'fresh', 'set', 'seq', 'map'}
 
 class DafnyParser:
+    """
+    Recursive-descent parser that builds a Contract in a single walk over the
+    token stream produced by dafny_lexer.tokenize().
+    """
+
     def __init__(self, source: str):
         self.source = source
-        self.lines = source.split('\n')
+        self.tokens: List[Token] = []
         self.pos = 0
-    
+        self.expr_end = 0  # Token index bounding the expression being parsed
+
     def parse(self) -> Contract:
-        contract_name, base_class = self._extract_contract_name()
-        imports = self._extract_imports()
-        libraries = self._extract_libraries()
-        structs = self._extract_structs()
-        fields = self._extract_fields()
-        constants = self._extract_constants()
-        events = self._extract_events()
-        errors = self._extract_errors()
-        modifiers = self._extract_modifiers()
-        constructor = self._extract_constructor()
-        methods = self._extract_methods()
-        invariants = self._extract_invariants()
-        receive_method, fallback_method = self._extract_special_functions(methods)
-        
+        # Tokenize here rather than in __init__ so callers may replace self.source
+        self.tokens = tokenize(self.source)
+        self.pos = 0
+
+        self.classes = []  # (name, base_class) in declaration order
+        self.imports = []
+        self.libraries = []
+        self.structs = []
+        self.fields = []
+        self.constants = {}
+        self.events = []
+        self.errors = []
+        self.modifiers = []
+        self.constructor = None
+        self.methods = []
+        self.invariants = []
+
+        self._parse_declarations(in_class=False)
+
+        contract_name, base_class = self._contract_name()
+        receive_method, fallback_method = self._extract_special_functions(self.methods)
+
         return Contract(
             name=contract_name,
-            fields=fields,
-            methods=methods,
-            invariants=invariants,
-            imports=imports,
-            constructor=constructor,
-            events=events,
-            libraries=libraries,
-            structs=structs,
+            fields=self.fields,
+            methods=self.methods,
+            invariants=self.invariants,
+            imports=self.imports,
+            constructor=self.constructor,
+            events=self.events,
+            libraries=self.libraries,
+            structs=self.structs,
             base_class=base_class,
-            modifiers=modifiers,
-            errors=errors,
+            modifiers=self.modifiers,
+            errors=self.errors,
             receive_method=receive_method,
             fallback_method=fallback_method,
-            constants=constants
+            constants=self.constants
         )
-    
-    def _extract_contract_name(self) -> tuple[str, Optional[str]]:
-        # Try with inheritance: class Derived is Base
-        match = re.search(r'class\s+(\w+)\s+is\s+(\w+)', self.source)
-        if match:
-            return match.group(1), match.group(2)
-        # Try without inheritance: class Contract
-        match = re.search(r'class\s+(\w+)', self.source)
-        return (match.group(1), None) if match else ("Contract", None)
-    
-    def _extract_imports(self) -> List[str]:
-        """Extract import statements (parsing only, not processed)."""
-        imports = []
-        for line in self.lines:
-            # import "path/to/file.dfy"
-            if match := re.match(r'\s*import\s+"([^"]+)"', line):
-                imports.append(match.group(1))
-            # import LibraryName
-            elif match := re.match(r'\s*import\s+(\w+)', line):
-                imports.append(match.group(1))
-        return imports
-    
-    def _extract_libraries(self) -> List[Library]:
-        libraries = []
-        for line in self.lines:
-            if match := re.match(r'\s*import\s+(\w+)\s+from\s+"([^"]+)"', line):
-                libraries.append(Library(match.group(1), match.group(2)))
-        return libraries
-    
-    def _extract_structs(self) -> List[Struct]:
-        structs = []
-        i = 0
-        while i < len(self.lines):
-            line = self.lines[i].strip()
-            if match := re.match(r'struct\s+(\w+)\s*\{', line):
-                name = match.group(1)
-                fields = []
-                i += 1
-                while i < len(self.lines):
-                    line = self.lines[i].strip()
-                    if line == '}':
-                        break
-                    if match := re.match(r'(\w+)\s*:\s*(\w+)', line):
-                        field_name, type_str = match.groups()
-                        fields.append(Variable(field_name, self._parse_type(type_str)))
-                    i += 1
-                structs.append(Struct(name, fields))
+
+    # ------------------------------------------------------------------
+    # Token helpers
+    # ------------------------------------------------------------------
+
+    def _peek(self, offset: int = 0) -> Optional[Token]:
+        index = self.pos + offset
+        return self.tokens[index] if index < len(self.tokens) else None
+
+    def _value(self, offset: int = 0) -> Optional[str]:
+        index = self.pos + offset
+        return self.tokens[index].value if index < len(self.tokens) else None
+
+    def _advance(self) -> Token:
+        tok = self.tokens[self.pos]
+        self.pos += 1
+        return tok
+
+    def _line(self, tok: Token) -> int:
+        return line_of(self.source, tok.start)
+
+    def _accept(self, value: str) -> bool:
+        if self._value() == value:
+            self.pos += 1
+            return True
+        return False
+
+    def _expect(self, value: str) -> Token:
+        tok = self._peek()
+        if tok is None:
+            raise SyntaxError(f"Unexpected end of input, expected '{value}'")
+        if tok.value != value:
+            raise SyntaxError(f"Line {self._line(tok)}: expected '{value}' but found '{tok.value}'")
+        self.pos += 1
+        return tok
+
+    def _expect_ident(self) -> str:
+        tok = self._peek()
+        if tok is None or tok.kind != 'IDENT':
+            found = tok.value if tok else 'end of input'
+            line = self._line(tok) if tok else '?'
+            raise SyntaxError(f"Line {line}: expected identifier but found '{found}'")
+        self.pos += 1
+        return tok.value
+
+    def _matching(self, index: int) -> int:
+        """Index of the bracket closing the one at tokens[index]."""
+        depth = 0
+        tokens = self.tokens
+        for i in range(index, len(tokens)):
+            value = tokens[i].value
+            if value in '([{' and tokens[i].kind == 'OP':
+                depth += 1
+            elif value in ')]}' and tokens[i].kind == 'OP':
+                depth -= 1
+                if depth == 0:
+                    return i
+        raise SyntaxError(f"Line {self._line(tokens[index])}: unbalanced '{tokens[index].value}'")
+
+    def _scan_to(self, stops: set, start: int = None) -> int:
+        """
+        Index of the first token at bracket depth 0 whose value is in stops,
+        or of the unmatched closing bracket that ends the enclosing group.
+        """
+        tokens = self.tokens
+        i = self.pos if start is None else start
+        n = len(tokens)
+        while i < n:
+            tok = tokens[i]
+            value = tok.value
+            if tok.kind == 'OP':
+                if value in stops:
+                    return i
+                if value in '([{':
+                    i = self._matching(i) + 1
+                    continue
+                if value in ')]}':
+                    return i
+            elif tok.kind == 'IDENT' and value in stops:
+                return i
             i += 1
-        return structs
-    
-    def _extract_fields(self) -> List[Variable]:
-        fields = []
-        in_method = False
-        brace_depth = 0
-        
-        for line in self.lines:
-            stripped = line.strip()
-            
-            # Track if we're inside a method/constructor
-            if re.match(r'(method|constructor|function)\s+\w+', stripped):
-                in_method = True
-                brace_depth = 0
-            
-            # Track braces to know when we exit method
-            if in_method:
-                brace_depth += stripped.count('{') - stripped.count('}')
-                if brace_depth <= 0 and '}' in stripped:
-                    in_method = False
+        return n
+
+    def _split_commas(self, start: int, end: int) -> List[tuple]:
+        """Split tokens[start:end] at depth-0 commas into (start, end) ranges."""
+        ranges = []
+        i = start
+        item_start = start
+        while i < end:
+            value = self.tokens[i].value
+            if value in '([{' and self.tokens[i].kind == 'OP':
+                i = self._matching(i) + 1
                 continue
-            
-            # Only extract vars at class level (not in methods)
-            # Array: public var name: array<type>
-            if match := re.match(r'\s*(public\s+)?var\s+(\w+)\s*:\s*array<(\w+)>', line):
-                public_prefix, name, elem_type = match.groups()
-                is_public = public_prefix is not None
-                fields.append(Variable(name, DafnyType(Type.ARRAY, element_type=self._parse_type(elem_type)), 
-                                     visibility="public" if is_public else "internal", is_public=is_public))
-            # Mapping: public var name: mapping<keyType, valueType>
-            elif match := re.match(r'\s*(public\s+)?var\s+(\w+)\s*:\s*mapping<(\w+),\s*(\w+)>', line):
-                public_prefix, name, key_type, val_type = match.groups()
-                is_public = public_prefix is not None
-                fields.append(Variable(name, DafnyType(Type.MAPPING, key_type=self._parse_type(key_type), value_type=self._parse_type(val_type)),
-                                     visibility="public" if is_public else "internal", is_public=is_public))
-            # Simple type: public var name: type
-            elif match := re.match(r'\s*(public\s+)?var\s+(\w+)\s*:\s*(\w+)', line):
-                public_prefix, name, type_str = match.groups()
-                is_public = public_prefix is not None
-                fields.append(Variable(name, self._parse_type(type_str),
-                                     visibility="public" if is_public else "internal", is_public=is_public))
-        return fields
-    
-    def _extract_constants(self) -> Dict[str, Any]:
-        """Extract ghost constants for verification"""
-        constants = {}
-        for line in self.lines:
-            # ghost const NAME: type := value
-            if match := re.match(r'\s*ghost\s+const\s+(\w+)\s*:\s*\w+\s*:=\s*(.+)', line):
-                name = match.group(1)
-                value_str = match.group(2).strip()
+            if value == ',':
+                ranges.append((item_start, i))
+                item_start = i + 1
+            i += 1
+        if item_start < end:
+            ranges.append((item_start, end))
+        return ranges
+
+    def _text(self, start: int, end: int) -> str:
+        """Original source text covered by tokens[start:end]."""
+        if start >= end:
+            return ''
+        return self.source[self.tokens[start].start:self.tokens[end - 1].end]
+
+    # ------------------------------------------------------------------
+    # Declarations
+    # ------------------------------------------------------------------
+
+    def _parse_declarations(self, in_class: bool):
+        while self.pos < len(self.tokens):
+            tok = self._peek()
+            value = tok.value
+
+            if value == '}' and tok.kind == 'OP':
+                self.pos += 1
+                if in_class:
+                    return
+                continue
+
+            if value == 'import':
+                self._parse_import()
+            elif value in ('class', 'interface', 'trait'):
+                self._parse_class()
+            elif value == 'struct':
+                self._parse_struct()
+            elif value == 'event':
+                self._parse_event()
+            elif value == 'error':
+                self._parse_error()
+            elif value == 'modifier':
+                self._parse_modifier()
+            elif value == 'constructor':
+                self._parse_constructor()
+            elif value == 'invariant':
+                self._parse_invariant()
+            elif value == 'ghost':
+                self._parse_ghost()
+            elif value == 'var' or value in VISIBILITY_KEYWORDS or value in MUTABILITY_KEYWORDS or value == 'method':
+                self._parse_member()
+            elif value in DECLARATION_KEYWORDS:
+                self._skip_declaration()
+            else:
+                self.pos += 1
+
+    def _skip_declaration(self):
+        """Skip a declaration the compiler does not use (function, lemma, ...)."""
+        self.pos += 1
+        # Compound keywords: function method, ghost method, twostate lemma
+        while self._value() in ('method', 'function', 'predicate', 'lemma'):
+            self.pos += 1
+        while self.pos < len(self.tokens):
+            tok = self._peek()
+            if tok.kind == 'OP':
+                if tok.value == '{':
+                    self.pos = self._matching(self.pos) + 1
+                    return
+                if tok.value in '([':
+                    self.pos = self._matching(self.pos) + 1
+                    continue
+                if tok.value == '}':
+                    return
+            elif tok.value in DECLARATION_KEYWORDS:
+                return
+            self.pos += 1
+
+    def _contract_name(self) -> tuple[str, Optional[str]]:
+        # Prefer a derived class: class Derived is Base
+        for name, base in self.classes:
+            if base:
+                return name, base
+        if self.classes:
+            return self.classes[0]
+        return "Contract", None
+
+    def _parse_import(self):
+        """Parse import statements (parsing only, not processed)."""
+        self._expect('import')
+        self._accept('opened')
+        tok = self._peek()
+        if tok is None:
+            return
+        if tok.kind == 'STRING':
+            # import "path/to/file.dfy"
+            self.pos += 1
+            self.imports.append(tok.value[1:-1])
+        elif tok.kind == 'IDENT':
+            # import LibraryName [from "path"]
+            self.pos += 1
+            self.imports.append(tok.value)
+            if self._value() == 'from' and self._peek(1) and self._peek(1).kind == 'STRING':
+                self.libraries.append(Library(tok.value, self._peek(1).value[1:-1]))
+                self.pos += 2
+        self._accept(';')
+
+    def _parse_class(self):
+        kind = self._advance().value
+        name = self._expect_ident()
+        base = None
+        if self._value() in ('is', 'extends'):
+            self.pos += 1
+            base = self._expect_ident()
+            while self._accept(','):
+                self._expect_ident()
+        if kind == 'class':
+            self.classes.append((name, base))
+        self.pos = self._scan_to({'{'})
+        if self._accept('{'):
+            self._parse_declarations(in_class=True)
+
+    def _parse_struct(self):
+        self._expect('struct')
+        name = self._expect_ident()
+        self._expect('{')
+        fields = []
+        while self.pos < len(self.tokens) and not self._accept('}'):
+            if self._peek().kind == 'IDENT' and self._value(1) == ':':
+                field_name = self._advance().value
+                self.pos += 1
+                fields.append(Variable(field_name, self._parse_type_ref()))
+            else:
+                self.pos += 1
+        self.structs.append(Struct(name, fields))
+
+    def _parse_member(self):
+        """Parse a field or method, including any leading visibility keywords."""
+        start = self.pos
+        while self._value() in VISIBILITY_KEYWORDS or self._value() in MUTABILITY_KEYWORDS:
+            self.pos += 1
+        value = self._value()
+        if value == 'var':
+            prefixes = {t.value for t in self.tokens[start:self.pos]}
+            self._parse_field(is_public='public' in prefixes)
+        elif value == 'method':
+            self.pos = start
+            self._parse_method()
+        else:
+            self._skip_declaration()
+
+    def _parse_field(self, is_public: bool):
+        self._expect('var')
+        name = self._expect_ident()
+        self._expect(':')
+        field_type = self._parse_type_ref()
+        if self._accept(':='):
+            self.pos = self._scan_to({';'} | DECLARATION_KEYWORDS)
+        self._accept(';')
+        self.fields.append(Variable(name, field_type,
+                                    visibility="public" if is_public else "internal", is_public=is_public))
+
+    def _parse_ghost(self):
+        """Ghost declarations are erased; only ghost constants are recorded."""
+        self._expect('ghost')
+        if self._value() == 'const':
+            self.pos += 1
+            name = self._expect_ident()
+            if self._accept(':'):
+                self._parse_type_ref()
+            if self._accept(':='):
+                start = self.pos
+                end = self._scan_to({';'} | DECLARATION_KEYWORDS)
+                value_str = self._text(start, end)
+                self.pos = end
                 # Parse the value (simple int/bool for now)
                 try:
                     value = int(value_str)
@@ -149,73 +358,244 @@ class DafnyParser:
                         value = False
                     else:
                         value = value_str
-                constants[name] = value
-        return constants
-    
-    def _extract_events(self) -> List[Event]:
-        events = []
-        for line in self.lines:
-            # event Name(type1 indexed param1, type2 param2) anonymous
-            if match := re.match(r'\s*event\s+(\w+)\s*\((.*?)\)\s*(anonymous)?', line):
-                name = match.group(1)
-                params_str = match.group(2)
-                anonymous = match.group(3) is not None
-                
-                # Parse params with indexed markers
-                params = []
-                indexed = []
-                if params_str:
-                    for param in params_str.split(','):
-                        param = param.strip()
-                        # Check for indexed keyword
-                        is_indexed = 'indexed' in param
-                        param = param.replace('indexed', '').strip()
-                        
-                        # Parse "name: type" or "type name"
-                        if ':' in param:
-                            # Dafny style: name: type
-                            parts = param.split(':')
-                            if len(parts) == 2:
-                                name_str = parts[0].strip()
-                                type_str = parts[1].strip()
-                                params.append(Variable(name_str, self._parse_type(type_str)))
-                                indexed.append(is_indexed)
-                        else:
-                            # Solidity style: type name
-                            parts = param.split()
-                            if len(parts) >= 2:
-                                type_str = parts[0]
-                                name_str = parts[1].rstrip(',')
-                                params.append(Variable(name_str, self._parse_type(type_str)))
-                                indexed.append(is_indexed)
-                
-                events.append(Event(name, params, indexed, anonymous))
-        return events
-    
-    def _extract_errors(self) -> List[CustomError]:
-        errors = []
-        for line in self.lines:
-            # error Name(type1 param1, type2 param2)
-            if match := re.match(r'\s*error\s+(\w+)\s*\((.*?)\)', line):
-                name = match.group(1)
-                params_str = match.group(2)
-                params = []
-                if params_str.strip():
-                    for param in params_str.split(','):
-                        param = param.strip()
-                        parts = param.split()
-                        if len(parts) >= 2:
-                            type_str = parts[0]
-                            name_str = parts[1]
-                            params.append(Variable(name_str, self._parse_type(type_str)))
-                errors.append(CustomError(name, params))
-        return errors
-    
+                self.constants[name] = value
+            self._accept(';')
+        elif self._value() == 'var':
+            self._skip_declaration()
+        elif self.pos < len(self.tokens):
+            # ghost method/function/predicate: skip the keyword and its body
+            self._skip_declaration()
+
+    def _parse_invariant(self):
+        self._expect('invariant')
+        start = self.pos
+        end = self._scan_to({';'} | DECLARATION_KEYWORDS)
+        self.invariants.append(self._expr(start, end))
+        self.pos = end
+        self._accept(';')
+
+    def _parse_event(self):
+        # event Name(type1 indexed param1, type2 param2) anonymous
+        self._expect('event')
+        name = self._expect_ident()
+        params, indexed = self._parse_event_params()
+        anonymous = self._accept('anonymous')
+        self._accept(';')
+        self.events.append(Event(name, params, indexed, anonymous))
+
+    def _parse_error(self):
+        # error Name(type1 param1, type2 param2)
+        self._expect('error')
+        name = self._expect_ident()
+        params, _ = self._parse_event_params()
+        self._accept(';')
+        self.errors.append(CustomError(name, params))
+
+    def _parse_event_params(self) -> tuple:
+        """Parse "(name: type, ...)" or Solidity-style "(type [indexed] name, ...)"."""
+        open_index = self.pos
+        self._expect('(')
+        close_index = self._matching(open_index)
+        params = []
+        indexed = []
+        for start, end in self._split_commas(open_index + 1, close_index):
+            group = [t for t in self.tokens[start:end] if t.value != 'indexed']
+            is_indexed = len(group) != end - start
+            colon = next((i for i, t in enumerate(group) if t.value == ':'), None)
+            if colon is not None:
+                # Dafny style: name: type
+                if colon == 0:
+                    continue
+                param_name = group[colon - 1].value
+                param_type = self._type_from_tokens(group[colon + 1:])
+            else:
+                # Solidity style: type name
+                if len(group) < 2:
+                    continue
+                param_type = self._parse_type(group[0].value)
+                param_name = group[1].value
+            params.append(Variable(param_name, param_type))
+            indexed.append(is_indexed)
+        self.pos = close_index + 1
+        return params, indexed
+
+    def _parse_modifier(self):
+        self._expect('modifier')
+        name = self._expect_ident()
+        params = self._parse_param_list() if self._value() == '(' else []
+        self.pos = self._scan_to({'{'})
+        body = self._parse_block() if self._value() == '{' else []
+        self.modifiers.append(Modifier(name, params, body))
+
+    def _parse_constructor(self):
+        self._expect('constructor')
+        params = self._parse_param_list() if self._value() == '(' else []
+        preconditions, postconditions = self._parse_spec_clauses()
+        body = self._parse_method_body()
+
+        # Only the first constructor is used
+        if self.constructor is not None:
+            return
+        self.constructor = Method(
+            name="constructor",
+            params=params,
+            returns=None,
+            preconditions=preconditions,
+            postconditions=postconditions,
+            body=body,
+            is_public=True,
+            is_payable=False,
+            visibility="public",
+            state_mutability="nonpayable",
+            modifiers=[]
+        )
+
+    def _parse_method(self):
+        visibility = "public"
+        state_mutability = None
+        is_payable = False
+        modifiers = []
+        returns = None
+
+        def header_keyword(value: str) -> bool:
+            nonlocal visibility, state_mutability, is_payable
+            if value in VISIBILITY_KEYWORDS:
+                visibility = value
+            elif value in ('view', 'pure'):
+                state_mutability = value
+            elif value == 'payable':
+                is_payable = True
+                if state_mutability is None:
+                    state_mutability = 'payable'
+            else:
+                return False
+            return True
+
+        while self._value() != 'method':
+            header_keyword(self._advance().value)
+        method_tok = self._expect('method')
+        name = self._expect_ident()
+
+        # Reject 'method constructor' - constructors must use 'constructor()' syntax
+        if name == "constructor":
+            raise SyntaxError(
+                f"Line {self._line(method_tok)}: Constructor cannot be declared as a method.\n"
+                f"Use 'constructor()' instead of 'method constructor()'.\n"
+                f"Constructors run once during deployment and cannot be called after."
+            )
+
+        params = self._parse_param_list()
+
+        # Visibility, mutability, custom modifiers and returns, in any order
+        while self.pos < len(self.tokens):
+            tok = self._peek()
+            if header_keyword(tok.value):
+                self.pos += 1
+            elif tok.value == 'returns':
+                self.pos += 1
+                # Return as list of Variables for consistency
+                returns = self._parse_param_list() or None
+            elif tok.kind == 'IDENT' and tok.value not in SPEC_CLAUSE_KEYWORDS and tok.value not in DECLARATION_KEYWORDS:
+                # Custom modifier, e.g. onlyOwner or onlyAbove(amount)
+                modifiers.append(tok.value)
+                self.pos += 1
+                if self._value() == '(':
+                    self.pos = self._matching(self.pos) + 1
+            else:
+                break
+
+        preconditions, postconditions = self._parse_spec_clauses()
+        body = self._parse_method_body()
+
+        self.methods.append(Method(
+            name=name,
+            params=params,
+            returns=returns,
+            preconditions=preconditions,
+            postconditions=postconditions,
+            body=body,
+            is_public=(visibility == "public"),
+            is_payable=is_payable,
+            visibility=visibility,
+            state_mutability=state_mutability,
+            modifiers=modifiers
+        ))
+
+    def _parse_spec_clauses(self) -> tuple:
+        preconditions = []
+        postconditions = []
+        stops = {'{', ';'} | SPEC_CLAUSE_KEYWORDS | DECLARATION_KEYWORDS
+        while self._value() in SPEC_CLAUSE_KEYWORDS:
+            keyword = self._advance().value
+            start = self.pos
+            end = self._scan_to(stops)
+            self.pos = end
+            if keyword not in ('requires', 'ensures') or start == end:
+                continue
+            expr = self._text(start, end)
+            # Skip predicate calls like Valid()
+            if '()' in expr and expr.count('(') <= 1:
+                continue
+            if keyword == 'requires':
+                preconditions.append(self._expr(start, end))
+            else:
+                postconditions.append(self._expr(start, end))
+        return preconditions, postconditions
+
+    def _parse_method_body(self) -> List[Statement]:
+        if self._value() == '{':
+            return self._parse_block()
+        # Body-less declaration (interfaces, traits)
+        self._accept(';')
+        return []
+
+    def _parse_param_list(self) -> List[Variable]:
+        """Parse "(name: type, ...)", dropping entries without a name."""
+        open_index = self.pos
+        self._expect('(')
+        close_index = self._matching(open_index)
+        params = []
+        for start, end in self._split_commas(open_index + 1, close_index):
+            group = self.tokens[start:end]
+            colon = next((i for i, t in enumerate(group) if t.value == ':'), None)
+            if colon is None or colon == 0:
+                continue
+            params.append(Variable(group[colon - 1].value, self._type_from_tokens(group[colon + 1:])))
+        self.pos = close_index + 1
+        return params
+
+    def _parse_type_ref(self) -> DafnyType:
+        """Parse a type such as uint256, array<T> or mapping<K, mapping<K2, V>>."""
+        name = self._expect_ident()
+        args = []
+        if self._value() == '<':
+            self.pos += 1
+            while self.pos < len(self.tokens) and not self._accept('>'):
+                if self._peek().kind == 'IDENT':
+                    args.append(self._parse_type_ref())
+                else:
+                    self.pos += 1
+        if name == 'array' and args:
+            return DafnyType(Type.ARRAY, element_type=args[0])
+        if name == 'mapping' and len(args) == 2:
+            return DafnyType(Type.MAPPING, key_type=args[0], value_type=args[1])
+        return self._parse_type(name)
+
+    def _type_from_tokens(self, tokens: List[Token]) -> DafnyType:
+        if not tokens:
+            return DafnyType(Type.UINT256)
+        saved_tokens, saved_pos = self.tokens, self.pos
+        self.tokens, self.pos = tokens, 0
+        try:
+            return self._parse_type_ref()
+        finally:
+            self.tokens, self.pos = saved_tokens, saved_pos
+
     def _extract_special_functions(self, methods: List[Method]) -> tuple:
         receive_method = None
         fallback_method = None
         regular_methods = []
-        
+
         for method in methods:
             if method.name == 'receive':
                 receive_method = method
@@ -223,247 +603,222 @@ class DafnyParser:
                 fallback_method = method
             else:
                 regular_methods.append(method)
-        
+
         # Update methods list to exclude special functions
         methods.clear()
         methods.extend(regular_methods)
-        
+
         return receive_method, fallback_method
-    
-    def _extract_modifiers(self) -> List[Modifier]:
-        modifiers = []
-        i = 0
-        while i < len(self.lines):
-            line = self.lines[i]
-            if match := re.match(r'\s*modifier\s+(\w+)\s*\((.*?)\)\s*\{?', line):
-                name = match.group(1)
-                params_str = match.group(2)
-                params = self._parse_params(params_str) if params_str else []
-                
-                # Extract modifier body
-                body = []
-                i += 1
-                brace_count = 1 if '{' in line else 0
-                if brace_count == 0:
-                    # Opening brace on next line
-                    while i < len(self.lines) and '{' not in self.lines[i]:
-                        i += 1
-                    if i < len(self.lines):
-                        brace_count = 1
-                        i += 1
-                
-                while i < len(self.lines) and brace_count > 0:
-                    line = self.lines[i].strip()
-                    if '{' in line:
-                        brace_count += line.count('{')
-                    if '}' in line:
-                        brace_count -= line.count('}')
-                    if brace_count > 0:
-                        # Parse modifier body statements
-                        if line and not line.startswith('//'):
-                            # For now, store as simple require statements
-                            if line.startswith('require'):
-                                cond = self._parse_condition(line)
-                                if cond:
-                                    body.append(Require(cond))
-                    i += 1
-                
-                modifiers.append(Modifier(name, params, body))
-            i += 1
-        return modifiers
-    
-    def _extract_constructor(self) -> Optional[Method]:
-        """Extract constructor if present"""
-        i = 0
-        while i < len(self.lines):
-            line = self.lines[i]
-            match = re.match(r'\s*constructor\s*\((.*?)\)', line)
-            if match:
-                params_str = match.group(1)
-                params = self._parse_params(params_str) if params_str.strip() else []
-                
-                # Check if opening brace is on same line
-                if '{' in line:
-                    preconditions, postconditions, body, _ = self._extract_method_body(i + 1, in_body=True)
-                else:
-                    preconditions, postconditions, body, _ = self._extract_method_body(i + 1, in_body=False)
-                
-                return Method(
-                    name="constructor",
-                    params=params,
-                    returns=None,
-                    preconditions=preconditions,
-                    postconditions=postconditions,
-                    body=body,
-                    is_public=True,
-                    is_payable=False,
-                    visibility="public",
-                    state_mutability="nonpayable",
-                    modifiers=[]
-                )
-            i += 1
-        return None
-    
-    def _extract_methods(self) -> List[Method]:
-        methods = []
-        i = 0
-        while i < len(self.lines):
-            line = self.lines[i]
-            
-            # Parse visibility, state mutability, payable, and modifiers
-            visibility = "public"
-            state_mutability = None
-            is_payable = False
-            modifiers = []
-            
-            # Extract modifiers: public, private, internal, external, view, pure, payable, custom modifiers
-            tokens = line.split()
-            for token in tokens:
-                if token in ['public', 'private', 'internal', 'external']:
-                    visibility = token
-                elif token in ['view', 'pure']:
-                    state_mutability = token
-                elif token == 'payable':
-                    is_payable = True
-                    if state_mutability is None:
-                        state_mutability = 'payable'
-            
-            # Match method signature - use two passes for better parsing
-            # First, extract returns clause if present
-            returns_str = None
-            returns_match = re.search(r'returns\s*\(([^)]+)\)', line)
-            if returns_match:
-                returns_str = returns_match.group(1)
-            
-            # Then match the main method signature
-            match = re.match(r'\s*(?:(?:public|private|internal|external|view|pure|payable)\s+)*method\s+(\w+)\s*\((.*?)\)', line)
-            if match:
-                name = match.group(1)
-                
-                # Reject 'method constructor' - constructors must use 'constructor()' syntax
-                if name == "constructor":
-                    raise SyntaxError(
-                        f"Line {i+1}: Constructor cannot be declared as a method.\n"
-                        f"Use 'constructor()' instead of 'method constructor()'.\n"
-                        f"Constructors run once during deployment and cannot be called after."
-                    )
-                params_str = match.group(2)
-                
-                # Extract modifiers after the closing paren (excluding keywords)
-                after_params = line[match.end():]
-                modifiers_str = None
-                # Find text between ) and { or returns, excluding keywords
-                mod_match = re.search(r'\)\s*([^{]*?)(?:returns|\{|$)', line)
-                if mod_match:
-                    modifiers_str = mod_match.group(1)
-                
-                # Parse custom modifiers (e.g., "onlyOwner whenNotPaused")
-                if modifiers_str:
-                    modifiers = [m.strip() for m in modifiers_str.split() if m.strip() and m.strip() not in ['public', 'private', 'internal', 'external', 'view', 'pure', 'payable', 'method', 'returns']]
-                
-                params = self._parse_params(params_str)
-                
-                # Parse return values
-                ret_type = None
-                if returns_str:
-                    # Check if multiple returns: "x: uint256, y: bool"
-                    if ',' in returns_str:
-                        ret_type = self._parse_params(returns_str)
-                    else:
-                        # Single return: "result: uint256"
-                        match_ret = re.match(r'(\w+)\s*:\s*(\w+)', returns_str)
-                        if match_ret:
-                            # Return as list of Variables for consistency
-                            var_name = match_ret.group(1)
-                            var_type = self._parse_type(match_ret.group(2))
-                            ret_type = [Variable(var_name, var_type)]
-                
-                # Check if opening brace is on same line
-                if '{' in line:
-                    preconditions, postconditions, body, i = self._extract_method_body(i + 1, in_body=True)
-                else:
-                    preconditions, postconditions, body, i = self._extract_method_body(i + 1, in_body=False)
-                
-                methods.append(Method(
-                    name=name,
-                    params=params,
-                    returns=ret_type,
-                    preconditions=preconditions,
-                    postconditions=postconditions,
-                    body=body,
-                    is_public=(visibility == "public"),
-                    is_payable=is_payable,
-                    visibility=visibility,
-                    state_mutability=state_mutability,
-                    modifiers=modifiers
-                ))
-            i += 1
-        return methods
-    
-    def _extract_method_body(self, start: int, in_body: bool = False):
-        preconditions = []
-        postconditions = []
+
+    # ------------------------------------------------------------------
+    # Statements
+    # ------------------------------------------------------------------
+
+    def _parse_block(self) -> List[Statement]:
+        """Parse "{ statement* }" and return the statements."""
+        self._expect('{')
         body = []
-        i = start
-        
-        while i < len(self.lines):
-            line = self.lines[i].strip()
-            
-            if not in_body:
-                if line.startswith('requires'):
-                    expr = line.replace('requires', '').strip()
-                    # Skip predicate calls like Valid()
-                    if not '()' in expr or expr.count('(') > 1:
-                        preconditions.append(self._parse_expression(expr))
-                elif line.startswith('ensures'):
-                    expr = line.replace('ensures', '').strip()
-                    # Skip predicate calls
-                    if not '()' in expr or expr.count('(') > 1:
-                        postconditions.append(self._parse_expression(expr))
-                elif line.startswith('modifies'):
-                    # Skip modifies clause
-                    pass
-                elif line == '{':
-                    in_body = True
+        while self.pos < len(self.tokens):
+            tok = self._peek()
+            if tok.value == '}' and tok.kind == 'OP':
+                self.pos += 1
+                break
+            if tok.value == '{' and tok.kind == 'OP':
+                # Bare nested block
+                body.extend(self._parse_block())
+                continue
+            stmt = self._parse_statement()
+            if stmt:
+                body.append(stmt)
+        return body
+
+    def _parse_statement(self) -> Optional[Statement]:
+        value = self._value()
+
+        # Check for control flow
+        if value == 'if':
+            return self._parse_if_statement()
+        if value == 'while':
+            return self._parse_while_loop()
+        if value == 'for':
+            return self._parse_for_loop()
+
+        start = self.pos
+        end = self._scan_to({';'})
+        if end < len(self.tokens) and self.tokens[end].value in (';', ')', ']'):
+            # Consume the terminator (or a stray closing bracket)
+            self.pos = end + 1
+        else:
+            self.pos = end
+        if start == end:
+            return None
+        return self._parse_simple_statement(start, end)
+
+    def _parse_simple_statement(self, start: int, end: int) -> Optional[Statement]:
+        """Parse a statement that contains no nested blocks from tokens[start:end]."""
+        tokens = self.tokens
+        first = tokens[start].value
+
+        # var name [: type] [:= expr]
+        if first == 'var':
+            if start + 1 >= end:
+                return None
+            name = tokens[start + 1].value
+            i = start + 2
+            var_type = DafnyType(Type.UINT256)  # Default type for type inference
+            if i < end and tokens[i].value == ':':
+                assign = next((j for j in range(i + 1, end) if tokens[j].value == ':='), end)
+                var_type = self._type_from_tokens(tokens[i + 1:assign])
+                i = assign
+            init = self._expr(i + 1, end) if i < end and tokens[i].value == ':=' else None
+            return VarDecl(Variable(name, var_type), init)
+
+        if first == 'return':
+            if start + 1 == end:
+                return Return(None)
+            # Check for multiple returns: "return x, y;"
+            parts = self._split_commas(start + 1, end)
+            if len(parts) > 1:
+                return Return([self._expr(s, e) for s, e in parts])
+            return Return(self._expr(start + 1, end))
+
+        if first == 'assert':
+            return Assert(self._expr(start + 1, end)) if start + 1 < end else None
+
+        if first == 'require':
+            return Require(self._expr(start + 1, end)) if start + 1 < end else None
+
+        # Emit event: emit EventName(args)
+        if first == 'emit':
+            if start + 2 < end and tokens[start + 2].value == '(':
+                return EmitEvent(tokens[start + 1].value, self._call_args(start + 2))
+            return None
+
+        if first == 'revert':
+            if start + 1 == end:
+                return Revert()
+            nxt = tokens[start + 1]
+            # Revert with custom error: revert ErrorName(args)
+            if nxt.kind == 'IDENT' and start + 2 < end and tokens[start + 2].value == '(':
+                return Revert(error_name=nxt.value, error_args=self._call_args(start + 2))
+            # Revert with message: revert("message")
+            if nxt.value == '(':
+                if start + 2 < end and tokens[start + 2].kind == 'STRING':
+                    return Revert(message=tokens[start + 2].value[1:-1])
+                return Revert()
+            return None
+
+        # Selfdestruct: selfdestruct(address)
+        if first == 'selfdestruct' and start + 1 < end and tokens[start + 1].value == '(':
+            close = self._matching(start + 1)
+            return Selfdestruct(self._expr(start + 2, close))
+
+        # Find := at depth 0 to split target from value
+        assign = start
+        while assign < end:
+            tok = tokens[assign]
+            if tok.kind == 'OP' and tok.value in '([{':
+                assign = self._matching(assign) + 1
+                continue
+            if tok.value == ':=':
+                break
+            assign += 1
+
+        if assign < end:
+            return self._parse_assignment(start, assign, end)
+
+        if tokens[start].kind == 'IDENT' and start + 3 < end and tokens[start + 1].value == '.' and tokens[start + 3].value == '(':
+            array = tokens[start].value
+            method = tokens[start + 2].value
+            close = self._matching(start + 3)
+            # Array push: arr.push(value)
+            if method == 'push' and close > start + 4:
+                return ArrayPush(array, self._expr(start + 4, close))
+            # Array pop: arr.pop()
+            if method == 'pop':
+                return ArrayPop(array)
+
+        return None
+
+    def _parse_assignment(self, start: int, assign: int, end: int) -> Optional[Statement]:
+        tokens = self.tokens
+        if tokens[start].kind != 'IDENT':
+            return None
+        target = tokens[start].value
+        value = self._expr(assign + 1, end)
+
+        if assign == start + 1:
+            return Assignment(target, value)
+
+        # Struct field assignment: struct.field := value
+        if assign == start + 3 and tokens[start + 1].value == '.' and tokens[start + 2].kind == 'IDENT':
+            return Assignment(f"{target}.{tokens[start + 2].value}", value)
+
+        # Array/mapping assignment: name[index] := value or name[i][j] := value
+        indices = []
+        i = start + 1
+        while i < assign and tokens[i].value == '[':
+            close = self._matching(i)
+            indices.append(self._expr(i + 1, close))
+            i = close + 1
+        if i != assign or not indices:
+            return None
+        if len(indices) == 1:
+            # Single index: use old format for compatibility
+            return Assignment(target, value, indices[0])
+        # Multiple indices: use new indices field
+        return Assignment(target, value, indices=indices)
+
+    def _call_args(self, open_index: int) -> List[Expression]:
+        close = self._matching(open_index)
+        return [self._expr(s, e) for s, e in self._split_commas(open_index + 1, close)]
+
+    def _parse_if_statement(self) -> IfStatement:
+        # if condition { ... } or if (condition) { ... }, optionally else { ... } / else if
+        self._expect('if')
+        start = self.pos
+        end = self._scan_to({'{'})
+        condition = self._expr(start, end)
+        self.pos = end
+        then_body = self._parse_block()
+        else_body = None
+        if self._accept('else'):
+            if self._value() == 'if':
+                else_body = [self._parse_if_statement()]
             else:
-                if line == '}':
-                    break
-                if line and not line.startswith('//'):
-                    # Check for control flow
-                    if line.startswith('if '):
-                        stmt, i = self._parse_if_statement(i)
-                        if stmt:
-                            body.append(stmt)
-                        continue
-                    elif line.startswith('while '):
-                        stmt, i = self._parse_while_loop(i)
-                        if stmt:
-                            body.append(stmt)
-                        continue
-                    elif line.startswith('for '):
-                        stmt, i = self._parse_for_loop(i)
-                        if stmt:
-                            body.append(stmt)
-                        continue
-                    else:
-                        stmt = self._parse_statement(line)
-                        if stmt:
-                            body.append(stmt)
-            i += 1
-        
-        return preconditions, postconditions, body, i
-    
-    def _parse_params(self, params_str: str) -> List[Variable]:
-        if not params_str.strip():
-            return []
-        params = []
-        for param in params_str.split(','):
-            match = re.match(r'\s*(\w+)\s*:\s*(\w+)', param)
-            if match:
-                name, type_str = match.groups()
-                params.append(Variable(name, self._parse_type(type_str)))
-        return params
-    
+                else_body = self._parse_block() or None
+        return IfStatement(condition, then_body, else_body)
+
+    def _parse_while_loop(self) -> WhileLoop:
+        self._expect('while')
+        start = self.pos
+        end = self._scan_to({'{'} | LOOP_CLAUSE_KEYWORDS)
+        condition = self._expr(start, end)
+        # Skip loop invariants and termination metrics
+        self.pos = self._scan_to({'{'}, end)
+        body = self._parse_block()
+        return WhileLoop(condition, body)
+
+    def _parse_for_loop(self) -> Optional[ForLoop]:
+        # for (init; condition; update) { ... }
+        self._expect('for')
+        if self._value() != '(':
+            # Unsupported loop form: skip it entirely
+            self.pos = self._scan_to({'{'})
+            if self._value() == '{':
+                self.pos = self._matching(self.pos) + 1
+            return None
+        open_index = self.pos
+        close = self._matching(open_index)
+        first_semi = self._scan_to({';'}, open_index + 1)
+        second_semi = self._scan_to({';'}, first_semi + 1)
+        init = self._parse_simple_statement(open_index + 1, first_semi) if first_semi > open_index + 1 else None
+        condition = self._expr(first_semi + 1, second_semi)
+        update = self._parse_simple_statement(second_semi + 1, close) if close > second_semi + 1 else None
+        self.pos = self._scan_to({'{'}, close + 1)
+        body = self._parse_block()
+        return ForLoop(init, condition, update, body)
+
     def _parse_type(self, type_str: str) -> DafnyType:
         type_map = {
             'int': Type.INT,
@@ -486,432 +841,221 @@ class DafnyParser:
         # Assume it's a struct name
         return DafnyType(Type.STRUCT, struct_name=type_str)
     
-    def _parse_statement(self, line: str) -> Optional[Statement]:
-        line = line.rstrip(';').strip()
-        
-        # var name : type := expr
-        if match := re.match(r'var\s+(\w+)\s*:\s*(\w+)\s*:=\s*(.+)', line):
-            name, type_str, expr = match.groups()
-            return VarDecl(
-                Variable(name, self._parse_type(type_str)),
-                self._parse_expression(expr)
-            )
-        
-        # var name := expr (type inference)
-        if match := re.match(r'var\s+(\w+)\s*:=\s*(.+)', line):
-            name, expr = match.groups()
-            # Use uint256 as default type for type inference
-            return VarDecl(
-                Variable(name, DafnyType(Type.UINT256)),
-                self._parse_expression(expr)
-            )
-        
-        # Array/mapping assignment: name[index] := value or name[i][j] := value
-        if '[' in line and ':=' in line:
-            # Match pattern: name[...][...] := value
-            match = re.match(r'(\w+)((?:\[[^\]]+\])+)\s*:=\s*(.+)', line)
-            if match:
-                target = match.group(1)
-                indices_str = match.group(2)  # All [index] parts
-                expr = match.group(3)
-                
-                # Extract all indices
-                indices = []
-                for idx_match in re.finditer(r'\[([^\]]+)\]', indices_str):
-                    indices.append(self._parse_expression(idx_match.group(1)))
-                
-                if len(indices) == 1:
-                    # Single index: use old format for compatibility
-                    return Assignment(target, self._parse_expression(expr), indices[0])
-                else:
-                    # Multiple indices: use new indices field
-                    return Assignment(target, self._parse_expression(expr), indices=indices)
-        
-        # Struct field assignment: struct.field := value
-        if match := re.match(r'(\w+)\.(\w+)\s*:=\s*(.+)', line):
-            struct, field, expr = match.groups()
-            # Store as special assignment with struct.field as target
-            return Assignment(f"{struct}.{field}", self._parse_expression(expr))
-        
-        # Emit event: emit EventName(args)
-        if match := re.match(r'emit\s+(\w+)\((.*)\)', line):
-            name, args_str = match.groups()
-            args = [self._parse_expression(a.strip()) for a in args_str.split(',')] if args_str.strip() else []
-            return EmitEvent(name, args)
-        
-        # Revert with custom error: revert ErrorName(args)
-        if match := re.match(r'revert\s+(\w+)\((.*)\)', line):
-            error_name, args_str = match.groups()
-            args = [self._parse_expression(a.strip()) for a in args_str.split(',')] if args_str.strip() else []
-            return Revert(error_name=error_name, error_args=args)
-        
-        # Revert with message: revert("message")
-        if match := re.match(r'revert\("(.+)"\)', line):
-            message = match.group(1)
-            return Revert(message=message)
-        
-        # Revert without args
-        if line == 'revert':
-            return Revert()
-        
-        # Selfdestruct: selfdestruct(address)
-        if match := re.match(r'selfdestruct\((.+)\)', line):
-            recipient = self._parse_expression(match.group(1))
-            return Selfdestruct(recipient)
-        
-        # Array push: arr.push(value)
-        if match := re.match(r'(\w+)\.push\((.+)\)', line):
-            array, value = match.groups()
-            return ArrayPush(array, self._parse_expression(value))
-        
-        # Array pop: arr.pop()
-        if match := re.match(r'(\w+)\.pop\(\)', line):
-            return ArrayPop(match.group(1))
-        
-        if match := re.match(r'(\w+)\s*:=\s*(.+)', line):
-            target, expr = match.groups()
-            return Assignment(target, self._parse_expression(expr))
-        
-        if match := re.match(r'return\s+(.+)', line):
-            ret_expr = match.group(1)
-            # Check for multiple returns: "return x, y;"
-            if ',' in ret_expr:
-                values = [self._parse_expression(v.strip()) for v in ret_expr.split(',')]
-                return Return(values)
-            return Return(self._parse_expression(ret_expr))
-        
-        if match := re.match(r'return\s*', line):
-            return Return(None)
-        
-        if match := re.match(r'assert\s+(.+)', line):
-            return Assert(self._parse_expression(match.group(1)))
-        
-        if match := re.match(r'require\s+(.+)', line):
-            return Require(self._parse_expression(match.group(1)))
-        
-        return None
-    
-    def _parse_if_statement(self, start: int):
-        line = self.lines[start].strip()
-        # Match: if condition { or if (condition) {
-        match = re.match(r'if\s+(?:\((.+?)\)|(.*?))\s*\{?', line)
-        if not match:
-            return None, start
-        
-        # Get condition from either group (with or without parens)
-        condition_str = match.group(1) if match.group(1) else match.group(2)
-        condition = self._parse_expression(condition_str)
-        then_body = []
-        else_body = []
-        
-        i = start + 1
-        brace_count = 1
-        in_else = False
-        
-        # Parse blocks
-        while i < len(self.lines):
-            line = self.lines[i].strip()
-            
-            # Check for } else { on same line
-            if '} else {' in line or line == '} else {':
-                in_else = True
-                brace_count = 1
-                i += 1
-                continue
-            
-            if line == '}':
-                brace_count -= 1
-                if brace_count == 0:
-                    i += 1
-                    break
-            elif line == '{':
-                brace_count += 1
-            elif line and not line.startswith('//'):
-                stmt = self._parse_statement(line)
-                if stmt:
-                    if in_else:
-                        else_body.append(stmt)
-                    else:
-                        then_body.append(stmt)
-            i += 1
-        
-        return IfStatement(condition, then_body, else_body if else_body else None), i
-    
-    def _parse_while_loop(self, start: int):
-        line = self.lines[start].strip()
-        match = re.match(r'while\s+\((.+?)\)\s*\{?', line)
-        if not match:
-            return None, start
-        
-        condition = self._parse_expression(match.group(1))
-        body = []
-        
-        i = start + 1
-        brace_count = 1 if '{' in line else 0
-        
-        while i < len(self.lines):
-            line = self.lines[i].strip()
-            if line == '}':
-                brace_count -= 1
-                if brace_count == 0:
-                    break
-            elif line == '{':
-                brace_count += 1
-            elif line and not line.startswith('//'):
-                stmt = self._parse_statement(line)
-                if stmt:
-                    body.append(stmt)
-            i += 1
-        
-        return WhileLoop(condition, body), i
-    
-    def _parse_for_loop(self, start: int):
-        line = self.lines[start].strip()
-        # for (init; condition; update) { ... }
-        match = re.match(r'for\s+\((.+?);(.+?);(.+?)\)\s*\{?', line)
-        if not match:
-            return None, start
-        
-        init_str, cond_str, update_str = match.groups()
-        init = self._parse_statement(init_str.strip()) if init_str.strip() else None
-        condition = self._parse_expression(cond_str.strip())
-        update = self._parse_statement(update_str.strip()) if update_str.strip() else None
-        
-        body = []
-        i = start + 1
-        brace_count = 1 if '{' in line else 0
-        
-        while i < len(self.lines):
-            line = self.lines[i].strip()
-            if line == '}':
-                brace_count -= 1
-                if brace_count == 0:
-                    break
-            elif line == '{':
-                brace_count += 1
-            elif line and not line.startswith('//'):
-                stmt = self._parse_statement(line)
-                if stmt:
-                    body.append(stmt)
-            i += 1
-        
-        return ForLoop(init, condition, update, body), i
-    
-    def _parse_condition(self, line: str) -> Optional[Expression]:
-        """Parse a condition from a require/assert/if statement"""
-        # Extract condition from require(condition) or similar
-        match = re.search(r'require\s*\((.*?)\)', line)
-        if match:
-            return self._parse_expression(match.group(1))
-        match = re.search(r'assert\s*\((.*?)\)', line)
-        if match:
-            return self._parse_expression(match.group(1))
-        match = re.search(r'if\s*\((.*?)\)', line)
-        if match:
-            return self._parse_expression(match.group(1))
-        return None
-    
-    def _parse_map_update(self, expr: str):
-        """Parse functional map update: map[k := v] or chained map[k1 := v1][k2 := v2]"""
-        # Find the base (everything before first '[')
-        first_bracket = expr.find('[')
-        if first_bracket == -1:
-            return None
-        
-        base = expr[:first_bracket].strip()
-        remaining = expr[first_bracket:]
-        
-        # Parse all [key := value] segments
-        updates = []
-        i = 0
-        while i < len(remaining):
-            if remaining[i] == '[':
-                # Find matching ']' considering nested brackets
-                depth = 1
-                j = i + 1
-                while j < len(remaining) and depth > 0:
-                    if remaining[j] == '[':
-                        depth += 1
-                    elif remaining[j] == ']':
-                        depth -= 1
-                    j += 1
-                
-                # Extract content between brackets
-                content = remaining[i+1:j-1]
-                
-                # Check if this is a map update (contains :=)
-                if ':=' in content:
-                    # Find := at the correct depth
-                    assign_pos = -1
-                    depth = 0
-                    for k, char in enumerate(content):
-                        if char == '[':
-                            depth += 1
-                        elif char == ']':
-                            depth -= 1
-                        elif char == ':' and k + 1 < len(content) and content[k+1] == '=' and depth == 0:
-                            assign_pos = k
-                            break
-                    
-                    if assign_pos != -1:
-                        key = content[:assign_pos].strip()
-                        value = content[assign_pos+2:].strip()
-                        updates.append((key, value))
-                
-                i = j
-            else:
-                i += 1
-        
-        if not updates:
-            return None
-        
-        # Build nested MapUpdate structure
-        # For map[k1 := v1][k2 := v2], create MapUpdate(MapUpdate(base, k1, v1), k2, v2)
-        result = MapUpdate(base, self._parse_expression(updates[0][0]), self._parse_expression(updates[0][1]))
-        for key, value in updates[1:]:
-            result = MapUpdate(result, self._parse_expression(key), self._parse_expression(value))
-        
-        return result
-    
-    def _parse_expression(self, expr: str) -> Expression:
-        expr = expr.strip()
-        
-        # Handle parentheses - strip outer parens if balanced
-        if expr.startswith('(') and expr.endswith(')'):
-            # Check if these are the outermost balanced parens
-            depth = 0
-            for i, char in enumerate(expr):
-                if char == '(':
-                    depth += 1
-                elif char == ')':
-                    depth -= 1
-                    if depth == 0 and i == len(expr) - 1:
-                        # Outer parens are balanced, strip them
-                        return self._parse_expression(expr[1:-1])
-        
-        # Functional map update: map[key := value] or chained map[k1 := v1][k2 := v2]
-        # MUST be checked before binary operators to avoid splitting on operators inside updates
-        if '[' in expr and ':=' in expr and ']' in expr:
-            map_update = self._parse_map_update(expr)
-            if map_update:
-                return map_update
-        
-        # If expression: if condition then thenExpr else elseExpr
-        if expr.startswith('if '):
-            # Find 'then' and 'else' keywords (not inside nested expressions)
-            depth = 0
-            then_pos = -1
-            else_pos = -1
-            i = 3  # Skip 'if '
-            
-            while i < len(expr):
-                if expr[i:i+2] == 'if':
-                    depth += 1
-                    i += 2
-                elif expr[i:i+4] == 'then' and depth == 0 and then_pos == -1:
-                    then_pos = i
-                    i += 4
-                elif expr[i:i+4] == 'else' and depth == 0:
-                    else_pos = i
-                    break
-                else:
-                    i += 1
-            
-            if then_pos > 0 and else_pos > 0:
-                condition = expr[3:then_pos].strip()
-                then_expr = expr[then_pos+4:else_pos].strip()
-                else_expr = expr[else_pos+4:].strip()
-                
-                return IfExpression(
-                    self._parse_expression(condition),
-                    self._parse_expression(then_expr),
-                    self._parse_expression(else_expr)
-                )
-        
-        # Handle unary operators
-        if expr.startswith('!'):
-            return UnaryOp('!', self._parse_expression(expr[1:]))
-        
-        if expr.isdigit():
-            return Literal(int(expr), DafnyType(Type.UINT256))
-        
-        if expr in ('true', 'false'):
-            return Literal(expr == 'true', DafnyType(Type.BOOL))
-        
-        # Binary operators - check before other patterns
-        # Parse with proper precedence and parentheses handling
-        for op in ['==', '!=', '<=', '>=', '<', '>', '+', '-', '*', '/', '%', '&&', '||', ' in ']:
-            # Find operator at depth 0 (not inside parens/brackets)
-            depth = 0
-            i = 0
-            while i < len(expr):
-                if expr[i] in '([':
-                    depth += 1
-                elif expr[i] in ')]':
-                    depth -= 1
-                elif depth == 0 and expr[i:i+len(op)] == op:
-                    # Found operator at top level
-                    left = expr[:i].strip()
-                    right = expr[i+len(op):].strip()
-                    if left and right:  # Make sure both sides exist
-                        return BinaryOp(op, self._parse_expression(left), self._parse_expression(right))
-                i += 1
-        
-        # Contract calls: addr.call(data) - check before struct access
-        if match := re.match(r'(.+?)\.call\{value:\s*(.+?)\}\((.+?)\)', expr):
-            addr, value, data = match.groups()
-            return ContractCall(self._parse_expression(addr), 'call', 
-                              self._parse_expression(data), self._parse_expression(value))
-        if match := re.match(r'(.+?)\.call\((.+?)\)', expr):
-            addr, data = match.groups()
-            return ContractCall(self._parse_expression(addr), 'call', self._parse_expression(data))
-        if match := re.match(r'(.+?)\.(delegatecall|staticcall)\((.+?)\)', expr):
-            addr, method, data = match.groups()
-            return ContractCall(self._parse_expression(addr), method, self._parse_expression(data))
-        
-        # Global variables: msg.sender, msg.value, block.timestamp, etc.
-        if '.' in expr and not '[' in expr:
-            parts = expr.split('.')
-            if len(parts) == 2:
-                if parts[0] in ('msg', 'block', 'tx'):
-                    return GlobalVar(expr)
+    # ------------------------------------------------------------------
+    # Expressions
+    # ------------------------------------------------------------------
+
+    def _expr(self, start: int, end: int) -> Expression:
+        """
+        Parse tokens[start:end] as one expression by precedence climbing.
+
+        Input outside the supported subset (quantifiers, slices, method calls
+        on arbitrary expressions, ...) is kept verbatim as a VarRef, as the
+        string-based parser did.
+        """
+        saved = self.pos, self.expr_end
+        self.pos, self.expr_end = start, end
+        try:
+            expr = self._parse_binary(0)
+            if self.pos != end:
+                raise SyntaxError(f"unexpected '{self.tokens[self.pos].value}' in expression")
+        except SyntaxError:
+            expr = VarRef(self._text(start, end))
+        finally:
+            self.pos, self.expr_end = saved
+        return expr
+
+    def _expr_peek(self, offset: int = 0) -> Optional[Token]:
+        index = self.pos + offset
+        return self.tokens[index] if index < self.expr_end else None
+
+    def _expr_expect(self, value: str):
+        tok = self._expr_peek()
+        if tok is None or tok.value != value:
+            raise SyntaxError(f"expected '{value}' in expression")
+        self.pos += 1
+
+    def _parse_binary(self, min_precedence: int) -> Expression:
+        left = self._parse_unary()
+        while True:
+            tok = self._expr_peek()
+            if tok is None:
+                return left
+            op = tok.value
+            width = 1
+            negated = False
+            if op == '!':
+                # x !in m
+                nxt = self._expr_peek(1)
+                if nxt is None or nxt.value != 'in':
+                    return left
+                op, width, negated = 'in', 2, True
+            precedence = BINARY_PRECEDENCE.get(op)
+            if precedence is None or precedence < min_precedence:
+                return left
+            self.pos += width
+            right = self._parse_binary(precedence if op in RIGHT_ASSOCIATIVE else precedence + 1)
+            left = BinaryOp(op, left, right)
+            if negated:
+                left = UnaryOp('!', left)
+
+    def _parse_unary(self) -> Expression:
+        tok = self._expr_peek()
+        if tok is not None and tok.kind == 'OP':
+            if tok.value == '!':
+                self.pos += 1
+                return UnaryOp('!', self._parse_unary())
+            if tok.value == '-':
+                # Lower negation to 0 - x so it wraps like EVM subtraction
+                self.pos += 1
+                return BinaryOp('-', Literal(0, DafnyType(Type.UINT256)), self._parse_unary())
+        return self._parse_postfix(self._parse_primary())
+
+    def _parse_primary(self) -> Expression:
+        tok = self._expr_peek()
+        if tok is None:
+            raise SyntaxError("unexpected end of expression")
+        self.pos += 1
+        kind, value = tok.kind, tok.value
+
+        if kind == 'NUMBER':
+            if value[:2] in ('0x', '0X'):
+                return Literal(int(value, 16), DafnyType(Type.UINT256))
+            if not value.replace('_', '').isdigit():
+                raise SyntaxError(f"unsupported numeric literal '{value}'")
+            return Literal(int(value), DafnyType(Type.UINT256))
+
+        if kind == 'STRING':
+            return VarRef(value)
+
+        if kind == 'OP':
+            if value != '(':
+                raise SyntaxError(f"unexpected '{value}' in expression")
+            inner = self._parse_binary(0)
+            self._expr_expect(')')
+            return inner
+
+        if value in ('true', 'false'):
+            return Literal(value == 'true', DafnyType(Type.BOOL))
+
+        # if condition then thenExpr else elseExpr
+        if value == 'if':
+            condition = self._parse_binary(0)
+            self._expr_expect('then')
+            then_expr = self._parse_binary(0)
+            self._expr_expect('else')
+            else_expr = self._parse_binary(0)
+            return IfExpression(condition, then_expr, else_expr)
+
+        if value in EXPRESSION_KEYWORDS:
+            raise SyntaxError(f"unsupported '{value}' expression")
+
+        return VarRef(value)
+
+    def _parse_postfix(self, expr: Expression) -> Expression:
+        while True:
+            tok = self._expr_peek()
+            if tok is None:
+                return expr
+            value = tok.value
+
+            if value == '.':
+                member_tok = self._expr_peek(1)
+                if member_tok is None or member_tok.kind != 'IDENT':
+                    raise SyntaxError("expected member name after '.'")
+                member = member_tok.value
+                self.pos += 2
+                if member in CONTRACT_CALL_METHODS:
+                    expr = self._parse_contract_call(expr, member)
+                    continue
+                if not isinstance(expr, VarRef):
+                    raise SyntaxError("unsupported member access chain")
+                # Global variables: msg.sender, msg.value, block.timestamp, etc.
+                if expr.name in ('msg', 'block', 'tx'):
+                    expr = GlobalVar(f"{expr.name}.{member}")
                 # Array length: arr.length
-                if parts[1] == 'length':
-                    return ArrayLength(parts[0])
+                elif member == 'length':
+                    expr = ArrayLength(expr.name)
                 # Struct member access: person.age
-                return StructAccess(parts[0], parts[1])
-        
-        # Array/mapping access: name[index] or nested name[i][j]
-        # Match all bracket pairs and build nested structure
-        if '[' in expr and ']' in expr:
-            # Find base name and all indices
-            base_match = re.match(r'(\w+)(\[.+\])+$', expr)
-            if base_match:
-                base_name = base_match.group(1)
-                indices_str = base_match.group(2)
-                
-                # Extract all [index] parts
-                indices = []
-                for idx_match in re.finditer(r'\[([^\[\]]+)\]', indices_str):
-                    indices.append(idx_match.group(1))
-                
-                # Build nested ArrayAccess structure
-                result = ArrayAccess(base_name, self._parse_expression(indices[0]))
-                for idx in indices[1:]:
-                    # Wrap previous result in another ArrayAccess
-                    result = ArrayAccess(result, self._parse_expression(idx))
-                return result
-        
-        if match := re.match(r'(\w+)\((.*)\)', expr):
-            name, args_str = match.groups()
-            args = [self._parse_expression(a.strip()) for a in args_str.split(',')] if args_str else []
-            return FunctionCall(name, args)
-        
-        return VarRef(expr)
-    
-    def _extract_invariants(self) -> List[Expression]:
-        invariants = []
-        for line in self.lines:
-            if match := re.match(r'\s*invariant\s+(.+)', line):
-                invariants.append(self._parse_expression(match.group(1)))
-        return invariants
+                else:
+                    expr = StructAccess(expr.name, member)
+
+            elif value == '[':
+                self.pos += 1
+                key = self._parse_binary(0)
+                tok = self._expr_peek()
+                if tok is not None and tok.value == ':=':
+                    # Functional map update: map[k := v], possibly chained
+                    self.pos += 1
+                    update = self._parse_binary(0)
+                    self._expr_expect(']')
+                    if isinstance(expr, MapUpdate):
+                        expr = MapUpdate(expr, key, update)
+                        continue
+                    # For m[a][b := v] the base is recorded as the mapping name;
+                    # the outer update m[a := ...] already carries key a
+                    base = expr
+                    while isinstance(base, ArrayAccess):
+                        base = base.array
+                    if isinstance(base, VarRef):
+                        base = base.name
+                    if not isinstance(base, str):
+                        raise SyntaxError("unsupported map update base")
+                    expr = MapUpdate(base, key, update)
+                    continue
+                self._expr_expect(']')
+                # Array/mapping access: name[index] or nested name[i][j]
+                if isinstance(expr, VarRef):
+                    expr = ArrayAccess(expr.name, key)
+                elif isinstance(expr, ArrayAccess):
+                    expr = ArrayAccess(expr, key)
+                else:
+                    raise SyntaxError("unsupported index base")
+
+            elif value == '(':
+                if not isinstance(expr, VarRef):
+                    raise SyntaxError("unsupported call target")
+                expr = FunctionCall(expr.name, self._parse_expr_args())
+
+            elif value == 'as':
+                # Numeric conversions are no-ops on 256-bit words
+                type_tok = self._expr_peek(1)
+                if type_tok is None or type_tok.kind != 'IDENT':
+                    raise SyntaxError("expected type after 'as'")
+                self.pos += 2
+
+            else:
+                return expr
+
+    def _parse_expr_args(self) -> List[Expression]:
+        """Parse "( expr, ... )" starting at the opening parenthesis."""
+        self._expr_expect('(')
+        args = []
+        tok = self._expr_peek()
+        if tok is not None and tok.value == ')':
+            self.pos += 1
+            return args
+        while True:
+            args.append(self._parse_binary(0))
+            tok = self._expr_peek()
+            if tok is None:
+                raise SyntaxError("unterminated argument list")
+            self.pos += 1
+            if tok.value == ')':
+                return args
+            if tok.value != ',':
+                raise SyntaxError(f"unexpected '{tok.value}' in argument list")
+
+    def _parse_contract_call(self, address: Expression, method: str) -> ContractCall:
+        # addr.call{value: v}(data), addr.call(data), addr.delegatecall(data)
+        value = None
+        tok = self._expr_peek()
+        if method == 'call' and tok is not None and tok.value == '{':
+            self.pos += 1
+            self._expr_expect('value')
+            self._expr_expect(':')
+            value = self._parse_binary(0)
+            self._expr_expect('}')
+        args = self._parse_expr_args()
+        data = args[0] if args else None
+        return ContractCall(address, method, data, value)
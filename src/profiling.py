@@ -0,0 +1,186 @@
+"""
+Per-stage instrumentation for the compile pipeline.
+
+A Profiler is created for each compile() call when profiling is enabled. It
+records a span for every pipeline stage (wall time, CPU time of the calling
+thread, CPU time of reaped child processes), every external tool invocation
+(dafny, solc) and every cache lookup. report() returns a JSON-serializable
+summary that includes peak RSS; chrome_trace() converts a report to the
+trace-event format understood by chrome://tracing and Perfetto.
+
+Hooks receive the same records as they are produced, so a metrics exporter
+can subscribe without parsing reports.
+"""
+
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Iterable, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+class ProfileHook:
+    """
+    Receives profiling records as they are produced.
+
+    Subclass and override the callbacks you need. Exceptions raised by a
+    hook are ignored so that instrumentation can never fail a build.
+    """
+
+    def on_stage(self, record: dict):
+        pass
+
+    def on_subprocess(self, record: dict):
+        pass
+
+    def on_cache(self, name: str, hit: bool):
+        pass
+
+    def on_profile(self, report: dict):
+        pass
+
+
+def _children_cpu() -> float:
+    times = os.times()
+    return times.children_user + times.children_system
+
+
+def peak_rss_kb() -> dict:
+    """Peak resident set size of this process and of its reaped children, in KiB."""
+    if resource is None:
+        return {'self': None, 'children': None}
+    # ru_maxrss is in bytes on macOS and KiB elsewhere
+    scale = 1024 if sys.platform == 'darwin' else 1
+    return {
+        'self': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // scale,
+        'children': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss // scale,
+    }
+
+
+class Profiler:
+    def __init__(self, hooks: Iterable[ProfileHook] = ()):
+        self.hooks = list(hooks)
+        self.stages: List[dict] = []
+        self.subprocesses: List[dict] = []
+        self.cache = {}
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def _notify(self, callback: str, *args):
+        for hook in self.hooks:
+            try:
+                getattr(hook, callback)(*args)
+            except Exception:
+                pass
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time a pipeline stage running on the calling thread."""
+        start = time.perf_counter()
+        cpu_start = time.thread_time()
+        children_start = _children_cpu()
+        try:
+            yield
+        finally:
+            record = {
+                'name': name,
+                'start': start - self._origin,
+                'wall': time.perf_counter() - start,
+                'cpu': time.thread_time() - cpu_start,
+                'children_cpu': _children_cpu() - children_start,
+                'thread': threading.current_thread().name,
+            }
+            with self._lock:
+                self.stages.append(record)
+            self._notify('on_stage', record)
+
+    @contextmanager
+    def subprocess(self, name: str, command: Iterable[str]):
+        """Time one external tool invocation (spawn to exit)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            record = {
+                'name': name,
+                'command': [str(part) for part in command],
+                'start': start - self._origin,
+                'wall': time.perf_counter() - start,
+                'thread': threading.current_thread().name,
+            }
+            with self._lock:
+                self.subprocesses.append(record)
+            self._notify('on_subprocess', record)
+
+    def record_cache(self, name: str, hit: bool):
+        with self._lock:
+            self.cache[name] = hit
+        self._notify('on_cache', name, hit)
+
+    def report(self) -> dict:
+        with self._lock:
+            report = {
+                'total_wall': time.perf_counter() - self._origin,
+                'stages': list(self.stages),
+                'subprocesses': list(self.subprocesses),
+                'cache': dict(self.cache),
+                'peak_rss_kb': peak_rss_kb(),
+            }
+        self._notify('on_profile', report)
+        return report
+
+    def replay(self, report: dict):
+        """Pass the records of a report made elsewhere, such as in a worker process, to the hooks."""
+        for record in report['stages']:
+            self._notify('on_stage', record)
+        for record in report['subprocesses']:
+            self._notify('on_subprocess', record)
+        for name, hit in report['cache'].items():
+            self._notify('on_cache', name, hit)
+        self._notify('on_profile', report)
+
+
+def stage(profiler: Optional[Profiler], name: str):
+    """profiler.stage(name), or a no-op when profiling is off."""
+    return profiler.stage(name) if profiler is not None else nullcontext()
+
+
+def subprocess_span(profiler: Optional[Profiler], name: str, command: Iterable[str]):
+    """profiler.subprocess(name, command), or a no-op when profiling is off."""
+    return profiler.subprocess(name, command) if profiler is not None else nullcontext()
+
+
+def chrome_trace(reports: dict) -> dict:
+    """
+    Convert {label: report} into a Chrome trace-event document.
+
+    Each report becomes its own process row, named after its label; stages
+    and subprocesses are complete ("X") events on the thread that ran them.
+    """
+    events = []
+    for pid, (label, report) in enumerate(reports.items(), start=1):
+        events.append({'ph': 'M', 'name': 'process_name', 'pid': pid, 'tid': 0, 'args': {'name': label}})
+        threads = {}
+        for category, records in (('stage', report['stages']), ('subprocess', report['subprocesses'])):
+            for record in records:
+                tid = threads.setdefault(record['thread'], len(threads) + 1)
+                args = {key: record[key] for key in ('cpu', 'children_cpu', 'command') if key in record}
+                events.append({
+                    'ph': 'X',
+                    'cat': category,
+                    'name': record['name'],
+                    'pid': pid,
+                    'tid': tid,
+                    'ts': record['start'] * 1e6,
+                    'dur': record['wall'] * 1e6,
+                    'args': args,
+                })
+        for thread, tid in threads.items():
+            events.append({'ph': 'M', 'name': 'thread_name', 'pid': pid, 'tid': tid, 'args': {'name': thread}})
+    return {'traceEvents': events, 'displayTimeUnit': 'ms'}
@@ -0,0 +1,131 @@
+"""
+Static gas and size estimates and side-effect analysis for Yul IR.
+
+Estimates are for choosing between lowerings (which operand of `&&` to test
+first, whether a branch is worth it) and for reporting what an optimization
+saved, not for predicting transaction cost: storage and account reads are
+priced cold, every other builtin at its base cost, and calls to user
+functions at a flat guess. Sizes assume one byte per opcode and the
+shortest PUSH for each literal.
+"""
+
+from typing import List, Tuple
+
+from .cse import HASH_HELPERS, OTHER_BUILTINS, PURE_BUILTINS, STORAGE_WRITING_BUILTINS
+from .yul_ast import Assign, Block, Call, ExprStmt, ForLoop, If, Literal, Switch, VarDecl
+
+GAS_COLD_SLOAD = 2100
+GAS_COLD_ACCOUNT = 2600
+# Two MSTOREs, KECCAK256 of 64 bytes and the jump into and out of the helper
+GAS_SLOT_HASH = 70
+GAS_USER_CALL = 100
+# Cost of a conditional jump around code: ISZERO, PUSH, JUMPI, JUMPDEST
+GAS_BRANCH = 3 + 3 + 10 + 1
+
+GAS_COSTS = {
+    'sload': GAS_COLD_SLOAD,
+    'balance': GAS_COLD_ACCOUNT,
+    'extcodesize': GAS_COLD_ACCOUNT,
+    'extcodehash': GAS_COLD_ACCOUNT,
+    'call': GAS_COLD_ACCOUNT,
+    'staticcall': GAS_COLD_ACCOUNT,
+    'delegatecall': GAS_COLD_ACCOUNT,
+    'keccak256': 42,
+    'exp': 60,
+    'mul': 5, 'div': 5, 'sdiv': 5, 'mod': 5, 'smod': 5, 'signextend': 5,
+    'addmod': 8, 'mulmod': 8,
+    'caller': 2, 'callvalue': 2, 'calldatasize': 2, 'address': 2, 'origin': 2, 'gasprice': 2,
+    'coinbase': 2, 'timestamp': 2, 'number': 2, 'gaslimit': 2, 'chainid': 2, 'basefee': 2, 'gas': 2, 'codesize': 2,
+    'selfbalance': 5,
+    # 375 base and 375 per topic; each byte of data adds 8
+    **{f'log{topics}': 375 * (1 + topics) for topics in range(5)},
+    'keccak256_mapping': GAS_SLOT_HASH,
+    'keccak256_single': GAS_SLOT_HASH - 3,
+    'keccak256_hash': GAS_SLOT_HASH - 3,
+}
+BUILTIN_GAS = 3
+
+# Builtins that only read state
+READ_ONLY_BUILTINS = PURE_BUILTINS | HASH_HELPERS | {
+    'sload', 'mload', 'keccak256', 'balance', 'selfbalance', 'extcodesize', 'extcodehash',
+    'returndatasize', 'msize', 'gas',
+}
+BUILTINS = PURE_BUILTINS | OTHER_BUILTINS | STORAGE_WRITING_BUILTINS
+# PUSH return label, PUSH target, JUMP, JUMPDEST, and the JUMP back
+SIZE_USER_CALL = 3 + 3 + 1 + 1 + 1
+# ISZERO, PUSH2 target, JUMPI, JUMPDEST
+SIZE_BRANCH = 1 + 3 + 1 + 1
+
+# Results are always 0 or 1
+BOOLEAN_BUILTINS = {'lt', 'gt', 'slt', 'sgt', 'eq', 'iszero'}
+
+
+def estimate_gas(expr) -> int:
+    """Gas to evaluate an expression, including pushing its literals."""
+    if isinstance(expr, Call):
+        if expr.name in GAS_COSTS:
+            own = GAS_COSTS[expr.name]
+        elif expr.name in READ_ONLY_BUILTINS:
+            own = BUILTIN_GAS
+        else:
+            own = GAS_USER_CALL
+        return own + sum(estimate_gas(arg) for arg in expr.args)
+    # PUSH for a literal, DUP for a variable
+    return 3
+
+
+def is_side_effect_free(expr) -> bool:
+    """Whether evaluating the expression can be skipped or reordered."""
+    if isinstance(expr, Call):
+        return expr.name in READ_ONLY_BUILTINS and all(is_side_effect_free(arg) for arg in expr.args)
+    return True
+
+
+def is_boolean(expr) -> bool:
+    """Whether the expression always evaluates to 0 or 1."""
+    if isinstance(expr, Literal):
+        return expr.value in ('true', 'false', '0', '1')
+    return isinstance(expr, Call) and expr.name in BOOLEAN_BUILTINS
+
+
+def estimate_size(expr) -> int:
+    """Bytecode bytes to evaluate an expression."""
+    if isinstance(expr, Call):
+        own = 1 if expr.name in BUILTINS else SIZE_USER_CALL
+        return own + sum(estimate_size(arg) for arg in expr.args)
+    if isinstance(expr, Literal):
+        try:
+            value = int(expr.value, 0)
+        except ValueError:
+            value = int(expr.value == 'true')
+        # PUSH0 for zero, otherwise PUSHn and n bytes
+        return 1 + (value.bit_length() + 7) // 8
+    return 1
+
+
+def estimate_statements(statements: List) -> Tuple[int, int]:
+    """(gas, bytes) of statements, with the gas of the path that skips every if body."""
+    gas = size = 0
+    for stmt in statements:
+        if isinstance(stmt, (VarDecl, Assign)):
+            if stmt.value is not None:
+                gas += estimate_gas(stmt.value)
+                size += estimate_size(stmt.value)
+        elif isinstance(stmt, ExprStmt):
+            gas += estimate_gas(stmt.expr)
+            size += estimate_size(stmt.expr)
+        elif isinstance(stmt, If):
+            gas += estimate_gas(stmt.condition) + GAS_BRANCH
+            size += estimate_size(stmt.condition) + SIZE_BRANCH + estimate_statements(stmt.body.statements)[1]
+        elif isinstance(stmt, Switch):
+            gas += estimate_gas(stmt.expr) + GAS_BRANCH * len(stmt.cases)
+            size += estimate_size(stmt.expr) + sum(SIZE_BRANCH + estimate_statements(case.body.statements)[1]
+                                                   for case in stmt.cases)
+        elif isinstance(stmt, ForLoop):
+            size += sum(estimate_statements(part.statements)[1] for part in (stmt.init, stmt.post, stmt.body))
+            size += estimate_size(stmt.condition) + 2 * SIZE_BRANCH
+        elif isinstance(stmt, Block):
+            block_gas, block_size = estimate_statements(stmt.statements)
+            gas += block_gas
+            size += block_size
+    return gas, size
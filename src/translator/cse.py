@@ -0,0 +1,485 @@
+"""
+Common-subexpression elimination of storage slot hashes and SLOADs.
+
+Runs per function over the generated Yul:
+
+- A mapping/array slot hash (`keccak256_mapping`, `keccak256_single`,
+  `keccak256_hash`) over pure arguments is computed once and reused for as
+  long as none of the variables it reads is reassigned.
+- An `sload` of a pure slot expression is reused until a write that may
+  touch that slot, or a call that may write storage (user functions,
+  `call`, `delegatecall`, ...).
+
+Values are bound with `let _cse_N := ...` in front of the statement that
+first needs them and are visible to the rest of that block and the blocks
+nested in it. Bindings that end up used only once are folded back, so code
+without repeated accesses is left as it was.
+
+Aliasing follows Solidity's storage model: distinct literal slots never
+alias, a hashed slot never aliases a literal slot, and two hashed slots can
+only alias if their preimages have the same length and their bases can.
+"""
+
+from typing import Dict, List, Optional, Set
+
+from .passes import FunctionPass
+from .yul_ast import (Assign, Block, Break, Call, Continue, ExprStmt, ForLoop, FunctionDef, Identifier,
+                      If, Leave, Literal, Object, Switch, VarDecl, YulSyntaxError, format_function,
+                      functions_of, iter_functions)
+
+# Bytes of preimage each slot hash helper hashes: its arguments, one word each
+HASH_PREIMAGE_SIZES = {'keccak256_mapping': 64, 'keccak256_single': 32, 'keccak256_hash': 32}
+HASH_HELPERS = set(HASH_PREIMAGE_SIZES)
+# Helpers emitted by YulGenerator that never touch storage
+STORAGE_FREE_HELPERS = HASH_HELPERS | {'allocate_memory'}
+# Builtins whose result depends only on their arguments and the call context
+PURE_BUILTINS = {
+    'add', 'sub', 'mul', 'div', 'sdiv', 'mod', 'smod', 'exp', 'not', 'lt', 'gt', 'slt', 'sgt',
+    'eq', 'iszero', 'and', 'or', 'xor', 'byte', 'shl', 'shr', 'sar', 'addmod', 'mulmod',
+    'signextend', 'caller', 'callvalue', 'calldataload', 'calldatasize', 'address', 'origin',
+    'chainid', 'timestamp', 'number', 'gasprice', 'coinbase', 'basefee', 'gaslimit',
+}
+# Builtins that may change this contract's storage (directly or by re-entry)
+STORAGE_WRITING_BUILTINS = {'sstore', 'call', 'callcode', 'delegatecall', 'create', 'create2', 'selfdestruct'}
+# All other EVM builtins; calls to anything else are user functions
+OTHER_BUILTINS = {
+    'sload', 'staticcall', 'mload', 'mstore', 'mstore8', 'msize', 'keccak256', 'balance',
+    'selfbalance', 'extcodesize', 'extcodecopy', 'extcodehash', 'codesize', 'codecopy',
+    'calldatacopy', 'returndatasize', 'returndatacopy', 'return', 'revert', 'stop', 'invalid',
+    'pop', 'gas', 'log0', 'log1', 'log2', 'log3', 'log4', 'datasize', 'dataoffset', 'datacopy',
+    'difficulty', 'prevrandao', 'blockhash', 'pc',
+}
+
+_PREFIX = '_cse_'
+
+
+def _is_pure(expr) -> bool:
+    if isinstance(expr, (Literal, Identifier)):
+        return True
+    return (expr.name in PURE_BUILTINS or expr.name in HASH_HELPERS) and all(_is_pure(arg) for arg in expr.args)
+
+
+def _identifiers(expr, out: Set[str]) -> Set[str]:
+    if isinstance(expr, Identifier):
+        out.add(expr.name)
+    elif isinstance(expr, Call):
+        for arg in expr.args:
+            _identifiers(arg, out)
+    return out
+
+
+def _writes_storage(name: str, storage_free: Set[str]) -> bool:
+    if name in STORAGE_WRITING_BUILTINS:
+        return True
+    return not (name in PURE_BUILTINS or name in OTHER_BUILTINS or name in storage_free)
+
+
+def _may_write_storage(expr, storage_free: Set[str]) -> bool:
+    if not isinstance(expr, Call):
+        return False
+    return _writes_storage(expr.name, storage_free) or any(_may_write_storage(arg, storage_free) for arg in expr.args)
+
+
+def storage_free_functions(functions: List[FunctionDef]) -> Set[str]:
+    """Names of functions that cannot write storage, directly or through calls."""
+    calls = {}
+    for function in functions:
+        names = set()
+        _called_names(function.body, names)
+        calls[function.name] = names
+    free = set(STORAGE_FREE_HELPERS) | set(calls)
+    changed = True
+    while changed:
+        changed = False
+        for name, called in calls.items():
+            if name in free and any(_writes_storage(callee, free) for callee in called):
+                free.discard(name)
+                changed = True
+    return free
+
+
+def _called_names(node, out: Set[str]):
+    if isinstance(node, Call):
+        out.add(node.name)
+        for arg in node.args:
+            _called_names(arg, out)
+    elif isinstance(node, Block):
+        for stmt in node.statements:
+            _called_names(stmt, out)
+    elif isinstance(node, ForLoop):
+        for part in (node.init, node.condition, node.post, node.body):
+            _called_names(part, out)
+    elif isinstance(node, If):
+        _called_names(node.condition, out)
+        _called_names(node.body, out)
+    elif isinstance(node, Switch):
+        _called_names(node.expr, out)
+        for case in node.cases:
+            _called_names(case.body, out)
+    elif isinstance(node, (VarDecl, Assign)):
+        if node.value is not None:
+            _called_names(node.value, out)
+    elif isinstance(node, ExprStmt):
+        _called_names(node.expr, out)
+
+
+def _literal_int(expr) -> Optional[int]:
+    if isinstance(expr, Literal):
+        try:
+            return int(expr.value, 0)
+        except ValueError:
+            return None
+    return None
+
+
+def may_alias(a, b) -> bool:
+    """Whether two (expanded) slot expressions can name the same slot."""
+    a_int, b_int = _literal_int(a), _literal_int(b)
+    if a_int is not None and b_int is not None:
+        return a_int == b_int
+    a_hash = isinstance(a, Call) and a.name in HASH_HELPERS
+    b_hash = isinstance(b, Call) and b.name in HASH_HELPERS
+    if (a_hash and b_int is not None) or (b_hash and a_int is not None):
+        return False
+    if a_hash and b_hash:
+        # Different preimage lengths never collide; keccak256_single(v) and keccak256_hash(v) are one hash
+        if HASH_PREIMAGE_SIZES[a.name] != HASH_PREIMAGE_SIZES[b.name]:
+            return False
+        if not may_alias(a.args[0], b.args[0]):
+            return False
+        if len(a.args) > 1:
+            key_a, key_b = _literal_int(a.args[1]), _literal_int(b.args[1])
+            if key_a is not None and key_b is not None and key_a != key_b:
+                return False
+        return True
+    return True
+
+
+class _Effects:
+    """What a statement may do to the available values."""
+
+    def __init__(self, storage_free: Set[str]):
+        self.storage_free = storage_free
+        self.writes: List = []       # Slot expressions stored to
+        self.clobbers_storage = False
+        self.assigned: Set[str] = set()
+
+    def add_expr(self, expr):
+        if isinstance(expr, Call):
+            if expr.name == 'sstore':
+                self.writes.append(expr.args[0])
+            elif _writes_storage(expr.name, self.storage_free):
+                self.clobbers_storage = True
+            for arg in expr.args:
+                self.add_expr(arg)
+
+    def add_stmt(self, stmt):
+        if isinstance(stmt, (VarDecl, Assign)):
+            if stmt.value is not None:
+                self.add_expr(stmt.value)
+            if isinstance(stmt, Assign):
+                self.assigned.update(stmt.names)
+        elif isinstance(stmt, ExprStmt):
+            self.add_expr(stmt.expr)
+        elif isinstance(stmt, If):
+            self.add_expr(stmt.condition)
+            self.add_block(stmt.body)
+        elif isinstance(stmt, Switch):
+            self.add_expr(stmt.expr)
+            for case in stmt.cases:
+                self.add_block(case.body)
+        elif isinstance(stmt, ForLoop):
+            self.add_block(stmt.init)
+            self.add_expr(stmt.condition)
+            self.add_block(stmt.post)
+            self.add_block(stmt.body)
+        elif isinstance(stmt, Block):
+            self.add_block(stmt)
+
+    def add_block(self, block: Block):
+        for stmt in block.statements:
+            self.add_stmt(stmt)
+
+
+class _Available:
+    """Values bound so far and visible at the current point."""
+
+    def __init__(self, entries=None, expansions=None):
+        # expression -> variable name
+        self.entries: Dict = dict(entries or {})
+        # variable name -> expression with all _cse_ variables expanded
+        self.expansions: Dict = dict(expansions or {})
+
+    def copy(self) -> '_Available':
+        return _Available(self.entries, self.expansions)
+
+    def expand(self, expr):
+        if isinstance(expr, Identifier) and expr.name in self.expansions:
+            return self.expansions[expr.name]
+        if isinstance(expr, Call):
+            return Call(expr.name, tuple(self.expand(arg) for arg in expr.args))
+        return expr
+
+    def apply(self, effects: _Effects):
+        for expr, name in list(self.entries.items()):
+            expanded = self.expansions[name]
+            if effects.assigned and _identifiers(expanded, set()) & effects.assigned:
+                del self.entries[expr]
+            elif expr.name == 'sload':
+                if effects.clobbers_storage or any(may_alias(expanded.args[0], self.expand(slot))
+                                                   for slot in effects.writes):
+                    del self.entries[expr]
+
+
+class _Eliminator:
+    def __init__(self, storage_free: Set[str]):
+        self.storage_free = storage_free
+        self.counter = 0
+
+    def fresh(self) -> str:
+        name = f"{_PREFIX}{self.counter}"
+        self.counter += 1
+        return name
+
+    def block(self, block: Block, available: _Available) -> Block:
+        statements = []
+        for stmt in block.statements:
+            statements.extend(self.statement(stmt, available))
+        return Block(statements)
+
+    def rewrite(self, expr, available: _Available, prelude: list, allow_loads: bool):
+        """Rewrite bottom-up, binding candidate expressions to variables."""
+        if not isinstance(expr, Call):
+            return expr
+        expr = Call(expr.name, tuple(self.rewrite(arg, available, prelude, allow_loads) for arg in expr.args))
+        is_hash = expr.name in HASH_HELPERS
+        is_load = expr.name == 'sload' and allow_loads
+        if not (is_hash or is_load) or not all(_is_pure(arg) for arg in expr.args):
+            return expr
+        name = available.entries.get(expr)
+        if name is None:
+            name = self.fresh()
+            prelude.append(VarDecl([name], expr))
+            available.entries[expr] = name
+            available.expansions[name] = available.expand(expr)
+        return Identifier(name)
+
+    def statement(self, stmt, available: _Available) -> list:
+        prelude = []
+        if isinstance(stmt, (VarDecl, Assign, ExprStmt, If, Switch)):
+            own = stmt.expr if isinstance(stmt, (ExprStmt, Switch)) else (
+                stmt.condition if isinstance(stmt, If) else stmt.value)
+            if own is not None:
+                # Loads cannot move above a call that may write storage. The
+                # outermost call runs after all of its arguments, so an
+                # sstore(slot, f(sload(slot))) is fine.
+                args = own.args if isinstance(own, Call) else ()
+                allow_loads = not any(_may_write_storage(arg, self.storage_free) for arg in args)
+                new = self.rewrite(own, available, prelude, allow_loads)
+                stmt = _with_own_expr(stmt, new)
+        elif isinstance(stmt, (Break, Continue, Leave, FunctionDef)):
+            return [stmt]
+
+        effects = _Effects(self.storage_free)
+        if isinstance(stmt, If):
+            own_effects = _Effects(self.storage_free)
+            own_effects.add_expr(stmt.condition)
+            available.apply(own_effects)
+            stmt = If(stmt.condition, self.block(stmt.body, available.copy()))
+            effects.add_block(stmt.body)
+        elif isinstance(stmt, Switch):
+            own_effects = _Effects(self.storage_free)
+            own_effects.add_expr(stmt.expr)
+            available.apply(own_effects)
+            stmt = Switch(stmt.expr, [type(case)(case.value, self.block(case.body, available.copy()))
+                                      for case in stmt.cases])
+            for case in stmt.cases:
+                effects.add_block(case.body)
+        elif isinstance(stmt, ForLoop):
+            # Whatever the loop changes is stale on every iteration
+            effects.add_stmt(stmt)
+            available.apply(effects)
+            stmt = ForLoop(stmt.init, stmt.condition, stmt.post, self.block(stmt.body, available.copy()))
+        elif isinstance(stmt, Block):
+            stmt = self.block(stmt, available.copy())
+            effects.add_block(stmt)
+        else:
+            effects.add_stmt(stmt)
+        available.apply(effects)
+        return prelude + [stmt]
+
+
+def _own_expr(stmt):
+    if isinstance(stmt, (ExprStmt, Switch)):
+        return stmt.expr
+    if isinstance(stmt, If):
+        return stmt.condition
+    if isinstance(stmt, (VarDecl, Assign)):
+        return stmt.value
+    return None
+
+
+def _with_own_expr(stmt, expr):
+    if isinstance(stmt, VarDecl):
+        return VarDecl(stmt.names, expr)
+    if isinstance(stmt, Assign):
+        return Assign(stmt.names, expr)
+    if isinstance(stmt, ExprStmt):
+        return ExprStmt(expr)
+    if isinstance(stmt, If):
+        return If(expr, stmt.body)
+    return Switch(expr, stmt.cases)
+
+
+def _substitute(expr, name: str, value):
+    if isinstance(expr, Identifier) and expr.name == name:
+        return value
+    if isinstance(expr, Call):
+        return Call(expr.name, tuple(_substitute(arg, name, value) for arg in expr.args))
+    return expr
+
+
+def _count_uses(node, counts: Dict[str, int]):
+    if isinstance(node, Identifier):
+        if node.name.startswith(_PREFIX):
+            counts[node.name] = counts.get(node.name, 0) + 1
+    elif isinstance(node, Call):
+        for arg in node.args:
+            _count_uses(arg, counts)
+    elif isinstance(node, Block):
+        for stmt in node.statements:
+            _count_uses(stmt, counts)
+    elif isinstance(node, ForLoop):
+        for part in (node.init, node.condition, node.post, node.body):
+            _count_uses(part, counts)
+    else:
+        own = _own_expr(node)
+        if own is not None:
+            _count_uses(own, counts)
+        if isinstance(node, If):
+            _count_uses(node.body, counts)
+        elif isinstance(node, Switch):
+            for case in node.cases:
+                _count_uses(case.body, counts)
+
+
+def _fold_single_uses(block: Block, counts: Dict[str, int]) -> Block:
+    """Inline bindings used exactly once into the statement that uses them."""
+    statements = list(block.statements)
+    i = len(statements) - 1
+    while i >= 0:
+        stmt = statements[i]
+        if isinstance(stmt, VarDecl) and stmt.names[0].startswith(_PREFIX) and counts.get(stmt.names[0]) == 1:
+            name = stmt.names[0]
+            # The single use is in the own expression of a following statement
+            for j in range(i + 1, len(statements)):
+                own = _own_expr(statements[j])
+                uses = {}
+                if own is not None:
+                    _count_uses(own, uses)
+                if uses.get(name):
+                    statements[j] = _with_own_expr(statements[j], _substitute(own, name, stmt.value))
+                    del statements[i]
+                    break
+        i -= 1
+    result = []
+    for stmt in statements:
+        if isinstance(stmt, If):
+            stmt = If(stmt.condition, _fold_single_uses(stmt.body, counts))
+        elif isinstance(stmt, Switch):
+            stmt = Switch(stmt.expr, [type(case)(case.value, _fold_single_uses(case.body, counts))
+                                      for case in stmt.cases])
+        elif isinstance(stmt, ForLoop):
+            stmt = ForLoop(stmt.init, stmt.condition, stmt.post, _fold_single_uses(stmt.body, counts))
+        elif isinstance(stmt, Block):
+            stmt = _fold_single_uses(stmt, counts)
+        result.append(stmt)
+    return Block(result)
+
+
+def eliminate_common_subexpressions(function: FunctionDef, storage_free: Optional[Set[str]] = None) -> FunctionDef:
+    """
+    CSE over one function. `storage_free` names the user functions known not
+    to write storage; calls to any other user function end every SLOAD reuse.
+    """
+    if storage_free is None:
+        storage_free = set(STORAGE_FREE_HELPERS)
+    body = _Eliminator(storage_free).block(function.body, _Available())
+    counts = {}
+    _count_uses(body, counts)
+    body = _fold_single_uses(body, counts)
+    # Number the surviving bindings from zero, in order of appearance
+    order = []
+    _collect_bindings(body, order)
+    names = {old: f"{_PREFIX}{i}" for i, old in enumerate(order)}
+    return FunctionDef(function.name, function.params, function.returns, _rename(body, names))
+
+
+def _collect_bindings(block: Block, out: List[str]):
+    for stmt in block.statements:
+        if isinstance(stmt, VarDecl) and stmt.names[0].startswith(_PREFIX):
+            out.append(stmt.names[0])
+        elif isinstance(stmt, If):
+            _collect_bindings(stmt.body, out)
+        elif isinstance(stmt, Switch):
+            for case in stmt.cases:
+                _collect_bindings(case.body, out)
+        elif isinstance(stmt, ForLoop):
+            _collect_bindings(stmt.body, out)
+        elif isinstance(stmt, Block):
+            _collect_bindings(stmt, out)
+
+
+def _rename(node, names: Dict[str, str]):
+    if isinstance(node, Identifier):
+        return Identifier(names.get(node.name, node.name))
+    if isinstance(node, Call):
+        return Call(node.name, tuple(_rename(arg, names) for arg in node.args))
+    if isinstance(node, Block):
+        return Block([_rename(stmt, names) for stmt in node.statements])
+    if isinstance(node, VarDecl):
+        return VarDecl([names.get(name, name) for name in node.names],
+                       _rename(node.value, names) if node.value is not None else None)
+    if isinstance(node, If):
+        return If(_rename(node.condition, names), _rename(node.body, names))
+    if isinstance(node, Switch):
+        return Switch(_rename(node.expr, names), [type(case)(case.value, _rename(case.body, names))
+                                                  for case in node.cases])
+    if isinstance(node, ForLoop):
+        return ForLoop(node.init, node.condition, node.post, _rename(node.body, names))
+    if isinstance(node, (Assign, ExprStmt)):
+        return _with_own_expr(node, _rename(_own_expr(node), names))
+    return node
+
+
+class CommonSubexpressionElimination(FunctionPass):
+    name = 'cse'
+
+    def prepare(self, obj: Object) -> Set[str]:
+        return storage_free_functions(list(functions_of(obj)))
+
+    def run_function(self, function: FunctionDef, storage_free: Set[str]) -> FunctionDef:
+        return eliminate_common_subexpressions(function, storage_free)
+
+
+def optimize_storage_access(yul_code: str) -> str:
+    """Apply CSE to every function in a Yul source; unchanged functions keep their text."""
+    try:
+        functions = list(iter_functions(yul_code))
+    except YulSyntaxError:
+        # Leave code the pass cannot read for solc to report
+        return yul_code
+    storage_free = storage_free_functions([function for function, _, _ in functions])
+    pieces = []
+    last = 0
+    for function, start, end in functions:
+        optimized = eliminate_common_subexpressions(function, storage_free)
+        if optimized == function:
+            continue
+        line_start = yul_code.rfind('\n', 0, start) + 1
+        indent = yul_code[line_start:start]
+        pieces.append(yul_code[last:start])
+        pieces.append(format_function(optimized, indent)[len(indent):])
+        last = end
+    pieces.append(yul_code[last:])
+    return ''.join(pieces)
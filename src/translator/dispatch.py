@@ -0,0 +1,163 @@
+"""
+Selector dispatch strategies for the runtime entry point.
+
+Every strategy first builds a plan (a small tree of comparison nodes), then
+either lowers it to Yul IR or counts the comparisons needed to reach each
+selector. Strategies:
+
+- linear:     one `if eq(selector, ...)` per entry, in declaration order
+- switch:     a single `switch selector`
+- binary:     a search tree of `lt(selector, pivot)` splits over sorted
+              selectors, ending in short eq chains
+- jump_table: selectors hashed into buckets by a window of their bits,
+              then a `switch` per bucket. Yul has no computed jumps, so the
+              "table" is a switch over bucket numbers.
+
+A call-frequency profile ({signature or selector: count}) moves hot entries
+to the front of chains and switches, and weights binary-search splits so hot
+selectors sit closer to the root.
+"""
+
+import math
+from typing import Dict, List, NamedTuple, Optional
+
+from .yul_ast import Block, Case, ExprStmt, Identifier, If, Literal, Stmt, Switch, call, format_stmt
+
+DISPATCH_STRATEGIES = ('linear', 'switch', 'binary', 'jump_table')
+# Binary search stops splitting at this many entries
+BINARY_LEAF_SIZE = 4
+
+
+class DispatchEntry(NamedTuple):
+    selector: str   # 0x-prefixed, 8 hex digits
+    signature: str  # e.g. transfer(address,uint256)
+    call: str       # Yul function that runs the handler, called without arguments
+
+
+def _weight(entry: DispatchEntry, profile: Optional[Dict[str, float]]) -> float:
+    if not profile:
+        return 0
+    return profile.get(entry.signature, profile.get(entry.selector, 0))
+
+
+def _by_frequency(entries: List[DispatchEntry], profile: Optional[Dict[str, float]]) -> List[DispatchEntry]:
+    if not profile:
+        return list(entries)
+    # Stable: entries with equal counts keep their order
+    return sorted(entries, key=lambda entry: -_weight(entry, profile))
+
+
+def plan_dispatch(entries: List[DispatchEntry], strategy: str = 'linear',
+                  profile: Optional[Dict[str, float]] = None) -> tuple:
+    """Build the comparison tree for a strategy."""
+    if strategy == 'linear':
+        return ('chain', _by_frequency(entries, profile))
+    if strategy == 'switch':
+        return ('switch', _by_frequency(entries, profile))
+    if strategy == 'binary':
+        ordered = sorted(entries, key=lambda entry: int(entry.selector, 16))
+        return _plan_binary(ordered, profile)
+    if strategy == 'jump_table':
+        return _plan_buckets(entries, profile)
+    raise ValueError(f"Unknown dispatch strategy '{strategy}' (expected one of {', '.join(DISPATCH_STRATEGIES)})")
+
+
+def _plan_binary(entries: List[DispatchEntry], profile: Optional[Dict[str, float]]) -> tuple:
+    if len(entries) <= BINARY_LEAF_SIZE:
+        return ('chain', _by_frequency(entries, profile))
+    if profile:
+        # Split where the weight on each side is closest to even, so hot
+        # selectors end up at shallow depth (+1 keeps cold entries in play)
+        weights = [_weight(entry, profile) + 1 for entry in entries]
+        total = sum(weights)
+        best, left = 1, 0
+        best_gap = math.inf
+        for i in range(1, len(entries)):
+            left += weights[i - 1]
+            gap = abs(total - 2 * left)
+            if gap < best_gap:
+                best, best_gap = i, gap
+        middle = best
+    else:
+        middle = len(entries) // 2
+    return ('split', entries[middle].selector,
+            _plan_binary(entries[:middle], profile),
+            _plan_binary(entries[middle:], profile))
+
+
+def _plan_buckets(entries: List[DispatchEntry], profile: Optional[Dict[str, float]]) -> tuple:
+    if len(entries) <= BINARY_LEAF_SIZE:
+        return ('switch', _by_frequency(entries, profile))
+    # About sqrt(n) buckets of about sqrt(n) entries each
+    bits = max(1, round(math.log2(len(entries)) / 2))
+    mask = (1 << bits) - 1
+    selectors = [int(entry.selector, 16) for entry in entries]
+    best = None
+    # Pick the bit window that spreads these selectors most evenly
+    for shift in range(0, 33 - bits):
+        counts = [0] * (mask + 1)
+        for selector in selectors:
+            counts[(selector >> shift) & mask] += 1
+        score = (max(counts), sum(count * count for count in counts))
+        if best is None or score < best[0]:
+            best = (score, shift)
+    shift = best[1]
+    buckets: Dict[int, List[DispatchEntry]] = {}
+    for entry, selector in zip(entries, selectors):
+        buckets.setdefault((selector >> shift) & mask, []).append(entry)
+    ordered = sorted(buckets.items(),
+                     key=lambda item: (-sum(_weight(entry, profile) for entry in item[1]), item[0]))
+    return ('buckets', shift, mask,
+            [(bucket, ('switch', _by_frequency(members, profile))) for bucket, members in ordered])
+
+
+def lower_dispatch(plan: tuple) -> List[Stmt]:
+    """Yul statements for a dispatch plan."""
+    kind = plan[0]
+    if kind == 'chain':
+        return [If(call('eq', 'selector', Literal(entry.selector)), Block([ExprStmt(call(entry.call))]))
+                for entry in plan[1]]
+    if kind == 'switch':
+        if not plan[1]:
+            return []
+        return [Switch(Identifier('selector'), [
+            Case(Literal(entry.selector), Block([ExprStmt(call(entry.call))])) for entry in plan[1]])]
+    if kind == 'split':
+        _, pivot, lower, upper = plan
+        return [Switch(call('lt', 'selector', Literal(pivot)), [
+            Case(Literal('0'), Block(lower_dispatch(upper))),
+            Case(None, Block(lower_dispatch(lower))),
+        ])]
+    if kind == 'buckets':
+        _, shift, mask, buckets = plan
+        return [Switch(call('and', call('shr', shift, 'selector'), Literal(hex(mask))), [
+            Case(Literal(str(bucket)), Block(lower_dispatch(node))) for bucket, node in buckets])]
+    raise ValueError(f"Unknown dispatch plan node '{kind}'")
+
+
+def emit_dispatch(plan: tuple, indent: int = 6) -> str:
+    """Render a dispatch plan as Yul statements at the given column."""
+    lines = []
+    for stmt in lower_dispatch(plan):
+        lines.extend(format_stmt(stmt, " " * indent))
+    return ''.join(line + '\n' for line in lines)
+
+
+def comparison_counts(plan: tuple) -> Dict[str, int]:
+    """Comparisons executed before each selector's handler is entered."""
+    kind = plan[0]
+    if kind in ('chain', 'switch'):
+        return {entry.selector: i + 1 for i, entry in enumerate(plan[1])}
+    if kind == 'split':
+        counts = {}
+        for child in plan[2:]:
+            for selector, count in comparison_counts(child).items():
+                counts[selector] = count + 1
+        return counts
+    if kind == 'buckets':
+        counts = {}
+        for position, (_, node) in enumerate(plan[3]):
+            for selector, count in comparison_counts(node).items():
+                counts[selector] = count + position + 1
+        return counts
+    raise ValueError(f"Unknown dispatch plan node '{kind}'")
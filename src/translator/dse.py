@@ -0,0 +1,402 @@
+"""
+Dead-store elimination of SSTOREs.
+
+Two walks over every block of generated Yul:
+
+- Forward, an `sstore` is dropped when the slot is known to hold the value
+  already: the value last stored there (a literal or an unchanged
+  variable), or zero for a slot of the contract being deployed that
+  nothing has written yet. This removes the constructor's zero
+  initialization, which pays for a cold SSTORE per slot to change
+  nothing, and packed-field writes that leave a slot unchanged.
+- Backward, an `sstore` is dropped when a later store in the same block
+  writes the same slot with nothing in between that may read it or leave
+  the block (a revert discards both stores, so it does not count).
+
+Only stores whose value has no side effects are removed. Aliasing is
+decided by `cse.may_alias`.
+"""
+
+from typing import Dict, List, Optional, Set
+
+from .costs import is_side_effect_free
+from .cse import (HASH_HELPERS, PURE_BUILTINS, STORAGE_FREE_HELPERS, _Effects, _is_pure, may_alias,
+                  storage_free_functions)
+from .passes import FunctionPass
+from .yul_ast import (Assign, Block, Break, Call, Continue, ExprStmt, ForLoop, FunctionDef, Identifier, If,
+                      Leave, Literal, Object, Switch, VarDecl, functions_of)
+
+_WORD = (1 << 256) - 1
+_ADDRESS_MASK = (1 << 160) - 1
+
+# Builtins whose result is 0 or 1, or an address
+BOOLEAN_BUILTINS = {'lt', 'gt', 'slt', 'sgt', 'eq', 'iszero'}
+ADDRESS_BUILTINS = {'caller', 'address', 'origin', 'coinbase'}
+
+# Builtins that neither read storage nor end the block other than by reverting
+_TRANSPARENT_BUILTINS = PURE_BUILTINS | HASH_HELPERS | STORAGE_FREE_HELPERS | {
+    'mload', 'mstore', 'mstore8', 'msize', 'keccak256', 'revert', 'invalid', 'pop', 'gas',
+    'calldatacopy', 'codecopy', 'codesize', 'returndatasize', 'datasize', 'dataoffset', 'datacopy',
+    'log0', 'log1', 'log2', 'log3', 'log4', 'balance', 'selfbalance', 'extcodesize', 'extcodehash',
+}
+
+_FOLDABLE = {
+    'and': lambda a, b: a & b,
+    'or': lambda a, b: a | b,
+    'xor': lambda a, b: a ^ b,
+    'not': lambda a: ~a & _WORD,
+    'shl': lambda shift, value: (value << shift) & _WORD if shift < 256 else 0,
+    'shr': lambda shift, value: value >> shift if shift < 256 else 0,
+    'add': lambda a, b: (a + b) & _WORD,
+    'sub': lambda a, b: (a - b) & _WORD,
+    'iszero': lambda a: int(a == 0),
+    'eq': lambda a, b: int(a == b),
+}
+
+
+def _literal_value(expr) -> Optional[int]:
+    if not isinstance(expr, Literal):
+        return None
+    if expr.value in ('true', 'false'):
+        return int(expr.value == 'true')
+    try:
+        return int(expr.value, 0)
+    except ValueError:
+        return None
+
+
+def _mentions(expr, names: Set[str]) -> bool:
+    if isinstance(expr, Identifier):
+        return expr.name in names
+    if isinstance(expr, Call):
+        return any(_mentions(arg, names) for arg in expr.args)
+    return False
+
+
+def _expansions(block: Block) -> Dict[str, object]:
+    """Pure values of variables declared once and never reassigned, for alias checks."""
+    declared: Dict[str, list] = {}
+    assigned: Set[str] = set()
+
+    def visit(node):
+        if isinstance(node, VarDecl):
+            for name in node.names:
+                declared.setdefault(name, []).append(node.value if len(node.names) == 1 else None)
+        elif isinstance(node, Assign):
+            assigned.update(node.names)
+        elif isinstance(node, If):
+            visit(node.body)
+        elif isinstance(node, Switch):
+            for case in node.cases:
+                visit(case.body)
+        elif isinstance(node, ForLoop):
+            for part in (node.init, node.post, node.body):
+                visit(part)
+        elif isinstance(node, Block):
+            for stmt in node.statements:
+                visit(stmt)
+
+    visit(block)
+    expansions = {}
+    for name, values in declared.items():
+        if name not in assigned and len(values) == 1 and values[0] is not None and _is_pure(values[0]):
+            expansions[name] = values[0]
+    return expansions
+
+
+def _expand(expr, expansions: Dict[str, object]):
+    if isinstance(expr, Identifier) and expr.name in expansions:
+        return _expand(expansions[expr.name], expansions)
+    if isinstance(expr, Call):
+        return Call(expr.name, tuple(_expand(arg, expansions) for arg in expr.args))
+    return expr
+
+
+def _sstore(stmt):
+    """(slot, value) of an `sstore(slot, value)` statement, else None."""
+    if isinstance(stmt, ExprStmt) and isinstance(stmt.expr, Call) and stmt.expr.name == 'sstore':
+        return stmt.expr.args
+    return None
+
+
+class _Known:
+    """Slot contents known at the current point of the forward walk."""
+
+    def __init__(self, fresh: bool, values=None, zero_bits=None, written=None):
+        # Nothing has been stored yet, so untouched slots hold zero
+        self.fresh = fresh
+        # slot expression -> Literal or Identifier stored there
+        self.values: Dict = dict(values or {})
+        # slot expression -> mask of bits known to be zero
+        self.zero_bits: Dict = dict(zero_bits or {})
+        # Expanded slot expressions stored to so far (only needed while fresh)
+        self.written: List = list(written or [])
+
+    def copy(self) -> '_Known':
+        return _Known(self.fresh, self.values, self.zero_bits, self.written)
+
+    def current(self, slot, expanded) -> Optional[object]:
+        if slot in self.values:
+            return self.values[slot]
+        if self.fresh and _is_pure(slot) and not any(may_alias(expanded, other) for other in self.written):
+            return Literal('0')
+        return None
+
+    def current_zero_bits(self, slot, expanded) -> int:
+        if slot in self.zero_bits:
+            return self.zero_bits[slot]
+        constant = _literal_value(self.current(slot, expanded))
+        return ~constant & _WORD if constant is not None else 0
+
+    def store(self, slot, expanded, value, zero_bits: int, expansions):
+        for other in list(self.zero_bits):
+            if may_alias(expanded, _expand(other, expansions)):
+                self.values.pop(other, None)
+                del self.zero_bits[other]
+        if self.fresh:
+            self.written.append(expanded)
+        if _is_pure(slot):
+            self.zero_bits[slot] = zero_bits
+            if isinstance(value, (Literal, Identifier)):
+                self.values[slot] = value
+
+    def apply(self, effects: _Effects, expansions):
+        if effects.clobbers_storage:
+            self.values.clear()
+            self.zero_bits.clear()
+            self.fresh = False
+        for slot in effects.writes:
+            self.store(slot, _expand(slot, expansions), None, 0, expansions)
+        if effects.assigned:
+            for slot in list(self.zero_bits):
+                if _mentions(slot, effects.assigned) or _mentions(self.values.get(slot), effects.assigned):
+                    self.values.pop(slot, None)
+                    del self.zero_bits[slot]
+
+
+class _Eliminator:
+    def __init__(self, storage_free: Set[str], expansions: Dict[str, object]):
+        self.storage_free = storage_free
+        self.expansions = expansions
+
+    def evaluate(self, expr, known: _Known) -> Optional[int]:
+        """Constant value of expr given the known slot contents, or None."""
+        value = _literal_value(expr)
+        if value is not None or not isinstance(expr, Call):
+            return value
+        if expr.name == 'sload' and len(expr.args) == 1:
+            current = known.current(expr.args[0], _expand(expr.args[0], self.expansions))
+            return _literal_value(current) if current is not None else None
+        fold = _FOLDABLE.get(expr.name)
+        if fold is None:
+            return None
+        args = [self.evaluate(arg, known) for arg in expr.args]
+        return None if None in args else fold(*args)
+
+    def zero_bits(self, expr, known: _Known) -> int:
+        """Mask of bits of expr's value known to be zero."""
+        constant = self.evaluate(expr, known)
+        if constant is not None:
+            return ~constant & _WORD
+        if not isinstance(expr, Call):
+            return 0
+        args = expr.args
+        if expr.name == 'sload':
+            return known.current_zero_bits(args[0], _expand(args[0], self.expansions))
+        if expr.name == 'and':
+            return self.zero_bits(args[0], known) | self.zero_bits(args[1], known)
+        if expr.name in ('or', 'xor'):
+            return self.zero_bits(args[0], known) & self.zero_bits(args[1], known)
+        if expr.name in ('shl', 'shr'):
+            shift = self.evaluate(args[0], known)
+            if shift is None or shift >= 256:
+                return 0
+            if expr.name == 'shl':
+                return ((self.zero_bits(args[1], known) << shift) | ((1 << shift) - 1)) & _WORD
+            return (self.zero_bits(args[1], known) >> shift) | (_WORD ^ (_WORD >> shift))
+        if expr.name in BOOLEAN_BUILTINS:
+            return _WORD ^ 1
+        if expr.name in ADDRESS_BUILTINS:
+            return _WORD ^ _ADDRESS_MASK
+        return 0
+
+    def unchanged(self, slot, value, known: _Known) -> bool:
+        """Whether storing value leaves the slot's contents as they are."""
+        expanded = _expand(slot, self.expansions)
+        if isinstance(value, Call) and value.name == 'sload' and value.args[0] == slot and _is_pure(slot):
+            return True
+        current = known.current(slot, expanded)
+        if current is not None:
+            constant = self.evaluate(value, known)
+            if current == value or (constant is not None and constant == _literal_value(current)):
+                return True
+        # and(sload(slot), mask) clearing bits that are already zero
+        if isinstance(value, Call) and value.name == 'and' and _is_pure(slot):
+            for loaded, mask in (value.args, reversed(value.args)):
+                mask = self.evaluate(mask, known)
+                if loaded == Call('sload', (slot,)) and mask is not None:
+                    return (~mask & _WORD) & ~known.current_zero_bits(slot, expanded) == 0
+        return False
+
+    # Forward walk: stores of the value the slot already holds
+
+    def forward(self, block: Block, known: _Known) -> Block:
+        statements = []
+        for stmt in block.statements:
+            store = _sstore(stmt)
+            if store is not None:
+                slot, value = store
+                if is_side_effect_free(value) and self.unchanged(slot, value, known):
+                    continue
+                expanded = _expand(slot, self.expansions)
+                constant = self.evaluate(value, known)
+                zero_bits = self.zero_bits(value, known)
+                # The value is computed before the store
+                effects = _Effects(self.storage_free)
+                effects.add_expr(value)
+                known.apply(effects, self.expansions)
+                known.store(slot, expanded, Literal(hex(constant)) if constant is not None else value, zero_bits,
+                            self.expansions)
+                statements.append(stmt)
+                continue
+
+            effects = _Effects(self.storage_free)
+            if isinstance(stmt, If):
+                stmt = If(stmt.condition, self.forward(stmt.body, known.copy()))
+            elif isinstance(stmt, Switch):
+                stmt = Switch(stmt.expr, [type(case)(case.value, self.forward(case.body, known.copy()))
+                                          for case in stmt.cases])
+            elif isinstance(stmt, ForLoop):
+                # The body must hold for every iteration, not just the first
+                effects.add_stmt(stmt)
+                known.apply(effects, self.expansions)
+                effects = _Effects(self.storage_free)
+                stmt = ForLoop(stmt.init, stmt.condition, stmt.post, self.forward(stmt.body, known.copy()))
+            elif isinstance(stmt, Block):
+                stmt = self.forward(stmt, known.copy())
+            if not isinstance(stmt, FunctionDef):
+                effects.add_stmt(stmt)
+                if isinstance(stmt, VarDecl):
+                    effects.assigned.update(stmt.names)
+                known.apply(effects, self.expansions)
+            statements.append(stmt)
+        return Block(statements)
+
+    # Backward walk: stores overwritten before anything can observe them
+
+    def backward(self, block: Block) -> Block:
+        overwritten: List = []
+        statements = []
+        for stmt in reversed(block.statements):
+            stmt = self.nested(stmt)
+            store = _sstore(stmt)
+            if store is not None and _is_pure(store[0]) and is_side_effect_free(store[1]):
+                slot, value = store
+                if slot in overwritten:
+                    continue
+                overwritten.append(slot)
+                self.reads(value, overwritten)
+            elif self.observes(stmt):
+                overwritten = []
+            else:
+                self.reads(stmt, overwritten)
+                if isinstance(stmt, (VarDecl, Assign)):
+                    names = set(stmt.names)
+                    overwritten = [slot for slot in overwritten if not _mentions(slot, names)]
+            statements.append(stmt)
+        return Block(list(reversed(statements)))
+
+    def nested(self, stmt):
+        if isinstance(stmt, If):
+            return If(stmt.condition, self.backward(stmt.body))
+        if isinstance(stmt, Switch):
+            return Switch(stmt.expr, [type(case)(case.value, self.backward(case.body)) for case in stmt.cases])
+        if isinstance(stmt, ForLoop):
+            return ForLoop(stmt.init, stmt.condition, stmt.post, self.backward(stmt.body))
+        if isinstance(stmt, Block):
+            return self.backward(stmt)
+        return stmt
+
+    def reads(self, node, overwritten: List):
+        """Forget slots that node may read."""
+        if isinstance(node, Call):
+            if node.name == 'sload':
+                loaded = _expand(node.args[0], self.expansions)
+                overwritten[:] = [slot for slot in overwritten
+                                  if not may_alias(loaded, _expand(slot, self.expansions))]
+            for arg in node.args:
+                self.reads(arg, overwritten)
+        elif isinstance(node, Block):
+            for stmt in node.statements:
+                self.reads(stmt, overwritten)
+        elif isinstance(node, ForLoop):
+            for part in (node.init, node.condition, node.post, node.body):
+                self.reads(part, overwritten)
+        elif isinstance(node, If):
+            self.reads(node.condition, overwritten)
+            self.reads(node.body, overwritten)
+        elif isinstance(node, Switch):
+            self.reads(node.expr, overwritten)
+            for case in node.cases:
+                self.reads(case.body, overwritten)
+        elif isinstance(node, (VarDecl, Assign)):
+            if node.value is not None:
+                self.reads(node.value, overwritten)
+        elif isinstance(node, ExprStmt):
+            self.reads(node.expr, overwritten)
+
+    def observes(self, node) -> bool:
+        """Whether node may leave the block normally or read storage out of sight."""
+        if isinstance(node, (Break, Continue, Leave)):
+            return True
+        if isinstance(node, Call):
+            if node.name not in _TRANSPARENT_BUILTINS and node.name not in ('sload', 'sstore'):
+                return True
+            return any(self.observes(arg) for arg in node.args)
+        if isinstance(node, Block):
+            return any(self.observes(stmt) for stmt in node.statements)
+        if isinstance(node, ForLoop):
+            return any(self.observes(part) for part in (node.init, node.condition, node.post, node.body))
+        if isinstance(node, If):
+            return self.observes(node.condition) or self.observes(node.body)
+        if isinstance(node, Switch):
+            return self.observes(node.expr) or any(self.observes(case.body) for case in node.cases)
+        if isinstance(node, (VarDecl, Assign)):
+            return node.value is not None and self.observes(node.value)
+        if isinstance(node, ExprStmt):
+            return self.observes(node.expr)
+        return False
+
+
+def eliminate_dead_stores(block: Block, storage_free: Optional[Set[str]] = None, fresh: bool = False) -> Block:
+    """
+    DSE over one block of code (a function body or an object's top-level
+    code). `fresh` means storage is known to be all zero on entry, as in a
+    constructor.
+    """
+    if storage_free is None:
+        storage_free = set(STORAGE_FREE_HELPERS)
+    eliminator = _Eliminator(storage_free, _expansions(block))
+    return eliminator.backward(eliminator.forward(block, _Known(fresh)))
+
+
+class DeadStoreElimination(FunctionPass):
+    """
+    Dead-store elimination. The top-level code of the outermost object is
+    the constructor of a contract being deployed, whose storage starts zero.
+    """
+    name = 'dse'
+
+    def prepare(self, obj: Object) -> Set[str]:
+        return storage_free_functions(functions_of(obj))
+
+    def run_function(self, function: FunctionDef, storage_free: Set[str]) -> FunctionDef:
+        return FunctionDef(function.name, function.params, function.returns,
+                           eliminate_dead_stores(function.body, storage_free))
+
+    def run(self, obj: Object, deploying: bool = True) -> Object:
+        storage_free = self.prepare(obj)
+        code = eliminate_dead_stores(obj.code, storage_free, fresh=deploying)
+        statements = [self.run_function(stmt, storage_free) if isinstance(stmt, FunctionDef) else stmt
+                      for stmt in code.statements]
+        return Object(obj.name, Block(statements), [self.run(child, deploying=False) for child in obj.objects])
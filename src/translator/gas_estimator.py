@@ -0,0 +1,567 @@
+"""
+Static per-method gas estimates for a generated runtime object.
+
+For every external entry point, the runtime code is walked from the top,
+with the selector and calldata size of that entry known, so the dispatcher
+only follows its own branch. The result is the best, typical and worst
+execution gas over the paths that do not revert. It excludes the 21000
+intrinsic cost of a transaction and calldata costs.
+
+Costs follow the model of `yul_interpreter`, so an estimate can be checked
+against a run:
+
+- The first SLOAD or SSTORE of a slot is cold (2100), later ones warm (100).
+  A slot is identified by its constant value or by its expression and the
+  versions of the variables in it. An SSTORE costs 100 at best, which is
+  storing the value already there, 2900 typically, which is changing a
+  non-zero value, and 20000 at worst, which is setting a zero slot. It is
+  100 at every level once the slot was written on every path.
+- KECCAK256 costs 30 plus 6 per word, and memory expansion 3 per word plus
+  the quadratic term. Offsets are found by a small constant propagation
+  over variables and memory words, which follows the free memory pointer.
+  Memory at an offset that is not known could grow by any amount, so it
+  leaves the worst case unbounded and the function is listed in the
+  method's `unbounded_memory`.
+- Other builtins, branches, loop jumps and function calls cost as in the
+  interpreter.
+
+The typical path skips branches that always revert and takes every other
+branch. Loops whose condition is known at every check, such as counting to
+a constant, are unrolled: the estimate is exact in the trip count, up to
+`MAX_UNROLL` iterations. Other loops are unbounded. Their best case runs
+no iterations, their typical case `TYPICAL_ITERATIONS` iterations, and their
+worst case is None. The functions containing them are listed in the
+method's `unbounded_loops`.
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .costs import BUILTIN_GAS, GAS_BRANCH, GAS_COSTS
+from .dispatch import DispatchEntry
+from .yul_ast import (Assign, Block, Break, Call, Continue, ExprStmt, ForLoop, FunctionDef, Identifier, If, Leave,
+                      Literal, Object, Switch, VarDecl, functions_of)
+from .yul_interpreter import (ARITHMETIC, GAS_COLD_ACCESS, GAS_FUNCTION_CALL, GAS_LOOP_JUMP, GAS_SSTORE_RESET,
+                              GAS_SSTORE_SET, GAS_WARM_ACCESS, WORD, _string)
+
+INF = float('inf')
+
+# Iterations assumed for the typical case of a loop with no static bound
+TYPICAL_ITERATIONS = 10
+# Loops still running after this many unrolled iterations count as unbounded
+MAX_UNROLL = 10000
+
+_EXITS = {'return', 'stop', 'selfdestruct'}
+_REVERTS = {'revert', 'invalid'}
+
+
+class _Paths:
+    """
+    Costs of the ways out of a piece of code, by kind: 'next' (falls
+    through), 'exit' (return/stop), 'leave', 'break' and 'continue', each
+    (best, worst). Reverting paths are dropped. `typical` is (cost, kind) of
+    the typical path, or None when every path reverts.
+    """
+
+    def __init__(self, ranges: Optional[Dict[str, Tuple[float, float]]] = None,
+                 typical: Optional[Tuple[float, str]] = None):
+        self.ranges = ranges if ranges is not None else {}
+        self.typical = typical
+
+    @classmethod
+    def cost(cls, best: float, typical: Optional[float] = None, worst: Optional[float] = None) -> '_Paths':
+        typical = best if typical is None else typical
+        return cls({'next': (best, typical if worst is None else worst)}, (typical, 'next'))
+
+    @classmethod
+    def reverts(cls) -> '_Paths':
+        return cls()
+
+    def add(self, kind: str, best: float, worst: float):
+        if kind in self.ranges:
+            old_best, old_worst = self.ranges[kind]
+            best, worst = min(best, old_best), max(worst, old_worst)
+        self.ranges[kind] = (best, worst)
+
+    def then(self, other: '_Paths') -> '_Paths':
+        """These paths followed, where they fall through, by other."""
+        result = _Paths({kind: cost for kind, cost in self.ranges.items() if kind != 'next'})
+        if 'next' in self.ranges:
+            best, worst = self.ranges['next']
+            for kind, (other_best, other_worst) in other.ranges.items():
+                result.add(kind, best + other_best, worst + other_worst)
+        if self.typical is not None and self.typical[1] == 'next':
+            if other.typical is not None:
+                result.typical = (self.typical[0] + other.typical[0], other.typical[1])
+        else:
+            result.typical = self.typical
+        return result._settle()
+
+    def either(self, other: '_Paths') -> '_Paths':
+        """Paths through one of two alternatives; the typical path is self's, if it does not revert."""
+        result = _Paths(dict(self.ranges))
+        for kind, (best, worst) in other.ranges.items():
+            result.add(kind, best, worst)
+        result.typical = self.typical if self.typical is not None else other.typical
+        return result
+
+    def continues(self) -> bool:
+        """Whether some path goes on in the enclosing code, rather than reverting or ending the call."""
+        return any(kind != 'exit' for kind in self.ranges)
+
+    def rename(self, mapping: Dict[str, str]) -> '_Paths':
+        result = _Paths()
+        for kind, (best, worst) in self.ranges.items():
+            result.add(mapping.get(kind, kind), best, worst)
+        if self.typical is not None:
+            result.typical = (self.typical[0], mapping.get(self.typical[1], self.typical[1]))
+        return result
+
+    def _settle(self) -> '_Paths':
+        # The typical path reverted further on: fall back to the cheapest survivor
+        if self.typical is None and self.ranges:
+            kind = min(self.ranges, key=lambda k: self.ranges[k][0])
+            self.typical = (self.ranges[kind][0], kind)
+        return self
+
+
+@dataclass
+class _Frame:
+    """Variables of one function invocation."""
+    uid: int
+    consts: Dict[str, int] = field(default_factory=dict)
+    versions: Dict[str, int] = field(default_factory=dict)
+
+
+@dataclass
+class _State:
+    """What is known at a point: variable values, memory, and warm or written slots."""
+    frame: _Frame
+    memory: Dict[int, int] = field(default_factory=dict)
+    # False once memory was written at an offset not known statically
+    memory_known: bool = True
+    # Memory size in bytes, over the paths that lead here: (smallest, largest)
+    memory_low: int = 0
+    memory_high: int = 0
+    warm_all: set = field(default_factory=set)
+    warm_any: set = field(default_factory=set)
+    dirty_all: set = field(default_factory=set)
+    dirty_any: set = field(default_factory=set)
+
+    def copy(self) -> '_State':
+        frame = _Frame(self.frame.uid, dict(self.frame.consts), dict(self.frame.versions))
+        return _State(frame, dict(self.memory), self.memory_known, self.memory_low, self.memory_high,
+                      set(self.warm_all), set(self.warm_any), set(self.dirty_all), set(self.dirty_any))
+
+    def word(self, offset: int) -> Optional[int]:
+        """The word stored at offset, if known."""
+        if offset in self.memory:
+            return self.memory[offset]
+        overlapping = any(abs(other - offset) < 32 for other in self.memory)
+        return 0 if self.memory_known and not overlapping else None
+
+    def join(self, other: '_State', fresh) -> '_State':
+        """What is known after either of two paths, written into self."""
+        frame = self.frame
+        for name in set(frame.consts) | set(other.frame.consts):
+            if frame.consts.get(name) != other.frame.consts.get(name):
+                frame.consts.pop(name, None)
+        for name in set(frame.versions) | set(other.frame.versions):
+            if frame.versions.get(name) != other.frame.versions.get(name):
+                frame.versions[name] = fresh()
+        mine, theirs = self.word, other.word
+        self.memory = {offset: mine(offset) if mine(offset) == theirs(offset) else None
+                       for offset in set(self.memory) | set(other.memory)}
+        self.memory_known = self.memory_known and other.memory_known
+        self.memory_low = min(self.memory_low, other.memory_low)
+        self.memory_high = max(self.memory_high, other.memory_high)
+        self.warm_all &= other.warm_all
+        self.warm_any |= other.warm_any
+        self.dirty_all &= other.dirty_all
+        self.dirty_any |= other.dirty_any
+        return self
+
+
+def _memory_cost(words: int) -> int:
+    return 3 * words + words * words // 512
+
+
+class _Estimator:
+    def __init__(self, runtime: Object):
+        self.functions = {function.name: function for function in functions_of(runtime)}
+        self.code = Block([stmt for stmt in runtime.code.statements if not isinstance(stmt, FunctionDef)])
+        self.counter = 0
+        self.stack: List[str] = []
+        self.unbounded: set = set()
+        self.unbounded_memory: set = set()
+
+    def fresh(self) -> int:
+        self.counter += 1
+        return self.counter
+
+    def entry(self, selector: int, calldata_size: int) -> dict:
+        self.selector, self.calldata_size = selector, calldata_size
+        self.stack, self.unbounded, self.unbounded_memory = ['<dispatcher>'], set(), set()
+        paths = self.block(self.code, _State(_Frame(self.fresh())))
+        ranges = [cost for kind, cost in paths.ranges.items() if kind in ('exit', 'next')]
+        if not ranges:
+            return {'best': None, 'typical': None, 'worst': None, 'unbounded_loops': sorted(self.unbounded),
+                    'unbounded_memory': sorted(self.unbounded_memory)}
+        worst = max(worst for _, worst in ranges)
+        return {
+            'best': int(min(best for best, _ in ranges)),
+            'typical': int(paths.typical[0]),
+            'worst': None if worst == INF else int(worst),
+            'unbounded_loops': sorted(self.unbounded),
+            'unbounded_memory': sorted(self.unbounded_memory),
+        }
+
+    # Statements
+
+    def block(self, block: Block, state: _State) -> _Paths:
+        paths = _Paths.cost(0)
+        for stmt in block.statements:
+            if 'next' not in paths.ranges:
+                break
+            paths = paths.then(self.statement(stmt, state))
+        return paths
+
+    def statement(self, stmt, state: _State) -> _Paths:
+        if isinstance(stmt, (VarDecl, Assign)):
+            if stmt.value is None:
+                paths, values = _Paths.cost(0), [0] * len(stmt.names)
+            else:
+                paths, values = self.values(stmt.value, state)
+            if len(values) != len(stmt.names):
+                values = [None] * len(stmt.names)
+            for name, value in zip(stmt.names, values):
+                self.assign(name, value, state)
+            return paths
+        if isinstance(stmt, ExprStmt):
+            return self.values(stmt.expr, state)[0]
+        if isinstance(stmt, If):
+            return self.branch(stmt, state)
+        if isinstance(stmt, Switch):
+            return self.switch(stmt, state)
+        if isinstance(stmt, ForLoop):
+            return self.loop(stmt, state)
+        if isinstance(stmt, Block):
+            return self.block(stmt, state)
+        if isinstance(stmt, Break):
+            return _Paths({'break': (0, 0)}, (0, 'break'))
+        if isinstance(stmt, Continue):
+            return _Paths({'continue': (0, 0)}, (0, 'continue'))
+        if isinstance(stmt, Leave):
+            return _Paths({'leave': (0, 0)}, (0, 'leave'))
+        return _Paths.cost(0)
+
+    def assign(self, name: str, value: Optional[int], state: _State):
+        state.frame.versions[name] = self.fresh()
+        if value is None:
+            state.frame.consts.pop(name, None)
+        else:
+            state.frame.consts[name] = value
+
+    def branch(self, stmt: If, state: _State) -> _Paths:
+        paths, value = self.expr(stmt.condition, state)
+        paths = paths.then(_Paths.cost(GAS_BRANCH))
+        if value is not None:
+            return paths.then(self.block(stmt.body, state)) if value else paths
+        taken = state.copy()
+        body = self.block(stmt.body, taken)
+        if body.continues():
+            state.join(taken, self.fresh)
+        # The typical path skips a body that always reverts and takes any other
+        return paths.then(body.either(_Paths.cost(0)) if body.typical is not None else _Paths.cost(0).either(body))
+
+    def switch(self, stmt: Switch, state: _State) -> _Paths:
+        paths, value = self.expr(stmt.expr, state)
+        options, joined, tested = None, None, 0
+        # Cases are tested in order, each a branch on its literal; no case may match
+        cases = list(stmt.cases) + ([None] if all(case.value is not None for case in stmt.cases) else [])
+        for case in cases:
+            if case is not None:
+                tested += GAS_BRANCH + (3 if case.value is not None else 0)
+            label = None if case is None or case.value is None else self.literal(case.value)
+            if value is not None and label is not None and label != value:
+                continue
+            branch = state.copy()
+            option = _Paths.cost(tested).then(self.block(case.body, branch) if case is not None else _Paths.cost(0))
+            options = option if options is None else options.either(option)
+            if option.continues():
+                joined = branch if joined is None else joined.join(branch, self.fresh)
+            if value is not None:
+                break
+        if joined is not None:
+            state.__dict__.update(joined.__dict__)
+        return paths.then(options)
+
+    def loop(self, stmt: ForLoop, state: _State) -> _Paths:
+        # Variables declared in the init block live in the loop's scope
+        paths = self.block(stmt.init, state)
+        done = _Paths()
+        for _ in range(MAX_UNROLL + 1):
+            if 'next' not in paths.ranges:
+                break
+            check, value = self.expr(stmt.condition, state)
+            paths = paths.then(check).then(_Paths.cost(GAS_BRANCH))
+            if value == 0:
+                break
+            if value is None:
+                return self.unbounded_loop(stmt, paths, done, state)
+            body = self.block(stmt.body, state).rename({'continue': 'next', 'break': 'done'})
+            after = paths.then(body)
+            post = self.block(stmt.post, state).then(_Paths.cost(GAS_LOOP_JUMP))
+            for kind in ('done', 'exit', 'leave'):
+                if kind in after.ranges:
+                    done.add(kind, *after.ranges.pop(kind))
+            if after.typical is not None and after.typical[1] != 'next':
+                done.typical = (after.typical[0], 'next' if after.typical[1] == 'done' else after.typical[1])
+                after.typical = None
+            paths = after.then(post) if 'next' in after.ranges else after
+        else:
+            return self.unbounded_loop(stmt, paths, done, state)
+        return self.loop_result(paths, done)
+
+    def unbounded_loop(self, stmt: ForLoop, paths: _Paths, done: _Paths, state: _State) -> _Paths:
+        """Paths out of a loop whose condition is not known statically, from its next check on."""
+        self.unbounded.add(self.stack[-1])
+        # Nothing the loop assigns is known inside it or after it
+        for name in _assigned(stmt.body) | _assigned(stmt.post):
+            if name in state.frame.consts or name in state.frame.versions:
+                self.assign(name, None, state)
+        looped = state.copy()
+        first = self.iteration(stmt, looped)
+        steady = self.iteration(stmt, looped)
+        state.join(looped, self.fresh)
+        # Zero more iterations at best, TYPICAL_ITERATIONS typically, no bound at worst
+        result = _Paths(dict(paths.ranges), paths.typical)
+        if 'next' in result.ranges:
+            best, _ = result.ranges['next']
+            result.ranges['next'] = (best, INF)
+            for kind in ('exit', 'leave'):
+                if kind in first.ranges:
+                    result.add(kind, best + first.ranges[kind][0], INF)
+            if result.typical is not None and result.typical[1] == 'next' \
+                    and None not in (first.typical, steady.typical):
+                iterations = first.typical[0] + (TYPICAL_ITERATIONS - 1) * steady.typical[0]
+                result.typical = (result.typical[0] + iterations, 'next')
+        return self.loop_result(result, done)
+
+    def iteration(self, stmt: ForLoop, state: _State) -> _Paths:
+        body = self.block(stmt.body, state).rename({'continue': 'next', 'break': 'exit_loop'})
+        cost = body.then(self.block(stmt.post, state)).then(_Paths.cost(GAS_LOOP_JUMP))
+        check, _ = self.expr(stmt.condition, state)
+        return cost.then(check).then(_Paths.cost(GAS_BRANCH))
+
+    @staticmethod
+    def loop_result(paths: _Paths, done: _Paths) -> _Paths:
+        result = _Paths(dict(paths.ranges), paths.typical)
+        for kind, (best, worst) in done.ranges.items():
+            result.add('next' if kind == 'done' else kind, best, worst)
+        if done.typical is not None:
+            result.typical = done.typical
+        return result._settle()
+
+    # Expressions
+
+    def literal(self, literal: Literal) -> int:
+        if literal.value in ('true', 'false'):
+            return int(literal.value == 'true')
+        if literal.value.startswith('"'):
+            return _string(literal.value)
+        return int(literal.value, 0)
+
+    def expr(self, expr, state: _State) -> Tuple[_Paths, Optional[int]]:
+        paths, values = self.values(expr, state)
+        return paths, values[0] if values else None
+
+    def values(self, expr, state: _State) -> Tuple[_Paths, List[Optional[int]]]:
+        if isinstance(expr, Identifier):
+            if expr.name.startswith('"'):
+                return _Paths.cost(3), [_string(expr.name)]
+            return _Paths.cost(3), [state.frame.consts.get(expr.name)]
+        if isinstance(expr, Literal):
+            return _Paths.cost(3), [self.literal(expr)]
+        # Arguments are evaluated right to left
+        paths, args = _Paths.cost(0), [None] * len(expr.args)
+        for index in reversed(range(len(expr.args))):
+            arg_paths, args[index] = self.expr(expr.args[index], state)
+            paths = paths.then(arg_paths)
+        if expr.name in self.functions:
+            call_paths, results = self.call(expr.name, args, state)
+            return paths.then(call_paths), results
+        builtin_paths, value = self.builtin(expr, args, state)
+        return paths.then(builtin_paths), [] if value is False else [value]
+
+    def call(self, name: str, args: List[Optional[int]], state: _State) -> Tuple[_Paths, List[Optional[int]]]:
+        function = self.functions[name]
+        if name in self.stack:
+            # Recursion has no static bound
+            self.unbounded.add(name)
+            return _Paths({'next': (GAS_FUNCTION_CALL, INF)}, (GAS_FUNCTION_CALL, 'next')), \
+                [None] * len(function.returns)
+        caller_frame = state.frame
+        state.frame = _Frame(self.fresh())
+        for param, value in zip(function.params, args):
+            self.assign(param, value, state)
+        for result in function.returns:
+            self.assign(result, 0, state)
+        self.stack.append(name)
+        body = self.block(function.body, state).rename({'leave': 'next'})
+        self.stack.pop()
+        results = [state.frame.consts.get(result) for result in function.returns]
+        state.frame = caller_frame
+        return _Paths.cost(GAS_FUNCTION_CALL).then(body), results
+
+    def builtin(self, expr: Call, args: List[Optional[int]], state: _State) -> Tuple[_Paths, object]:
+        """Paths through one builtin and its value: None when unknown, False when it has none."""
+        name = expr.name
+        if name in _REVERTS:
+            return _Paths.reverts(), False
+        if name == 'sload':
+            return _Paths.cost(*self.access(self.slot(expr.args[0], args[0], state), state)), None
+        if name == 'sstore':
+            return self.sstore(self.slot(expr.args[0], args[0], state), state), False
+        if name == 'keccak256':
+            size = args[1]
+            words = (size + 31) // 32 if size is not None else 2
+            return _Paths.cost(30 + 6 * words).then(self.expand(args[0], size, state)), None
+        cost = _Paths.cost(GAS_COSTS.get(name, BUILTIN_GAS))
+        value: object = None
+        if name in ARITHMETIC:
+            if all(arg is not None for arg in args):
+                value = ARITHMETIC[name](*args)
+        elif name == 'mload':
+            cost = cost.then(self.expand(args[0], 32, state))
+            value = self.mload(args[0], state)
+        elif name in ('mstore', 'mstore8'):
+            size = 32 if name == 'mstore' else 1
+            cost = cost.then(self.expand(args[0], size, state))
+            self.mstore(args[0], args[1] if name == 'mstore' else None, size, state)
+            value = False
+        elif name == 'calldataload':
+            value = self.selector << 224 if args[0] == 0 else None
+        elif name == 'calldatasize':
+            value = self.calldata_size
+        elif name in _EXITS:
+            if name == 'return':
+                cost = cost.then(self.expand(args[0], args[1], state))
+            return cost.then(_Paths({'exit': (0, 0)}, (0, 'exit'))), False
+        elif name.startswith('log'):
+            size = args[1] if args[1] is not None else 0
+            cost = cost.then(_Paths.cost(8 * size)).then(self.expand(args[0], size, state))
+            value = False
+        elif name in ('pop', 'calldatacopy', 'returndatacopy', 'codecopy', 'datacopy'):
+            value = False
+        return cost, value
+
+    # Storage
+
+    def slot(self, expr, value: Optional[int], state: _State):
+        """A key identifying the slot an expression names, as long as its variables keep their values."""
+        if value is not None:
+            return value
+        return state.frame.uid, expr, tuple(sorted((name, state.frame.versions.get(name))
+                                                   for name in _identifiers(expr)))
+
+    def access(self, key, state: _State) -> Tuple[int, int, int]:
+        best = GAS_WARM_ACCESS if key in state.warm_any else GAS_COLD_ACCESS
+        worst = GAS_WARM_ACCESS if key in state.warm_all else GAS_COLD_ACCESS
+        state.warm_all.add(key)
+        state.warm_any.add(key)
+        return best, best, worst
+
+    def sstore(self, key, state: _State) -> _Paths:
+        best, typical, worst = (GAS_COLD_ACCESS if cost == GAS_COLD_ACCESS else 0
+                                for cost in self.access(key, state))
+        if key in state.dirty_all:
+            change = (GAS_WARM_ACCESS,) * 3
+        elif key in state.dirty_any:
+            change = (GAS_WARM_ACCESS, GAS_WARM_ACCESS, GAS_SSTORE_SET)
+        else:
+            change = (GAS_WARM_ACCESS, GAS_SSTORE_RESET, GAS_SSTORE_SET)
+        state.dirty_all.add(key)
+        state.dirty_any.add(key)
+        return _Paths.cost(best + change[0], typical + change[1], worst + change[2])
+
+    # Memory
+
+    def expand(self, offset: Optional[int], size: Optional[int], state: _State) -> _Paths:
+        if size == 0:
+            return _Paths.cost(0)
+        if offset is None or size is None:
+            # Memory could grow by any amount
+            self.unbounded_memory.add(self.stack[-1])
+            return _Paths({'next': (0, INF)}, (0, 'next'))
+        end = 32 * ((offset + size + 31) // 32)
+        # Cheapest where memory is largest, dearest where it is smallest
+        best, worst = (_memory_cost(max(end, current) // 32) - _memory_cost(current // 32)
+                       for current in (state.memory_high, state.memory_low))
+        state.memory_low, state.memory_high = max(state.memory_low, end), max(state.memory_high, end)
+        return _Paths.cost(best, best, worst)
+
+    def mload(self, offset: Optional[int], state: _State) -> Optional[int]:
+        return None if offset is None else state.word(offset)
+
+    def mstore(self, offset: Optional[int], value: Optional[int], size: int, state: _State):
+        if offset is None:
+            state.memory, state.memory_known = {}, False
+            return
+        for other in [other for other in state.memory if other < offset + size and offset < other + 32]:
+            del state.memory[other]
+        # A word whose value is not known is kept as None, so it does not read as zero
+        state.memory[offset] = value & WORD if size == 32 and value is not None else None
+
+
+def _identifiers(expr) -> set:
+    if isinstance(expr, Identifier):
+        return {expr.name}
+    if isinstance(expr, Call):
+        return set().union(*(_identifiers(arg) for arg in expr.args)) if expr.args else set()
+    return set()
+
+
+def _assigned(block: Block) -> set:
+    names = set()
+    for stmt in block.statements:
+        if isinstance(stmt, (VarDecl, Assign)):
+            names.update(stmt.names)
+        for child in _blocks(stmt):
+            names |= _assigned(child)
+    return names
+
+
+def _blocks(stmt) -> List[Block]:
+    if isinstance(stmt, If):
+        return [stmt.body]
+    if isinstance(stmt, Switch):
+        return [case.body for case in stmt.cases]
+    if isinstance(stmt, ForLoop):
+        return [stmt.init, stmt.post, stmt.body]
+    if isinstance(stmt, Block):
+        return [stmt]
+    return []
+
+
+def _calldata_size(signature: str) -> int:
+    """Selector plus one head word per top-level parameter."""
+    params = signature[signature.index('(') + 1:-1]
+    depth, count = 0, 1 if params else 0
+    for char in params:
+        depth += {'(': 1, ')': -1}.get(char, 0)
+        count += char == ',' and depth == 0
+    return 4 + 32 * count
+
+
+def estimate_methods(obj: Object, entries: Sequence[DispatchEntry]) -> Dict[str, dict]:
+    """
+    {signature: {'best', 'typical', 'worst', 'unbounded_loops',
+    'unbounded_memory'}} for the entry points of a contract object (its
+    runtime is `obj.objects[0]`). `worst` is None when an unbounded loop,
+    recursion or memory access is reachable, and all three are None for a
+    method that always reverts.
+    """
+    estimator = _Estimator(obj.objects[0])
+    return {entry.signature: estimator.entry(int(entry.selector, 16), _calldata_size(entry.signature))
+            for entry in entries}
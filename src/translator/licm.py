@@ -0,0 +1,320 @@
+"""
+Loop-invariant code motion of storage reads and writes.
+
+Runs over every `for` loop of the generated Yul (the lowering of Dafny
+`while` and `for`), outermost loops first:
+
+- Hoisting: a slot hash (`keccak256_mapping`, `keccak256_single`,
+  `keccak256_hash`) whose arguments the loop does not change, and an
+  `sload` of such a slot that nothing in the loop may write, are evaluated
+  once in front of the loop instead of on every iteration. This covers
+  field reads and `arr.Length` in loop conditions and mapping slots keyed
+  by a loop-invariant value. Loads are not hoisted out of loops that call
+  anything that may write storage.
+- Sinking: a slot the loop stores to through one invariant slot
+  expression, with no other access that may alias it, is kept in a local
+  for the duration of the loop: loaded once before it and stored once
+  after it. A counter updated on every iteration then costs one SLOAD and
+  one SSTORE. This needs a loop that can only finish by falling through,
+  breaking or reverting, and that calls nothing that may access storage.
+
+Values are bound with `let _licm_N := ...` in front of the loop. As in
+other compilers' LICM, hoisted code runs even when the loop body does not:
+a loop that makes no iterations pays for the hoisted loads and for storing
+back the unchanged value of a sunk slot.
+
+Runs before CSE, which then reuses the hashes the loads and stores in
+front of and after a loop have in common. Aliasing is decided by
+`cse.may_alias`.
+"""
+
+from typing import Dict, List, Set, Tuple
+
+from .cse import (HASH_HELPERS, OTHER_BUILTINS, PURE_BUILTINS, STORAGE_FREE_HELPERS, STORAGE_WRITING_BUILTINS,
+                  _called_names, _Effects, _identifiers, _is_pure, may_alias, storage_free_functions)
+from .dse import _expand, _expansions
+from .passes import FunctionPass
+from .yul_ast import (Assign, Block, Call, ExprStmt, ForLoop, FunctionDef, Identifier, If, Leave, Object,
+                      Switch, VarDecl, functions_of)
+
+_PREFIX = '_licm_'
+
+# Builtins that end the transaction or let other code see this contract's storage
+ESCAPING_BUILTINS = {'call', 'callcode', 'delegatecall', 'staticcall', 'create', 'create2', 'selfdestruct',
+                     'return', 'stop'}
+_BUILTINS = PURE_BUILTINS | OTHER_BUILTINS | STORAGE_WRITING_BUILTINS
+
+
+def _isolated(name: str, isolated: Set[str]) -> bool:
+    if name in ESCAPING_BUILTINS or name in ('sload', 'sstore'):
+        return False
+    return name in _BUILTINS or name in isolated
+
+
+def storage_isolated_functions(functions: List[FunctionDef]) -> Set[str]:
+    """Names of functions that neither access storage nor end the transaction, directly or through calls."""
+    calls = {}
+    for function in functions:
+        names = set()
+        _called_names(function.body, names)
+        calls[function.name] = names
+    isolated = set(calls)
+    changed = True
+    while changed:
+        changed = False
+        for name, called in calls.items():
+            if name in isolated and not all(_isolated(callee, isolated) for callee in called):
+                isolated.discard(name)
+                changed = True
+    return isolated
+
+
+def _bound_names(node, out: Set[str]) -> Set[str]:
+    """Variables declared or assigned anywhere in node."""
+    if isinstance(node, (VarDecl, Assign)):
+        out.update(node.names)
+    elif isinstance(node, Block):
+        for stmt in node.statements:
+            _bound_names(stmt, out)
+    elif isinstance(node, ForLoop):
+        for part in (node.init, node.post, node.body):
+            _bound_names(part, out)
+    elif isinstance(node, If):
+        _bound_names(node.body, out)
+    elif isinstance(node, Switch):
+        for case in node.cases:
+            _bound_names(case.body, out)
+    return out
+
+
+def _own_exprs(node) -> list:
+    if isinstance(node, (VarDecl, Assign)):
+        return [node.value] if node.value is not None else []
+    if isinstance(node, ExprStmt):
+        return [node.expr]
+    if isinstance(node, If):
+        return [node.condition]
+    if isinstance(node, Switch):
+        return [node.expr]
+    if isinstance(node, ForLoop):
+        return [node.condition]
+    return []
+
+
+def _children(node) -> List[Block]:
+    if isinstance(node, Block):
+        return [node]
+    if isinstance(node, ForLoop):
+        return [node.init, node.post, node.body]
+    if isinstance(node, If):
+        return [node.body]
+    if isinstance(node, Switch):
+        return [case.body for case in node.cases]
+    return []
+
+
+def _map_exprs(node, rewrite):
+    """Copy of a statement with rewrite applied to each of its own expressions, recursively."""
+    if isinstance(node, Block):
+        return Block([_map_exprs(stmt, rewrite) for stmt in node.statements])
+    if isinstance(node, VarDecl):
+        return VarDecl(node.names, rewrite(node.value) if node.value is not None else None)
+    if isinstance(node, Assign):
+        return Assign(node.names, rewrite(node.value))
+    if isinstance(node, ExprStmt):
+        return ExprStmt(rewrite(node.expr))
+    if isinstance(node, If):
+        return If(rewrite(node.condition), _map_exprs(node.body, rewrite))
+    if isinstance(node, Switch):
+        return Switch(rewrite(node.expr), [type(case)(case.value, _map_exprs(case.body, rewrite))
+                                           for case in node.cases])
+    if isinstance(node, ForLoop):
+        return ForLoop(_map_exprs(node.init, rewrite), rewrite(node.condition), _map_exprs(node.post, rewrite),
+                       _map_exprs(node.body, rewrite))
+    return node
+
+
+class _Loop:
+    """What a loop changes, computed before it is rewritten."""
+
+    def __init__(self, loop: ForLoop, storage_free: Set[str], expansions: Dict[str, object]):
+        # Variables whose value can differ between iterations, or that are
+        # not in scope in front of the loop
+        self.variant = _bound_names(loop, set())
+        self.effects = _Effects(storage_free)
+        self.effects.add_stmt(loop)
+        # (slot expression, slot with variables expanded for alias checks)
+        self.writes = [(slot, _expand(slot, expansions)) for slot in self.effects.writes]
+
+    def invariant(self, expr) -> bool:
+        """Whether expr has the same value on every iteration and can be evaluated in front of the loop."""
+        return _is_pure(expr) and not (_identifiers(expr, set()) & self.variant)
+
+
+class _Mover:
+    def __init__(self, storage_free: Set[str], isolated: Set[str], expansions: Dict[str, object]):
+        self.storage_free = storage_free
+        self.isolated = isolated
+        self.expansions = expansions
+        self.counter = 0
+
+    def fresh(self) -> str:
+        name = f"{_PREFIX}{self.counter}"
+        self.counter += 1
+        return name
+
+    def block(self, block: Block) -> Block:
+        statements = []
+        for stmt in block.statements:
+            if isinstance(stmt, ForLoop):
+                before, stmt, after = self.loop(stmt)
+                # Loops nested in this one move code to the front of themselves
+                stmt = ForLoop(stmt.init, stmt.condition, stmt.post, self.block(stmt.body))
+                statements.extend(before + [stmt] + after)
+            elif isinstance(stmt, If):
+                statements.append(If(stmt.condition, self.block(stmt.body)))
+            elif isinstance(stmt, Switch):
+                statements.append(Switch(stmt.expr, [type(case)(case.value, self.block(case.body))
+                                                     for case in stmt.cases]))
+            elif isinstance(stmt, Block):
+                statements.append(self.block(stmt))
+            else:
+                statements.append(stmt)
+        return Block(statements)
+
+    def loop(self, loop: ForLoop) -> Tuple[list, ForLoop, list]:
+        """(statements in front of the loop, the loop, statements after it)."""
+        before, after = [], []
+        for slot in self.sinkable(loop, _Loop(loop, self.storage_free, self.expansions)):
+            name = self.fresh()
+            before.append(VarDecl([name], Call('sload', (slot,))))
+            after.append(ExprStmt(Call('sstore', (slot, Identifier(name)))))
+            loop = self.sink(loop, slot, name)
+        info = _Loop(loop, self.storage_free, self.expansions)
+        hoisted = {}
+
+        def hoist(expr):
+            if not isinstance(expr, Call):
+                return expr
+            if not self.hoistable(expr, info):
+                return Call(expr.name, tuple(hoist(arg) for arg in expr.args))
+            if expr not in hoisted:
+                hoisted[expr] = self.fresh()
+                before.append(VarDecl([hoisted[expr]], expr))
+                if expr.name in HASH_HELPERS:
+                    self.expansions[hoisted[expr]] = _expand(expr, self.expansions)
+            return Identifier(hoisted[expr])
+
+        # The init block runs once already
+        loop = ForLoop(loop.init, hoist(loop.condition), _map_exprs(loop.post, hoist), _map_exprs(loop.body, hoist))
+        return before, loop, after
+
+    def hoistable(self, expr: Call, info: _Loop) -> bool:
+        if expr.name in HASH_HELPERS:
+            return info.invariant(expr)
+        if expr.name != 'sload' or info.effects.clobbers_storage:
+            return False
+        slot = expr.args[0]
+        expanded = _expand(slot, self.expansions)
+        return info.invariant(slot) and not any(may_alias(expanded, write) for _, write in info.writes)
+
+    # Sinking
+
+    def escapes(self, node) -> bool:
+        """Whether node may leave the function or let other code access storage."""
+        if isinstance(node, Leave):
+            return True
+        if isinstance(node, Call):
+            if node.name not in ('sload', 'sstore') and not _isolated(node.name, self.isolated):
+                return True
+            return any(self.escapes(arg) for arg in node.args)
+        return any(self.escapes(expr) for expr in _own_exprs(node)) or \
+            any(self.escapes(stmt) for block in _children(node) for stmt in block.statements)
+
+    def accesses(self, node, out: list) -> list:
+        """(slot, expanded slot) of every sload and sstore in node."""
+        if isinstance(node, Call):
+            if node.name in ('sload', 'sstore'):
+                out.append((node.args[0], _expand(node.args[0], self.expansions)))
+            for arg in node.args:
+                self.accesses(arg, out)
+        else:
+            for expr in _own_exprs(node):
+                self.accesses(expr, out)
+            for block in _children(node):
+                for stmt in block.statements:
+                    self.accesses(stmt, out)
+        return out
+
+    def sinkable(self, loop: ForLoop, info: _Loop) -> list:
+        if self.escapes(loop):
+            return []
+        accesses = self.accesses(loop, [])
+        slots = []
+        for slot, expanded in info.writes:
+            if slot in slots or not info.invariant(slot):
+                continue
+            # Every access that may touch the slot must name it the same way
+            if all(access == slot or not may_alias(other, expanded) for access, other in accesses):
+                slots.append(slot)
+        return slots
+
+    def sink(self, loop: ForLoop, slot, name: str) -> ForLoop:
+        def load(expr):
+            if not isinstance(expr, Call):
+                return expr
+            if expr.name == 'sload' and expr.args[0] == slot:
+                return Identifier(name)
+            return Call(expr.name, tuple(load(arg) for arg in expr.args))
+
+        def statement(stmt):
+            if isinstance(stmt, ExprStmt) and isinstance(stmt.expr, Call) and stmt.expr.name == 'sstore' \
+                    and stmt.expr.args[0] == slot:
+                return Assign([name], load(stmt.expr.args[1]))
+            if isinstance(stmt, Block):
+                return Block([statement(inner) for inner in stmt.statements])
+            if isinstance(stmt, ForLoop):
+                return ForLoop(statement(stmt.init), load(stmt.condition), statement(stmt.post),
+                               statement(stmt.body))
+            if isinstance(stmt, If):
+                return If(load(stmt.condition), statement(stmt.body))
+            if isinstance(stmt, Switch):
+                return Switch(load(stmt.expr), [type(case)(case.value, statement(case.body))
+                                                for case in stmt.cases])
+            return _map_exprs(stmt, load)
+
+        return statement(loop)
+
+
+def move_loop_invariants(block: Block, storage_free: Set[str] = None, isolated: Set[str] = None) -> Block:
+    """
+    LICM over one block of code. `storage_free` names the user functions
+    known not to write storage and `isolated` those that do not access it
+    at all; calls to other user functions stop loads from being hoisted and
+    slots from being sunk.
+    """
+    if storage_free is None:
+        storage_free = set(STORAGE_FREE_HELPERS)
+    if isolated is None:
+        isolated = set(STORAGE_FREE_HELPERS)
+    return _Mover(storage_free, isolated, _expansions(block)).block(block)
+
+
+class LoopInvariantCodeMotion(FunctionPass):
+    """Loop-invariant code motion, in functions and in an object's top-level code."""
+    name = 'licm'
+
+    def prepare(self, obj: Object) -> Tuple[Set[str], Set[str]]:
+        functions = list(functions_of(obj))
+        return storage_free_functions(functions), storage_isolated_functions(functions)
+
+    def run_function(self, function: FunctionDef, context) -> FunctionDef:
+        return FunctionDef(function.name, function.params, function.returns,
+                           move_loop_invariants(function.body, *context))
+
+    def run(self, obj: Object) -> Object:
+        context = self.prepare(obj)
+        code = move_loop_invariants(obj.code, *context)
+        statements = [self.run_function(stmt, context) if isinstance(stmt, FunctionDef) else stmt
+                      for stmt in code.statements]
+        return Object(obj.name, Block(statements), [self.run(child) for child in obj.objects])
@@ -0,0 +1,54 @@
+"""
+Pass manager for the Yul IR.
+
+A pass takes an `Object` and returns a (possibly new) `Object`. Passes that
+work one function at a time subclass `FunctionPass`; they see every
+function of every object, with a per-object context computed once by
+`prepare()` (for example, which functions can write storage).
+"""
+
+from typing import Iterable, List
+
+from .yul_ast import FunctionDef, Object
+
+
+class Pass:
+    name = ''
+
+    def run(self, obj: Object) -> Object:
+        raise NotImplementedError
+
+
+class FunctionPass(Pass):
+    def prepare(self, obj: Object):
+        """Context shared by all functions of one object."""
+        return None
+
+    def run_function(self, function: FunctionDef, context) -> FunctionDef:
+        raise NotImplementedError
+
+    def run(self, obj: Object) -> Object:
+        context = self.prepare(obj)
+        statements = [self.run_function(stmt, context) if isinstance(stmt, FunctionDef) else stmt
+                      for stmt in obj.code.statements]
+        return Object(obj.name, type(obj.code)(statements), [self.run(child) for child in obj.objects])
+
+
+class PassManager:
+    """Runs passes in order over an object."""
+
+    def __init__(self, passes: Iterable[Pass] = ()):
+        self.passes: List[Pass] = list(passes)
+
+    def add(self, pass_: Pass) -> 'PassManager':
+        self.passes.append(pass_)
+        return self
+
+    @property
+    def names(self) -> List[str]:
+        return [pass_.name for pass_ in self.passes]
+
+    def run(self, obj: Object) -> Object:
+        for pass_ in self.passes:
+            obj = pass_.run(obj)
+        return obj
@@ -0,0 +1,200 @@
+"""
+Storage layout: which slot, and which bytes of it, each field occupies.
+
+Value types smaller than 32 bytes are packed Solidity-style: fields are laid
+out in order, each starting at the lowest free byte of the current slot, and
+a field that does not fit in what remains starts a new slot. Mappings,
+arrays, strings, dynamic bytes and structs always start a new slot, and the
+field after them does too.
+
+With reorder=True, full-slot fields keep their declaration order and the
+small fields are packed first-fit-decreasing into as few slots as possible.
+This changes slot numbers, so it is only safe for fresh deployments.
+"""
+
+from typing import Dict, List, NamedTuple, Tuple
+
+from ..parser.dafny_ast import DafnyType, Struct, Type, Variable
+
+SLOT_BYTES = 32
+
+# Bytes taken by value types that can share a slot
+VALUE_TYPE_BYTES = {
+    Type.BOOL: 1,
+    Type.UINT8: 1,
+    Type.UINT16: 2,
+    Type.UINT32: 4,
+    Type.UINT64: 8,
+    Type.UINT128: 16,
+    Type.INT128: 16,
+    Type.ADDRESS: 20,
+}
+SIGNED_TYPES = {Type.INT, Type.INT128, Type.INT256}
+
+
+class FieldLocation(NamedTuple):
+    slot: int     # Relative to the start of the contract or struct
+    offset: int   # Byte offset from the least significant end of the slot
+    size: int     # Bytes; 32 for a full slot
+    slots: int    # Slots spanned (structs span several)
+
+    @property
+    def packed(self) -> bool:
+        return self.size < SLOT_BYTES
+
+    @property
+    def shift(self) -> int:
+        return self.offset * 8
+
+    @property
+    def mask(self) -> str:
+        return hex((1 << (self.size * 8)) - 1)
+
+
+def type_label(dtype: DafnyType) -> str:
+    if dtype is None:
+        return 'uint256'
+    if dtype.base == Type.STRUCT:
+        return f"struct {dtype.struct_name}"
+    if dtype.base == Type.MAPPING:
+        return f"mapping({type_label(dtype.key_type)} => {type_label(dtype.value_type)})"
+    if dtype.base == Type.ARRAY:
+        return f"{type_label(dtype.element_type)}[]"
+    if dtype.base == Type.INT:
+        return 'int256'
+    return dtype.base.value
+
+
+def _footprint(dtype: DafnyType, struct_slots: Dict[str, int]) -> Tuple[int, int]:
+    """(bytes, slots) a field of this type occupies."""
+    if dtype is None:
+        return SLOT_BYTES, 1
+    if dtype.base in VALUE_TYPE_BYTES:
+        return VALUE_TYPE_BYTES[dtype.base], 1
+    if dtype.base == Type.STRUCT:
+        return SLOT_BYTES, struct_slots.get(dtype.struct_name, 1)
+    return SLOT_BYTES, 1
+
+
+def _sequential(fields: List[Variable], struct_slots: Dict[str, int], pack: bool) -> Tuple[Dict[str, FieldLocation], int]:
+    locations = {}
+    slot = 0
+    used = 0  # Bytes used in the current slot
+    for field in fields:
+        size, slots = _footprint(field.type, struct_slots)
+        if not pack:
+            size = SLOT_BYTES
+        if used and (size == SLOT_BYTES or used + size > SLOT_BYTES):
+            slot += 1
+            used = 0
+        locations[field.name] = FieldLocation(slot, used, size, slots)
+        if size == SLOT_BYTES:
+            slot += slots
+            used = 0
+        else:
+            used += size
+    return locations, slot + (1 if used else 0)
+
+
+def _first_fit_decreasing(fields: List[Variable], struct_slots: Dict[str, int]) -> Tuple[Dict[str, FieldLocation], int]:
+    locations = {}
+    slot = 0
+    small = []
+    for field in fields:
+        size, slots = _footprint(field.type, struct_slots)
+        if size == SLOT_BYTES:
+            locations[field.name] = FieldLocation(slot, 0, size, slots)
+            slot += slots
+        else:
+            small.append((size, field))
+    bins = []  # [slot, bytes used]
+    for size, field in sorted(small, key=lambda item: -item[0]):
+        target = next((b for b in bins if b[1] + size <= SLOT_BYTES), None)
+        if target is None:
+            target = [slot + len(bins), 0]
+            bins.append(target)
+        locations[field.name] = FieldLocation(target[0], target[1], size, 1)
+        target[1] += size
+    ordered = {field.name: locations[field.name] for field in fields}
+    return ordered, slot + len(bins)
+
+
+def _widen_sole_occupants(locations: Dict[str, FieldLocation]) -> Dict[str, FieldLocation]:
+    """A small field alone in its slot is accessed as a full slot: no masking."""
+    occupants: Dict[int, int] = {}
+    for location in locations.values():
+        if location.packed:
+            occupants[location.slot] = occupants.get(location.slot, 0) + 1
+    return {
+        name: location._replace(size=SLOT_BYTES) if location.packed and occupants[location.slot] == 1 else location
+        for name, location in locations.items()
+    }
+
+
+def compute_struct_layouts(structs: List[Struct], pack: bool = True) -> Tuple[Dict[str, Dict[str, FieldLocation]], Dict[str, int]]:
+    """Member locations relative to each struct's base slot, and struct sizes in slots."""
+    layouts = {}
+    struct_slots = {}
+    # Structs may embed structs declared before them
+    for struct in structs:
+        layout, struct_slots[struct.name] = _sequential(struct.fields, struct_slots, pack)
+        layouts[struct.name] = _widen_sole_occupants(layout)
+    return layouts, struct_slots
+
+
+def compute_layout(fields: List[Variable], struct_slots: Dict[str, int], pack: bool = True,
+                   reorder: bool = False) -> Tuple[Dict[str, FieldLocation], int]:
+    """Field locations and the number of slots used."""
+    if pack and reorder:
+        locations, slots = _first_fit_decreasing(fields, struct_slots)
+    else:
+        locations, slots = _sequential(fields, struct_slots, pack)
+    return _widen_sole_occupants(locations), slots
+
+
+def layout_artifact(contract_name: str, fields: List[Variable], locations: Dict[str, FieldLocation],
+                    structs: List[Struct], struct_layouts: Dict[str, Dict[str, FieldLocation]],
+                    struct_slots: Dict[str, int]) -> dict:
+    """Storage layout in the shape of solc's `storageLayout` output."""
+    types = {}
+
+    def type_id(dtype: DafnyType) -> str:
+        label = type_label(dtype)
+        ident = 't_' + ''.join(c if c.isalnum() else '_' for c in label)
+        if ident not in types:
+            size, slots = _footprint(dtype, struct_slots)
+            base = dtype.base if dtype is not None else Type.UINT256
+            entry = {
+                'encoding': 'mapping' if base == Type.MAPPING else
+                            'dynamic_array' if base == Type.ARRAY else 'inplace',
+                'label': label,
+                'numberOfBytes': str(size if size < SLOT_BYTES else slots * SLOT_BYTES),
+            }
+            types[ident] = entry
+            if dtype is None:
+                pass
+            elif dtype.base == Type.MAPPING:
+                entry['key'] = type_id(dtype.key_type)
+                entry['value'] = type_id(dtype.value_type)
+            elif dtype.base == Type.ARRAY and dtype.element_type is not None:
+                entry['base'] = type_id(dtype.element_type)
+            elif dtype.base == Type.STRUCT:
+                struct = next((s for s in structs if s.name == dtype.struct_name), None)
+                if struct is not None:
+                    entry['members'] = [_storage_entry(contract_name, member, struct_layouts[struct.name][member.name],
+                                                       type_id(member.type)) for member in struct.fields]
+        return ident
+
+    storage = [_storage_entry(contract_name, field, locations[field.name], type_id(field.type))
+               for field in sorted(fields, key=lambda f: (locations[f.name].slot, locations[f.name].offset))]
+    return {'storage': storage, 'types': types}
+
+
+def _storage_entry(contract_name: str, field: Variable, location: FieldLocation, type_ident: str) -> dict:
+    return {
+        'contract': contract_name,
+        'label': field.name,
+        'slot': str(location.slot),
+        'offset': location.offset,
+        'type': type_ident,
+    }
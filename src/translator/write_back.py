@@ -0,0 +1,305 @@
+"""
+Write-back caching of storage slots within a method.
+
+A slot a function writes more than once, or reads after writing, is read
+into a local (`let _wb_N := sload(slot)`) in front of the first statement
+that uses it. Every later `sload` of the slot reads the local, and every
+`sstore` assigns it. The slot is written back once, before each point where the value
+becomes visible:
+
+- before `return`, `stop` and `leave`, and at the end of the function;
+- before a call that may read storage: an external call (the callee may
+  re-enter) or a user function that accesses storage. After a call that
+  may write storage, the local is loaded again; the statement making the
+  call reads the slot from storage, since the call may run before the read.
+
+Only slots that may have been assigned on some path to that point are
+written back. Paths that revert need nothing, since the revert discards
+the stores anyway.
+
+A slot is cached when its slot expression is pure and its variables are
+never reassigned, every other access in the function provably names a
+different slot (`cse.may_alias`), and the first statement that uses it does
+so unconditionally, so the load is not speculative. A first use that
+stores a value not read from the slot initializes the local without a load.
+Functions whose loop conditions or loop post blocks call out are left as
+they are.
+"""
+
+from typing import Dict, List, Optional, Set
+
+from .cse import (STORAGE_FREE_HELPERS, _identifiers, _is_pure, _writes_storage, may_alias,
+                  storage_free_functions)
+from .dse import _expand, _expansions
+from .licm import _children, _isolated, _map_exprs, _own_exprs, storage_isolated_functions
+from .passes import FunctionPass
+from .yul_ast import (Assign, Block, Call, ExprStmt, ForLoop, FunctionDef, Identifier, If, Leave, Object,
+                      Switch, VarDecl, functions_of)
+
+_PREFIX = '_wb_'
+
+# Builtins after which nothing else in the function runs
+_TERMINATING_BUILTINS = {'return', 'stop', 'revert', 'invalid', 'selfdestruct'}
+
+
+def _sstore(stmt):
+    """(slot, value) of an `sstore(slot, value)` statement, else None."""
+    if isinstance(stmt, ExprStmt) and isinstance(stmt.expr, Call) and stmt.expr.name == 'sstore':
+        return stmt.expr.args
+    return None
+
+
+def _terminates(stmt) -> bool:
+    if isinstance(stmt, Leave):
+        return True
+    return isinstance(stmt, ExprStmt) and isinstance(stmt.expr, Call) and stmt.expr.name in _TERMINATING_BUILTINS
+
+
+class _State:
+    """Cached slots in scope and those that may differ from storage."""
+
+    def __init__(self, declared: List, dirty: Set):
+        self.declared = declared
+        self.dirty = dirty
+
+    def copy(self) -> '_State':
+        return _State(self.declared, set(self.dirty))
+
+
+class _WriteBack:
+    def __init__(self, storage_free: Set[str], isolated: Set[str]):
+        self.storage_free = storage_free
+        self.isolated = isolated
+
+    # Analysis
+
+    def observes(self, expr) -> bool:
+        """Whether evaluating expr may let code outside this function read storage, or end the call."""
+        if not isinstance(expr, Call):
+            return False
+        if expr.name not in ('sload', 'sstore') and not _isolated(expr.name, self.isolated):
+            return True
+        return any(self.observes(arg) for arg in expr.args)
+
+    def clobbers(self, expr) -> bool:
+        """Whether evaluating expr may write storage other than through its own sstore."""
+        if not isinstance(expr, Call):
+            return False
+        if expr.name != 'sstore' and _writes_storage(expr.name, self.storage_free):
+            return True
+        return any(self.clobbers(arg) for arg in expr.args)
+
+    def accesses(self, node, out: list) -> list:
+        """(slot, is store, value stored) of every sload and sstore in node."""
+        if isinstance(node, Call):
+            # Arguments are evaluated first: a store's value is read before it is stored
+            for arg in node.args:
+                self.accesses(arg, out)
+            if node.name in ('sload', 'sstore'):
+                out.append((node.args[0], node.name == 'sstore', node.args[1] if node.name == 'sstore' else None))
+        else:
+            for expr in _own_exprs(node):
+                self.accesses(expr, out)
+            for block in _children(node):
+                for stmt in block.statements:
+                    self.accesses(stmt, out)
+        return out
+
+    def loop_calls_out(self, node) -> bool:
+        """Whether a loop condition or post block in node calls anything that may observe storage."""
+        if isinstance(node, ForLoop) and (self.observes(node.condition) or self.calls_out(node.post)):
+            return True
+        return any(self.loop_calls_out(stmt) for block in _children(node) for stmt in block.statements)
+
+    def calls_out(self, block: Block) -> bool:
+        return any(self.observes(expr) for stmt in block.statements for expr in _own_exprs(stmt)) or \
+            any(self.calls_out(inner) for stmt in block.statements for inner in _children(stmt))
+
+    def candidates(self, function: FunctionDef) -> Dict[object, int]:
+        """Cached slot expression -> index of the top-level statement in front of which it is loaded."""
+        body = function.body.statements
+        expansions = _expansions(function.body)
+        assigned = set()
+        _assigned_names(function.body, assigned)
+        accesses = []
+        first_use = {}
+        for index, stmt in enumerate(body):
+            found = self.accesses(stmt, [])
+            # Accesses in loops happen more than once
+            weight = 2 if _contains_loop(stmt) else 1
+            for slot, is_store, value in found:
+                accesses.append((slot, is_store, value, weight))
+                first_use.setdefault(slot, index)
+        declared_before = {}
+        in_scope = set(function.params)
+        for index, stmt in enumerate(body):
+            declared_before[index] = set(in_scope)
+            if isinstance(stmt, VarDecl):
+                in_scope.update(stmt.names)
+
+        result = {}
+        for slot, index in first_use.items():
+            own = [(is_store, value, weight) for other, is_store, value, weight in accesses if other == slot]
+            stores = [value for is_store, value, _ in own if is_store]
+            if not stores or not _is_pure(slot):
+                continue
+            # Worth it when a store is saved: the slot is stored twice, or read after a store
+            first_store = next(i for i, (is_store, _, _) in enumerate(own) if is_store)
+            if sum(weight for is_store, _, weight in own if is_store) < 2 and \
+                    not any(not is_store for is_store, _, _ in own[first_store + 1:]):
+                continue
+            names = _identifiers(slot, set())
+            if names & assigned or not names <= declared_before[index]:
+                continue
+            if any(self.clobbers(value) for value in stores):
+                continue
+            expanded = _expand(slot, expansions)
+            if any(other != slot and may_alias(_expand(other, expansions), expanded)
+                   for other, _, _, _ in accesses):
+                continue
+            # The first statement that uses it must do so on every path through it
+            if not any(other == slot for expr in _own_exprs(body[index]) for other, _, _ in self.accesses(expr, [])):
+                continue
+            result[slot] = index
+        return result
+
+    # Rewriting
+
+    def function(self, function: FunctionDef) -> FunctionDef:
+        if self.loop_calls_out(function.body):
+            return function
+        candidates = self.candidates(function)
+        if not candidates:
+            return function
+        self.names = {slot: f"{_PREFIX}{i}" for i, slot in enumerate(candidates)}
+        self.conditions = 0
+        state = _State([], set())
+        statements = []
+        for index, stmt in enumerate(function.body.statements):
+            for slot, first in candidates.items():
+                if first != index:
+                    continue
+                state.declared = state.declared + [slot]
+                store = _sstore(stmt)
+                if store is not None and store[0] == slot and not self.accesses(store[1], []) \
+                        and not self.observes(store[1]):
+                    # The first use overwrites the slot: no need to load it
+                    statements.append(VarDecl([self.names[slot]], store[1]))
+                    state.dirty.add(slot)
+                    stmt = None
+                else:
+                    statements.append(VarDecl([self.names[slot]], Call('sload', (slot,))))
+            if stmt is not None:
+                statements.extend(self.statement(stmt, state))
+        if not statements or not _terminates(statements[-1]):
+            statements.extend(self.flush(state))
+        return FunctionDef(function.name, function.params, function.returns, Block(statements))
+
+    def block(self, block: Block, state: _State) -> Block:
+        statements = []
+        for stmt in block.statements:
+            statements.extend(self.statement(stmt, state))
+        return Block(statements)
+
+    def statement(self, stmt, state: _State) -> list:
+        if isinstance(stmt, Leave):
+            return self.flush(state) + [stmt]
+        if isinstance(stmt, Block):
+            return [self.block(stmt, state)]
+        if isinstance(stmt, FunctionDef):
+            return [stmt]
+        own = _own_exprs(stmt)
+        before = self.flush(state) if any(self.observes(expr) for expr in own) else []
+        clobbered = any(self.clobbers(expr) for expr in own)
+        reload = self.reload(state) if clobbered else []
+        # Arguments run right to left, so a call that writes storage may run before a read
+        # to its left: after the flush, such a statement reads storage itself
+        read = (lambda expr: expr) if clobbered else (lambda expr: self.expr(expr, state))
+        if isinstance(stmt, (If, Switch)):
+            condition = read(own[0])
+            if reload:
+                # Storage may have changed by the time the branch is taken
+                name = f"{_PREFIX}condition_{self.conditions}"
+                self.conditions += 1
+                before += [VarDecl([name], condition)] + reload
+                condition = Identifier(name)
+            if isinstance(stmt, If):
+                branch = state.copy()
+                body = self.block(stmt.body, branch)
+                state.dirty |= branch.dirty
+                return before + [If(condition, body)]
+            cases = []
+            for case in stmt.cases:
+                branch = state.copy()
+                cases.append(type(case)(case.value, self.block(case.body, branch)))
+                state.dirty |= branch.dirty
+            return before + [Switch(condition, cases)]
+        if isinstance(stmt, ForLoop):
+            # Whatever the loop assigns may be unwritten at any point in it
+            stored = {slot for slot, is_store, _ in self.accesses(stmt, []) if is_store and slot in state.declared}
+            state.dirty |= stored
+            init = self.block(stmt.init, state)
+            branch = state.copy()
+            body = self.block(stmt.body, branch)
+            post = self.block(stmt.post, branch)
+            state.dirty |= branch.dirty | stored
+            return [ForLoop(init, self.expr(stmt.condition, state), post, body)]
+        store = _sstore(stmt)
+        if store is not None and store[0] in state.declared:
+            state.dirty.add(store[0])
+            return before + [Assign([self.names[store[0]]], read(store[1]))] + reload
+        return before + [_map_exprs(stmt, read)] + reload
+
+    def expr(self, expr, state: _State):
+        if not isinstance(expr, Call):
+            return expr
+        if expr.name == 'sload' and expr.args[0] in state.declared:
+            return Identifier(self.names[expr.args[0]])
+        return Call(expr.name, tuple(self.expr(arg, state) for arg in expr.args))
+
+    def flush(self, state: _State) -> list:
+        stores = [ExprStmt(Call('sstore', (slot, Identifier(self.names[slot]))))
+                  for slot in state.declared if slot in state.dirty]
+        state.dirty = set()
+        return stores
+
+    def reload(self, state: _State) -> list:
+        return [Assign([self.names[slot]], Call('sload', (slot,))) for slot in state.declared]
+
+
+def _assigned_names(node, out: Set[str]):
+    if isinstance(node, Assign):
+        out.update(node.names)
+    for block in _children(node):
+        for stmt in block.statements:
+            _assigned_names(stmt, out)
+
+
+def _contains_loop(node) -> bool:
+    return isinstance(node, ForLoop) or any(_contains_loop(stmt) for block in _children(node)
+                                            for stmt in block.statements)
+
+
+def write_back_storage(function: FunctionDef, storage_free: Optional[Set[str]] = None,
+                       isolated: Optional[Set[str]] = None) -> FunctionDef:
+    """
+    Write-back caching over one function. `storage_free` names the user
+    functions known not to write storage and `isolated` those that do not
+    access it at all; the cache is written back before calls to any other.
+    """
+    if storage_free is None:
+        storage_free = set(STORAGE_FREE_HELPERS)
+    if isolated is None:
+        isolated = set(STORAGE_FREE_HELPERS)
+    return _WriteBack(storage_free, isolated).function(function)
+
+
+class StorageWriteBack(FunctionPass):
+    name = 'write_back'
+
+    def prepare(self, obj: Object):
+        functions = list(functions_of(obj))
+        return storage_free_functions(functions), storage_isolated_functions(functions)
+
+    def run_function(self, function: FunctionDef, context) -> FunctionDef:
+        return write_back_storage(function, *context)
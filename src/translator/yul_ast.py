@@ -0,0 +1,460 @@
+"""
+Yul intermediate representation: syntax tree, parser and printer.
+
+YulGenerator lowers the Dafny AST to these nodes, optimization passes
+rewrite them and the printer renders the final text. Only what the
+generator produces is supported: objects, function definitions, blocks,
+let/assignment, if, switch, for, break/continue/leave and calls over
+identifiers and literals. Expressions are frozen dataclasses, so equal
+expressions compare and hash equal and can key lookup tables.
+"""
+
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Iterator, List, Optional, Tuple, Union
+
+
+@dataclass(frozen=True)
+class Literal:
+    value: str
+
+
+@dataclass(frozen=True)
+class Identifier:
+    name: str
+
+
+@dataclass(frozen=True)
+class Call:
+    name: str
+    args: Tuple['Expr', ...] = ()
+
+
+Expr = Union[Literal, Identifier, Call]
+
+
+@dataclass
+class Block:
+    statements: List['Stmt'] = field(default_factory=list)
+
+
+@dataclass
+class VarDecl:
+    names: List[str]
+    value: Optional[Expr] = None
+
+
+@dataclass
+class Assign:
+    names: List[str]
+    value: Expr
+
+
+@dataclass
+class ExprStmt:
+    expr: Expr
+
+
+@dataclass
+class If:
+    condition: Expr
+    body: Block
+
+
+@dataclass
+class Case:
+    value: Optional[Literal]  # None for default
+    body: Block
+
+
+@dataclass
+class Switch:
+    expr: Expr
+    cases: List[Case]
+
+
+@dataclass
+class ForLoop:
+    init: Block
+    condition: Expr
+    post: Block
+    body: Block
+
+
+@dataclass
+class FunctionDef:
+    name: str
+    params: List[str]
+    returns: List[str]
+    body: Block
+
+
+@dataclass
+class Break:
+    pass
+
+
+@dataclass
+class Continue:
+    pass
+
+
+@dataclass
+class Leave:
+    pass
+
+
+Stmt = Union[Block, VarDecl, Assign, ExprStmt, If, Switch, ForLoop, FunctionDef, Break, Continue, Leave]
+
+
+@dataclass
+class Object:
+    name: str
+    code: Block
+    objects: List['Object'] = field(default_factory=list)
+
+
+def call(name: str, *args) -> Call:
+    """Call node; int and str arguments become literals and identifiers."""
+    return Call(name, tuple([arg if type(arg) in _EXPR_TYPES else _as_expr(arg) for arg in args]))
+
+
+_EXPR_TYPES = (Literal, Identifier, Call)
+
+
+@lru_cache(maxsize=None)
+def _as_expr(value) -> Expr:
+    # Nodes are immutable, so one node per distinct constant or name is shared
+    if isinstance(value, int):
+        return Literal(str(value))
+    if isinstance(value, str):
+        return Identifier(value)
+    return value
+
+
+def functions_of(obj: Object) -> Iterator[FunctionDef]:
+    """Function definitions at the top of an object's code block."""
+    return (stmt for stmt in obj.code.statements if isinstance(stmt, FunctionDef))
+
+
+# ----------------------------------------------------------------------
+# Parsing
+# ----------------------------------------------------------------------
+
+_TOKEN_RE = re.compile(
+    r'(?:\s+|//[^\n]*|/\*.*?\*/)*'
+    r'(?:(?P<STRING>"(?:[^"\\]|\\.)*")'
+    r'|(?P<NUMBER>0x[0-9a-fA-F]+|\d+)'
+    r'|(?P<IDENT>[A-Za-z_$][A-Za-z0-9_$.]*)'
+    r'|(?P<OP>:=|->|[{}(),:])'
+    r'|(?P<ERROR>.)'
+    r'|$)',
+    re.DOTALL,
+)
+
+
+class YulSyntaxError(SyntaxError):
+    pass
+
+
+def _tokenize(text: str) -> List[Tuple[str, str, int, int]]:
+    tokens = []
+    for m in _TOKEN_RE.finditer(text):
+        kind = m.lastgroup
+        if kind is None:
+            continue
+        start, end = m.span(kind)
+        if kind == 'ERROR':
+            raise YulSyntaxError(f"Unexpected character {text[start]!r} at offset {start}")
+        tokens.append((kind, text[start:end], start, end))
+    return tokens
+
+
+class _Parser:
+    def __init__(self, tokens, pos: int = 0):
+        self.tokens = tokens
+        self.pos = pos
+
+    def peek(self, offset: int = 0) -> Optional[str]:
+        i = self.pos + offset
+        return self.tokens[i][1] if i < len(self.tokens) else None
+
+    def next(self) -> Tuple[str, str, int, int]:
+        if self.pos >= len(self.tokens):
+            raise YulSyntaxError("Unexpected end of input")
+        tok = self.tokens[self.pos]
+        self.pos += 1
+        return tok
+
+    def expect(self, value: str):
+        tok = self.next()
+        if tok[1] != value:
+            raise YulSyntaxError(f"Expected {value!r} but found {tok[1]!r} at offset {tok[2]}")
+        return tok
+
+    def identifier(self) -> str:
+        tok = self.next()
+        if tok[0] != 'IDENT':
+            raise YulSyntaxError(f"Expected identifier but found {tok[1]!r} at offset {tok[2]}")
+        return tok[1]
+
+    def identifier_list(self) -> List[str]:
+        names = [self.identifier()]
+        while self.peek() == ',':
+            self.next()
+            names.append(self.identifier())
+        return names
+
+    def block(self) -> Block:
+        self.expect('{')
+        statements = []
+        while self.peek() != '}':
+            statements.append(self.statement())
+        self.next()
+        return Block(statements)
+
+    def function(self) -> FunctionDef:
+        self.expect('function')
+        name = self.identifier()
+        self.expect('(')
+        params = [] if self.peek() == ')' else self.identifier_list()
+        self.expect(')')
+        returns = []
+        if self.peek() == '->':
+            self.next()
+            returns = self.identifier_list()
+        return FunctionDef(name, params, returns, self.block())
+
+    def statement(self) -> Stmt:
+        value = self.peek()
+        if value == '{':
+            return self.block()
+        if value == 'function':
+            return self.function()
+        if value == 'let':
+            self.next()
+            names = self.identifier_list()
+            if self.peek() == ':=':
+                self.next()
+                return VarDecl(names, self.expression())
+            return VarDecl(names)
+        if value == 'if':
+            self.next()
+            condition = self.expression()
+            return If(condition, self.block())
+        if value == 'switch':
+            self.next()
+            expr = self.expression()
+            cases = []
+            while self.peek() in ('case', 'default'):
+                if self.next()[1] == 'case':
+                    literal = self.expression()
+                    if not isinstance(literal, Literal):
+                        raise YulSyntaxError("Switch case must be a literal")
+                    cases.append(Case(literal, self.block()))
+                else:
+                    cases.append(Case(None, self.block()))
+            return Switch(expr, cases)
+        if value == 'for':
+            self.next()
+            init = self.block()
+            condition = self.expression()
+            post = self.block()
+            return ForLoop(init, condition, post, self.block())
+        if value == 'break':
+            self.next()
+            return Break()
+        if value == 'continue':
+            self.next()
+            return Continue()
+        if value == 'leave':
+            self.next()
+            return Leave()
+        if self.peek(1) in (':=', ','):
+            names = self.identifier_list()
+            self.expect(':=')
+            return Assign(names, self.expression())
+        return ExprStmt(self.expression())
+
+    def expression(self) -> Expr:
+        kind, value, start, _ = self.next()
+        if kind in ('NUMBER', 'STRING') or value in ('true', 'false'):
+            return Literal(value)
+        if kind != 'IDENT':
+            raise YulSyntaxError(f"Unexpected {value!r} at offset {start}")
+        if self.peek() != '(':
+            return Identifier(value)
+        self.next()
+        args = []
+        while self.peek() != ')':
+            args.append(self.expression())
+            if self.peek() == ',':
+                self.next()
+        self.next()
+        return Call(value, tuple(args))
+
+
+def parse_function(text: str) -> FunctionDef:
+    """Parse a single `function ... { ... }` definition."""
+    return _Parser(_tokenize(text)).function()
+
+
+def iter_functions(text: str) -> Iterator[Tuple[FunctionDef, int, int]]:
+    """
+    Yield (function, start, end) for every top-level function definition in
+    a Yul source, with character offsets of its text. Object and code
+    wrappers and statements outside functions are skipped, not parsed.
+    """
+    tokens = _tokenize(text)
+    i = 0
+    while i < len(tokens):
+        if tokens[i][1] == 'function' and tokens[i][0] == 'IDENT':
+            parser = _Parser(tokens, i)
+            function = parser.function()
+            yield function, tokens[i][2], tokens[parser.pos - 1][3]
+            i = parser.pos
+        else:
+            i += 1
+
+
+def iter_objects(text: str) -> Iterator[Tuple[str, int, int]]:
+    """
+    Yield (name, start, end) for every `object "name" { ... }` in a Yul
+    source, including nested ones, in order of their start offset (an
+    object before the objects inside it).
+    """
+    tokens = _tokenize(text)
+    for i, (kind, value, start, _) in enumerate(tokens[:-2]):
+        if kind != 'IDENT' or value != 'object' or tokens[i + 1][0] != 'STRING' or tokens[i + 2][1] != '{':
+            continue
+        depth = 0
+        for j in range(i + 2, len(tokens)):
+            if tokens[j][0] == 'OP' and tokens[j][1] in '{}':
+                depth += 1 if tokens[j][1] == '{' else -1
+                if depth == 0:
+                    yield tokens[i + 1][1][1:-1], start, tokens[j][3]
+                    break
+        else:
+            raise YulSyntaxError(f"Unterminated object at offset {start}")
+
+
+# ----------------------------------------------------------------------
+# Printing
+# ----------------------------------------------------------------------
+
+def format_expr(expr: Expr) -> str:
+    if isinstance(expr, Call):
+        return f"{expr.name}({', '.join([format_expr(arg) for arg in expr.args])})"
+    if isinstance(expr, Identifier):
+        return expr.name
+    return expr.value
+
+
+def _is_simple(stmt: Stmt) -> bool:
+    return isinstance(stmt, (VarDecl, Assign, ExprStmt, Break, Continue, Leave))
+
+
+class _Printer:
+    """Appends output lines to one list; joined once at the end."""
+
+    def __init__(self):
+        self.lines: List[str] = []
+
+    def simple(self, stmt: Stmt) -> str:
+        if isinstance(stmt, VarDecl):
+            text = f"let {', '.join(stmt.names)}"
+            if stmt.value is not None:
+                text += f" := {format_expr(stmt.value)}"
+            return text
+        if isinstance(stmt, Assign):
+            return f"{', '.join(stmt.names)} := {format_expr(stmt.value)}"
+        if isinstance(stmt, ExprStmt):
+            return format_expr(stmt.expr)
+        if isinstance(stmt, Break):
+            return "break"
+        if isinstance(stmt, Continue):
+            return "continue"
+        return "leave"
+
+    def inline(self, block: Block) -> Optional[str]:
+        """`{ stmt }` on one line for a block holding one simple statement."""
+        if not block.statements:
+            return "{ }"
+        if len(block.statements) == 1 and _is_simple(block.statements[0]):
+            return "{ " + self.simple(block.statements[0]) + " }"
+        return None
+
+    def flat(self, block: Block) -> str:
+        """A block on one line, as in for-loop headers."""
+        printer = _Printer()
+        printer.statements(block, "")
+        return "{ " + " ".join(line.strip() for line in printer.lines if line) + " }"
+
+    def statements(self, block: Block, indent: str):
+        previous = None
+        for stmt in block.statements:
+            # Function definitions are set off by blank lines
+            if previous is not None and (isinstance(stmt, FunctionDef) or isinstance(previous, FunctionDef)):
+                self.lines.append("")
+            self.stmt(stmt, indent)
+            previous = stmt
+
+    def braced(self, head: str, block: Block, indent: str):
+        self.lines.append(head + " {")
+        self.statements(block, indent + "  ")
+        self.lines.append(indent + "}")
+
+    def stmt(self, stmt: Stmt, indent: str):
+        if _is_simple(stmt):
+            self.lines.append(indent + self.simple(stmt))
+        elif isinstance(stmt, Block):
+            self.lines.append(indent + "{")
+            self.statements(stmt, indent + "  ")
+            self.lines.append(indent + "}")
+        elif isinstance(stmt, If):
+            head = f"{indent}if {format_expr(stmt.condition)}"
+            one_line = self.inline(stmt.body)
+            if one_line is not None:
+                self.lines.append(f"{head} {one_line}")
+            else:
+                self.braced(head, stmt.body, indent)
+        elif isinstance(stmt, Switch):
+            self.lines.append(f"{indent}switch {format_expr(stmt.expr)}")
+            for case in stmt.cases:
+                head = f"{indent}case {case.value.value}" if case.value is not None else f"{indent}default"
+                self.braced(head, case.body, indent)
+        elif isinstance(stmt, ForLoop):
+            init = self.inline(stmt.init) or self.flat(stmt.init)
+            post = self.inline(stmt.post) or self.flat(stmt.post)
+            self.braced(f"{indent}for {init} {format_expr(stmt.condition)} {post}", stmt.body, indent)
+        elif isinstance(stmt, FunctionDef):
+            head = f"{indent}function {stmt.name}({', '.join(stmt.params)})"
+            if stmt.returns:
+                head += f" -> {', '.join(stmt.returns)}"
+            self.braced(head, stmt.body, indent)
+        else:
+            raise TypeError(f"Cannot format {type(stmt).__name__}")
+
+    def object(self, obj: Object, indent: str):
+        self.lines.append(f'{indent}object "{obj.name}" {{')
+        self.braced(indent + "  code", obj.code, indent + "  ")
+        for child in obj.objects:
+            self.object(child, indent + "  ")
+        self.lines.append(indent + "}")
+
+
+def format_stmt(stmt: Stmt, indent: str = "") -> List[str]:
+    printer = _Printer()
+    printer.stmt(stmt, indent)
+    return printer.lines
+
+
+def format_function(function: FunctionDef, indent: str = "") -> str:
+    return '\n'.join(format_stmt(function, indent))
+
+
+def format_object(obj: Object) -> str:
+    printer = _Printer()
+    printer.object(obj, "")
+    return '\n'.join(printer.lines) + '\n'
@@ -1,14 +1,135 @@
-from typing import List
+from functools import lru_cache
+from typing import Dict, List, Optional
 from ..parser.dafny_ast import *
+from . import yul_ast as yul
+from .costs import GAS_BRANCH, estimate_gas, estimate_statements, is_boolean, is_side_effect_free
+from .cse import CommonSubexpressionElimination
+from .dse import DeadStoreElimination
+from .licm import LoopInvariantCodeMotion
+from .write_back import StorageWriteBack
+from .dispatch import DISPATCH_STRATEGIES, DispatchEntry, lower_dispatch, plan_dispatch
+from .gas_estimator import estimate_methods
+from .passes import PassManager
+from .storage_layout import (SIGNED_TYPES, FieldLocation, compute_layout, compute_struct_layouts,
+                             layout_artifact)
+from .yul_ast import call
+
+GLOBAL_VARS = {
+    'msg.sender': call('caller'),
+    'msg.value': call('callvalue'),
+    'msg.data': call('calldatasize'),
+    'msg.sig': call('shr', 224, call('calldataload', 0)),
+    'tx.origin': call('origin'),
+    'tx.gasprice': call('gasprice'),
+    'block.timestamp': call('timestamp'),
+    'block.number': call('number'),
+    'block.difficulty': call('difficulty'),
+    'block.gaslimit': call('gaslimit'),
+    'block.coinbase': call('coinbase'),
+    'block.chainid': call('chainid'),
+}
+
+
+def _lit(value) -> yul.Literal:
+    return yul.Literal(str(value))
+
+
+def _stmt(expr: yul.Expr) -> yul.ExprStmt:
+    return yul.ExprStmt(expr)
+
+
+def _revert_unless(condition: yul.Expr) -> yul.If:
+    return yul.If(call('iszero', condition), yul.Block([_stmt(call('revert', 0, 0))]))
+
+
+def _checked_condition(check: List[yul.Stmt]) -> Optional[yul.Expr]:
+    """The condition of a check that is a single _revert_unless, else None."""
+    if len(check) == 1 and isinstance(check[0], yul.If):
+        negated = check[0].condition
+        if isinstance(negated, yul.Call) and negated.name == 'iszero' and check[0] == _revert_unless(negated.args[0]):
+            return negated.args[0]
+    return None
+
+
+def _fold_cheap(op: str, operands: List[tuple]) -> Optional[yul.Expr]:
+    """Bitwise and/or of (prelude, value) operands too cheap to be worth a branch each, else None."""
+    if not all(not prelude and is_boolean(value) and is_side_effect_free(value) and estimate_gas(value) <= GAS_BRANCH
+               for prelude, value in operands):
+        return None
+    folded = operands[0][1]
+    for _, value in operands[1:]:
+        folded = call(op, folded, value)
+    return folded
+
+
+def _call_graph(contract: Contract) -> Dict[str, set]:
+    """Method name -> names of the methods (and 'constructor') that call it."""
+    names = {method.name for method in contract.methods}
+    callers: Dict[str, set] = {}
+
+    def visit(node, caller: str):
+        if isinstance(node, FunctionCall) and node.name in names:
+            callers.setdefault(node.name, set()).add(caller)
+        if isinstance(node, list):
+            for item in node:
+                visit(item, caller)
+        elif hasattr(node, '__dataclass_fields__'):
+            for value in vars(node).values():
+                visit(value, caller)
+
+    for method in contract.methods + [m for m in (contract.receive_method, contract.fallback_method) if m]:
+        visit(method.body, method.name)
+        visit(method.preconditions, method.name)
+    if contract.constructor:
+        visit(contract.constructor.body, 'constructor')
+    return callers
+
 
 class YulGenerator:
-    def __init__(self):
+    def __init__(self, dispatch: str = 'linear', dispatch_profile: Optional[Dict[str, float]] = None, *,
+                 pack_storage: bool = True, reorder_storage: bool = False, cse: bool = True,
+                 dse: bool = True, licm: bool = True, write_back: bool = False):
+        if dispatch not in DISPATCH_STRATEGIES:
+            raise ValueError(f"Unknown dispatch strategy '{dispatch}' (expected one of {', '.join(DISPATCH_STRATEGIES)})")
+        # Selector dispatch strategy and optional {signature or selector: call count}
+        self.dispatch = dispatch
+        self.dispatch_profile = dispatch_profile
+        # Share slots between small fields; reordering also changes slot numbers
+        self.pack_storage = pack_storage
+        self.reorder_storage = reorder_storage
+        # Reuse slot hashes and SLOADs within each function
+        self.cse = cse
+        # Drop SSTOREs that cannot change storage (constructor zero-init, overwritten stores)
+        self.dse = dse
+        # Move loop-invariant SLOADs and slot hashes out of loops, and sink repeated stores
+        self.licm = licm
+        # Keep fields in locals for the whole method, storing them back before exits and calls
+        self.write_back = write_back
+        # IR passes run between lowering and printing
+        self.passes = PassManager()
+        if licm:
+            self.passes.add(LoopInvariantCodeMotion())
+        if write_back:
+            self.passes.add(StorageWriteBack())
+        if cse:
+            self.passes.add(CommonSubexpressionElimination())
+        if dse:
+            self.passes.add(DeadStoreElimination())
         self.indent_level = 0
         self.storage_slots = {}
         self.next_slot = 0
         self.event_signatures = {}
         self.error_signatures = {}
         self.current_method = None  # Track current method for return handling
+        # Statements that must run before the expression being lowered
+        # (if-expressions), and a per-function counter for their temporaries
+        self._prelude = []
+        self._temp_counter = 0
+        # Set when Dafny verified the contract: checks it proved are not emitted
+        self.proven = False
+        self._function_name = None
+        self._elided = {}
+        self._callers = {}
         self.yul_builtins = {
             'add', 'sub', 'mul', 'div', 'mod', 'lt', 'gt', 'eq',
             'iszero', 'and', 'or', 'xor', 'not', 'shl', 'shr', 'sar',
@@ -24,70 +145,150 @@ class YulGenerator:
             'coinbase', 'byte', 'signextend', 'addmod', 'mulmod', 'exp',
             'sdiv', 'smod', 'slt', 'sgt', 'sha3', 'stop'
         }
-    
+
     def _safe_method_name(self, name: str) -> str:
         """Ensure method name doesn't conflict with Yul builtins"""
         if name.lower() in self.yul_builtins:
             return f"fn_{name}"
         return name
-    
-    def generate(self, contract: Contract) -> str:
+
+    def generate(self, contract: Contract, proven: bool = False) -> str:
+        return yul.format_object(self.generate_ir(contract, proven))
+
+    def generate_ir(self, contract: Contract, proven: bool = False) -> yul.Object:
+        """
+        Lower a contract to a Yul object and run the IR passes over it.
+
+        `proven` means Dafny verified this contract: the preconditions of
+        internal methods (every caller was proven to meet them) and assert
+        statements are then not checked at runtime. See elided_checks().
+        """
         # Reset state for deterministic compilation
         self.storage_slots = {}
+        self.field_locations = {}
         self.next_slot = 0
         self.event_signatures = {}
         self.error_signatures = {}
         self.struct_layouts = {}
+        self.struct_slots = {}
         self.contract = contract  # Store contract for modifier access
         self.constants = contract.constants  # Store ghost constants
+        self.proven = proven
+        self._elided = {}
+        self._callers = _call_graph(contract) if proven else {}
         self.free_memory_pointer = 0x40  # Standard free memory pointer location
         self.next_free_memory = 0x80     # Start allocating after 0x80
-        
+
         self._compute_struct_layouts(contract.structs)
         self._allocate_storage(contract.fields)
         self._compute_event_signatures(contract.events)
         self._compute_error_signatures(contract.errors)
-        
-        yul_code = f"object \"{contract.name}\" {{\n"
-        yul_code += f"  code {{\n"
-        yul_code += self._generate_constructor(contract)
-        yul_code += f"    datacopy(0, dataoffset(\"runtime\"), datasize(\"runtime\"))\n"
-        yul_code += f"    return(0, datasize(\"runtime\"))\n"
-        yul_code += f"  }}\n"
-        yul_code += f"  object \"runtime\" {{\n"
-        yul_code += f"    code {{\n"
-        yul_code += self._generate_dispatcher(contract.methods)
-        yul_code += self._generate_methods(contract.methods)
-        yul_code += f"    }}\n"
-        yul_code += f"  }}\n"
-        yul_code += f"}}\n"
-        
-        return yul_code
-    
+
+        runtime_name = yul.Literal('"runtime"')
+        constructor = self._generate_constructor(contract)
+        constructor.append(_stmt(call('datacopy', 0, call('dataoffset', runtime_name), call('datasize', runtime_name))))
+        constructor.append(_stmt(call('return', 0, call('datasize', runtime_name))))
+        runtime = self._generate_dispatcher(contract.methods) + self._generate_methods(contract.methods)
+        obj = yul.Object(contract.name, yul.Block(constructor), [yul.Object('runtime', yul.Block(runtime))])
+        self._ir = self.passes.run(obj)
+        return self._ir
+
     def _allocate_storage(self, fields: List[Variable]):
-        # Use declaration order, not alphabetical
-        for field in fields:
-            if field.type.base == Type.STRUCT:
-                # Structs take multiple slots based on field count
-                struct_name = field.type.struct_name
-                if struct_name in self.struct_layouts:
-                    field_count = len(self.struct_layouts[struct_name])
-                    self.storage_slots[field.name] = self.next_slot
-                    self.next_slot += field_count
-                else:
-                    self.storage_slots[field.name] = self.next_slot
-                    self.next_slot += 1
-            else:
-                self.storage_slots[field.name] = self.next_slot
-                self.next_slot += 1
-    
+        # Use declaration order, not alphabetical (unless reordering to save slots)
+        self.field_locations, self.next_slot = compute_layout(
+            fields, self.struct_slots, self.pack_storage, self.reorder_storage)
+        self.field_types = {field.name: field.type for field in fields}
+        self.storage_slots = {name: location.slot for name, location in self.field_locations.items()}
+
     def _compute_struct_layouts(self, structs: List[Struct]):
-        for struct in structs:
-            layout = {}
-            for i, field in enumerate(struct.fields):
-                layout[field.name] = i
-            self.struct_layouts[struct.name] = layout
-    
+        self.struct_layouts, self.struct_slots = compute_struct_layouts(structs, self.pack_storage)
+
+    def storage_layout(self) -> dict:
+        """Storage layout of the last generated contract, in solc's storageLayout shape."""
+        return layout_artifact(self.contract.name, self.contract.fields, self.field_locations,
+                               self.contract.structs, self.struct_layouts, self.struct_slots)
+
+    def elided_checks(self) -> dict:
+        """Runtime checks left out of the last proven contract, per function: count, estimated gas and bytes."""
+        return {name: dict(entry) for name, entry in self._elided.items()}
+
+    def gas_estimates(self) -> dict:
+        """Best, typical and worst execution gas of each entry point of the last contract, by signature."""
+        return estimate_methods(self._ir, self._entries)
+
+    def _elide(self, checks: List[yul.Stmt]):
+        gas, size = estimate_statements(checks)
+        entry = self._elided.setdefault(self._function_name, {'checks': 0, 'gas': 0, 'bytes': 0})
+        entry['checks'] += 1
+        entry['gas'] += gas
+        entry['bytes'] += size
+        if self._function_name in self._callers:
+            entry['callers'] = sorted(self._callers[self._function_name])
+
+    def _load_storage(self, slot: int, location: FieldLocation, dtype: Optional[DafnyType]) -> yul.Expr:
+        value = call('sload', slot)
+        if not location.packed:
+            return value
+        if location.shift:
+            value = call('shr', location.shift, value)
+        value = call('and', value, yul.Literal(location.mask))
+        if dtype is not None and dtype.base in SIGNED_TYPES:
+            value = call('signextend', location.size - 1, value)
+        return value
+
+    def _store_storage(self, slot: int, location: FieldLocation, value: yul.Expr) -> List[yul.Stmt]:
+        if not location.packed:
+            return [_stmt(call('sstore', slot, value))]
+        # Read-modify-write: clear this field's bytes, then merge the new value
+        field_mask = yul.Literal(hex(((1 << (location.size * 8)) - 1) << location.shift))
+        kept = call('and', call('sload', slot), call('not', field_mask))
+        constant = self._constant_value(value)
+        if constant is not None:
+            new_bits = hex((constant & int(location.mask, 16)) << location.shift)
+            if new_bits == '0x0':
+                return [_stmt(call('sstore', slot, kept))]
+            new_bits = yul.Literal(new_bits)
+        else:
+            new_bits = call('and', value, yul.Literal(location.mask))
+            if location.shift:
+                new_bits = call('shl', location.shift, new_bits)
+        return [_stmt(call('sstore', slot, call('or', kept, new_bits)))]
+
+    @staticmethod
+    def _constant_value(value: yul.Expr) -> Optional[int]:
+        """Integer value of a literal Yul expression, or None."""
+        if not isinstance(value, yul.Literal):
+            return None
+        if value.value == 'true':
+            return 1
+        if value.value == 'false':
+            return 0
+        try:
+            return int(value.value, 0)
+        except ValueError:
+            return None
+
+    def _load_field(self, name: str) -> yul.Expr:
+        return self._load_storage(self.storage_slots[name], self.field_locations[name], self.field_types.get(name))
+
+    def _store_field(self, name: str, value: yul.Expr) -> List[yul.Stmt]:
+        return self._store_storage(self.storage_slots[name], self.field_locations[name], value)
+
+    def _struct_member(self, struct_field: str, member: str):
+        """(struct layout member location, member type) for field.member, or (None, None)."""
+        dtype = self.field_types.get(struct_field)
+        candidates = []
+        if dtype is not None and dtype.struct_name in self.struct_layouts:
+            candidates.append(dtype.struct_name)
+        candidates.extend(self.struct_layouts)
+        for struct_name in candidates:
+            layout = self.struct_layouts[struct_name]
+            if member in layout:
+                struct = next((s for s in self.contract.structs if s.name == struct_name), None)
+                member_type = next((f.type for f in struct.fields if f.name == member), None) if struct else None
+                return layout[member], member_type
+        return None, None
+
     def _compute_event_signatures(self, events: List[Event]):
         from Crypto.Hash import keccak
         for event in events:
@@ -96,7 +297,7 @@ class YulGenerator:
             k = keccak.new(digest_bits=256)
             k.update(signature.encode())
             self.event_signatures[event.name] = '0x' + k.hexdigest()
-    
+
     def _compute_error_signatures(self, errors: List[CustomError]):
         from Crypto.Hash import keccak
         for error in errors:
@@ -106,10 +307,17 @@ class YulGenerator:
             k.update(signature.encode())
             # Error selector is first 4 bytes
             self.error_signatures[error.name] = '0x' + k.hexdigest()[:8]
-    
-    def _generate_constructor(self, contract: Contract) -> str:
-        code = ""
-        
+
+    @staticmethod
+    def _hash_helper(name: str, params: List[str], preimage_bytes: int) -> yul.FunctionDef:
+        """keccak256 over its arguments stored at memory offset 0."""
+        body = [_stmt(call('mstore', i * 32, param)) for i, param in enumerate(params)]
+        body.append(yul.Assign(['result'], call('keccak256', 0, preimage_bytes)))
+        return yul.FunctionDef(name, params, ['result'], yul.Block(body))
+
+    def _generate_constructor(self, contract: Contract) -> List[yul.Stmt]:
+        code = []
+
         # Check if constructor uses mappings/arrays (needs helper functions)
         needs_helpers = False
         if contract.constructor:
@@ -122,235 +330,189 @@ class YulGenerator:
                     if isinstance(stmt.value, MapUpdate):
                         needs_helpers = True
                         break
-        
+
         # Add helper functions if needed
         if needs_helpers:
-            code += "    function keccak256_mapping(slot, key) -> result {\n"
-            code += "      mstore(0, slot)\n"
-            code += "      mstore(32, key)\n"
-            code += "      result := keccak256(0, 64)\n"
-            code += "    }\n\n"
-        
-        # Initialize all fields to 0 first
-        for field in contract.fields:
-            code += f"    sstore({self.storage_slots[field.name]}, 0)\n"
-        
+            code.append(self._hash_helper('keccak256_mapping', ['slot', 'key'], 64))
+
+        # Initialize all fields to 0 first (packed fields share a slot)
+        for slot in dict.fromkeys(self.storage_slots[field.name] for field in contract.fields):
+            code.append(_stmt(call('sstore', slot, 0)))
+
         # Execute constructor body if present
         if contract.constructor:
-            # Load constructor parameters from calldata
-            offset = 0
-            for param in contract.constructor.params:
-                code += f"    let {param.name} := calldataload({offset})\n"
-                offset += 32
-            
+            self._function_name = 'constructor'
+            # Constructor arguments are ABI-encoded after the creation code
+            params = contract.constructor.params
+            if params:
+                program_size = call('datasize', yul.Literal(f'"{contract.name}"'))
+                code.append(_stmt(call('codecopy', 0, program_size, call('sub', call('codesize'), program_size))))
+            for i, param in enumerate(params):
+                code.append(yul.VarDecl([param.name], call('mload', i * 32)))
+
+            self._temp_counter = 0
             for stmt in contract.constructor.body:
-                code += self._generate_statement(stmt, 2)
-        
+                code += self._generate_statement(stmt)
+
         return code
-    
-    def _generate_dispatcher(self, methods: List[Method]) -> str:
-        code = ""
-        
-        # Calldata bounds checking
-        code += "      if lt(calldatasize(), 4) {\n"
-        code += "        // Check for receive function (no calldata, has value)\n"
-        
-        # Check for receive function (no calldata, has value)
-        if self.contract.receive_method:
-            code += "        if callvalue() {\n"
-            code += "          receive_fn()\n"
-            code += "          return(0, 0)\n"
-            code += "        }\n"
-        
-        # Check for fallback function (no matching selector or no calldata)
+
+    def _generate_dispatcher(self, methods: List[Method]) -> List[yul.Stmt]:
+        # No selector: receive function (no calldata, has value), fallback or revert
         has_fallback = self.contract.fallback_method is not None
-        if has_fallback:
-            code += "        fallback_fn()\n"
-        else:
-            code += "        revert(0, 0)\n"
-        code += "      }\n\n"
-        
-        code += "      let selector := shr(224, calldataload(0))\n"
-        
-        # Generate dispatch for regular methods
-        for method in methods:
-            if method.is_public:
-                sig = self._method_signature(method)
-                selector = self._compute_selector(sig)
-                safe_name = self._safe_method_name(method.name)
-                code += f"      if eq(selector, {selector}) {{\n"
-                code += f"        {safe_name}()\n"
-                code += f"      }}\n"
-        
-        # Generate dispatch for getter methods
-        code += self._generate_getter_methods(self.contract.fields)
-        
+        no_match = _stmt(call('fallback_fn')) if has_fallback else _stmt(call('revert', 0, 0))
+        short_calldata = []
+        if self.contract.receive_method:
+            short_calldata.append(yul.If(call('callvalue'), yul.Block([
+                _stmt(call('receive_fn')),
+                _stmt(call('return', 0, 0)),
+            ])))
+        short_calldata.append(no_match)
+        code = [
+            yul.If(call('lt', call('calldatasize'), 4), yul.Block(short_calldata)),
+            yul.VarDecl(['selector'], call('shr', 224, call('calldataload', 0))),
+        ]
+
+        # Dispatch to regular methods and getters
+        entries = self._dispatch_entries(methods) + self._getter_dispatch_entries(self.contract.fields)
+        self._entries = entries
+        code += lower_dispatch(plan_dispatch(entries, self.dispatch, self.dispatch_profile))
+
         # If no method matched, handle fallback or revert
-        if has_fallback:
-            code += "      fallback_fn()\n"
-        else:
-            code += "      revert(0, 0)\n"
-        
-        code += "\n"
+        code.append(no_match)
         return code
-    
-    def _generate_methods(self, methods: List[Method]) -> str:
-        code = ""
+
+    def _generate_methods(self, methods: List[Method]) -> List[yul.Stmt]:
         # Initialize free memory pointer
-        code += "      // Initialize free memory pointer\n"
-        code += f"      mstore({self.free_memory_pointer}, {self.next_free_memory})\n\n"
-        
+        code = [_stmt(call('mstore', self.free_memory_pointer, self.next_free_memory))]
+
         # Add helper function for memory allocation
-        code += "      function allocate_memory(size) -> ptr {\n"
-        code += f"        ptr := mload({self.free_memory_pointer})\n"
-        code += "        mstore(0x40, add(ptr, size))\n"
-        code += "      }\n\n"
-        
+        code.append(yul.FunctionDef('allocate_memory', ['size'], ['ptr'], yul.Block([
+            yul.Assign(['ptr'], call('mload', self.free_memory_pointer)),
+            _stmt(call('mstore', yul.Literal('0x40'), call('add', 'ptr', 'size'))),
+        ])))
+
         # Add helper function for mapping storage (always include since getters need it)
-        code += "      function keccak256_mapping(slot, key) -> result {\n"
-        code += "        mstore(0, slot)\n"
-        code += "        mstore(32, key)\n"
-        code += "        result := keccak256(0, 64)\n"
-        code += "      }\n\n"
-        
+        code.append(self._hash_helper('keccak256_mapping', ['slot', 'key'], 64))
         # Add helper for keccak256 hash
-        code += "      function keccak256_hash(value) -> result {\n"
-        code += "        mstore(0, value)\n"
-        code += "        result := keccak256(0, 32)\n"
-        code += "      }\n\n"
-        
+        code.append(self._hash_helper('keccak256_hash', ['value'], 32))
         # Add helper for array base location
-        code += "      function keccak256_single(slot) -> result {\n"
-        code += "        mstore(0, slot)\n"
-        code += "        result := keccak256(0, 32)\n"
-        code += "      }\n\n"
-        
+        code.append(self._hash_helper('keccak256_single', ['slot'], 32))
+
         # Generate receive function if present
         if self.contract.receive_method:
-            code += self._generate_special_function(self.contract.receive_method, "receive_fn")
-        
+            code.append(self._generate_special_function(self.contract.receive_method, "receive_fn"))
+
         # Generate fallback function if present
         if self.contract.fallback_method:
-            code += self._generate_special_function(self.contract.fallback_method, "fallback_fn")
-        
+            code.append(self._generate_special_function(self.contract.fallback_method, "fallback_fn"))
+
         # Generate getter functions (they depend on helper functions above)
         code += self._generate_getter_functions(self.contract.fields)
-        
+
         # Generate regular methods
         for method in methods:
-            code += self._generate_method(method)
+            code.append(self._generate_method(method))
         return code
-    
-    def _generate_special_function(self, method: Method, fn_name: str) -> str:
-        code = f"      function {fn_name}() {{\n"
-        
-        # Generate body (indent level 4 for inside function)
+
+    def _generate_special_function(self, method: Method, fn_name: str) -> yul.FunctionDef:
+        self._temp_counter = 0
+        self._function_name = method.name
+        body = []
         for stmt in method.body:
-            code += self._generate_statement(stmt, indent=4)
-        
-        code += "      }\n\n"
-        return code
-    
-    def _generate_getter_methods(self, fields: List[Variable]) -> str:
-        code = ""
+            body += self._generate_statement(stmt)
+        return yul.FunctionDef(fn_name, [], [], yul.Block(body))
+
+    def _dispatch_entries(self, methods: List[Method]) -> List[DispatchEntry]:
+        entries = []
+        for method in methods:
+            if method.is_public:
+                sig = self._method_signature(method)
+                entries.append(DispatchEntry(self._compute_selector(sig), sig, self._safe_method_name(method.name)))
+        return entries
+
+    def _getter_dispatch_entries(self, fields: List[Variable]) -> List[DispatchEntry]:
+        entries = []
         for field in fields:
             if field.is_public:
                 getter_name = self._safe_method_name(field.name)
                 sig = f"{field.name}("
-                
                 if field.type.base == Type.MAPPING:
                     # Mapping getter: takes key parameter
                     key_type = field.type.key_type.base.value
                     sig += f"{key_type})"
-                    selector = self._compute_selector(sig)
-                    
-                    code += f"      if eq(selector, {selector}) {{\n"
-                    code += f"        {getter_name}_getter()\n"
-                    code += f"      }}\n"
                 else:
                     # Simple variable getter: no parameters
                     sig += ")"
-                    selector = self._compute_selector(sig)
-                    
-                    code += f"      if eq(selector, {selector}) {{\n"
-                    code += f"        {getter_name}_getter()\n"
-                    code += f"      }}\n"
-        
-        return code
-    
-    def _generate_getter_functions(self, fields: List[Variable]) -> str:
-        code = ""
+                entries.append(DispatchEntry(self._compute_selector(sig), sig, f"{getter_name}_getter"))
+
+        return entries
+
+    def _return_word(self, value: yul.Expr) -> List[yul.Stmt]:
+        """ABI-return a single 32-byte word."""
+        return [
+            yul.VarDecl(['_return_ptr'], call('allocate_memory', 32)),
+            _stmt(call('mstore', '_return_ptr', value)),
+            _stmt(call('return', '_return_ptr', 32)),
+        ]
+
+    def _generate_getter_functions(self, fields: List[Variable]) -> List[yul.FunctionDef]:
+        functions = []
         for field in fields:
             if field.is_public:
                 getter_name = self._safe_method_name(field.name)
-                
+                body = [yul.If(call('callvalue'), yul.Block([_stmt(call('revert', 0, 0))]))]
                 if field.type.base == Type.MAPPING:
-                    # Mapping getter function
-                    code += f"      function {getter_name}_getter() {{\n"
-                    code += "        if callvalue() { revert(0, 0) }\n"
-                    code += "        let key := calldataload(4)\n"  # First parameter at offset 4
+                    # Mapping getter: key is the first parameter, at offset 4
+                    body.append(yul.VarDecl(['key'], call('calldataload', 4)))
                     slot = self.storage_slots[field.name]
-                    code += f"        let value := sload(keccak256_mapping({slot}, key))\n"
-                    code += "        let _return_ptr := allocate_memory(32)\n"
-                    code += "        mstore(_return_ptr, value)\n"
-                    code += "        return(_return_ptr, 32)\n"
-                    code += "      }\n\n"
+                    value = call('sload', call('keccak256_mapping', slot, 'key'))
                 else:
-                    # Simple variable getter function
-                    code += f"      function {getter_name}_getter() {{\n"
-                    code += "        if callvalue() { revert(0, 0) }\n"
-                    slot = self.storage_slots[field.name]
-                    code += f"        let value := sload({slot})\n"
-                    code += "        let _return_ptr := allocate_memory(32)\n"
-                    code += "        mstore(_return_ptr, value)\n"
-                    code += "        return(_return_ptr, 32)\n"
-                    code += "      }\n\n"
-        
-        return code
-    
-    def _generate_method(self, method: Method) -> str:
+                    value = self._load_field(field.name)
+                body.append(yul.VarDecl(['value'], value))
+                body += self._return_word(yul.Identifier('value'))
+                functions.append(yul.FunctionDef(f"{getter_name}_getter", [], [], yul.Block(body)))
+
+        return functions
+
+    def _generate_method(self, method: Method) -> yul.FunctionDef:
         self.current_method = method  # Set context
+        self._function_name = method.name
+        self._temp_counter = 0
         safe_name = self._safe_method_name(method.name)
-        
+
         # For internal/private methods, generate proper function signatures with returns
         is_internal = method.visibility in ['internal', 'private']
-        
+
+        params = []
+        returns = []
         if is_internal:
-            # Generate internal function with parameters and return values
-            params = ', '.join(param.name for param in method.params)
-            
-            returns_sig = ""
+            # Internal functions take parameters and return values on the stack
+            params = [param.name for param in method.params]
             if method.returns:
                 if isinstance(method.returns, list):
-                    return_names = ', '.join(self._safe_method_name(r.name) for r in method.returns)
-                    returns_sig = f" -> {return_names}"
+                    returns = [self._safe_method_name(r.name) for r in method.returns]
                 else:
                     # Single unnamed return
-                    returns_sig = " -> result"
-            
-            code = f"      function {safe_name}({params}){returns_sig} {{\n"
-        else:
-            # External/public methods use calldata
-            code = f"      function {safe_name}() {{\n"
-        
+                    returns = ['result']
+
+        body = []
         # Non-payable check (only for external/public)
         if not is_internal and not method.is_payable:
-            code += f"        if callvalue() {{ revert(0, 0) }}\n"
-        
+            body.append(yul.If(call('callvalue'), yul.Block([_stmt(call('revert', 0, 0))])))
+
         # Load parameters from calldata (only for external/public)
         if not is_internal:
             offset = 4
-            for i, param in enumerate(method.params):
-                code += f"        let {param.name} := calldataload({offset})\n"
+            for param in method.params:
+                body.append(yul.VarDecl([param.name], call('calldataload', offset)))
                 offset += 32
-        
+
         # Declare return variables if they have names (only for external/public)
         if not is_internal and method.returns:
             if isinstance(method.returns, list):
                 for ret_var in method.returns:
-                    var_name = self._safe_method_name(ret_var.name)
-                    code += f"        let {var_name} := 0\n"
-        
+                    body.append(yul.VarDecl([self._safe_method_name(ret_var.name)], _lit(0)))
+
         # Inject modifier checks
         if hasattr(method, 'modifiers') and method.modifiers:
             for modifier_name in method.modifiers:
@@ -361,490 +523,445 @@ class YulGenerator:
                             # Inject modifier body (requires statements)
                             for stmt in modifier.body:
                                 if isinstance(stmt, Require):
-                                    code += f"        if iszero({self._generate_expr(stmt.condition)}) {{ revert(0, 0) }}\n"
-        
+                                    body += self._generate_check(stmt.condition)
+
+        # Dafny proved every call site meets an internal method's preconditions;
+        # external callers are not verified, so public methods keep theirs
+        trust_preconditions = self.proven and is_internal and not method.is_public
         for precond in method.preconditions:
-            code += f"        if iszero({self._generate_expr(precond)}) {{ revert(0, 0) }}\n"
-        
+            checks = self._generate_check(precond)
+            if trust_preconditions:
+                self._elide(checks)
+            else:
+                body += checks
+
         for stmt in method.body:
-            code += self._generate_statement(stmt, 2)
-        
+            body += self._generate_statement(stmt)
+
         # Add implicit return for void methods (no explicit return in body)
         has_return = any(isinstance(stmt, Return) for stmt in method.body)
         if not has_return and not is_internal:
             # Only add implicit returns for external/public methods
             if method.returns:
                 # Has return type but no return statement - return default values
-                if isinstance(method.returns, list):
-                    code += "    let _return_ptr := allocate_memory(32)\n"
-                    code += "    mstore(_return_ptr, 0)\n"
-                    code += f"    return(_return_ptr, {len(method.returns) * 32})\n"
-                else:
-                    code += "    let _return_ptr := allocate_memory(32)\n"
-                    code += "    mstore(_return_ptr, 0)\n"
-                    code += "    return(_return_ptr, 32)\n"
+                size = len(method.returns) * 32 if isinstance(method.returns, list) else 32
+                body += [
+                    yul.VarDecl(['_return_ptr'], call('allocate_memory', 32)),
+                    _stmt(call('mstore', '_return_ptr', 0)),
+                    _stmt(call('return', '_return_ptr', size)),
+                ]
             else:
                 # Void method - return empty
-                code += "    return(0, 0)\n"
-        
-        code += f"      }}\n\n"
+                body.append(_stmt(call('return', 0, 0)))
+
         self.current_method = None  # Clear context
-        return code
-    
-    def _generate_statement(self, stmt: Statement, indent: int) -> str:
-        ind = "  " * indent
-        
+        return yul.FunctionDef(safe_name, params, returns, yul.Block(body))
+
+    def _capture(self, lower):
+        """(prelude, result) of lower(), with the prelude kept out of the enclosing one."""
+        outer, self._prelude = self._prelude, []
+        try:
+            result = lower()
+            return self._prelude, result
+        finally:
+            self._prelude = outer
+
+    def _temp(self, prefix: str) -> str:
+        name = f"{prefix}_{self._temp_counter}"
+        self._temp_counter += 1
+        return name
+
+    def _generate_check(self, condition: Expression) -> List[yul.Stmt]:
+        """Revert unless condition holds, testing && and || operands one at a time."""
+        if isinstance(condition, BinaryOp) and condition.op == '&&':
+            checks = [self._generate_check(operand) for operand in self._logical_chain(condition)]
+            conditions = [_checked_condition(check) for check in checks]
+            if all(cond is not None and is_side_effect_free(cond) for cond in conditions):
+                folded = _fold_cheap('and', [([], cond) for cond in conditions])
+                if folded is not None:
+                    return [_revert_unless(folded)]
+                # Any failing check reverts, so test the cheapest first
+                checks = [check for _, check in sorted(zip(conditions, checks), key=lambda c: estimate_gas(c[0]))]
+            return [stmt for check in checks for stmt in check]
+        if isinstance(condition, BinaryOp) and condition.op == '||':
+            operands = self._logical_operands(condition)
+            folded = _fold_cheap('or', operands)
+            if folded is not None:
+                return [_revert_unless(folded)]
+            prelude, value = operands[-1]
+            code = prelude + [_revert_unless(value)]
+            for prelude, value in reversed(operands[:-1]):
+                code = prelude + [yul.If(call('iszero', value), yul.Block(code))]
+            return code
+        prelude, value = self._capture(lambda: self._generate_expr(condition))
+        return prelude + [_revert_unless(value)]
+
+    @staticmethod
+    def _logical_chain(expr: BinaryOp) -> List[Expression]:
+        """Operands of a chain of one logical operator: a && (b && c) -> [a, b, c]."""
+        if isinstance(expr, BinaryOp) and expr.op in ('&&', '||'):
+            operands = []
+            for side in (expr.left, expr.right):
+                if isinstance(side, BinaryOp) and side.op == expr.op:
+                    operands += YulGenerator._logical_chain(side)
+                else:
+                    operands.append(side)
+            return operands
+        return [expr]
+
+    def _logical_operands(self, expr: BinaryOp) -> List[tuple]:
+        """Lowered (prelude, value) operands of a && or || chain, in evaluation order.
+
+        Either operator can stop at any operand, so when no operand has side
+        effects the cheapest are evaluated first.
+        """
+        operands = [self._capture(lambda operand=operand: self._generate_expr(operand))
+                    for operand in self._logical_chain(expr)]
+        if all(not prelude and is_side_effect_free(value) for prelude, value in operands):
+            operands.sort(key=lambda operand: estimate_gas(operand[1]))
+        return operands
+
+    def _short_circuit(self, expr: BinaryOp) -> yul.Expr:
+        """a && b / a || b in a temporary, evaluating b only when a does not decide the result."""
+        operands = self._logical_operands(expr)
+        is_and = expr.op == '&&'
+        folded = _fold_cheap('and' if is_and else 'or', operands)
+        if folded is not None:
+            return folded
+        temp = self._temp('_and' if is_and else '_or')
+        guard = yul.Identifier(temp) if is_and else call('iszero', temp)
+        code = []
+        for prelude, value in reversed(operands[1:]):
+            code = [yul.If(guard, yul.Block(prelude + [yul.Assign([temp], value)] + code))]
+        prelude, value = operands[0]
+        self._prelude += prelude + [yul.VarDecl([temp], value)] + code
+        return yul.Identifier(temp)
+
+    def _conditional_into(self, target: str, expr: IfExpression) -> List[yul.Stmt]:
+        """Assign one branch of an if-expression to target, evaluating the condition once."""
+        condition = self._generate_expr(expr.condition)
+        return [self._branch(condition, self._assign_branch(target, expr.then_expr),
+                             self._assign_branch(target, expr.else_expr))]
+
+    def _assign_branch(self, target: str, expr: Expression) -> yul.Block:
+        if isinstance(expr, IfExpression):
+            # Nested conditionals assign the target directly
+            prelude, code = self._capture(lambda: self._conditional_into(target, expr))
+        else:
+            prelude, value = self._capture(lambda: self._generate_expr(expr))
+            code = [yul.Assign([target], value)]
+        return yul.Block(prelude + code)
+
+    def _branch(self, condition: yul.Expr, then_body: yul.Block, else_body: yul.Block) -> yul.Stmt:
+        return yul.Switch(condition, [yul.Case(_lit(0), else_body), yul.Case(None, then_body)])
+
+    def _loop(self, init: yul.Block, condition: Expression, update: yul.Block,
+              body: List[Statement]) -> List[yul.Stmt]:
+        prelude, value = self._capture(lambda: self._generate_expr(condition))
+        body = self._generate_block(body)
+        if not prelude:
+            return [yul.ForLoop(init, value, update, body)]
+        # The condition needs statements: evaluate it at the top of every iteration
+        exit_check = yul.If(call('iszero', value), yul.Block([yul.Break()]))
+        return [yul.ForLoop(init, _lit(1), update, yul.Block(prelude + [exit_check] + body.statements))]
+
+    def _map_updates(self, value: MapUpdate) -> list:
+        """(key, value) pairs of a chain of functional updates m[k1 := v1][k2 := v2]."""
+        updates = []
+        current = value
+        while isinstance(current, MapUpdate):
+            updates.append((current.key, current.value))
+            if isinstance(current.base, MapUpdate):
+                current = current.base
+            else:
+                break
+        # Innermost first
+        return list(reversed(updates))
+
+    def _generate_statement(self, stmt: Statement) -> List[yul.Stmt]:
+        prelude, code = self._capture(lambda: self._lower_statement(stmt))
+        return prelude + code
+
+    def _lower_statement(self, stmt: Statement) -> List[yul.Stmt]:
         if isinstance(stmt, VarDecl):
-            init = self._generate_expr(stmt.init) if stmt.init else "0"
-            
-            # Handle if expressions
-            if init.startswith("IF_EXPR("):
-                # Extract: IF_EXPR(cond, then, else) - handle nested parens/commas
-                depth = 0
-                parts = []
-                current = ""
-                for i, char in enumerate(init[8:-1]):  # Skip "IF_EXPR(" and ")"
-                    if char in '([':
-                        depth += 1
-                        current += char
-                    elif char in ')]':
-                        depth -= 1
-                        current += char
-                    elif char == ',' and depth == 0:
-                        parts.append(current.strip())
-                        current = ""
-                    else:
-                        current += char
-                if current:
-                    parts.append(current.strip())
-                
-                if len(parts) == 3:
-                    cond, then_val, else_val = parts
-                    code = f"{ind}let {stmt.var.name} := 0\n"
-                    code += f"{ind}if {cond} {{ {stmt.var.name} := {then_val} }}\n"
-                    code += f"{ind}if iszero({cond}) {{ {stmt.var.name} := {else_val} }}\n"
-                    return code
-            
-            return f"{ind}let {stmt.var.name} := {init}\n"
-        
+            if isinstance(stmt.init, IfExpression):
+                return [yul.VarDecl([stmt.var.name], _lit(0))] + self._conditional_into(stmt.var.name, stmt.init)
+            init = self._generate_expr(stmt.init) if stmt.init else _lit(0)
+            return [yul.VarDecl([stmt.var.name], init)]
+
         if isinstance(stmt, Assignment):
-            # Check if value is a functional map update: map := map[key := value]
+            # Functional map update: map := map[key := value]
             if isinstance(stmt.value, MapUpdate):
-                # Convert functional update to imperative assignment
-                # Extract all updates from nested MapUpdate structure
-                updates = []
-                current = stmt.value
-                while isinstance(current, MapUpdate):
-                    updates.append((current.key, current.value))
-                    if isinstance(current.base, MapUpdate):
-                        current = current.base
-                    else:
-                        break
-                
-                # Generate imperative assignments
-                # For: map := map[k1 := v1][k2 := v2]
-                # Generate: sstore(keccak256(slot, k1), v1); sstore(keccak256(slot, k2), v2)
-                code = ""
+                # Becomes sstore(keccak256_mapping(slot, k1), v1); sstore(keccak256_mapping(slot, k2), v2)
+                code = []
                 slot = self.storage_slots.get(stmt.target, 0)
-                
-                # Reverse to process innermost first
-                for key_expr, val_expr in reversed(updates):
+                for key_expr, val_expr in self._map_updates(stmt.value):
                     key = self._generate_expr(key_expr)
-                    value = self._generate_expr(val_expr)
-                    
-                    # Check if this is a nested map update (value is MapUpdate)
                     if isinstance(val_expr, MapUpdate):
                         # Nested: allowances[owner := allowances[owner][spender := amount]]
-                        # First level: owner -> inner map
-                        # Second level: spender -> amount
-                        inner_updates = []
-                        inner_current = val_expr
-                        while isinstance(inner_current, MapUpdate):
-                            inner_updates.append((inner_current.key, inner_current.value))
-                            if isinstance(inner_current.base, MapUpdate):
-                                inner_current = inner_current.base
-                            else:
-                                break
-                        
-                        # Generate nested storage access
-                        for inner_key_expr, inner_val_expr in reversed(inner_updates):
-                            inner_key = self._generate_expr(inner_key_expr)
-                            inner_value = self._generate_expr(inner_val_expr)
-                            storage_loc = f"keccak256_mapping(keccak256_mapping({slot}, {key}), {inner_key})"
-                            code += f"{ind}sstore({storage_loc}, {inner_value})\n"
+                        for inner_key_expr, inner_val_expr in self._map_updates(val_expr):
+                            storage_loc = call('keccak256_mapping', call('keccak256_mapping', slot, key),
+                                               self._generate_expr(inner_key_expr))
+                            code.append(_stmt(call('sstore', storage_loc, self._generate_expr(inner_val_expr))))
                     else:
-                        # Simple update
-                        storage_loc = f"keccak256_mapping({slot}, {key})"
-                        code += f"{ind}sstore({storage_loc}, {value})\n"
-                
+                        storage_loc = call('keccak256_mapping', slot, key)
+                        code.append(_stmt(call('sstore', storage_loc, self._generate_expr(val_expr))))
                 return code
-            
+
             if stmt.indices:  # Nested mapping/array assignment: arr[i][j] := value
-                slot = self.storage_slots.get(stmt.target, 0)
-                # Compute nested storage location
-                # For allowances[owner][spender], compute: keccak256(keccak256(slot, owner), spender)
-                storage_loc = str(slot)
+                # allowances[owner][spender] is at keccak256(keccak256(slot, owner), spender)
+                storage_loc = _lit(self.storage_slots.get(stmt.target, 0))
                 for idx in stmt.indices:
-                    key = self._generate_expr(idx)
-                    storage_loc = f"keccak256_mapping({storage_loc}, {key})"
-                value = self._generate_expr(stmt.value)
-                return f"{ind}sstore({storage_loc}, {value})\n"
+                    storage_loc = call('keccak256_mapping', storage_loc, self._generate_expr(idx))
+                return [_stmt(call('sstore', storage_loc, self._generate_expr(stmt.value)))]
             elif stmt.index:  # Single-level array/mapping assignment
                 slot = self.storage_slots.get(stmt.target, 0)
                 key = self._generate_expr(stmt.index)
-                value = self._generate_expr(stmt.value)
-                return f"{ind}sstore(keccak256_mapping({slot}, {key}), {value})\n"
+                return [_stmt(call('sstore', call('keccak256_mapping', slot, key), self._generate_expr(stmt.value)))]
             elif '.' in stmt.target:  # Struct field assignment
                 parts = stmt.target.split('.')
                 if len(parts) == 2:
                     struct_name, field_name = parts
                     base_slot = self.storage_slots.get(struct_name, 0)
-                    # Find field offset
-                    for struct_type, layout in self.struct_layouts.items():
-                        if field_name in layout:
-                            offset = layout[field_name]
-                            value = self._generate_expr(stmt.value)
-                            return f"{ind}sstore({base_slot + offset}, {value})\n"
-                    # Fallback
                     value = self._generate_expr(stmt.value)
-                    return f"{ind}sstore({base_slot}, {value})\n"
+                    member, _ = self._struct_member(struct_name, field_name)
+                    if member is not None:
+                        return self._store_storage(base_slot + member.slot, member, value)
+                    # Fallback
+                    return [_stmt(call('sstore', base_slot, value))]
+                return []
             elif stmt.target in self.storage_slots:
-                value_expr = self._generate_expr(stmt.value)
+                value = self._generate_expr(stmt.value)
                 # Skip map[] initialization - mappings are implicit in EVM
-                if value_expr == "map[]":
-                    return ""
-                return f"{ind}sstore({self.storage_slots[stmt.target]}, {value_expr})\n"
+                if value == yul.Identifier('map[]'):
+                    return []
+                return self._store_field(stmt.target, value)
+            elif isinstance(stmt.value, IfExpression):
+                return self._conditional_into(stmt.target, stmt.value)
             else:
-                return f"{ind}{stmt.target} := {self._generate_expr(stmt.value)}\n"
-        
+                return [yul.Assign([stmt.target], self._generate_expr(stmt.value))]
+
         if isinstance(stmt, EmitEvent):
-            if stmt.name in self.event_signatures:
-                event = None
-                for e in self.contract.events:
-                    if e.name == stmt.name:
-                        event = e
-                        break
-                
-                if event:
-                    sig = self.event_signatures[stmt.name]
-                    code = ""
-                    
-                    # Separate indexed and non-indexed params
-                    topics = []
-                    data_args = []
-                    for i, (arg, is_indexed) in enumerate(zip(stmt.args, event.indexed)):
-                        if is_indexed:
-                            topics.append(self._generate_expr(arg))
-                        else:
-                            data_args.append(arg)
-                    
-                    # Store non-indexed data in memory
-                    for i, arg in enumerate(data_args):
-                        code += f"{ind}mstore({i * 32}, {self._generate_expr(arg)})\n"
-                    
-                    data_size = len(data_args) * 32
-                    
-                    # Choose log instruction based on number of topics
-                    # log0: no topics, log1: 1 topic (sig), log2: sig + 1 indexed, etc.
-                    if event.anonymous:
-                        # Anonymous events don't include signature as topic
-                        if len(topics) == 0:
-                            code += f"{ind}log0(0, {data_size})\n"
-                        elif len(topics) == 1:
-                            code += f"{ind}log1(0, {data_size}, {topics[0]})\n"
-                        elif len(topics) == 2:
-                            code += f"{ind}log2(0, {data_size}, {topics[0]}, {topics[1]})\n"
-                        elif len(topics) == 3:
-                            code += f"{ind}log3(0, {data_size}, {topics[0]}, {topics[1]}, {topics[2]})\n"
-                    else:
-                        # Regular events include signature as first topic
-                        if len(topics) == 0:
-                            code += f"{ind}log1(0, {data_size}, {sig})\n"
-                        elif len(topics) == 1:
-                            code += f"{ind}log2(0, {data_size}, {sig}, {topics[0]})\n"
-                        elif len(topics) == 2:
-                            code += f"{ind}log3(0, {data_size}, {sig}, {topics[0]}, {topics[1]})\n"
-                        elif len(topics) == 3:
-                            code += f"{ind}log4(0, {data_size}, {sig}, {topics[0]}, {topics[1]}, {topics[2]})\n"
-                    
-                    return code
-            return ""
-        
+            event = next((e for e in self.contract.events if e.name == stmt.name), None)
+            if stmt.name not in self.event_signatures or event is None:
+                return []
+            code = []
+            # Separate indexed and non-indexed params
+            topics = []
+            data_args = []
+            for arg, is_indexed in zip(stmt.args, event.indexed):
+                if is_indexed:
+                    topics.append(self._generate_expr(arg))
+                else:
+                    data_args.append(arg)
+
+            # Store non-indexed data in memory
+            for i, arg in enumerate(data_args):
+                code.append(_stmt(call('mstore', i * 32, self._generate_expr(arg))))
+
+            # Anonymous events don't include the signature as the first topic
+            if not event.anonymous:
+                topics.insert(0, yul.Literal(self.event_signatures[stmt.name]))
+            if len(topics) <= 4:
+                code.append(_stmt(call(f"log{len(topics)}", 0, len(data_args) * 32, *topics)))
+            return code
+
         if isinstance(stmt, Revert):
             if stmt.error_name and stmt.error_name in self.error_signatures:
-                # Custom error: revert ErrorName(args)
-                sig = self.error_signatures[stmt.error_name]
-                code = f"{ind}mstore(0, {sig})\n"
-                # Encode args after selector
+                # Custom error: selector, then the encoded args
+                code = [_stmt(call('mstore', 0, yul.Literal(self.error_signatures[stmt.error_name])))]
                 for i, arg in enumerate(stmt.error_args or []):
-                    code += f"{ind}mstore({4 + i * 32}, {self._generate_expr(arg)})\n"
-                size = 4 + len(stmt.error_args or []) * 32
-                code += f"{ind}revert(0, {size})\n"
+                    code.append(_stmt(call('mstore', 4 + i * 32, self._generate_expr(arg))))
+                code.append(_stmt(call('revert', 0, 4 + len(stmt.error_args or []) * 32)))
                 return code
             elif stmt.message:
-                # Revert with message: encode Error(string) selector + message
-                # Error(string) selector is 0x08c379a0
-                code = f"{ind}mstore(0, 0x08c379a000000000000000000000000000000000000000000000000000000000)\n"
-                # For simplicity, just revert with selector
-                code += f"{ind}revert(0, 4)\n"
-                return code
+                # Error(string) selector is 0x08c379a0; the message itself is not encoded
+                selector = yul.Literal('0x08c379a000000000000000000000000000000000000000000000000000000000')
+                return [_stmt(call('mstore', 0, selector)), _stmt(call('revert', 0, 4))]
             else:
-                # Simple revert
-                return f"{ind}revert(0, 0)\n"
-        
+                return [_stmt(call('revert', 0, 0))]
+
         if isinstance(stmt, Selfdestruct):
-            recipient = self._generate_expr(stmt.recipient)
-            return f"{ind}selfdestruct({recipient})\n"
-        
+            return [_stmt(call('selfdestruct', self._generate_expr(stmt.recipient)))]
+
         if isinstance(stmt, Return):
-            # Check if we're in an internal/private method
-            is_internal = self.current_method and self.current_method.visibility in ['internal', 'private']
-            
-            if stmt.value:
-                # Check if multiple returns
-                if isinstance(stmt.value, list):
-                    if is_internal:
-                        # For internal methods, assign to return variables
-                        code = ""
-                        for i, (val, ret_var) in enumerate(zip(stmt.value, self.current_method.returns)):
-                            var_name = self._safe_method_name(ret_var.name)
-                            code += f"{ind}{var_name} := {self._generate_expr(val)}\n"
-                        return code
-                    else:
-                        # For external methods, use memory and return
-                        code = ""
-                        # Allocate memory for return values
-                        code += f"{ind}let _return_ptr := allocate_memory({len(stmt.value) * 32})\n"
-                        for i, val in enumerate(stmt.value):
-                            code += f"{ind}mstore(add(_return_ptr, {i * 32}), {self._generate_expr(val)})\n"
-                        return code + f"{ind}return(_return_ptr, {len(stmt.value) * 32})\n"
-                else:
-                    val_expr = self._generate_expr(stmt.value)
-                    
-                    if is_internal:
-                        # For internal methods with single return, assign to result
-                        if self.current_method.returns:
-                            if isinstance(self.current_method.returns, list) and len(self.current_method.returns) > 0:
-                                var_name = self._safe_method_name(self.current_method.returns[0].name)
-                                return f"{ind}{var_name} := {val_expr}\n"
-                            else:
-                                # Unnamed return
-                                return f"{ind}result := {val_expr}\n"
-                        return ""
-                    else:
-                        # For external methods, use memory and return
-                        # Handle if expressions
-                        if val_expr.startswith("IF_EXPR("):
-                            depth = 0
-                            parts = []
-                            current = ""
-                            for char in val_expr[8:-1]:  # Skip "IF_EXPR(" and ")"
-                                if char in '([':
-                                    depth += 1
-                                    current += char
-                                elif char in ')]':
-                                    depth -= 1
-                                    current += char
-                                elif char == ',' and depth == 0:
-                                    parts.append(current.strip())
-                                    current = ""
-                                else:
-                                    current += char
-                            if current:
-                                parts.append(current.strip())
-                            
-                            if len(parts) == 3:
-                                cond, then_val, else_val = parts
-                                code = f"{ind}let _return_val := 0\n"
-                                code += f"{ind}if {cond} {{ _return_val := {then_val} }}\n"
-                                code += f"{ind}if iszero({cond}) {{ _return_val := {else_val} }}\n"
-                                code += f"{ind}let _return_ptr := allocate_memory(32)\n"
-                                code += f"{ind}mstore(_return_ptr, _return_val)\n"
-                                code += f"{ind}return(_return_ptr, 32)\n"
-                                return code
-                        
-                        return f"{ind}let _return_ptr := allocate_memory(32)\n{ind}mstore(_return_ptr, {val_expr})\n{ind}return(_return_ptr, 32)\n"
-            
-            # No return value
-            if is_internal:
-                return ""  # Internal functions just exit
-            return f"{ind}return(0, 0)\n"
-        
-        if isinstance(stmt, Assert):
-            return f"{ind}if iszero({self._generate_expr(stmt.condition)}) {{ revert(0, 0) }}\n"
-        
-        if isinstance(stmt, Require):
-            return f"{ind}if iszero({self._generate_expr(stmt.condition)}) {{ revert(0, 0) }}\n"
-        
+            return self._generate_return(stmt)
+
+        if isinstance(stmt, (Assert, Require)):
+            checks = self._generate_check(stmt.condition)
+            if self.proven and isinstance(stmt, Assert):
+                # Dafny proved the assertion holds
+                self._elide(checks)
+                return []
+            return checks
+
         if isinstance(stmt, ArrayPush):
             slot = self.storage_slots.get(stmt.array, 0)
             value = self._generate_expr(stmt.value)
-            # Get current length, store value at keccak256(slot) + length, increment length
-            code = f"{ind}let len := sload({slot})\n"
-            code += f"{ind}sstore(add(keccak256_single({slot}), len), {value})\n"
-            code += f"{ind}sstore({slot}, add(len, 1))\n"
-            return code
-        
+            # Store value at keccak256(slot) + length, then increment the length
+            return [
+                yul.VarDecl(['len'], call('sload', slot)),
+                _stmt(call('sstore', call('add', call('keccak256_single', slot), 'len'), value)),
+                _stmt(call('sstore', slot, call('add', 'len', 1))),
+            ]
+
         if isinstance(stmt, ArrayPop):
             slot = self.storage_slots.get(stmt.array, 0)
             # Decrement length, delete last element
-            code = f"{ind}let len := sload({slot})\n"
-            code += f"{ind}if iszero(len) {{ revert(0, 0) }}\n"
-            code += f"{ind}let newLen := sub(len, 1)\n"
-            code += f"{ind}sstore(add(keccak256_single({slot}), newLen), 0)\n"
-            code += f"{ind}sstore({slot}, newLen)\n"
-            return code
-        
+            return [
+                yul.VarDecl(['len'], call('sload', slot)),
+                yul.If(call('iszero', 'len'), yul.Block([_stmt(call('revert', 0, 0))])),
+                yul.VarDecl(['newLen'], call('sub', 'len', 1)),
+                _stmt(call('sstore', call('add', call('keccak256_single', slot), 'newLen'), 0)),
+                _stmt(call('sstore', slot, 'newLen')),
+            ]
+
         if isinstance(stmt, IfStatement):
-            code = f"{ind}if {self._generate_expr(stmt.condition)} {{\n"
-            for s in stmt.then_body:
-                code += self._generate_statement(s, indent + 1)
-            code += f"{ind}}}\n"
+            if not stmt.else_body and isinstance(stmt.condition, BinaryOp) and stmt.condition.op == '&&':
+                # Nested ifs need no temporary for the result
+                operands = self._logical_operands(stmt.condition)
+                folded = _fold_cheap('and', operands)
+                if folded is not None:
+                    return [yul.If(folded, self._generate_block(stmt.then_body))]
+                code = self._generate_block(stmt.then_body).statements
+                for prelude, value in reversed(operands):
+                    code = prelude + [yul.If(value, yul.Block(code))]
+                return code
+            condition = self._generate_expr(stmt.condition)
             if stmt.else_body:
-                code += f"{ind}if iszero({self._generate_expr(stmt.condition)}) {{\n"
-                for s in stmt.else_body:
-                    code += self._generate_statement(s, indent + 1)
-                code += f"{ind}}}\n"
-            return code
-        
+                # One evaluation of the condition; the else branch must not
+                # see state changed by the then branch
+                return [self._branch(condition, self._generate_block(stmt.then_body),
+                                     self._generate_block(stmt.else_body))]
+            return [yul.If(condition, self._generate_block(stmt.then_body))]
+
         if isinstance(stmt, WhileLoop):
-            code = f"{ind}for {{ }} {self._generate_expr(stmt.condition)} {{ }} {{\n"
-            for s in stmt.body:
-                code += self._generate_statement(s, indent + 1)
-            code += f"{ind}}}\n"
-            return code
-        
+            return self._loop(yul.Block(), stmt.condition, yul.Block(), stmt.body)
+
         if isinstance(stmt, ForLoop):
-            code = f"{ind}for {{ "
-            if stmt.init:
-                # Inline init without newline
-                init_code = self._generate_statement(stmt.init, 0).strip()
-                code += init_code
-            code += f" }} {self._generate_expr(stmt.condition)} {{ "
-            if stmt.update:
-                # Inline update without newline
-                update_code = self._generate_statement(stmt.update, 0).strip()
-                code += update_code
-            code += f" }} {{\n"
-            for s in stmt.body:
-                code += self._generate_statement(s, indent + 1)
-            code += f"{ind}}}\n"
+            init = self._generate_block([stmt.init] if stmt.init else [])
+            update = self._generate_block([stmt.update] if stmt.update else [])
+            return self._loop(init, stmt.condition, update, stmt.body)
+
+        return []
+
+    def _generate_block(self, statements: List[Statement]) -> yul.Block:
+        code = []
+        for stmt in statements:
+            code += self._generate_statement(stmt)
+        return yul.Block(code)
+
+    def _generate_return(self, stmt: Return) -> List[yul.Stmt]:
+        # Check if we're in an internal/private method
+        is_internal = self.current_method and self.current_method.visibility in ['internal', 'private']
+
+        if not stmt.value:
+            # Internal functions just exit
+            return [] if is_internal else [_stmt(call('return', 0, 0))]
+
+        if isinstance(stmt.value, list):
+            if is_internal:
+                # Assign to the return variables
+                return [yul.Assign([self._safe_method_name(ret_var.name)], self._generate_expr(val))
+                        for val, ret_var in zip(stmt.value, self.current_method.returns)]
+            # External methods return through memory
+            size = len(stmt.value) * 32
+            code = [yul.VarDecl(['_return_ptr'], call('allocate_memory', size))]
+            for i, val in enumerate(stmt.value):
+                code.append(_stmt(call('mstore', call('add', '_return_ptr', i * 32), self._generate_expr(val))))
+            code.append(_stmt(call('return', '_return_ptr', size)))
             return code
-        
-        return ""
-    
-    def _generate_expr(self, expr: Expression) -> str:
+
+        if is_internal:
+            # Single return: assign to the named return variable, or to result
+            if self.current_method.returns:
+                if isinstance(self.current_method.returns, list) and len(self.current_method.returns) > 0:
+                    var_name = self._safe_method_name(self.current_method.returns[0].name)
+                    return [yul.Assign([var_name], self._generate_expr(stmt.value))]
+                return [yul.Assign(['result'], self._generate_expr(stmt.value))]
+            return []
+
+        return self._return_word(self._generate_expr(stmt.value))
+
+    def _element_slot(self, expr) -> yul.Expr:
+        """Storage slot of a mapping or array element."""
+        if isinstance(expr, ArrayAccess) and isinstance(expr.array, (ArrayAccess, MappingAccess)):
+            # Nested access: arr[i][j] hashes j into the slot of arr[i]
+            return call('keccak256_mapping', self._element_slot(expr.array), self._generate_expr(expr.index))
+        slot = self.storage_slots.get(expr.array if isinstance(expr, ArrayAccess) else expr.mapping, 0)
+        key = self._generate_expr(expr.index if isinstance(expr, ArrayAccess) else expr.key)
+        # keccak256(key . slot) is the element's storage location
+        return call('keccak256_mapping', slot, key)
+
+    def _generate_expr(self, expr: Expression) -> yul.Expr:
         if isinstance(expr, Literal):
-            return str(expr.value).lower() if isinstance(expr.value, bool) else str(expr.value)
-        
+            return _lit(str(expr.value).lower() if isinstance(expr.value, bool) else expr.value)
+
         if isinstance(expr, VarRef):
             # Check if it's a ghost constant
             if hasattr(self, 'constants') and expr.name in self.constants:
-                return str(self.constants[expr.name])
+                return _lit(self.constants[expr.name])
             if expr.name in self.storage_slots:
-                return f"sload({self.storage_slots[expr.name]})"
-            return expr.name
-        
+                return self._load_field(expr.name)
+            return yul.Identifier(expr.name)
+
         if isinstance(expr, GlobalVar):
-            global_map = {
-                'msg.sender': 'caller()',
-                'msg.value': 'callvalue()',
-                'msg.data': 'calldatasize()',
-                'msg.sig': 'shr(224, calldataload(0))',
-                'tx.origin': 'origin()',
-                'tx.gasprice': 'gasprice()',
-                'block.timestamp': 'timestamp()',
-                'block.number': 'number()',
-                'block.difficulty': 'difficulty()',
-                'block.gaslimit': 'gaslimit()',
-                'block.coinbase': 'coinbase()',
-                'block.chainid': 'chainid()',
-            }
-            return global_map.get(expr.name, '0')
-        
+            return GLOBAL_VARS.get(expr.name, _lit(0))
+
         if isinstance(expr, ArrayAccess) or isinstance(expr, MappingAccess):
-            # Handle nested access: arr[i][j] becomes nested ArrayAccess
-            if isinstance(expr, ArrayAccess) and isinstance(expr.array, (ArrayAccess, MappingAccess)):
-                # Nested access - compute recursively
-                # First get the inner storage location
-                inner_loc = self._generate_expr(expr.array)
-                # Then apply this level's index
-                key = self._generate_expr(expr.index)
-                # If inner_loc is already an sload(), extract the location
-                if inner_loc.startswith('sload('):
-                    inner_loc = inner_loc[6:-1]  # Remove sload( and )
-                return f"sload(keccak256_mapping({inner_loc}, {key}))"
-            else:
-                # Single level access
-                slot = self.storage_slots.get(expr.array if isinstance(expr, ArrayAccess) else expr.mapping, 0)
-                key = self._generate_expr(expr.index if isinstance(expr, ArrayAccess) else expr.key)
-                # Compute keccak256(slot . key) for storage location
-                return f"sload(keccak256_mapping({slot}, {key}))"
-        
+            return call('sload', self._element_slot(expr))
+
         if isinstance(expr, StructAccess):
             base_slot = self.storage_slots.get(expr.struct, 0)
             # Find struct type and field offset
-            for struct_name, layout in self.struct_layouts.items():
-                if expr.field in layout:
-                    offset = layout[expr.field]
-                    return f"sload({base_slot + offset})"
-            return f"sload({base_slot})"
-        
+            member, member_type = self._struct_member(expr.struct, expr.field)
+            if member is not None:
+                return self._load_storage(base_slot + member.slot, member, member_type)
+            return call('sload', base_slot)
+
         if isinstance(expr, ArrayLength):
             slot = self.storage_slots.get(expr.array, 0)
-            return f"sload({slot})"  # Length stored at base slot
-        
+            return call('sload', slot)  # Length stored at base slot
+
         if isinstance(expr, ContractCall):
             addr = self._generate_expr(expr.address)
+            # Call data is assumed to be in memory at 0
             if expr.method == 'call':
-                # call(gas, addr, value, argsOffset, argsSize, retOffset, retSize)
-                value = self._generate_expr(expr.value) if expr.value else "0"
-                # For simplicity, assume data is already in memory at 0
-                return f"call(gas(), {addr}, {value}, 0, 32, 0, 32)"
+                value = self._generate_expr(expr.value) if expr.value else _lit(0)
+                return call('call', call('gas'), addr, value, 0, 32, 0, 32)
             elif expr.method == 'delegatecall':
-                return f"delegatecall(gas(), {addr}, 0, 32, 0, 32)"
+                return call('delegatecall', call('gas'), addr, 0, 32, 0, 32)
             elif expr.method == 'staticcall':
-                return f"staticcall(gas(), {addr}, 0, 32, 0, 32)"
-        
+                return call('staticcall', call('gas'), addr, 0, 32, 0, 32)
+            return _lit(0)
+
         if isinstance(expr, UnaryOp):
             operand = self._generate_expr(expr.operand)
             if expr.op == '!':
-                return f"iszero({operand})"
+                return call('iszero', operand)
             return operand
-        
+
         if isinstance(expr, IfExpression):
-            # Yul doesn't have ternary or if expressions
-            # We need to generate a function that returns the value
-            # For now, use a workaround: generate inline switch expression
-            # This only works in Yul 0.8.0+, otherwise need temp variable
-            cond = self._generate_expr(expr.condition)
-            then_val = self._generate_expr(expr.then_expr)
-            else_val = self._generate_expr(expr.else_expr)
-            
-            # Use: if condition { result := then } if iszero(condition) { result := else }
-            # But since we're in expression context, we need a different approach
-            # Generate a unique temp variable name
-            import random
-            temp_var = f"_if_result_{random.randint(1000, 9999)}"
-            
-            # This is a hack - we return a placeholder that needs statement context
-            # Better: return a special marker that VarDecl/Assignment can expand
-            return f"IF_EXPR({cond}, {then_val}, {else_val})"
-        
+            # Yul has no conditional expression: compute it into a temporary
+            # ahead of the enclosing statement
+            temp = self._temp('_if')
+            self._prelude.append(yul.VarDecl([temp], _lit(0)))
+            self._prelude += self._conditional_into(temp, expr)
+            return yul.Identifier(temp)
+
         if isinstance(expr, BinaryOp):
             # Handle 'in' operator for mappings
             if expr.op.strip() == 'in':
-                # In EVM, mappings are infinite - all keys exist with default value 0
-                # We can't check existence, so we check if value != 0
-                # For verification, this is modeled correctly
-                # For now, return 1 (true) since mappings are infinite in EVM
-                # Better: check if sload(key) != 0
+                # Mappings are infinite in the EVM: every key exists with default
+                # value 0, so membership is modeled as a non-zero value
                 left = self._generate_expr(expr.left)  # key
                 right = expr.right.name if hasattr(expr.right, 'name') else str(expr.right)  # mapping name
                 slot = self.storage_slots.get(right, 0)
-                # Check if value at key is non-zero
-                return f"iszero(iszero(sload(keccak256_mapping({slot}, {left}))))"
-            
+                return call('iszero', call('iszero', call('sload', call('keccak256_mapping', slot, left))))
+
+            if expr.op in ('&&', '||'):
+                return self._short_circuit(expr)
+
             left = self._generate_expr(expr.left)
             right = self._generate_expr(expr.right)
             op_map = {
@@ -852,45 +969,36 @@ class YulGenerator:
                 '<': 'lt', '>': 'gt', '==': 'eq'
             }
             if expr.op == '!=':
-                return f"iszero(eq({left}, {right}))"
+                return call('iszero', call('eq', left, right))
             elif expr.op == '<=':
-                return f"iszero(gt({left}, {right}))"
+                return call('iszero', call('gt', left, right))
             elif expr.op == '>=':
-                return f"iszero(lt({left}, {right}))"
+                return call('iszero', call('lt', left, right))
+            elif expr.op == '==>':
+                return call('or', call('iszero', left), right)
+            elif expr.op == '<==':
+                return call('or', left, call('iszero', right))
+            elif expr.op == '<==>':
+                return call('eq', call('iszero', left), call('iszero', right))
             else:
-                yul_op = op_map.get(expr.op, expr.op)
-                return f"{yul_op}({left}, {right})"
-        
+                return call(op_map.get(expr.op, expr.op), left, right)
+
         if isinstance(expr, FunctionCall):
+            args = [self._generate_expr(arg) for arg in expr.args]
             # Built-in functions
             if expr.name == 'keccak256':
                 # For single arg, just pass it through - caller handles memory
-                args = ', '.join(self._generate_expr(arg) for arg in expr.args)
-                return f"keccak256_hash({args})"
-            
-            builtin_map = {
-                'sha256': 'sha256',
-                'ripemd160': 'ripemd160',
-                'ecrecover': 'ecrecover',
-                'addmod': 'addmod',
-                'mulmod': 'mulmod',
-                'gasleft': 'gas',
-            }
-            if expr.name in builtin_map:
-                if expr.name == 'gasleft':
-                    return 'gas()'
-                args = ', '.join(self._generate_expr(arg) for arg in expr.args)
-                return f"{builtin_map[expr.name]}({args})"
-            
-            args = ', '.join(self._generate_expr(arg) for arg in expr.args)
-            return f"{expr.name}({args})"
-        
-        return "0"
-    
+                return call('keccak256_hash', *args)
+            if expr.name == 'gasleft':
+                return call('gas')
+            return call(expr.name, *args)
+
+        return _lit(0)
+
     def _method_signature(self, method: Method) -> str:
         param_types = ','.join(self._type_to_solidity(p.type) for p in method.params)
         return f"{method.name}({param_types})"
-    
+
     def _type_to_solidity(self, dtype: DafnyType) -> str:
         type_map = {
             Type.INT: 'int256',
@@ -909,9 +1017,14 @@ class YulGenerator:
             Type.BYTES32: 'bytes32',
         }
         return type_map.get(dtype.base, 'uint256')
-    
+
     def _compute_selector(self, signature: str) -> str:
-        from Crypto.Hash import keccak
-        k = keccak.new(digest_bits=256)
-        k.update(signature.encode())
-        return '0x' + k.hexdigest()[:8]
+        return _selector(signature)
+
+
+@lru_cache(maxsize=None)
+def _selector(signature: str) -> str:
+    from Crypto.Hash import keccak
+    k = keccak.new(digest_bits=256)
+    k.update(signature.encode())
+    return '0x' + k.hexdigest()[:8]
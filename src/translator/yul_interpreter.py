@@ -0,0 +1,379 @@
+"""
+Gas-metered interpreter for the Yul IR.
+
+Runs the functions of an `Object` in process against a storage dict, to
+measure what an optimization saves and to check that it leaves storage as
+it was. It executes the IR rather than bytecode, so gas follows a model of
+the EVM, not solc's output:
+
+- Storage follows EIP-2929/EIP-2200: 2100 for the first access to a slot in
+  a call, 100 after that; an SSTORE sets a zero slot for 20000, changes a
+  non-zero one for 2900, and costs 100 when it stores the current value or
+  the slot was already changed in the call. Refunds are not counted.
+- KECCAK256 costs 30 plus 6 per word, and memory expansion 3 per word plus
+  the quadratic term.
+- LOG costs 375, plus 375 per topic and 8 per byte of data.
+- Other builtins cost their base price (`costs.GAS_COSTS`, else 3), each
+  literal or variable 3 (a PUSH or DUP), each branch `costs.GAS_BRANCH`,
+  each loop iteration one more jump, and each user function call the jumps
+  in and out.
+
+A method function reads its arguments with `calldataload(4 + 32 * i)`; the
+selector word is zero. A constructor copies its arguments from after the
+creation code: objects have no code of their own here (`datasize` is 0), so
+`codesize` and `codecopy` see only `arguments`. External calls succeed without running any code
+unless an `external_call` hook is given, which can read and change
+`storage` to stand for re-entry.
+"""
+
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from .costs import BUILTIN_GAS, GAS_BRANCH, GAS_COSTS
+from .yul_ast import (Assign, Block, Break, Call, Continue, ExprStmt, ForLoop, FunctionDef, Identifier, If,
+                      Leave, Object, Switch, VarDecl, functions_of)
+
+WORD = (1 << 256) - 1
+
+GAS_COLD_ACCESS = 2100
+GAS_WARM_ACCESS = 100
+GAS_SSTORE_SET = 20000
+GAS_SSTORE_RESET = 2900
+# PUSH return label, JUMP, JUMPDEST in; JUMP, JUMPDEST back
+GAS_FUNCTION_CALL = 3 + 8 + 1 + 8 + 1
+GAS_LOOP_JUMP = 8
+
+DEFAULT_CALLER = 0xCA11E2
+
+
+def _signed(value: int) -> int:
+    return value - (1 << 256) if value >> 255 else value
+
+
+def _sdiv(a: int, b: int) -> int:
+    if b == 0:
+        return 0
+    quotient = abs(_signed(a)) // abs(_signed(b))
+    return (-quotient if (_signed(a) < 0) != (_signed(b) < 0) else quotient) & WORD
+
+
+def _exp(base: int, exponent: int) -> int:
+    return pow(base, exponent, 1 << 256)
+
+
+ARITHMETIC = {
+    'add': lambda a, b: (a + b) & WORD,
+    'sub': lambda a, b: (a - b) & WORD,
+    'mul': lambda a, b: (a * b) & WORD,
+    'div': lambda a, b: a // b if b else 0,
+    'sdiv': _sdiv,
+    'mod': lambda a, b: a % b if b else 0,
+    'exp': _exp,
+    'addmod': lambda a, b, n: (a + b) % n if n else 0,
+    'mulmod': lambda a, b, n: (a * b) % n if n else 0,
+    'lt': lambda a, b: int(a < b),
+    'gt': lambda a, b: int(a > b),
+    'slt': lambda a, b: int(_signed(a) < _signed(b)),
+    'sgt': lambda a, b: int(_signed(a) > _signed(b)),
+    'eq': lambda a, b: int(a == b),
+    'iszero': lambda a: int(a == 0),
+    'and': lambda a, b: a & b,
+    'or': lambda a, b: a | b,
+    'xor': lambda a, b: a ^ b,
+    'not': lambda a: ~a & WORD,
+    'byte': lambda i, x: (x >> (8 * (31 - i))) & 0xff if i < 32 else 0,
+    'shl': lambda shift, value: (value << shift) & WORD if shift < 256 else 0,
+    'shr': lambda shift, value: value >> shift if shift < 256 else 0,
+    'sar': lambda shift, value: (_signed(value) >> min(shift, 256)) & WORD,
+}
+
+
+def keccak256(data: bytes) -> int:
+    from Crypto.Hash import keccak
+    return int.from_bytes(keccak.new(digest_bits=256, data=data).digest(), 'big')
+
+
+def _words(args: Sequence[int]) -> bytes:
+    return b''.join((arg & WORD).to_bytes(32, 'big') for arg in args)
+
+
+def _string(literal: str) -> int:
+    """A Yul string literal as a word: its bytes left-aligned, as solc does."""
+    data = literal[1:-1].encode()[:32]
+    return int.from_bytes(data.ljust(32, b'\0'), 'big')
+
+
+class Revert(Exception):
+    """The code reverted; `data` is the revert payload."""
+
+    def __init__(self, data: bytes = b''):
+        super().__init__(data.hex())
+        self.data = data
+
+
+class _Halt(Exception):
+    def __init__(self, data: bytes = b''):
+        self.data = data
+
+
+class _Break(Exception):
+    pass
+
+
+class _Continue(Exception):
+    pass
+
+
+class _Leave(Exception):
+    pass
+
+
+@dataclass
+class ExecutionResult:
+    success: bool
+    gas_used: int
+    return_data: bytes = b''
+    # (topics, data) of each log, in order
+    logs: List = field(default_factory=list)
+    # slot -> value of every slot whose value changed
+    storage_changes: Dict[int, int] = field(default_factory=dict)
+
+
+class YulInterpreter:
+    """Runs functions of one Yul object, keeping its storage between calls."""
+
+    def __init__(self, obj: Object, storage: Optional[Dict[int, int]] = None, caller: int = DEFAULT_CALLER,
+                 callvalue: int = 0, external_call: Optional[Callable] = None):
+        self.code = obj.code
+        self.functions: Dict[str, FunctionDef] = {function.name: function for function in functions_of(obj)}
+        self.storage: Dict[int, int] = dict(storage or {})
+        self.caller = caller
+        self.callvalue = callvalue
+        # ABI-encoded constructor arguments, appended to the creation code
+        self.arguments = b''
+        # external_call(interpreter, address, value) -> success flag
+        self.external_call = external_call
+
+    @classmethod
+    def deploy(cls, obj: Object, args: Sequence[int] = (), **options) -> Tuple['YulInterpreter', ExecutionResult]:
+        """
+        Run a contract object's constructor (its top-level code, with args as
+        words after the creation code) and return an interpreter for its runtime object,
+        with the storage the constructor left, and the constructor's result.
+        """
+        creation = cls(obj, **options)
+        creation.arguments = _words(args)
+        result = creation.transact(b'')
+        return cls(obj.objects[0], creation.storage, **options), result
+
+    def call(self, function: str, args: Sequence[int] = ()) -> ExecutionResult:
+        """Call a function as if through the dispatcher, with args as calldata words."""
+        return self._execute(lambda: self._call(function, []), bytes(4) + _words(args))
+
+    def transact(self, calldata: bytes) -> ExecutionResult:
+        """Run the object's top-level code (for a runtime, its dispatcher) on raw calldata."""
+        return self._execute(lambda: self._block(Block([stmt for stmt in self.code.statements
+                                                         if not isinstance(stmt, FunctionDef)]), {}), calldata)
+
+    def _execute(self, run: Callable, calldata: bytes) -> ExecutionResult:
+        self.calldata = calldata
+        self.original = dict(self.storage)
+        self.warm = set()
+        self.memory = bytearray()
+        self.logs = []
+        self.gas = 0
+        success, data = True, b''
+        try:
+            run()
+        except _Halt as halt:
+            data = halt.data
+        except Revert as revert:
+            success, data = False, revert.data
+            self.storage = dict(self.original)
+            self.logs = []
+        changes = {slot: value for slot, value in self.storage.items() if self.original.get(slot, 0) != value}
+        changes.update({slot: 0 for slot, value in self.original.items() if value and slot not in self.storage})
+        return ExecutionResult(success, self.gas, data, self.logs, changes)
+
+    # Statements
+
+    def _call(self, name: str, args: List[int]) -> List[int]:
+        function = self.functions[name]
+        self.gas += GAS_FUNCTION_CALL
+        scope = dict(zip(function.params, args))
+        scope.update({name: 0 for name in function.returns})
+        try:
+            self._block(function.body, scope)
+        except _Leave:
+            pass
+        return [scope[name] for name in function.returns]
+
+    def _block(self, block: Block, scope: dict):
+        for stmt in block.statements:
+            self._statement(stmt, scope)
+
+    def _statement(self, stmt, scope: dict):
+        if isinstance(stmt, (VarDecl, Assign)):
+            values = self._values(stmt.value, scope) if stmt.value is not None else [0] * len(stmt.names)
+            scope.update(zip(stmt.names, values))
+        elif isinstance(stmt, ExprStmt):
+            self._values(stmt.expr, scope)
+        elif isinstance(stmt, If):
+            self.gas += GAS_BRANCH
+            if self._expr(stmt.condition, scope):
+                self._block(stmt.body, scope)
+        elif isinstance(stmt, Switch):
+            value = self._expr(stmt.expr, scope)
+            for case in stmt.cases:
+                self.gas += GAS_BRANCH
+                if case.value is None or self._expr(case.value, scope) == value:
+                    self._block(case.body, scope)
+                    break
+        elif isinstance(stmt, ForLoop):
+            self._block(stmt.init, scope)
+            while True:
+                self.gas += GAS_BRANCH
+                if not self._expr(stmt.condition, scope):
+                    break
+                try:
+                    self._block(stmt.body, scope)
+                except _Break:
+                    break
+                except _Continue:
+                    pass
+                self._block(stmt.post, scope)
+                self.gas += GAS_LOOP_JUMP
+        elif isinstance(stmt, Block):
+            self._block(stmt, scope)
+        elif isinstance(stmt, Break):
+            raise _Break()
+        elif isinstance(stmt, Continue):
+            raise _Continue()
+        elif isinstance(stmt, Leave):
+            raise _Leave()
+        elif not isinstance(stmt, FunctionDef):
+            raise NotImplementedError(type(stmt).__name__)
+
+    # Expressions
+
+    def _values(self, expr, scope: dict) -> List[int]:
+        if isinstance(expr, Call) and expr.name in self.functions:
+            return self._call(expr.name, [self._expr(arg, scope) for arg in reversed(expr.args)][::-1])
+        value = self._expr(expr, scope)
+        return [] if value is None else [value]
+
+    def _expr(self, expr, scope: dict) -> Optional[int]:
+        if isinstance(expr, Identifier):
+            self.gas += 3
+            # The generator emits some string literals as identifiers
+            return _string(expr.name) if expr.name.startswith('"') else scope[expr.name]
+        if not isinstance(expr, Call):
+            self.gas += 3
+            if expr.value in ('true', 'false'):
+                return int(expr.value == 'true')
+            if expr.value.startswith('"'):
+                return _string(expr.value)
+            return int(expr.value, 0)
+        if expr.name in self.functions:
+            values = self._values(expr, scope)
+            return values[0] if values else None
+        # Arguments are evaluated right to left, as the EVM does
+        args = [self._expr(arg, scope) for arg in reversed(expr.args)][::-1]
+        return self._builtin(expr.name, args)
+
+    def _builtin(self, name: str, args: List[int]) -> Optional[int]:
+        if name == 'sload':
+            self._access(args[0])
+            return self.storage.get(args[0], 0)
+        if name == 'sstore':
+            self._sstore(args[0], args[1])
+            return None
+        if name == 'keccak256':
+            self.gas += 30 + 6 * ((args[1] + 31) // 32)
+            return keccak256(self._read(args[0], args[1]))
+        self.gas += GAS_COSTS.get(name, BUILTIN_GAS)
+        if name in ARITHMETIC:
+            return ARITHMETIC[name](*args)
+        if name == 'mload':
+            return int.from_bytes(self._read(args[0], 32), 'big')
+        if name == 'mstore':
+            self._write(args[0], args[1].to_bytes(32, 'big'))
+        elif name == 'mstore8':
+            self._write(args[0], bytes([args[1] & 0xff]))
+        elif name == 'calldataload':
+            return int.from_bytes(self.calldata[args[0]:args[0] + 32].ljust(32, b'\0'), 'big')
+        elif name == 'calldatasize':
+            return len(self.calldata)
+        elif name == 'caller':
+            return self.caller
+        elif name == 'callvalue':
+            return self.callvalue
+        elif name in ('address', 'origin', 'coinbase'):
+            return self.caller if name == 'origin' else 0
+        elif name in ('timestamp', 'number', 'chainid', 'gasprice', 'basefee', 'gaslimit', 'selfbalance',
+                      'balance', 'returndatasize', 'extcodesize'):
+            return 0 if name != 'chainid' else 1
+        elif name == 'gas':
+            return WORD
+        elif name == 'codesize':
+            return len(self.arguments)
+        elif name == 'codecopy':
+            self.gas += 3 * ((args[2] + 31) // 32)
+            self._write(args[0], self.arguments[args[1]:args[1] + args[2]].ljust(args[2], b'\0'))
+        elif name in ('datasize', 'dataoffset', 'datacopy'):
+            # The constructor copying out the runtime code
+            return 0 if name in ('datasize', 'dataoffset') else None
+        elif name == 'pop':
+            pass
+        elif name == 'return':
+            raise _Halt(self._read(args[0], args[1]))
+        elif name == 'stop':
+            raise _Halt()
+        elif name in ('revert', 'invalid'):
+            raise Revert(self._read(args[0], args[1]) if args else b'')
+        elif name.startswith('log'):
+            self.gas += 8 * args[1]
+            self.logs.append((args[2:], self._read(args[0], args[1])))
+        elif name in ('call', 'staticcall', 'delegatecall'):
+            value = args[2] if name == 'call' else 0
+            return self.external_call(self, args[1], value) if self.external_call else 1
+        else:
+            raise NotImplementedError(name)
+        return None
+
+    # State
+
+    def _access(self, slot: int):
+        self.gas += GAS_WARM_ACCESS if slot in self.warm else GAS_COLD_ACCESS
+        self.warm.add(slot)
+
+    def _sstore(self, slot: int, value: int):
+        if slot not in self.warm:
+            self.gas += GAS_COLD_ACCESS
+            self.warm.add(slot)
+        original, current = self.original.get(slot, 0), self.storage.get(slot, 0)
+        if current == value or original != current:
+            self.gas += GAS_WARM_ACCESS
+        else:
+            self.gas += GAS_SSTORE_SET if original == 0 else GAS_SSTORE_RESET
+        if value:
+            self.storage[slot] = value
+        else:
+            self.storage.pop(slot, None)
+
+    def _expand(self, end: int):
+        words = (end + 31) // 32
+        old = len(self.memory) // 32
+        if words > old:
+            self.gas += 3 * (words - old) + (words * words - old * old) // 512
+            self.memory.extend(bytes(32 * (words - old)))
+
+    def _read(self, offset: int, size: int) -> bytes:
+        if size == 0:
+            return b''
+        self._expand(offset + size)
+        return bytes(self.memory[offset:offset + size])
+
+    def _write(self, offset: int, data: bytes):
+        self._expand(offset + len(data))
+        self.memory[offset:offset + len(data)] = data
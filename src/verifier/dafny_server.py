@@ -0,0 +1,295 @@
+"""
+Long-lived Dafny language server used to avoid paying .NET and Dafny startup
+on every verification.
+
+`dafny server` speaks the Language Server Protocol over stdio. Documents are
+opened with their full text. The server reports progress through
+`dafny/compilation/status` and per-symbol verification state through
+`dafny/textDocument/symbolStatus`. Once every symbol has a final status, the
+error diagnostics from `textDocument/publishDiagnostics` become the result.
+"""
+
+import atexit
+import itertools
+import json
+import os
+import subprocess
+import threading
+import time
+from pathlib import Path
+
+# PublishedVerificationStatus in the Dafny language server
+_FINAL_SYMBOL_STATUSES = {4, 5, 'Error', 'Correct'}
+_FAILED_COMPILATION_STATUSES = {'ParsingFailed', 'ResolutionFailed'}
+# Dafny CLI exit code for verification failures
+_VERIFICATION_FAILED = 4
+# Diagnostics may trail the final symbol status; wait this long for quiet
+_SETTLE_SECONDS = 0.2
+
+
+class DafnyServerError(RuntimeError):
+    pass
+
+
+class _Document:
+    """Notifications collected for one open document."""
+
+    def __init__(self):
+        self.diagnostics = []
+        self.symbols = None
+        self.compilation_status = None
+        self.last_update = time.monotonic()
+        self.changed = threading.Condition()
+
+    def done(self) -> bool:
+        if self.compilation_status in _FAILED_COMPILATION_STATUSES:
+            return True
+        if self.symbols is None:
+            return False
+        return all(symbol.get('status') in _FINAL_SYMBOL_STATUSES for symbol in self.symbols)
+
+
+class DafnyServer:
+    def __init__(self, dafny_path: str, args: tuple = (), startup_timeout: float = 60):
+        self.dafny_path = dafny_path
+        self.args = tuple(args)
+        self.startup_timeout = startup_timeout
+        self.restarts = 0
+        self._process = None
+        self._reader = None
+        self._ids = itertools.count(1)
+        self._uris = itertools.count(1)
+        self._responses = {}
+        self._documents = {}
+        self._lock = threading.Lock()       # Guards _responses and _documents
+        self._write_lock = threading.Lock()
+        self._verify_lock = threading.Lock()
+        self._response_ready = threading.Condition(self._lock)
+        # Never leave an orphaned server behind
+        atexit.register(self.stop)
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def start(self):
+        self._process = subprocess.Popen(
+            [self.dafny_path, 'server', *self.args],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True
+        )
+        self._responses.clear()
+        self._documents.clear()
+        self._reader = threading.Thread(target=self._read_loop, args=(self._process,), daemon=True)
+        self._reader.start()
+        self._request('initialize', {
+            'processId': os.getpid(),
+            'rootUri': None,
+            'capabilities': {},
+        }, timeout=self.startup_timeout)
+        self._notify('initialized', {})
+
+    def stop(self):
+        process, self._process = self._process, None
+        if process is None:
+            return
+        try:
+            if process.poll() is None:
+                self._send(process, {'jsonrpc': '2.0', 'id': next(self._ids), 'method': 'shutdown'})
+                self._send(process, {'jsonrpc': '2.0', 'method': 'exit'})
+                process.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            pass
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        with self._response_ready:
+            self._response_ready.notify_all()
+
+    def restart(self):
+        self.stop()
+        self.restarts += 1
+        self.start()
+
+    def is_alive(self) -> bool:
+        return self._process is not None and self._process.poll() is None
+
+    def health_check(self, timeout: float = 10) -> bool:
+        """
+        True if the process is running and answers a request.
+
+        Any JSON-RPC reply counts, including MethodNotFound, so this works
+        across language server versions.
+        """
+        if not self.is_alive():
+            return False
+        try:
+            self._request('dafny/ping', {}, timeout=timeout, allow_error=True)
+            return True
+        except DafnyServerError:
+            return False
+
+    def ensure_running(self):
+        if self._process is None:
+            self.start()
+        elif not self.health_check():
+            self.restart()
+
+    # ------------------------------------------------------------------
+    # Verification
+    # ------------------------------------------------------------------
+
+    def verify(self, source: str, timeout: float) -> dict:
+        """
+        Verify one document; returns the same raw outcome as a CLI run:
+        verified, output, errors and return_code.
+
+        Raises subprocess.TimeoutExpired if the server does not finish in
+        time; the server is restarted so the next call starts clean.
+        """
+        with self._verify_lock:
+            self.ensure_running()
+            try:
+                return self._verify_document(source, timeout)
+            except DafnyServerError:
+                # The server died mid-request: restart once and retry
+                self.restart()
+                return self._verify_document(source, timeout)
+
+    def _verify_document(self, source: str, timeout: float) -> dict:
+        uri = f"file:///dafny-evm/contract{next(self._uris)}.dfy"
+        document = _Document()
+        with self._lock:
+            self._documents[uri] = document
+        try:
+            self._notify('textDocument/didOpen', {
+                'textDocument': {'uri': uri, 'languageId': 'dafny', 'version': 1, 'text': source}
+            })
+            deadline = time.monotonic() + timeout
+            with document.changed:
+                while not (document.done() and time.monotonic() - document.last_update >= _SETTLE_SECONDS):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.restart()
+                        raise subprocess.TimeoutExpired(['dafny', 'server'], timeout)
+                    if not self.is_alive():
+                        raise DafnyServerError("Dafny server exited during verification")
+                    document.changed.wait(min(remaining, _SETTLE_SECONDS if document.done() else 1.0))
+            self._notify('textDocument/didClose', {'textDocument': {'uri': uri}})
+        finally:
+            with self._lock:
+                self._documents.pop(uri, None)
+        return self._outcome(uri, document)
+
+    def _outcome(self, uri: str, document: _Document) -> dict:
+        name = Path(uri).name
+        lines = []
+        errors = []
+        for diagnostic in document.diagnostics:
+            # LSP severity 1 is Error
+            if diagnostic.get('severity', 1) != 1:
+                continue
+            start = diagnostic.get('range', {}).get('start', {})
+            line = f"{name}({start.get('line', 0) + 1},{start.get('character', 0) + 1}): Error: {diagnostic.get('message', '')}"
+            lines.append(line)
+            errors.append(line)
+        symbols = document.symbols or []
+        verified_count = sum(1 for symbol in symbols if symbol.get('status') in (5, 'Correct'))
+        verified = not errors and document.compilation_status not in _FAILED_COMPILATION_STATUSES
+        lines.append(f"\nDafny program verifier finished with {verified_count} verified, {len(errors)} errors")
+        return {
+            'verified': verified,
+            'output': '\n'.join(lines),
+            'errors': errors,
+            'return_code': 0 if verified else _VERIFICATION_FAILED
+        }
+
+    # ------------------------------------------------------------------
+    # JSON-RPC over stdio
+    # ------------------------------------------------------------------
+
+    def _send(self, process, message: dict):
+        body = json.dumps(message).encode()
+        with self._write_lock:
+            process.stdin.write(b'Content-Length: %d\r\n\r\n' % len(body) + body)
+            process.stdin.flush()
+
+    def _notify(self, method: str, params: dict):
+        try:
+            self._send(self._process, {'jsonrpc': '2.0', 'method': method, 'params': params})
+        except (OSError, AttributeError) as e:
+            raise DafnyServerError(f"Dafny server is not running: {e}")
+
+    def _request(self, method: str, params: dict, timeout: float, allow_error: bool = False):
+        request_id = next(self._ids)
+        try:
+            self._send(self._process, {'jsonrpc': '2.0', 'id': request_id, 'method': method, 'params': params})
+        except (OSError, AttributeError) as e:
+            raise DafnyServerError(f"Dafny server is not running: {e}")
+        deadline = time.monotonic() + timeout
+        with self._response_ready:
+            while request_id not in self._responses:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self.is_alive():
+                    raise DafnyServerError(f"No response to '{method}'")
+                self._response_ready.wait(min(remaining, 1.0))
+            response = self._responses.pop(request_id)
+        if 'error' in response and not allow_error:
+            raise DafnyServerError(response['error'].get('message', str(response['error'])))
+        return response.get('result')
+
+    def _read_loop(self, process):
+        stream = process.stdout
+        while True:
+            headers = {}
+            while True:
+                line = stream.readline()
+                if not line:
+                    self._on_exit()
+                    return
+                line = line.strip()
+                if not line:
+                    break
+                key, _, value = line.decode('ascii', 'replace').partition(':')
+                headers[key.strip().lower()] = value.strip()
+            length = int(headers.get('content-length', 0))
+            body = stream.read(length)
+            try:
+                message = json.loads(body)
+            except ValueError:
+                continue
+            self._dispatch(message)
+
+    def _dispatch(self, message: dict):
+        if 'id' in message and 'method' not in message:
+            with self._response_ready:
+                self._responses[message['id']] = message
+                self._response_ready.notify_all()
+            return
+        params = message.get('params') or {}
+        uri = params.get('uri') or params.get('textDocument', {}).get('uri')
+        with self._lock:
+            document = self._documents.get(uri)
+        if document is None:
+            return
+        method = message.get('method')
+        with document.changed:
+            if method == 'textDocument/publishDiagnostics':
+                document.diagnostics = params.get('diagnostics', [])
+            elif method == 'dafny/textDocument/symbolStatus':
+                document.symbols = params.get('namedVerifiables', [])
+            elif method == 'dafny/compilation/status':
+                document.compilation_status = params.get('status')
+            document.last_update = time.monotonic()
+            document.changed.notify_all()
+
+    def _on_exit(self):
+        with self._response_ready:
+            self._response_ready.notify_all()
+        with self._lock:
+            documents = list(self._documents.values())
+        for document in documents:
+            with document.changed:
+                document.changed.notify_all()
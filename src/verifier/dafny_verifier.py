@@ -2,13 +2,45 @@ import subprocess
 import tempfile
 import os
 import re
+import shutil
+import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
+from typing import Callable, Optional
+
+from ..compiler.cache import DiskCache
+from .incremental import fingerprints
+from .dafny_server import DafnyServer
+from ..profiling import Profiler, subprocess_span
 
 class DafnyVerifier:
-    def __init__(self, dafny_path: str = None, verbose: bool = False):
+    # Flags that affect the verdict; they are part of the cache key
+    VERIFY_FLAGS = (
+        '--resource-limit', '10000000',  # Limit SMT solver resources
+        '--verification-time-limit', '20',  # 20 seconds per method
+    )
+
+    def __init__(self, dafny_path: str = None, verbose: bool = False, cache: Optional[DiskCache] = None,
+                 incremental: bool = False, jobs: int = 1, fail_fast: bool = False,
+                 timeout: int = 30, cores: Optional[int] = None, server: bool = False):
         self.dafny_path = dafny_path or self._find_dafny()
         self.prelude_path = Path(__file__).parent.parent / 'dafny_prelude.dfy'
         self.verbose = verbose
+        self.cache = cache
+        # Verify per method and reuse cached outcomes (needs a cache)
+        self.incremental = incremental
+        # Number of dafny processes verifying methods concurrently
+        self.jobs = max(1, jobs)
+        # Stop outstanding work after the first failing method
+        self.fail_fast = fail_fast
+        # Seconds allowed per dafny invocation
+        self.timeout = timeout
+        # Passed through as --cores (default with jobs > 1: CPUs / jobs)
+        self.cores = cores
+        # Keep one `dafny server` process warm instead of spawning per call
+        self.server = DafnyServer(self.dafny_path, self._server_args()) if server else None
+        self._dafny_version = None
     
     def _find_dafny(self) -> str:
         """Find Dafny executable"""
@@ -18,16 +50,58 @@ class DafnyVerifier:
         if os.path.exists(dotnet_tool):
             return dotnet_tool
         
-        # Check PATH
-        try:
-            result = subprocess.run(['which', 'dafny'], capture_output=True, text=True)
-            if result.returncode == 0:
-                return result.stdout.strip()
-        except:
-            pass
+        # Check PATH (in-process lookup; no `which` subprocess)
+        found = shutil.which('dafny')
+        if found:
+            return found
         
         raise FileNotFoundError("Dafny not found. Install with: dotnet tool install --global dafny")
     
+    def dafny_version(self) -> str:
+        if self._dafny_version is None:
+            try:
+                result = subprocess.run(
+                    [self.dafny_path, '--version'],
+                    capture_output=True,
+                    text=True,
+                    timeout=30,
+                    check=True
+                )
+                self._dafny_version = result.stdout.strip()
+            except (OSError, subprocess.SubprocessError):
+                self._dafny_version = ''
+        return self._dafny_version
+    
+    def _server_args(self) -> tuple:
+        args = self.VERIFY_FLAGS
+        if self.cores:
+            args += ('--cores', str(self.cores))
+        return args
+    
+    def close(self):
+        """Stop the Dafny server, if one is running."""
+        if self.server is not None:
+            self.server.stop()
+    
+    def _can_cache(self) -> bool:
+        # An unknown version could mask a verdict change after an upgrade
+        return self.cache is not None and bool(self.dafny_version())
+    
+    def _cache_key(self, processed_source: str) -> Optional[str]:
+        if not self._can_cache():
+            return None
+        return DiskCache.key(processed_source, self.dafny_version(), ' '.join(self.VERIFY_FLAGS))
+    
+    def _unit_cache_key(self, fingerprint: str) -> Optional[str]:
+        if not self._can_cache():
+            return None
+        return DiskCache.key('unit', fingerprint, self.dafny_version(), ' '.join(self.VERIFY_FLAGS))
+    
+    def cache_stats(self) -> dict:
+        if self.cache is None:
+            return {'hits': 0, 'misses': 0, 'hit_rate': 0.0}
+        return self.cache.stats()
+    
     def _preprocess_for_verification(self, source: str) -> tuple[str, dict]:
         """
         Preprocess source to make it verifiable by standard Dafny.
@@ -167,13 +241,18 @@ class DafnyVerifier:
         
         return source, stats
     
-    def verify(self, dafny_source: str, include_prelude: bool = False) -> dict:
+    def verify(self, dafny_source: str, include_prelude: bool = False,
+               on_unit: Optional[Callable[[str, dict], None]] = None,
+               profiler: Optional[Profiler] = None) -> dict:
         """
         Verify Dafny source code using the Dafny verifier.
         
         Args:
             dafny_source: The Dafny source code
             include_prelude: Whether to include EVM type definitions (deprecated)
+            on_unit: Called with (name, outcome) as each method finishes
+                (per-method modes only)
+            profiler: Records each dafny invocation, if given
         
         Returns:
             dict with keys:
@@ -182,59 +261,50 @@ class DafnyVerifier:
                 - output: str (verifier output)
                 - errors: list of error messages
                 - stats: dict of preprocessing statistics (if verbose)
+                - cache_hit: bool (True if served from the verification cache)
+                - units: per-method {verified, cache_hit} (per-method modes only)
         """
         # Preprocess to make verifiable
         processed_source, stats = self._preprocess_for_verification(dafny_source)
         
+        cache_key = self._cache_key(processed_source)
+        if cache_key:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return self._build_result(cached, stats, cache_hit=True)
+        
         with tempfile.NamedTemporaryFile(mode='w', suffix='.dfy', delete=False) as f:
             f.write(processed_source)
             temp_file = f.name
         
         try:
-            # Use process group to ensure child processes are killed on timeout
-            result = subprocess.run(
-                [self.dafny_path, 'verify', 
-                 '--resource-limit', '10000000',  # Limit SMT solver resources
-                 '--verification-time-limit', '20',  # 20 seconds per method
-                 temp_file],
-                capture_output=True,
-                text=True,
-                timeout=30,
-                preexec_fn=os.setsid if hasattr(os, 'setsid') else None
-            )
-            
-            output = result.stdout + result.stderr
-            verified = result.returncode == 0 and 'verified' in output.lower()
-            
-            # Parse verification statistics from output
-            verification_stats = self._parse_verification_output(output)
-            
-            errors = []
-            if not verified:
-                for line in output.split('\n'):
-                    if 'error' in line.lower() or 'postcondition' in line.lower() or 'precondition' in line.lower():
-                        errors.append(line.strip())
-            
-            result_dict = {
-                'success': True,
-                'verified': verified,
-                'output': self._format_output(output, stats, verification_stats) if self.verbose else output,
-                'errors': errors,
-                'return_code': result.returncode
-            }
-            
-            if self.verbose:
-                result_dict['preprocessing_stats'] = stats
-                result_dict['verification_stats'] = verification_stats
-            
-            return result_dict
+            per_unit = self.jobs > 1 or (self.incremental and self._can_cache())
+            if self.server is not None:
+                # Warm process: no .NET or Dafny startup on this call
+                with subprocess_span(profiler, 'dafny server', [self.dafny_path, 'server']):
+                    outcome = self.server.verify(processed_source, self.timeout)
+            elif per_unit:
+                outcome = self._verify_units(processed_source, temp_file, on_unit, profiler)
+            else:
+                outcome = self._run_dafny(temp_file, profiler=profiler)
+            if outcome.get('timed_out'):
+                return {
+                    'success': False,
+                    'verified': False,
+                    'output': outcome['output'],
+                    'errors': outcome['errors'],
+                    'units': outcome.get('units', {})
+                }
+            if cache_key and not outcome.get('cancelled'):
+                self.cache.put(cache_key, outcome)
+            return self._build_result(outcome, stats, cache_hit=False)
         
         except subprocess.TimeoutExpired:
             return {
                 'success': False,
                 'verified': False,
                 'output': '',
-                'errors': ['Verification timeout (30s)']
+                'errors': [f'Verification timeout ({self.timeout}s)']
             }
         except Exception as e:
             return {
@@ -249,6 +319,193 @@ class DafnyVerifier:
             except:
                 pass
     
+    def _run_dafny(self, temp_file: str, extra_args: tuple = (), running: Optional[set] = None,
+                   profiler: Optional[Profiler] = None) -> dict:
+        """
+        Run `dafny verify` on a file and return the raw outcome.
+        
+        running, if given, holds the live processes so another thread can
+        kill them; each dafny runs in its own session so its solver
+        children die with it.
+        """
+        args = [self.dafny_path, 'verify', *self.VERIFY_FLAGS]
+        cores = self.cores
+        if cores is None and self.jobs > 1:
+            # Split the machine between workers instead of oversubscribing it
+            cores = max(1, (os.cpu_count() or 1) // self.jobs)
+        if cores:
+            args += ['--cores', str(cores)]
+        command = [*args, *extra_args, temp_file]
+        with subprocess_span(profiler, 'dafny', command):
+            process = subprocess.Popen(
+                command,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                start_new_session=True
+            )
+            if running is not None:
+                running.add(process)
+            try:
+                stdout, stderr = process.communicate(timeout=self.timeout)
+            except subprocess.TimeoutExpired:
+                self._kill(process)
+                process.communicate()
+                raise
+            finally:
+                if running is not None:
+                    running.discard(process)
+        
+        output = stdout + stderr
+        verified = process.returncode == 0 and 'verified' in output.lower()
+        
+        errors = []
+        if not verified:
+            for line in output.split('\n'):
+                if 'error' in line.lower() or 'postcondition' in line.lower() or 'precondition' in line.lower():
+                    errors.append(line.strip())
+        
+        return {
+            'verified': verified,
+            'output': output,
+            'errors': errors,
+            'return_code': process.returncode
+        }
+    
+    @staticmethod
+    def _kill(process: subprocess.Popen):
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except (AttributeError, OSError):
+            process.kill()
+    
+    def _verify_units(self, processed_source: str, temp_file: str,
+                      on_unit: Optional[Callable[[str, dict], None]] = None,
+                      profiler: Optional[Profiler] = None) -> dict:
+        """
+        Verify each method/lemma/function as its own dafny run, using up to
+        self.jobs concurrent processes. Units with a cached outcome are not
+        re-run. Outcomes are reported through on_unit as they complete.
+        """
+        units = fingerprints(processed_source)
+        if not units:
+            return self._run_dafny(temp_file, profiler=profiler)
+        
+        unit_outcomes = {}
+        pending = {}
+        for name, fingerprint in units.items():
+            key = self._unit_cache_key(fingerprint)
+            outcome = self.cache.get(key) if key else None
+            if outcome is None:
+                pending[name] = key
+                continue
+            unit_outcomes[name] = (outcome, True)
+            if on_unit:
+                on_unit(name, outcome)
+        
+        running = set()
+        cancelled = threading.Event()
+        if self.fail_fast and any(not outcome['verified'] for outcome, _ in unit_outcomes.values()):
+            cancelled.set()
+        
+        def verify_unit(name: str) -> Optional[dict]:
+            if cancelled.is_set():
+                return None
+            try:
+                # --filter-symbol matches by substring, so Token.transfer also
+                # re-checks Token.transferFrom; a superset is still sound
+                outcome = self._run_dafny(temp_file, ('--filter-symbol', name), running, profiler)
+            except subprocess.TimeoutExpired:
+                return {
+                    'verified': False,
+                    'output': '',
+                    'errors': [f'Verification timeout ({self.timeout}s): {name}'],
+                    'return_code': None,
+                    'timed_out': True
+                }
+            if cancelled.is_set() and not outcome['verified']:
+                # Killed because another unit failed first
+                return None
+            return outcome
+        
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            futures = {pool.submit(verify_unit, name): name for name in pending}
+            for future in as_completed(futures):
+                name = futures[future]
+                outcome = None if future.cancelled() else future.result()
+                if outcome is None:
+                    outcome = {
+                        'verified': False,
+                        'output': '',
+                        'errors': [],
+                        'return_code': None,
+                        'cancelled': True
+                    }
+                elif pending[name] and not outcome.get('timed_out'):
+                    self.cache.put(pending[name], outcome)
+                unit_outcomes[name] = (outcome, False)
+                if on_unit:
+                    on_unit(name, outcome)
+                if self.fail_fast and not outcome['verified'] and not cancelled.is_set():
+                    cancelled.set()
+                    for other in futures:
+                        other.cancel()
+                    for process in list(running):
+                        self._kill(process)
+        
+        return self._merge_unit_outcomes({name: unit_outcomes[name] for name in units})
+    
+    def _merge_unit_outcomes(self, unit_outcomes: dict) -> dict:
+        sections = []
+        errors = []
+        return_code = 0
+        for name, (outcome, cache_hit) in unit_outcomes.items():
+            if outcome.get('cancelled'):
+                sections.append(f"[{name}] (cancelled)")
+                continue
+            sections.append(f"[{name}]{' (cached)' if cache_hit else ''}\n{outcome['output'].strip()}")
+            errors.extend(outcome['errors'])
+            if outcome['return_code'] and not return_code:
+                return_code = outcome['return_code']
+        units = {}
+        for name, (outcome, cache_hit) in unit_outcomes.items():
+            units[name] = {'verified': outcome['verified'], 'cache_hit': cache_hit}
+            for flag in ('cancelled', 'timed_out'):
+                if outcome.get(flag):
+                    units[name][flag] = True
+        return {
+            'verified': all(outcome['verified'] for outcome, _ in unit_outcomes.values()),
+            'output': '\n'.join(sections),
+            'errors': errors,
+            'return_code': return_code,
+            'units': units,
+            'cancelled': any(outcome.get('cancelled') for outcome, _ in unit_outcomes.values()),
+            'timed_out': any(outcome.get('timed_out') for outcome, _ in unit_outcomes.values())
+        }
+    
+    def _build_result(self, outcome: dict, stats: dict, cache_hit: bool) -> dict:
+        """Turn a raw Dafny outcome (fresh or cached) into the verify() result."""
+        output = outcome['output']
+        # Parse verification statistics from output
+        verification_stats = self._parse_verification_output(output)
+        
+        result_dict = {
+            'success': True,
+            'verified': outcome['verified'],
+            'output': self._format_output(output, stats, verification_stats) if self.verbose else output,
+            'errors': outcome['errors'],
+            'return_code': outcome['return_code'],
+            'cache_hit': cache_hit
+        }
+        if 'units' in outcome:
+            result_dict['units'] = outcome['units']
+        
+        if self.verbose:
+            result_dict['preprocessing_stats'] = stats
+            result_dict['verification_stats'] = verification_stats
+        
+        return result_dict
+    
     def _parse_verification_output(self, output: str) -> dict:
         """Extract verification statistics from Dafny output"""
         stats = {
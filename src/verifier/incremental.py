@@ -0,0 +1,164 @@
+"""
+Fingerprints for per-method incremental verification.
+
+The preprocessed source is split into verification units (methods, lemmas,
+functions, predicates) and class fields. Each unit's fingerprint covers:
+
+- its own tokens (so whitespace and comment edits do not count),
+- the fields it mentions,
+- every unit it mentions, transitively (callees, Valid()-style predicates
+  standing in for class invariants),
+- the remaining top-level context (imports, datatypes, class headers).
+
+A unit only needs re-verification when its fingerprint changes.
+"""
+
+import hashlib
+from dataclasses import dataclass, field
+from typing import Dict, List, Set
+
+from ..parser.dafny_lexer import tokenize
+
+UNIT_KEYWORDS = {'method', 'function', 'predicate', 'lemma', 'constructor'}
+FIELD_KEYWORDS = {'var', 'const'}
+# Keywords that may precede a declaration keyword
+DECLARATION_PREFIXES = {'ghost', 'static', 'twostate', 'abstract', 'opaque'}
+CONTAINER_KEYWORDS = {'class', 'trait', 'module'}
+
+
+@dataclass
+class Unit:
+    name: str            # Qualified name, e.g. Token.transfer
+    kind: str
+    text: str            # Normalized token text
+    references: Set[str] = field(default_factory=set)
+
+
+def _normalize(tokens) -> str:
+    return ' '.join(tok.value for tok in tokens)
+
+
+def split_units(source: str):
+    """
+    Split source into (context, units, fields).
+
+    units and fields map qualified names to Unit objects; context is the
+    normalized text of everything else.
+    """
+    tokens = tokenize(source)
+    units: Dict[str, Unit] = {}
+    fields: Dict[str, Unit] = {}
+    context_tokens = []
+
+    # Stack of open blocks: (kind, container name); kind is a container
+    # keyword or 'code' for any other braces
+    stack = []
+    pending_container = None
+    # Declaration currently being collected at container level:
+    # [kind, qualified name, start index, container depth]
+    current = None
+
+    def close(end: int):
+        nonlocal current
+        if current is None:
+            return
+        kind, name, start, _ = current
+        decl_tokens = tokens[start:end]
+        unit = Unit(name, kind, _normalize(decl_tokens),
+                    {tok.value for tok in decl_tokens if tok.kind == 'IDENT'})
+        (fields if kind in FIELD_KEYWORDS else units)[name] = unit
+        current = None
+
+    def container_name() -> str:
+        for kind, name in reversed(stack):
+            if kind in ('class', 'trait'):
+                return name
+        return ''
+
+    i = 0
+    n = len(tokens)
+    while i < n:
+        tok = tokens[i]
+        value = tok.value
+        at_container_level = not stack or stack[-1][0] in CONTAINER_KEYWORDS
+
+        if tok.kind == 'OP' and value == '{':
+            stack.append(pending_container or ('code', ''))
+            pending_container = None
+        elif tok.kind == 'OP' and value == '}':
+            if stack:
+                kind, _ = stack.pop()
+                if kind in CONTAINER_KEYWORDS and current is not None and current[3] == len(stack) + 1:
+                    close(i)
+        elif at_container_level and tok.kind == 'IDENT':
+            j = i
+            while j < n and tokens[j].value in DECLARATION_PREFIXES:
+                j += 1
+            keyword = tokens[j].value if j < n else None
+            if keyword in CONTAINER_KEYWORDS and j + 1 < n:
+                close(i)
+                pending_container = (keyword, tokens[j + 1].value)
+            elif keyword in UNIT_KEYWORDS or keyword in FIELD_KEYWORDS:
+                close(i)
+                k = j + 1
+                # 'function method' and 'predicate method' (Dafny 3 syntax)
+                if k < n and tokens[k].value == 'method':
+                    k += 1
+                if k < n and tokens[k].kind == 'IDENT':
+                    name = tokens[k].value
+                    k += 1
+                else:
+                    # Anonymous constructor
+                    name = '_ctor'
+                owner = container_name()
+                qualified = f"{owner}.{name}" if owner else name
+                current = [keyword, qualified, i, len(stack)]
+                i = k
+                continue
+            elif current is not None and current[3] == len(stack) and keyword in ('datatype', 'type', 'newtype', 'import', 'include'):
+                close(i)
+
+        if current is None:
+            context_tokens.append(tok)
+        i += 1
+    close(n)
+
+    return _normalize(context_tokens), units, fields
+
+
+def fingerprints(source: str) -> Dict[str, str]:
+    """Map each verification unit's qualified name to its fingerprint."""
+    context, units, fields = split_units(source)
+
+    by_short_name: Dict[str, List[Unit]] = {}
+    for unit in units.values():
+        by_short_name.setdefault(unit.name.rsplit('.', 1)[-1], []).append(unit)
+    fields_by_short_name: Dict[str, List[Unit]] = {}
+    for unit in fields.values():
+        fields_by_short_name.setdefault(unit.name.rsplit('.', 1)[-1], []).append(unit)
+
+    result = {}
+    for name, unit in units.items():
+        # Transitive closure over referenced units
+        seen = {name}
+        queue = [unit]
+        while queue:
+            for ref in queue.pop().references:
+                for dep in by_short_name.get(ref, ()):
+                    if dep.name not in seen:
+                        seen.add(dep.name)
+                        queue.append(dep)
+
+        digest = hashlib.sha256()
+        digest.update(context.encode())
+        for dep_name in sorted(seen):
+            digest.update(b'\0unit\0' + dep_name.encode() + b'\0' + units[dep_name].text.encode())
+        referenced_fields = set()
+        for dep_name in seen:
+            for ref in units[dep_name].references:
+                for fld in fields_by_short_name.get(ref, ()):
+                    referenced_fields.add(fld.name)
+        for field_name in sorted(referenced_fields):
+            digest.update(b'\0field\0' + fields[field_name].text.encode())
+        result[name] = digest.hexdigest()
+    return result
@@ -1,6 +1,9 @@
+import shutil
 import unittest
 from pathlib import Path
+from src.compiler.bytecode import MAX_INITCODE_SIZE, MAX_RUNTIME_SIZE
 from src.dafny_compiler import DafnyEVMCompiler
+from src.evm import LocalChain
 
 def get_test_compiler():
     return DafnyEVMCompiler(verify=False)
@@ -50,12 +53,15 @@ class TestIntegration(unittest.TestCase):
         self.assertIn('function unpause()', yul)
     
     def test_bytecode_size_limits(self):
-        """Test that generated bytecode is within reasonable limits"""
+        """Test that deployed code and initcode are within the EIP-170 and EIP-3860 limits"""
         for dfy_file in self.fixtures_dir.glob('*.dfy'):
             result = self.compiler.compile_file(str(dfy_file))
-            bytecode_size = len(result['bytecode']) // 2
-            self.assertLess(bytecode_size, 24576,  # 24KB limit
-                f"{dfy_file.name} exceeds size limit: {bytecode_size} bytes")
+            runtime_size = result['runtime_size']
+            self.assertLessEqual(runtime_size, MAX_RUNTIME_SIZE,
+                f"{dfy_file.name} exceeds contract size limit: {runtime_size} bytes")
+            initcode_size = len(result['bytecode']) // 2
+            self.assertLessEqual(initcode_size, MAX_INITCODE_SIZE,
+                f"{dfy_file.name} exceeds initcode size limit: {initcode_size} bytes")
     
     def test_deterministic_compilation(self):
         """Test that compilation is deterministic"""
@@ -185,5 +191,30 @@ class TestSecurityPatterns(unittest.TestCase):
         result = self.compiler.compile(source)
         self.assertTrue(result['success'])
 
+
+class TestLocalExecution(unittest.TestCase):
+    def setUp(self):
+        if not shutil.which('solc'):
+            self.skipTest("solc not installed")
+        result = get_test_compiler().compile_file('tests/fixtures/Counter.dfy')
+        self.assertTrue(result['success'], result.get('error'))
+        self.chain = LocalChain()
+        self.counter = self.chain.deploy(result)
+
+    def test_counter_round_trip(self):
+        """Test the compiled Counter deploys, counts and reports its storage changes"""
+        self.assertEqual(self.counter.call('getCount').value, 0)
+        result = self.counter.call('increment')
+        self.assertTrue(result.success, result.error)
+        self.assertEqual(result.value, 1)
+        self.assertTrue(result.storage_changes)
+        self.assertEqual(self.counter.call('getCount').value, 1)
+
+    def test_failed_precondition_reverts(self):
+        """Test decrementing from zero reverts without changing storage"""
+        result = self.counter.call('decrement')
+        self.assertFalse(result.success)
+        self.assertEqual(result.storage_changes, {})
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1 @@
+"""Unit tests for individual compiler components."""
@@ -0,0 +1,41 @@
+"""
+Stand-ins for the dafny and solc executables, so the compiler's subprocess
+handling can be tested without either toolchain installed.
+"""
+import stat
+import sys
+from pathlib import Path
+from typing import Optional
+
+# Answers `solc --version`; every fake solc starts with it
+SOLC_VERSION = """
+import sys, time
+if sys.argv[1] == '--version':
+    print('solc, the solidity compiler commandline interface')
+    print('Version: 0.8.20+stand-in')
+    sys.exit(0)
+"""
+
+
+def write_tool(directory: str, name: str, body: str) -> str:
+    """Write body as an executable Python script named name in directory; returns its path."""
+    path = Path(directory) / name
+    path.write_text(f"#!{sys.executable}\n" + body)
+    path.chmod(path.stat().st_mode | stat.S_IEXEC)
+    return str(path)
+
+
+def fake_solc(directory: str, code: str = "code = '00'", delay: float = 0, body: Optional[str] = None) -> str:
+    """
+    Write a stand-in for `solc --strict-assembly --bin`: after `delay`
+    seconds it prints the `code` variable as the binary, where `code` is
+    Python that may read `source`, the Yul it was given. `body` replaces
+    that output entirely, e.g. to answer `--standard-json`.
+    """
+    if body is None:
+        body = (f"time.sleep({delay})\n"
+                f"source = open(sys.argv[-1]).read()\n"
+                f"{code}\n"
+                f"print('Binary representation:')\n"
+                f"print(code)\n")
+    return write_tool(directory, 'solc', SOLC_VERSION + body)
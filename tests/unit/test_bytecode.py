@@ -0,0 +1,98 @@
+import tempfile
+import unittest
+from src.compiler.bytecode import runtime_info, split_metadata
+from src.compiler.evm_compiler import EVMCompiler, runtime_object_source
+from src.dafny_compiler import DafnyEVMCompiler
+from tests.unit.fake_tools import fake_solc
+
+CONTRACT = """
+class Counter {
+    var count: uint256
+
+    method increment()
+        modifies this
+    {
+        count := count + 1;
+    }
+}
+"""
+
+# A Solidity-style metadata section: {"ipfs": <34 bytes>, "solc": 0.8.20}, then its length
+METADATA = "a2" + "6469706673" + "5822" + "12" * 34 + "64736f6c6343" + "000814" + "0033"
+
+# Stand-in for solc: an object's code is its text length (two bytes),
+# followed by the code of the object nested in it, as solc embeds it
+SOLC_CODE = """
+text = source.strip()
+code = '%04x' % len(text)
+if text.count('object "') > 1:
+    inner = text[text.index('object "', 1):len(text[:-1].rstrip())]
+    code += '%04x' % len(inner)
+"""
+
+
+class TestMetadata(unittest.TestCase):
+    def test_split_metadata(self):
+        """Test a trailing CBOR metadata section is split off with its length."""
+        self.assertEqual(split_metadata("6080604052" + METADATA), ("6080604052", METADATA))
+
+    def test_no_metadata(self):
+        """Test code without a metadata section is returned whole."""
+        for code in ("", "00", "6080604052", "60806040520033", "6080a1" + "00" * 5 + "0006"):
+            self.assertEqual(split_metadata(code), (code, ""), code)
+
+
+class TestRuntimeInfo(unittest.TestCase):
+    def test_sizes_and_offset(self):
+        """Test the deployed size includes metadata, and the runtime is found in the creation code."""
+        runtime = "6001600055" + METADATA
+        info = runtime_info("6080" + "fe" + runtime, runtime)
+        self.assertEqual(info["runtime_size"], 5 + len(METADATA) // 2)
+        self.assertEqual(info["metadata_size"], len(METADATA) // 2)
+        self.assertEqual(info["runtime_offset"], 3)
+
+    def test_immutables_zeroed_in_embedded_copy(self):
+        """Test a runtime with immutables filled in still matches its zeroed copy in the creation code."""
+        references = {"3": [{"start": 1, "length": 2}]}
+        info = runtime_info("60aa" + "7f000000", "7fbeef00", references)
+        self.assertEqual(info["runtime_offset"], 2)
+        self.assertEqual(info["immutable_references"], references)
+        self.assertIsNone(runtime_info("60aa", "7fbeef00")["runtime_offset"])
+
+    def test_runtime_object_source(self):
+        """Test the runtime sub-object is cut out of a generated object, comments and strings included."""
+        yul = 'object "A" { code { } /* object "x" { } */ object "runtime" { code { let s := "}" } } }'
+        self.assertEqual(runtime_object_source(yul), 'object "runtime" { code { let s := "}" } }')
+        self.assertIsNone(runtime_object_source('object "A" { code { } }'))
+
+
+class TestCompiledRuntime(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.solc = fake_solc(self.tmp.name, SOLC_CODE)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_runtime_is_not_creation_code(self):
+        """Test the runtime is assembled from the runtime sub-object and found inside the creation code."""
+        compiler = DafnyEVMCompiler(self.solc, verify=False, use_cache=False)
+        result = compiler.compile(CONTRACT)
+        self.assertTrue(result["success"])
+        runtime_source = runtime_object_source(result["yul_code"])
+        self.assertEqual(int(result["runtime_bytecode"], 16), len(runtime_source))
+        self.assertNotEqual(result["runtime_bytecode"], result["bytecode"])
+        self.assertEqual(result["runtime_size"], 2)
+        self.assertEqual(result["runtime_offset"], 2)
+        self.assertEqual(result["metadata_size"], 0)
+
+    def test_object_without_runtime(self):
+        """Test an object with no sub-object has no runtime code rather than its creation code."""
+        result = EVMCompiler(self.solc).compile_yul('object "A" { code { stop() } }')
+        self.assertTrue(result["success"])
+        self.assertEqual(result["runtime_bytecode"], "")
+        self.assertEqual(result["runtime_size"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import os
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from src.compiler.cache import DiskCache
+from src.compiler.evm_compiler import EVMCompiler
+from src.verifier.dafny_verifier import DafnyVerifier
+
+
+class TestDiskCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = DiskCache(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip_and_counters(self):
+        """Test stored entries are returned and hits/misses are counted."""
+        key = DiskCache.key('object "A" {}', 'solc 0.8.20')
+        self.assertIsNone(self.cache.get(key))
+        self.cache.put(key, {'bytecode': '6001'})
+        self.assertEqual(self.cache.get(key), {'bytecode': '6001'})
+        self.assertEqual(self.cache.stats(), {'hits': 1, 'misses': 1, 'hit_rate': 0.5})
+
+    def test_key_separates_parts(self):
+        """Test keys depend on part boundaries, not just concatenation."""
+        self.assertNotEqual(DiskCache.key('ab', 'c'), DiskCache.key('a', 'bc'))
+
+    def test_no_temp_files_left_behind(self):
+        """Test writes are moved into place atomically."""
+        self.cache.put(DiskCache.key('x'), {'v': 1})
+        leftovers = [p for p in Path(self.tmp.name).rglob('*') if p.name.startswith('.tmp-')]
+        self.assertEqual(leftovers, [])
+
+    def test_lru_eviction(self):
+        """Test the least recently used entry is evicted when over budget."""
+        keys = [DiskCache.key(str(i)) for i in range(3)]
+        self.cache.put(keys[0], {'data': 'x' * 100})
+        self.cache.put(keys[1], {'data': 'x' * 100})
+        # Age both entries, then touch the first so the second is oldest
+        past = time.time() - 100
+        for key in keys[:2]:
+            os.utime(self.cache._path(key), (past, past))
+        self.cache.get(keys[0])
+        self.cache.max_bytes = 250
+        self.cache.put(keys[2], {'data': 'x' * 100})
+        self.assertIsNotNone(self.cache.get(keys[0]))
+        self.assertIsNone(self.cache.get(keys[1]))
+        self.assertIsNotNone(self.cache.get(keys[2]))
+
+
+class TestBytecodeCache(unittest.TestCase):
+    def test_cached_bytecode_skips_solc(self):
+        """Test a cache hit is served without invoking solc."""
+        with tempfile.TemporaryDirectory() as tmp:
+            compiler = EVMCompiler('solc-that-does-not-exist', cache=DiskCache(tmp))
+            compiler._solc_version = 'solc, the solidity compiler 0.8.20'
+            yul = 'object "A" { code { } }'
+            compiler.cache.put(compiler._cache_key(yul), {'bytecode': '00', 'runtime_bytecode': '00', 'success': True})
+            result = compiler.compile_yul(yul)
+            self.assertTrue(result['success'])
+            self.assertTrue(result['cache_hit'])
+            self.assertEqual(compiler.cache_stats()['hits'], 1)
+
+
+
+class TestVerificationCache(unittest.TestCase):
+    def test_cached_verdict_skips_dafny(self):
+        """Test a repeat verification is served from the cache."""
+        source = """
+        class Counter {
+          var count: uint256
+          method increment() modifies this { count := count + 1; }
+        }
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            verifier = DafnyVerifier(dafny_path='dafny-that-does-not-exist', cache=DiskCache(tmp))
+            verifier._dafny_version = '4.4.0'
+            processed, _ = verifier._preprocess_for_verification(source)
+            verifier.cache.put(verifier._cache_key(processed), {
+                'verified': True,
+                'output': 'Dafny program verifier finished with 1 verified, 0 errors',
+                'errors': [],
+                'return_code': 0,
+            })
+            result = verifier.verify(source)
+            self.assertTrue(result['verified'])
+            self.assertTrue(result['cache_hit'])
+            self.assertEqual(verifier.cache_stats()['hits'], 1)
+
+    def test_key_depends_on_flags(self):
+        """Test changing verifier limits invalidates cached verdicts."""
+        verifier = DafnyVerifier(dafny_path='dafny-that-does-not-exist', cache=DiskCache('unused'))
+        verifier._dafny_version = '4.4.0'
+        key = verifier._cache_key('class A {}')
+        verifier.VERIFY_FLAGS = ('--resource-limit', '1')
+        self.assertNotEqual(verifier._cache_key('class A {}'), key)
+
+
+if __name__ == '__main__':
+    unittest.main()
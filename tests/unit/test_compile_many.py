@@ -0,0 +1,69 @@
+import tempfile
+import unittest
+from pathlib import Path
+from src.dafny_compiler import DafnyEVMCompiler
+from tests.unit.fake_tools import fake_solc
+
+CONTRACT = """
+class {name} {{
+    var count: uint256
+
+    constructor() {{
+        count := 0;
+    }}
+
+    method increment()
+        modifies this
+    {{
+        count := count + 1;
+    }}
+}}
+"""
+
+class TestCompileMany(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.paths = []
+        for name in ('Alpha', 'Beta', 'Gamma'):
+            path = Path(self.tmp.name) / f"{name}.dfy"
+            path.write_text(CONTRACT.format(name=name))
+            self.paths.append(str(path))
+        # The stand-in solc emits the Yul length as "bytecode"
+        solc = fake_solc(self.tmp.name, "code = '%064x' % len(source)")
+        self.compiler = DafnyEVMCompiler(solc, verify=False, use_cache=False)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_results_in_input_order(self):
+        """Test each file gets its own result, keyed and ordered by path."""
+        results = self.compiler.compile_many(self.paths, jobs=2)
+        self.assertEqual(list(results), self.paths)
+        self.assertEqual([r['contract_name'] for r in results.values()], ['Alpha', 'Beta', 'Gamma'])
+        for result in results.values():
+            self.assertTrue(result['success'])
+            self.assertEqual(int(result['bytecode'], 16), len(result['yul_code']))
+
+    def test_parallel_matches_serial(self):
+        """Test worker processes produce the same output as in-process compilation."""
+        serial = self.compiler.compile_many(self.paths, jobs=1)
+        parallel = self.compiler.compile_many(self.paths, jobs=3)
+        for path in self.paths:
+            self.assertEqual(serial[path]['yul_code'], parallel[path]['yul_code'])
+            self.assertEqual(serial[path]['abi'], parallel[path]['abi'])
+            self.assertEqual(serial[path]['bytecode'], parallel[path]['bytecode'])
+
+    def test_failures_are_isolated(self):
+        """Test a missing or malformed file fails alone."""
+        missing = str(Path(self.tmp.name) / 'Missing.dfy')
+        broken = Path(self.tmp.name) / 'Broken.dfy'
+        broken.write_text("class { }")
+        results = self.compiler.compile_many([self.paths[0], missing, str(broken)], jobs=2)
+        self.assertFalse(results[missing]['success'])
+        self.assertIn('Missing.dfy', results[missing]['error'])
+        self.assertFalse(results[str(broken)]['success'])
+        self.assertTrue(results[self.paths[0]]['success'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,174 @@
+import unittest
+from src.parser.dafny_parser import DafnyParser
+from src.translator.cse import may_alias, optimize_storage_access
+from src.translator.yul_ast import Call, Identifier, Literal, format_function, parse_function
+from src.translator.yul_generator import YulGenerator
+
+ALLOWANCES = """
+class Token {
+    var balances: mapping<address, uint256>
+    var allowances: mapping<address, mapping<address, uint256>>
+
+    method transferFrom(from: address, to: address, amount: uint256)
+        modifies this
+    {
+        require(balances[from] >= amount);
+        require(allowances[from][msg.sender] >= amount);
+        balances[from] := balances[from] - amount;
+        balances[to] := balances[to] + amount;
+        allowances[from][msg.sender] := allowances[from][msg.sender] - amount;
+    }
+}
+"""
+
+
+def optimize(function: str) -> str:
+    return optimize_storage_access(function)
+
+
+class TestYulAst(unittest.TestCase):
+    def test_round_trip(self):
+        """Test printing a parsed function gives back the same text."""
+        text = ("function f(a, b) -> r {\n"
+                "  let x := add(a, 0x20)\n"
+                "  if iszero(x) { revert(0, 0) }\n"
+                "  switch b\n"
+                "  case 0 {\n"
+                "    r := 1\n"
+                "  }\n"
+                "  default {\n"
+                "    r := x\n"
+                "  }\n"
+                "  for { let i := 0 } lt(i, a) { i := add(i, 1) } {\n"
+                "    sstore(i, \"x\")\n"
+                "  }\n"
+                "}")
+        function = parse_function(text)
+        self.assertEqual(format_function(function), text)
+        self.assertEqual(parse_function(format_function(function)), function)
+
+    def test_expressions_are_hashable(self):
+        """Test equal expressions compare and hash equal."""
+        a = parse_function("function f() { sstore(keccak256_mapping(2, x), 1) }").body.statements[0].expr
+        b = parse_function("function g() { pop(keccak256_mapping(2, x)) }").body.statements[0].expr
+        self.assertEqual(hash(a.args[0]), hash(b.args[0]))
+
+
+class TestAliasing(unittest.TestCase):
+    def test_literal_slots(self):
+        """Test distinct literal slots never alias."""
+        self.assertFalse(may_alias(Literal('0'), Literal('1')))
+        self.assertTrue(may_alias(Literal('1'), Literal('0x1')))
+
+    def test_mapping_slots(self):
+        """Test hashed slots alias only when their bases can."""
+        from_balance = Call('keccak256_mapping', (Literal('2'), Identifier('from')))
+        to_balance = Call('keccak256_mapping', (Literal('2'), Identifier('to')))
+        allowance = Call('keccak256_mapping', (Call('keccak256_mapping', (Literal('3'), Identifier('from'))),
+                                               Call('caller')))
+        self.assertTrue(may_alias(from_balance, to_balance))
+        self.assertFalse(may_alias(from_balance, allowance))
+        self.assertFalse(may_alias(from_balance, Literal('2')))
+        self.assertFalse(may_alias(Call('keccak256_mapping', (Literal('2'), Literal('7'))),
+                                   Call('keccak256_mapping', (Literal('2'), Literal('8')))))
+        self.assertTrue(may_alias(Identifier('slot'), Literal('2')))
+
+    def test_one_word_hashes(self):
+        """Test the two one-word hash helpers alias each other, but not a two-word mapping hash."""
+        single = Call('keccak256_single', (Identifier('slot'),))
+        self.assertTrue(may_alias(single, Call('keccak256_hash', (Identifier('value'),))))
+        self.assertTrue(may_alias(Call('keccak256_hash', (Literal('3'),)), Call('keccak256_single', (Literal('3'),))))
+        self.assertFalse(may_alias(Call('keccak256_hash', (Literal('4'),)), Call('keccak256_single', (Literal('3'),))))
+        self.assertFalse(may_alias(single, Call('keccak256_mapping', (Identifier('slot'), Identifier('key')))))
+
+
+class TestCommonSubexpressions(unittest.TestCase):
+    def test_reuses_load_and_hash(self):
+        """Test a read-modify-write loads and hashes its slot once."""
+        out = optimize("function f(k, v) {\n"
+                       "  if lt(sload(keccak256_mapping(2, k)), v) { revert(0, 0) }\n"
+                       "  sstore(keccak256_mapping(2, k), sub(sload(keccak256_mapping(2, k)), v))\n"
+                       "}")
+        self.assertEqual(out.count("keccak256_mapping"), 1)
+        self.assertEqual(out.count("sload"), 1)
+        self.assertIn("sstore(_cse_0, sub(_cse_1, v))", out)
+
+    def test_single_use_is_unchanged(self):
+        """Test functions without repeated accesses keep their text."""
+        text = "function f(k) {\n  sstore(keccak256_mapping(2, k), 1)\n  sstore(3, sload(4))\n}"
+        self.assertEqual(optimize(text), text)
+
+    def test_aliasing_store_invalidates_load(self):
+        """Test a store that may hit the slot forces a fresh load."""
+        out = optimize("function f(a, b) {\n"
+                       "  sstore(keccak256_mapping(2, a), add(sload(keccak256_mapping(2, a)), 1))\n"
+                       "  sstore(keccak256_mapping(2, b), 5)\n"
+                       "  sstore(9, sload(keccak256_mapping(2, a)))\n"
+                       "}")
+        self.assertEqual(out.count("sload"), 2)
+        # The hash itself is still reused
+        self.assertEqual(out.count("keccak256_mapping(2, a)"), 1)
+
+    def test_disjoint_store_keeps_load(self):
+        """Test a store to a different literal slot does not invalidate a load."""
+        out = optimize("function f() -> r {\n"
+                       "  sstore(1, sload(0))\n"
+                       "  r := sload(0)\n"
+                       "}")
+        self.assertEqual(out.count("sload(0)"), 1)
+
+    def test_user_call_invalidates_loads(self):
+        """Test calls that may write storage end reuse, storage-free helpers do not."""
+        helpers = ("function writer() {\n  sstore(0, 1)\n}\n"
+                   "function reader() -> r {\n  r := sload(5)\n}\n")
+        out = optimize(helpers + "function f() -> r {\n  r := sload(0)\n  writer()\n  r := add(r, sload(0))\n}")
+        self.assertEqual(out.count("sload(0)"), 2)
+        out = optimize(helpers + "function f() -> r {\n  r := sload(0)\n  pop(reader())\n  r := add(r, sload(0))\n}")
+        self.assertEqual(out.count("sload(0)"), 1)
+
+    def test_assignment_invalidates_dependent_hash(self):
+        """Test reassigning a key variable forces the hash to be recomputed."""
+        out = optimize("function f(k) {\n"
+                       "  sstore(keccak256_mapping(2, k), sload(keccak256_mapping(2, k)))\n"
+                       "  k := add(k, 1)\n"
+                       "  sstore(keccak256_mapping(2, k), 0)\n"
+                       "}")
+        self.assertEqual(out.count("keccak256_mapping(2, k)"), 2)
+
+    def test_loop_writes_invalidate_before_body(self):
+        """Test values changed anywhere in a loop are not reused inside it."""
+        out = optimize("function f(n) {\n"
+                       "  let x := sload(0)\n"
+                       "  for { let i := 0 } lt(i, n) { i := add(i, 1) } {\n"
+                       "    sstore(0, add(sload(0), x))\n"
+                       "  }\n"
+                       "}")
+        self.assertEqual(out.count("sload(0)"), 2)
+
+    def test_branch_bindings_stay_in_branch(self):
+        """Test values bound inside a branch are not used after it."""
+        out = optimize("function f(c) {\n"
+                       "  if c {\n"
+                       "    sstore(1, add(sload(0), sload(0)))\n"
+                       "  }\n"
+                       "  sstore(2, add(sload(0), sload(0)))\n"
+                       "}")
+        self.assertEqual(out.count("sload(0)"), 2)
+        self.assertEqual(out.count("let _cse_"), 2)
+
+
+class TestGeneratedCode(unittest.TestCase):
+    def test_transfer_from(self):
+        """Test transferFrom hashes and loads each slot once."""
+        contract = DafnyParser(ALLOWANCES).parse()
+        plain = YulGenerator(cse=False).generate(contract)
+        optimized = YulGenerator().generate(contract)
+        self.assertLess(optimized.count("sload("), plain.count("sload("))
+        self.assertLess(optimized.count("keccak256_mapping("), plain.count("keccak256_mapping("))
+        body = optimized[optimized.index("function transferFrom"):]
+        # balances[to] may be balances[from], so it is loaded after the first store
+        self.assertEqual(body[:body.index("\n      }")].count("sload("), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
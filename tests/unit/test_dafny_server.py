@@ -0,0 +1,101 @@
+import os
+import tempfile
+import textwrap
+import unittest
+from pathlib import Path
+from src.verifier.dafny_server import DafnyServer
+from tests.unit.fake_tools import write_tool
+
+# Minimal stand-in for `dafny server`: answers requests and reports a
+# verification result for each opened document, so the LSP client logic can
+# be exercised without a .NET toolchain.
+FAKE_SERVER = textwrap.dedent('''
+    import json, os, sys
+
+    def read():
+        headers = {}
+        while True:
+            line = sys.stdin.buffer.readline()
+            if not line:
+                sys.exit(0)
+            line = line.strip()
+            if not line:
+                break
+            key, _, value = line.decode().partition(':')
+            headers[key.lower()] = value.strip()
+        return json.loads(sys.stdin.buffer.read(int(headers['content-length'])))
+
+    def send(message):
+        body = json.dumps(message).encode()
+        sys.stdout.buffer.write(b'Content-Length: %d\\r\\n\\r\\n' % len(body) + body)
+        sys.stdout.buffer.flush()
+
+    crash_marker = os.environ['FAKE_DAFNY_CRASH_MARKER']
+    while True:
+        message = read()
+        method = message.get('method')
+        if 'id' in message:
+            if method in ('initialize', 'shutdown'):
+                send({'jsonrpc': '2.0', 'id': message['id'], 'result': {}})
+            else:
+                send({'jsonrpc': '2.0', 'id': message['id'], 'error': {'code': -32601, 'message': 'not found'}})
+            continue
+        if method == 'exit':
+            sys.exit(0)
+        if method == 'textDocument/didOpen':
+            doc = message['params']['textDocument']
+            if 'CRASH' in doc['text'] and not os.path.exists(crash_marker):
+                open(crash_marker, 'w').close()
+                sys.exit(1)
+            failing = 'assert false' in doc['text']
+            diagnostics = [{'severity': 1, 'message': 'assertion might not hold',
+                            'range': {'start': {'line': 2, 'character': 4}}}] if failing else []
+            send({'jsonrpc': '2.0', 'method': 'textDocument/publishDiagnostics',
+                  'params': {'uri': doc['uri'], 'diagnostics': diagnostics}})
+            send({'jsonrpc': '2.0', 'method': 'dafny/textDocument/symbolStatus',
+                  'params': {'uri': doc['uri'], 'namedVerifiables': [{'status': 4 if failing else 5}]}})
+''')
+
+
+class TestDafnyServer(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        script = write_tool(self.tmp.name, 'dafny', FAKE_SERVER)
+        os.environ['FAKE_DAFNY_CRASH_MARKER'] = str(Path(self.tmp.name) / 'crashed')
+        self.server = DafnyServer(script)
+
+    def tearDown(self):
+        self.server.stop()
+        self.tmp.cleanup()
+
+    def test_verified_document(self):
+        """Test a clean document produces a verified CLI-shaped outcome."""
+        outcome = self.server.verify("method M() { }", timeout=10)
+        self.assertTrue(outcome['verified'])
+        self.assertEqual(outcome['return_code'], 0)
+        self.assertIn('1 verified, 0 errors', outcome['output'])
+
+    def test_failing_document(self):
+        """Test error diagnostics become errors with line numbers."""
+        outcome = self.server.verify("method M() {\n\n    assert false;\n}", timeout=10)
+        self.assertFalse(outcome['verified'])
+        self.assertEqual(len(outcome['errors']), 1)
+        self.assertIn('(3,5): Error: assertion might not hold', outcome['errors'][0])
+
+    def test_process_is_reused(self):
+        """Test consecutive verifications share one server process."""
+        self.server.verify("method A() { }", timeout=10)
+        pid = self.server._process.pid
+        self.server.verify("method B() { }", timeout=10)
+        self.assertEqual(self.server._process.pid, pid)
+        self.assertTrue(self.server.health_check())
+
+    def test_restart_after_crash(self):
+        """Test a crash mid-verification restarts the server and retries."""
+        outcome = self.server.verify("method CRASH() { }", timeout=10)
+        self.assertTrue(outcome['verified'])
+        self.assertEqual(self.server.restarts, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
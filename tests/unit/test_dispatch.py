@@ -0,0 +1,107 @@
+import unittest
+from src.parser.dafny_parser import DafnyParser
+from src.translator.dispatch import (DISPATCH_STRATEGIES, DispatchEntry, comparison_counts,
+                                     emit_dispatch, plan_dispatch)
+from src.translator.yul_generator import YulGenerator
+
+
+def make_entries(count: int):
+    gen = YulGenerator()
+    return [DispatchEntry(gen._compute_selector(f"op{i}(uint256)"), f"op{i}(uint256)", f"op{i}")
+            for i in range(count)]
+
+
+def route(plan: tuple, selector: int):
+    """Follow a plan the way the emitted Yul would; returns the entry or None."""
+    kind = plan[0]
+    if kind in ('chain', 'switch'):
+        return next((e for e in plan[1] if int(e.selector, 16) == selector), None)
+    if kind == 'split':
+        _, pivot, lower, upper = plan
+        return route(lower if selector < int(pivot, 16) else upper, selector)
+    _, shift, mask, buckets = plan
+    node = dict(buckets).get((selector >> shift) & mask)
+    return route(node, selector) if node else None
+
+
+class TestDispatchPlans(unittest.TestCase):
+    def test_every_strategy_routes_every_selector(self):
+        """Test each selector reaches its own handler and unknown ones reach none."""
+        for count in (1, 5, 50, 200):
+            entries = make_entries(count)
+            for strategy in DISPATCH_STRATEGIES:
+                plan = plan_dispatch(entries, strategy)
+                for entry in entries:
+                    self.assertEqual(route(plan, int(entry.selector, 16)), entry, (strategy, count))
+                self.assertIsNone(route(plan, 0xdeadbeef))
+                self.assertEqual(len(comparison_counts(plan)), count)
+
+    def test_binary_search_is_logarithmic(self):
+        """Test the deepest selector needs far fewer comparisons than a chain."""
+        entries = make_entries(200)
+        worst = max(comparison_counts(plan_dispatch(entries, 'binary')).values())
+        self.assertLessEqual(worst, 10)
+        self.assertEqual(max(comparison_counts(plan_dispatch(entries, 'linear')).values()), 200)
+
+    def test_profile_moves_hot_selectors_forward(self):
+        """Test a call-frequency profile shortens the path to hot selectors."""
+        entries = make_entries(50)
+        hot = entries[-1]
+        profile = {hot.signature: 1000}
+        for strategy in ('linear', 'switch'):
+            self.assertEqual(comparison_counts(plan_dispatch(entries, strategy, profile))[hot.selector], 1)
+        unweighted = comparison_counts(plan_dispatch(entries, 'binary'))[hot.selector]
+        weighted = comparison_counts(plan_dispatch(entries, 'binary', profile))[hot.selector]
+        self.assertLess(weighted, unweighted)
+
+    def test_unknown_strategy(self):
+        """Test an unknown strategy name is rejected."""
+        with self.assertRaises(ValueError):
+            YulGenerator(dispatch='perfect_hash')
+
+
+class TestDispatchCodegen(unittest.TestCase):
+    SOURCE = """
+    class Token {
+        var totalSupply: uint256
+        var balances: mapping<address, uint256>
+
+        method transfer(to: address, amount: uint256)
+            modifies this
+        {
+            balances[to] := balances[to] + amount;
+        }
+
+        method mint(amount: uint256)
+            modifies this
+        {
+            totalSupply := totalSupply + amount;
+        }
+    }
+    """
+
+    def test_linear_is_default(self):
+        """Test the default keeps one if-eq per selector."""
+        yul = YulGenerator().generate(DafnyParser(self.SOURCE).parse())
+        self.assertIn("if eq(selector, ", yul)
+        self.assertNotIn("switch selector", yul)
+
+    def test_strategies_emit_balanced_yul(self):
+        """Test every strategy emits well-formed blocks that call each handler once."""
+        contract = DafnyParser(self.SOURCE).parse()
+        for strategy in DISPATCH_STRATEGIES:
+            yul = YulGenerator(dispatch=strategy).generate(contract)
+            self.assertEqual(yul.count('{'), yul.count('}'), strategy)
+            dispatcher = yul[yul.index('let selector'):yul.index('function allocate_memory')]
+            self.assertEqual(dispatcher.count('transfer()'), 1, strategy)
+            self.assertEqual(dispatcher.count('mint()'), 1, strategy)
+
+    def test_split_emits_switch_on_lt(self):
+        """Test binary search splits on lt(selector, pivot)."""
+        code = emit_dispatch(plan_dispatch(make_entries(10), 'binary'))
+        self.assertTrue(code.startswith("      switch lt(selector, 0x"))
+        self.assertIn("default {", code)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+import unittest
+from src.parser.dafny_parser import DafnyParser
+from src.translator.dse import eliminate_dead_stores
+from src.translator.yul_ast import format_stmt, parse_function
+from src.translator.yul_generator import YulGenerator
+
+WALLET = """
+class Wallet {
+    var owner: address
+    var paused: bool
+    var balance: uint256
+    var limits: mapping<address, uint256>
+
+    constructor(initial: uint256)
+    {
+        owner := msg.sender;
+        paused := false;
+        balance := initial;
+    }
+
+    method reset(amount: uint256)
+        modifies this
+    {
+        balance := 0;
+        balance := amount;
+    }
+}
+"""
+
+
+def optimize(function: str, fresh: bool = False) -> list:
+    body = eliminate_dead_stores(parse_function(function).body, fresh=fresh)
+    return [line.strip() for stmt in body.statements for line in format_stmt(stmt)]
+
+
+class TestDeadStores(unittest.TestCase):
+    def test_fresh_storage_zero_stores_dropped(self):
+        """Test zero stores to untouched slots of a new contract are removed."""
+        lines = optimize("function f() { sstore(0, 0) sstore(1, false) sstore(keccak256_mapping(2, x), 0) }",
+                         fresh=True)
+        self.assertEqual(lines, [])
+
+    def test_zero_store_kept_outside_constructor(self):
+        """Test a zero store is kept when the slot's contents are unknown."""
+        self.assertEqual(optimize("function f() { sstore(0, 0) }"), ["sstore(0, 0)"])
+
+    def test_store_after_write_kept(self):
+        """Test a zero store after a possibly aliasing write is kept."""
+        lines = optimize("function f() { sstore(keccak256_mapping(2, x), 5) sstore(keccak256_mapping(2, y), 0) }",
+                         fresh=True)
+        self.assertEqual(len(lines), 2)
+
+    def test_same_value_stored_again(self):
+        """Test storing the literal or variable a slot already holds is removed."""
+        lines = optimize("function f(a) { sstore(3, a) mstore(0, a) sstore(3, a) sstore(4, 7) sstore(4, 0x07) }")
+        self.assertEqual(lines, ["sstore(3, a)", "mstore(0, a)", "sstore(4, 7)"])
+
+    def test_reassigned_variable_not_same_value(self):
+        """Test a store of a variable reassigned since the last store is kept."""
+        lines = optimize("function f(a) { sstore(3, a) a := add(a, 1) sstore(3, a) }")
+        # The first store is the dead one: the second overwrites it
+        self.assertEqual(lines, ["a := add(a, 1)", "sstore(3, a)"])
+
+    def test_store_of_loaded_value(self):
+        """Test sstore(s, sload(s)) is removed."""
+        self.assertEqual(optimize("function f() { sstore(keccak256_mapping(1, x), sload(keccak256_mapping(1, x))) }"),
+                         [])
+
+    def test_overwritten_store_dropped(self):
+        """Test a store overwritten later in the block with no read between is removed."""
+        lines = optimize("function f(a, b) { sstore(1, a) sstore(2, b) if iszero(b) { revert(0, 0) } sstore(1, b) }")
+        self.assertEqual(lines[0], "sstore(2, b)")
+        self.assertEqual(lines.count("sstore(1, b)"), 1)
+        self.assertNotIn("sstore(1, a)", lines)
+
+    def test_read_between_keeps_store(self):
+        """Test a store read before being overwritten is kept."""
+        lines = optimize("function f(a) { sstore(1, a) sstore(1, add(sload(1), 1)) }")
+        self.assertEqual(lines, ["sstore(1, a)", "sstore(1, add(sload(1), 1))"])
+
+    def test_exit_between_keeps_store(self):
+        """Test a store before a return or a user call is kept."""
+        lines = optimize("function f(a) { sstore(1, a) if a { return(0, 0) } sstore(1, 2) }")
+        self.assertEqual(len(lines), 3)
+        lines = optimize("function f(a) { sstore(1, a) helper() sstore(1, 2) }")
+        self.assertEqual(len(lines), 3)
+
+    def test_conditional_store_does_not_overwrite(self):
+        """Test a store inside a branch does not make an earlier store dead."""
+        lines = optimize("function f(a) { sstore(1, a) if a { sstore(1, 2) } }")
+        self.assertEqual(lines[0], "sstore(1, a)")
+
+    def test_side_effecting_value_kept(self):
+        """Test a store whose value has side effects is never removed."""
+        lines = optimize("function f(a) { sstore(1, call(gas(), a, 0, 0, 0, 0, 0)) sstore(1, 0) }")
+        self.assertEqual(len(lines), 2)
+
+    def test_packed_clear_of_zero_bits(self):
+        """Test clearing packed bits that are known to be zero is removed."""
+        lines = optimize("function f() { sstore(0, and(caller(), 0xffffffffffffffffffffffffffffffffffffffff)) "
+                         "sstore(0, and(sload(0), not(0xff0000000000000000000000000000000000000000))) }", fresh=True)
+        self.assertEqual(len(lines), 1)
+
+
+class TestGeneratedDeadStores(unittest.TestCase):
+    def setUp(self):
+        contract = DafnyParser(WALLET).parse()
+        self.yul = YulGenerator().generate(contract)
+        self.unoptimized = YulGenerator(dse=False).generate(contract)
+
+    def test_constructor_zero_init_removed(self):
+        """Test the constructor only stores the values it assigns."""
+        constructor = self.yul[:self.yul.index('object "runtime"')]
+        self.assertNotIn("sstore(0, 0)", constructor)
+        self.assertNotIn("sstore(1, 0)", constructor)
+        self.assertIn("sstore(1, initial)", constructor)
+        # paused := false leaves the packed slot as it is
+        self.assertEqual(constructor.count("sstore(0,"), 1)
+        self.assertIn("sstore(0, 0)", self.unoptimized)
+
+    def test_method_overwrite_removed(self):
+        """Test a method's store that is immediately overwritten is removed."""
+        reset = self.yul[self.yul.index("function reset()"):]
+        self.assertNotIn("sstore(1, 0)", reset)
+        self.assertIn("sstore(1, amount)", reset)
+
+    def test_runtime_storage_not_assumed_zero(self):
+        """Test zero stores in methods are kept."""
+        source = WALLET.replace("balance := 0;\n        balance := amount;", "balance := 0;")
+        yul = YulGenerator().generate(DafnyParser(source).parse())
+        self.assertIn("sstore(1, 0)", yul[yul.index("function reset()"):])
+
+
+if __name__ == '__main__':
+    unittest.main()
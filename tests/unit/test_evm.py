@@ -0,0 +1,302 @@
+import tempfile
+import unittest
+from src.dafny_compiler import DafnyEVMCompiler
+from src.evm import EVM, DeploymentError, LocalChain
+from src.evm import abi
+from src.evm.vm import OPCODE_VALUES, create_address
+from tests.unit.fake_tools import fake_solc
+
+CONTRACT = """
+class Counter {
+    var count: uint256
+
+    event Incremented(by: uint256)
+
+    constructor(initial: uint256)
+    {
+        count := initial;
+    }
+
+    method increment()
+        modifies this
+    {
+        count := count + 1;
+    }
+}
+"""
+
+SENDER = 0x1000
+TARGET = 0x2000
+
+
+def assemble(*tokens) -> bytes:
+    """Bytecode of opcode names, ints (pushed with PUSH1..PUSH32), labels 'name:' and jumps to '@name'."""
+    def size(token):
+        if isinstance(token, int):
+            return 1 + max(1, (token.bit_length() + 7) // 8)
+        return 0 if token.endswith(':') else 2 if token.startswith('@') else 1
+
+    labels, position = {}, 0
+    for token in tokens:
+        if isinstance(token, str) and token.endswith(':'):
+            labels[token[:-1]] = position
+            token = 'JUMPDEST'
+        position += size(token) if token != 'JUMPDEST' else 1
+    code = bytearray()
+    for token in tokens:
+        if isinstance(token, int):
+            width = max(1, (token.bit_length() + 7) // 8)
+            code += bytes([0x5f + width]) + token.to_bytes(width, 'big')
+        elif token.endswith(':'):
+            code.append(OPCODE_VALUES['JUMPDEST'])
+        elif token.startswith('@'):
+            code += bytes([OPCODE_VALUES['PUSH1'], labels[token[1:]]])
+        else:
+            code.append(OPCODE_VALUES[token])
+    return bytes(code)
+
+
+def deployer(runtime: bytes, constructor: bytes = b'') -> bytes:
+    """Initcode running constructor, then returning runtime."""
+    prefix_size = len(constructor) + len(assemble(len(runtime), 'DUP1', 0xff, 'PUSH0', 'CODECOPY', 'PUSH0', 'RETURN'))
+    copy = assemble(len(runtime), 'DUP1', prefix_size, 'PUSH0', 'CODECOPY', 'PUSH0', 'RETURN')
+    return constructor + copy + runtime
+
+
+def selector(signature: str) -> int:
+    return int.from_bytes(abi.selector(signature), 'big')
+
+
+# Counter: increment() adds one to slot 0 and logs Incremented(1); count() returns slot 0
+EVENT = int.from_bytes(abi.keccak(b'Incremented(uint256)'), 'big')
+COUNTER = assemble(
+    'PUSH0', 'CALLDATALOAD', 0xe0, 'SHR',
+    'DUP1', selector('increment()'), 'EQ', '@increment', 'JUMPI',
+    selector('count()'), 'EQ', '@count', 'JUMPI',
+    'PUSH0', 'DUP1', 'REVERT',
+    'increment:', 'PUSH0', 'SLOAD', 1, 'ADD', 'PUSH0', 'SSTORE',
+    1, 'PUSH0', 'MSTORE', EVENT, 32, 'PUSH0', 'LOG1', 'STOP',
+    'count:', 'PUSH0', 'SLOAD', 'PUSH0', 'MSTORE', 32, 'PUSH0', 'RETURN',
+)
+
+# Constructor storing its argument, the last word of the creation code, in slot 0
+CONSTRUCTOR = assemble(32, 32, 'CODESIZE', 'SUB', 'PUSH0', 'CODECOPY', 'PUSH0', 'MLOAD', 'PUSH0', 'SSTORE')
+
+class TestABI(unittest.TestCase):
+    def test_static_round_trip(self):
+        """Test static values encode to one word each and decode back."""
+        types = ['uint256', 'int128', 'bool', 'address', 'bytes4']
+        values = (5, -2, True, '0x' + '11' * 20, b'\x01\x02\x03\x04')
+        data = abi.encode(types, values)
+        self.assertEqual(len(data), 5 * 32)
+        self.assertEqual(abi.decode(types, data), values)
+
+    def test_dynamic_round_trip(self):
+        """Test strings, bytes, arrays and tuples are placed after the heads at their offsets."""
+        types = ['string', 'uint256[]', '(uint256,string)', 'bytes']
+        values = ('hello', [1, 2, 3], (7, 'x'), b'\xff')
+        data = abi.encode(types, values)
+        self.assertEqual(int.from_bytes(data[:32], 'big'), 4 * 32)
+        self.assertEqual(abi.decode(types, data), ('hello', [1, 2, 3], (7, 'x'), b'\xff'))
+
+    def test_known_call_data(self):
+        """Test call data matches the well-known transfer encoding."""
+        data = abi.encode_call('transfer(address,uint256)', [0xabc, 1])
+        self.assertEqual(data[:4].hex(), 'a9059cbb')
+        self.assertEqual(data[4:], (0xabc).to_bytes(32, 'big') + (1).to_bytes(32, 'big'))
+
+    def test_signature_of_entry(self):
+        """Test ABI JSON entries give canonical signatures, with tuples spelled out."""
+        entry = {'name': 'f', 'inputs': [{'type': 'uint256'},
+                                         {'type': 'tuple[]', 'components': [{'type': 'bool'}, {'type': 'address'}]}]}
+        self.assertEqual(abi.signature(entry), 'f(uint256,(bool,address)[])')
+
+    def test_invalid_values(self):
+        """Test out-of-range values and short data are rejected."""
+        with self.assertRaises(ValueError):
+            abi.encode(['uint8'], [256])
+        with self.assertRaises(ValueError):
+            abi.encode(['int8'], [-129])
+        with self.assertRaises(ValueError):
+            abi.decode(['uint256'], bytes(31))
+
+
+class TestGas(unittest.TestCase):
+    def setUp(self):
+        self.evm = EVM()
+        self.evm.account(SENDER).balance = 10 ** 18
+
+    def run_code(self, *tokens, data=b'', storage=None):
+        account = self.evm.account(TARGET)
+        account.code = assemble(*tokens)
+        account.storage = dict(storage or {})
+        return self.evm.transact(SENDER, TARGET, data)
+
+    def test_intrinsic_gas(self):
+        """Test a call to an empty account costs the base fee plus 4 per zero and 16 per non-zero byte."""
+        receipt = self.evm.transact(SENDER, TARGET, b'\x00\x01\x00')
+        self.assertTrue(receipt.success)
+        self.assertEqual(receipt.gas_used, 21000 + 4 + 16 + 4)
+
+    def test_cold_and_warm_slots(self):
+        """Test the first load of a slot is cold and the second warm."""
+        receipt = self.run_code('PUSH0', 'SLOAD', 'PUSH0', 'SLOAD', 'STOP')
+        self.assertEqual(receipt.gas_used, 21000 + 2 + 2100 + 2 + 100)
+
+    def test_store_set_and_reset(self):
+        """Test storing to a zero slot costs 20000 and to a non-zero slot 2900, after the cold access."""
+        self.assertEqual(self.run_code(1, 'PUSH0', 'SSTORE').gas_used, 21000 + 3 + 2 + 2100 + 20000)
+        self.assertEqual(self.run_code(2, 'PUSH0', 'SSTORE', storage={0: 1}).gas_used, 21000 + 3 + 2 + 2100 + 2900)
+
+    def test_clear_refund(self):
+        """Test clearing a slot refunds 4800 and the storage diff records the zero."""
+        receipt = self.run_code('PUSH0', 'PUSH0', 'SSTORE', storage={0: 1})
+        self.assertEqual(receipt.gas_refund, 4800)
+        self.assertEqual(receipt.gas_used, 21000 + 2 + 2 + 2100 + 2900 - 4800)
+        self.assertEqual(receipt.storage_changes, {TARGET: {0: 0}})
+
+    def test_restored_slot_refund(self):
+        """Test changing a slot and restoring it in one transaction refunds all but a warm access."""
+        receipt = self.run_code(2, 'PUSH0', 'SSTORE', 1, 'PUSH0', 'SSTORE', storage={0: 1})
+        self.assertEqual(receipt.gas_refund, 2900 - 100)
+        self.assertEqual(receipt.storage_changes, {})
+
+    def test_refund_capped(self):
+        """Test the refund is at most a fifth of the gas used."""
+        receipt = self.run_code('PUSH0', 'PUSH0', 'SSTORE', 1, 'PUSH0', 'SSTORE', 'PUSH0', 'PUSH0', 'SSTORE',
+                                storage={0: 1})
+        self.assertEqual(receipt.gas_used + receipt.gas_refund, 21000 + (4 + 2100 + 2900) + (5 + 100) + (4 + 2900))
+        self.assertEqual(receipt.gas_refund, (receipt.gas_used + receipt.gas_refund) // 5)
+
+    def test_memory_expansion(self):
+        """Test memory costs 3 per word plus the quadratic term, charged once per new word."""
+        receipt = self.run_code('PUSH0', 1023 * 32, 'MSTORE', 'PUSH0', 'PUSH0', 'MSTORE')
+        self.assertEqual(receipt.gas_used, 21000 + 2 + 3 + 3 + 3 * 1024 + 1024 * 1024 // 512 + 2 + 2 + 3)
+
+    def test_keccak_and_exp(self):
+        """Test hashing costs 6 per word and EXP 50 per exponent byte."""
+        receipt = self.run_code(64, 'PUSH0', 'KECCAK256', 'POP', 0x100, 2, 'EXP')
+        self.assertEqual(receipt.gas_used, 21000 + 3 + 2 + 30 + 12 + 6 + 2 + 3 + 3 + 10 + 100)
+
+    def test_log_cost(self):
+        """Test a log costs 375, 375 per topic and 8 per data byte."""
+        receipt = self.run_code(7, 32, 'PUSH0', 'LOG1')
+        self.assertEqual(receipt.gas_used, 21000 + 3 + 3 + 2 + 375 * 2 + 8 * 32 + 3)
+        self.assertEqual(receipt.logs[0].topics, (7,))
+
+    def test_revert_keeps_gas(self):
+        """Test a revert undoes storage and returns unused gas with its data."""
+        receipt = self.run_code(1, 'PUSH0', 'SSTORE', 32, 'PUSH0', 'REVERT')
+        self.assertFalse(receipt.success)
+        self.assertEqual(receipt.error, 'revert')
+        self.assertEqual(receipt.return_data, bytes(32))
+        self.assertEqual(receipt.storage_changes, {})
+        self.assertEqual(self.evm.account(TARGET).storage, {})
+        self.assertLess(receipt.gas_used, 50000)
+
+    def test_exceptional_halt_consumes_gas(self):
+        """Test a bad jump, an invalid opcode and stack underflows use the whole gas limit."""
+        for tokens, error in (((3, 'JUMP', 'PUSH0', 'JUMPDEST'), 'invalid jump destination'),
+                              (('INVALID',), 'invalid opcode'), (('ADD',), 'stack underflow'),
+                              ((0, 0, 0, 'CREATE2'), 'stack underflow')):
+            self.evm.account(TARGET).code = assemble(*tokens)
+            receipt = self.evm.transact(SENDER, TARGET, gas_limit=100000)
+            self.assertFalse(receipt.success)
+            self.assertIn(error, receipt.error)
+            self.assertEqual(receipt.gas_used, 100000)
+
+    def test_sstore_needs_stipend(self):
+        """Test SSTORE fails when no more than the 2300 stipend is left."""
+        self.evm.account(TARGET).code = assemble(1, 'PUSH0', 'SSTORE')
+        receipt = self.evm.transact(SENDER, TARGET, gas_limit=21000 + 3 + 2 + 2300)
+        self.assertFalse(receipt.success)
+        self.assertEqual(receipt.error, 'out of gas')
+
+    def test_inner_call(self):
+        """Test a CALL runs the callee with its own storage and charges the cold account access."""
+        self.evm.account(0x3000).code = assemble(5, 'PUSH0', 'SSTORE')
+        receipt = self.run_code('PUSH0', 'PUSH0', 'PUSH0', 'PUSH0', 'PUSH0', 0x3000, 'GAS', 'CALL')
+        self.assertTrue(receipt.success)
+        self.assertEqual(receipt.storage_changes, {0x3000: {0: 5}})
+        self.assertEqual(receipt.gas_used, 21000 + 2 * 5 + 3 + 2 + 2600 + 3 + 2 + 2100 + 20000)
+
+    def test_static_call_cannot_write(self):
+        """Test a store inside STATICCALL fails the inner call only."""
+        self.evm.account(0x3000).code = assemble(5, 'PUSH0', 'SSTORE')
+        receipt = self.run_code('PUSH0', 'PUSH0', 'PUSH0', 'PUSH0', 0x3000, 'GAS', 'STATICCALL', 'PUSH0', 'SSTORE')
+        self.assertTrue(receipt.success)
+        self.assertEqual(receipt.storage_changes, {})
+
+    def test_create_address(self):
+        """Test contract addresses follow the sender and nonce."""
+        self.assertEqual(create_address(0x6ac7ea33f8831ea9dcc53393aaa88b25a785dbf0, 0),
+                         0xcd234a471b72ba2f1ccf0a70fcaba648a5eecd8d)
+
+
+class TestLocalChain(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        # The stand-in solc prints the hand-assembled counter whatever the source
+        solc = fake_solc(self.tmp.name, f"code = '{deployer(COUNTER, CONSTRUCTOR).hex()}'")
+        self.result = DafnyEVMCompiler(solc, verify=False, use_cache=False).compile(CONTRACT)
+        self.chain = LocalChain()
+        self.counter = self.chain.deploy(self.result, 41)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_deploy_runs_constructor(self):
+        """Test deployment stores the runtime code and the storage the constructor set from its argument."""
+        self.assertEqual(self.chain.evm.account(self.counter.address).code, COUNTER)
+        self.assertEqual(self.counter.storage(0), 41)
+        self.assertEqual(self.counter.receipt.storage_changes, {self.counter.address: {0: 41}})
+        initcode = len(bytes.fromhex(self.result['bytecode']))
+        self.assertGreater(self.counter.receipt.gas_used, 21000 + 32000 + 200 * len(COUNTER) + 20000 + initcode * 4)
+
+    def test_call_by_name(self):
+        """Test a method named in the ABI is called and its effects, logs and events reported."""
+        result = self.counter.call('increment')
+        self.assertTrue(result.success)
+        self.assertEqual(result.storage_changes, {0: 42})
+        self.assertEqual(result.events, [('Incremented', {'by': 1})])
+        self.assertEqual(len(result.logs), 1)
+        self.assertIsNone(result.value)
+
+    def test_getter_by_signature(self):
+        """Test a getter missing from the ABI is called by signature and decoded."""
+        self.assertEqual(self.counter.call('count()').value, 41)
+        self.counter.call('increment')
+        result = self.counter.call('count()')
+        self.assertEqual(result.value, 42)
+        self.assertEqual(result.storage_changes, {})
+
+    def test_warm_second_call_cheaper(self):
+        """Test repeated increments cost the same and less than a store to a fresh slot would."""
+        first, second = self.counter.call('increment'), self.counter.call('increment')
+        self.assertEqual(first.gas_used, second.gas_used)
+        self.assertLess(first.gas_used, 21000 + 20000)
+
+    def test_unknown_selector_reverts(self):
+        """Test a call the dispatcher does not route reverts with no reason."""
+        result = self.counter.call('decrement()')
+        self.assertFalse(result.success)
+        self.assertEqual(result.error, 'revert')
+
+    def test_unknown_method(self):
+        """Test a method name not in the ABI is rejected before sending."""
+        with self.assertRaises(ValueError):
+            self.counter.call('decrement')
+
+    def test_constructor_arguments_checked(self):
+        """Test constructor arguments must match the ABI constructor."""
+        with self.assertRaises(ValueError):
+            self.chain.deploy(self.result)
+
+    def test_no_bytecode(self):
+        """Test a result without bytecode cannot be deployed."""
+        with self.assertRaises(DeploymentError):
+            self.chain.deploy({'success': True, 'bytecode': '', 'abi': '[]'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,251 @@
+import unittest
+from src.dafny_compiler import DafnyEVMCompiler
+from src.parser.dafny_parser import DafnyParser
+from src.translator.dispatch import DispatchEntry
+from src.translator.gas_estimator import TYPICAL_ITERATIONS, estimate_methods
+from src.translator.yul_ast import Block, Object, parse_function
+from src.translator.yul_generator import YulGenerator
+from src.translator.yul_interpreter import YulInterpreter, keccak256
+
+VAULT = """
+class Vault {
+    var total: uint256
+    var owner: address
+    var deposits: mapping<address, uint256>
+
+    method deposit(amount: uint256)
+        modifies this
+    {
+        require(amount > 0);
+        deposits[msg.sender] := deposits[msg.sender] + amount;
+        total := total + amount;
+    }
+
+    method getTotal() returns (result: uint256)
+    {
+        return total;
+    }
+
+    method sumFirst() returns (sum: uint256)
+    {
+        var i: uint256 := 0;
+        var s: uint256 := 0;
+        while (i < 5) {
+            s := s + total;
+            i := i + 1;
+        }
+        return s;
+    }
+
+    method sumTo(n: uint256) returns (sum: uint256)
+    {
+        var i: uint256 := 0;
+        var s: uint256 := 0;
+        while (i < n) {
+            s := s + i;
+            i := i + 1;
+        }
+        return s;
+    }
+}
+"""
+
+BELL = """
+class Bell {
+    var rings: uint256
+    event Rung(ringer: address, count: uint256)
+
+    method ring(count: uint256)
+    {
+        emit Rung(msg.sender, count);
+    }
+}
+"""
+
+ENTRY = DispatchEntry("0x12345678", "f(uint256)", "f")
+
+
+def estimate(function: str, entry: DispatchEntry = ENTRY) -> dict:
+    """Estimate of a runtime whose top-level code calls function f."""
+    return estimate_methods(contract(function), [entry])[entry.signature]
+
+
+def contract(function: str) -> Object:
+    code = parse_function("function main() { f() stop() }").body.statements + [parse_function(function)]
+    return Object("C", Block([]), [Object("runtime", Block(code))])
+
+
+def measure(function: str, args=(), storage=None) -> int:
+    runtime = YulInterpreter(contract(function).objects[0], storage)
+    result = runtime.transact(bytes(4) + b"".join(arg.to_bytes(32, "big") for arg in args))
+    assert result.success
+    return result.gas_used
+
+
+def calldata(signature: str, *args: int) -> bytes:
+    selector = (keccak256(signature.encode()) >> 224).to_bytes(4, "big")
+    return selector + b"".join(arg.to_bytes(32, "big") for arg in args)
+
+
+def slot(key: int) -> int:
+    return keccak256(key.to_bytes(32, "big"))
+
+
+class TestStorageAccess(unittest.TestCase):
+    def test_cold_then_warm_load(self):
+        """Test the first load of a slot is priced cold and the second warm, matching a run exactly."""
+        function = "function f() { mstore(0, add(sload(1), sload(1))) }"
+        gas = estimate(function)
+        self.assertEqual(gas["best"], gas["worst"])
+        self.assertEqual(gas["best"], measure(function))
+        self.assertEqual(estimate("function f() { mstore(0, add(sload(1), sload(2))) }")["best"] - gas["best"], 2000)
+
+    def test_store_bounds(self):
+        """Test a store of an unknown value ranges from no change to setting a zero slot, typically a reset."""
+        function = "function f() { sstore(1, calldataload(4)) }"
+        gas = estimate(function)
+        self.assertEqual(gas["typical"] - gas["best"], 2800)
+        self.assertEqual(gas["worst"] - gas["best"], 19900)
+        self.assertEqual(measure(function, [5]), gas["worst"])
+        self.assertEqual(measure(function, [5], {1: 7}), gas["typical"])
+        self.assertEqual(measure(function, [7], {1: 7}), gas["best"])
+
+    def test_second_store_is_warm(self):
+        """Test a slot already written is stored for the warm price at every level."""
+        once = estimate("function f() { sstore(1, calldataload(4)) }")
+        twice = estimate("function f() { sstore(1, calldataload(4)) sstore(1, calldataload(36)) }")
+        for level in ("best", "typical", "worst"):
+            self.assertEqual(twice[level] - once[level], 100 + 3 * 3, level)
+
+    def test_slot_identified_by_expression(self):
+        """Test a hashed slot is warm when its key variable still holds the same value."""
+        function = ("function f() { let key := calldataload(4) mstore(0, key) "
+                    "let slot := keccak256(0, 32) sstore(slot, add(sload(slot), 1)) }")
+        gas = estimate(function)
+        self.assertEqual(gas["worst"], measure(function, [3]))
+        self.assertEqual(gas["typical"], measure(function, [3], {slot(3): 1}))
+
+    def test_reverting_branch_ignored(self):
+        """Test a branch that always reverts adds neither cost nor warm slots to the other paths."""
+        function = "function f() { if iszero(calldataload(4)) { sstore(1, 1) revert(0, 0) } mstore(0, sload(1)) }"
+        gas = estimate(function)
+        self.assertEqual(gas["best"], gas["worst"])
+        self.assertEqual(gas["best"], measure(function, [1]))
+
+
+class TestMemory(unittest.TestCase):
+    def test_keccak_and_expansion(self):
+        """Test hashing prices its words and memory expansion is charged once per new word."""
+        function = "function f() { mstore(0, 1) mstore(32, 2) mstore(0, keccak256(0, 64)) return(0, 64) }"
+        gas = estimate(function)
+        self.assertEqual(gas["best"], gas["worst"])
+        self.assertEqual(gas["best"], measure(function))
+
+    def test_free_memory_pointer_followed(self):
+        """Test memory addressed through a pointer read back from memory is priced."""
+        function = "function f() { mstore(64, 128) let p := mload(64) mstore(p, 1) return(p, 32) }"
+        gas = estimate(function)
+        self.assertEqual(gas["worst"], measure(function))
+        self.assertEqual(gas["unbounded_memory"], [])
+
+    def test_unknown_offset_unbounded(self):
+        """Test memory addressed by calldata has no worst case and is flagged."""
+        gas = estimate("function f() { mstore(calldataload(4), 1) }")
+        self.assertIsNone(gas["worst"])
+        self.assertEqual(gas["unbounded_memory"], ["f"])
+
+
+    def test_log_priced(self):
+        """Test a log costs 375, plus 375 per topic and 8 per byte of data, matching a run exactly."""
+        function = "function f() { mstore(0, 7) log2(0, 32, 1, 2) }"
+        gas = estimate(function)
+        self.assertEqual(gas["best"], gas["worst"])
+        self.assertEqual(gas["best"], measure(function))
+        # LOG2, its data and pushing its four arguments
+        self.assertEqual(gas["best"] - estimate("function f() { mstore(0, 7) }")["best"], 3 * 375 + 8 * 32 + 4 * 3)
+
+
+class TestLoops(unittest.TestCase):
+    def test_constant_bound_exact(self):
+        """Test a loop with a constant trip count is unrolled to the exact cost."""
+        function = "function f() { for { let i := 0 } lt(i, 10) { i := add(i, 1) } { sstore(i, 1) } }"
+        gas = estimate(function)
+        self.assertEqual(gas["unbounded_loops"], [])
+        self.assertEqual(gas["worst"], measure(function))
+        self.assertEqual(gas["best"], measure(function, storage={i: 1 for i in range(10)}))
+
+    def test_break_leaves_loop(self):
+        """Test a loop that breaks on a known iteration ends there."""
+        function = "function f() { for { let i := 0 } 1 { i := add(i, 1) } { if eq(i, 3) { break } mstore(0, i) } }"
+        gas = estimate(function)
+        self.assertEqual(gas["unbounded_loops"], [])
+        self.assertEqual((gas["best"], gas["worst"]), (measure(function),) * 2)
+
+    def test_unknown_bound_flagged(self):
+        """Test a loop bounded by an argument is flagged, with no worst case and a typical trip count."""
+        function = "function f() { for { let i := 0 } lt(i, calldataload(4)) { i := add(i, 1) } { mstore(0, i) } }"
+        gas = estimate(function)
+        self.assertIsNone(gas["worst"])
+        self.assertEqual(gas["unbounded_loops"], ["f"])
+        self.assertEqual(gas["best"], measure(function, [0]))
+        self.assertEqual(gas["typical"], measure(function, [TYPICAL_ITERATIONS]))
+
+    def test_recursion_unbounded(self):
+        """Test a recursive function has no worst case."""
+        gas = estimate("function f() { if calldataload(4) { f() } }")
+        self.assertIsNone(gas["worst"])
+        self.assertEqual(gas["unbounded_loops"], ["f"])
+
+
+class TestContract(unittest.TestCase):
+    def setUp(self):
+        self.generator = YulGenerator()
+        self.obj = self.generator.generate_ir(DafnyParser(VAULT).parse())
+        self.estimates = self.generator.gas_estimates()
+        self.runtime, _ = YulInterpreter.deploy(self.obj)
+
+    def run_method(self, signature: str, *args: int) -> int:
+        result = self.runtime.transact(calldata(signature, *args))
+        self.assertTrue(result.success)
+        return result.gas_used
+
+    def test_every_entry_point(self):
+        """Test each public method gets an estimate, keyed by its signature."""
+        self.assertEqual(set(self.estimates), {"deposit(uint256)", "getTotal()", "sumFirst()", "sumTo(uint256)"})
+        self.assertEqual(self.estimates["sumTo(uint256)"]["unbounded_loops"], ["sumTo"])
+        self.assertEqual(self.estimates["sumFirst()"]["unbounded_loops"], [])
+
+    def test_view_methods_exact(self):
+        """Test methods without branches on unknown values match a run through the dispatcher exactly."""
+        for signature in ("getTotal()", "sumFirst()"):
+            gas = self.estimates[signature]
+            self.assertEqual(gas["best"], gas["worst"], signature)
+            self.assertEqual(gas["best"], self.run_method(signature), signature)
+
+    def test_runs_within_bounds(self):
+        """Test first and repeated deposits cost between the best and worst estimates."""
+        gas = self.estimates["deposit(uint256)"]
+        first = self.run_method("deposit(uint256)", 5)
+        second = self.run_method("deposit(uint256)", 5)
+        self.assertEqual(first, gas["worst"])
+        self.assertLessEqual(gas["best"], second)
+        self.assertLess(second, first)
+
+    def test_event_emitting_method_exact(self):
+        """Test a method that emits an event matches a run through the dispatcher exactly."""
+        generator = YulGenerator()
+        runtime, _ = YulInterpreter.deploy(generator.generate_ir(DafnyParser(BELL).parse()))
+        gas = generator.gas_estimates()["ring(uint256)"]
+        result = runtime.transact(calldata("ring(uint256)", 3))
+        self.assertEqual(len(result.logs), 1)
+        self.assertEqual((gas["best"], gas["worst"]), (result.gas_used, result.gas_used))
+
+    def test_in_compile_result(self):
+        """Test the compile result carries the estimates in place of a bytecode-size figure."""
+        result = DafnyEVMCompiler(verify=False, use_cache=False).compile(VAULT, assemble=False)
+        self.assertEqual(result["gas_estimates"], self.estimates)
+        self.assertNotIn("gas_estimate", result)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,135 @@
+import unittest
+from pathlib import Path
+from src.gas_snapshot import (DEPLOY, GasChange, ScenarioError, compare, format_changes, load, run_scenario,
+                              take_snapshot)
+from src.translator.yul_generator import YulGenerator
+
+ROOT = Path(__file__).resolve().parents[2]
+EXAMPLES = ROOT / "examples"
+SCENARIOS = ROOT / "tests" / "gas" / "scenarios.json"
+SNAPSHOT = ROOT / "tests" / "gas" / "snapshot.json"
+
+WALLET = """
+class Wallet {
+    var total: uint256
+    var credits: mapping<address, uint256>
+
+    method credit(to: address, amount: uint256)
+        modifies this
+    {
+        require(amount > 0);
+        credits[to] := credits[to] + amount;
+        total := total + amount;
+    }
+
+    method getTotal() returns (result: uint256)
+    {
+        return total;
+    }
+}
+"""
+
+SEEDED = WALLET.replace("    method credit", """    constructor(initial: uint256)
+    {
+        total := initial;
+    }
+
+    method credit""", 1)
+
+CREDIT = "credit(address,uint256)"
+
+
+class TestScenario(unittest.TestCase):
+    def test_labels_per_call(self):
+        """Test the deployment and each call are recorded, repeated calls under numbered labels."""
+        gas = run_scenario(WALLET, {"calls": [{"method": CREDIT, "args": ["caller", 5]},
+                                              {"method": CREDIT, "args": ["caller", 5]},
+                                              {"method": "getTotal()"}]})
+        self.assertEqual(set(gas), {DEPLOY, CREDIT, f"{CREDIT} #2", "getTotal()"})
+        # The second credit changes non-zero slots instead of setting zero ones
+        self.assertEqual(gas[CREDIT] - gas[f"{CREDIT} #2"], 2 * (20000 - 2900))
+
+    def test_constructor_arguments(self):
+        """Test constructor arguments reach the deployment, which pays for storing them."""
+        calls = [{"method": CREDIT, "args": ["caller", 5]}, {"method": "getTotal()"}]
+        seeded = run_scenario(SEEDED, {"constructor": [7], "calls": calls})
+        empty = run_scenario(SEEDED, {"constructor": [0], "calls": calls})
+        self.assertGreater(seeded[DEPLOY] - empty[DEPLOY], 19000)
+        # Crediting a non-zero total is a reset, not a set
+        self.assertEqual(empty[CREDIT] - seeded[CREDIT], 20000 - 2900)
+
+    def test_declared_revert(self):
+        """Test a call declared to revert is measured, and one that reverts unexpectedly fails the run."""
+        calls = [{"method": CREDIT, "args": ["caller", 0], "reverts": True}, {"method": "getTotal()"}]
+        self.assertIn(CREDIT, run_scenario(WALLET, {"calls": calls}))
+        calls[0]["reverts"] = False
+        with self.assertRaisesRegex(ScenarioError, "reverted but the scenario says it succeeds"):
+            run_scenario(WALLET, {"calls": calls})
+
+    def test_every_method_covered(self):
+        """Test a scenario that never calls a public method is rejected."""
+        with self.assertRaisesRegex(ScenarioError, r"no call to getTotal\(\)"):
+            run_scenario(WALLET, {"calls": [{"method": CREDIT, "args": ["caller", 5]}]})
+
+    def test_unknown_method(self):
+        """Test a call to a method outside the ABI is rejected."""
+        calls = [{"method": CREDIT, "args": ["caller", 5]}, {"method": "getTotal()"}, {"method": "burn()"}]
+        with self.assertRaisesRegex(ScenarioError, "not in the ABI"):
+            run_scenario(WALLET, {"calls": calls})
+
+
+class TestCompare(unittest.TestCase):
+    def test_changes_only(self):
+        """Test unchanged entries are left out and new or removed ones are reported."""
+        changes = compare({"A": {DEPLOY: 10, "f()": 5, "g()": 7}}, {"A": {DEPLOY: 10, "f()": 6, "h()": 1}})
+        self.assertEqual(changes, [GasChange("A", "f()", 5, 6), GasChange("A", "g()", 7, None),
+                                   GasChange("A", "h()", None, 1)])
+
+    def test_threshold(self):
+        """Test an increase counts as a regression only beyond the threshold; missing entries always do."""
+        self.assertFalse(GasChange("A", "f()", 1000, 1010).is_regression(0.01))
+        self.assertTrue(GasChange("A", "f()", 1000, 1011).is_regression(0.01))
+        self.assertFalse(GasChange("A", "f()", 1000, 900).is_regression(0))
+        self.assertTrue(GasChange("A", "f()", None, 900).is_regression(0.5))
+
+    def test_readable_diff(self):
+        """Test the diff gives one aligned line per change with its difference and verdict."""
+        text = format_changes([GasChange("Token", DEPLOY, 1000, 900), GasChange("Token", "transfer()", 100, 150),
+                               GasChange("Token", "mint()", None, 50)], threshold=0.01)
+        lines = text.split("\n")
+        self.assertEqual(lines, ["Token::deploy      1000 -> 900  -100 (-10.00%)  improved",
+                                 "Token::transfer()   100 -> 150   +50 (+50.00%)  REGRESSION",
+                                 "Token::mint()         - ->  50             new  not in snapshot"])
+        self.assertEqual(format_changes([]), "No gas changes")
+
+
+class TestExamples(unittest.TestCase):
+    """The committed gas snapshot of examples/, run on the Yul interpreter."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.scenarios = load(SCENARIOS)
+
+    def test_snapshot_up_to_date(self):
+        """Test no example deployment or call costs more than the committed snapshot allows."""
+        changes = compare(load(SNAPSHOT), take_snapshot(EXAMPLES, self.scenarios))
+        regressions = [change for change in changes if change.is_regression()]
+        if regressions:
+            self.fail("Gas regressions against tests/gas/snapshot.json "
+                      "(run tools/gas_snapshot.py --update if intended):\n" + format_changes(regressions))
+
+    def test_detects_regression(self):
+        """Test turning the storage optimizations off shows up as per-method regressions."""
+        source = (EXAMPLES / "ERC20Verified.dfy").read_text()
+        scenario = self.scenarios["ERC20Verified"]
+        optimized = run_scenario(source, scenario)
+        unoptimized = run_scenario(source, scenario, YulGenerator(cse=False, dse=False, licm=False))
+        changes = compare({"ERC20Verified": optimized}, {"ERC20Verified": unoptimized})
+        regressed = {change.label for change in changes if change.is_regression()}
+        self.assertIn(DEPLOY, regressed)
+        self.assertIn("transferFrom(address,address,uint256)", regressed)
+        self.assertIn("REGRESSION", format_changes(changes))
+
+
+if __name__ == '__main__':
+    unittest.main()
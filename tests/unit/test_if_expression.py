@@ -0,0 +1,89 @@
+import unittest
+from src.parser.dafny_parser import DafnyParser
+from src.translator.yul_generator import YulGenerator
+
+
+def generate(body: str, **kwargs) -> str:
+    source = f"""
+class Test {{
+    var limit: uint256
+    var balances: mapping<address, uint256>
+    var total: uint256
+
+    method f(x: uint256, y: uint256, addr: address) returns (r: uint256)
+        modifies this
+    {{
+{body}
+    }}
+}}
+"""
+    return YulGenerator(cse=False, **kwargs).generate(DafnyParser(source).parse())
+
+
+def method_body(yul: str) -> str:
+    start = yul.index("function f()")
+    return yul[start:yul.index("\n      }", start)]
+
+
+class TestIfExpressionLowering(unittest.TestCase):
+    def test_condition_evaluated_once(self):
+        """Test the condition's SLOAD and hash run once, not once per branch."""
+        body = method_body(generate("        var v := if balances[addr] > limit then 1 else 2;"))
+        self.assertEqual(body.count("keccak256_mapping(1, addr)"), 1)
+        self.assertEqual(body.count("sload(0)"), 1)
+        self.assertNotIn("iszero(gt(", body)
+
+    def test_return_position(self):
+        """Test a returned if-expression is computed into a temporary."""
+        body = method_body(generate("        return if x > y then x else y;"))
+        self.assertIn("switch gt(x, y)", body)
+        self.assertIn("mstore(_return_ptr, _if_0)", body)
+
+    def test_argument_and_assignment_positions(self):
+        """Test if-expressions nested in arithmetic and storage writes are lowered."""
+        body = method_body(generate("        total := total + (if x > 0 then x else 1);"))
+        self.assertNotIn("IF_EXPR", body)
+        self.assertIn("sstore(2, add(sload(2), _if_0))", body)
+
+    def test_nested_branches_assign_directly(self):
+        """Test a nested if-expression assigns the outer target without another temporary."""
+        body = method_body(generate("        var v := if x > 0 then (if y > 0 then 1 else 2) else 3;"))
+        self.assertEqual(body.count("switch"), 2)
+        self.assertNotIn("_if_", body)
+
+    def test_branches_are_lazy(self):
+        """Test each branch value is only computed inside its own case."""
+        body = method_body(generate("        var v := if x > 0 then balances[addr] else 0;"))
+        case_default = body[body.index("default {"):]
+        self.assertIn("sload(keccak256_mapping(1, addr))", case_default)
+
+    def test_deterministic_names(self):
+        """Test repeated generation gives identical output."""
+        body = ("        var a := if x > 0 then 1 else 2;\n"
+                "        var b := (if y > 0 then 3 else 4) + (if x > y then 5 else 6);")
+        outputs = {generate(body) for _ in range(5)}
+        self.assertEqual(len(outputs), 1)
+        self.assertIn("_if_1", outputs.pop())
+
+    def test_loop_condition_reevaluated(self):
+        """Test an if-expression in a loop condition is recomputed every iteration."""
+        body = method_body(generate("        while (if x > 0 then x else y) > total {\n"
+                                    "            total := total + 1;\n"
+                                    "        }"))
+        loop = body[body.index("for {"):]
+        self.assertTrue(loop.startswith("for { } 1 { } {"))
+        self.assertLess(loop.index("switch gt(x, 0)"), loop.index("break"))
+
+    def test_if_else_statement_uses_switch(self):
+        """Test if/else evaluates its condition once, so the else branch cannot also run."""
+        body = method_body(generate("        if total > 0 {\n"
+                                    "            total := 0;\n"
+                                    "        } else {\n"
+                                    "            total := 5;\n"
+                                    "        }"))
+        self.assertEqual(body.count("gt(sload(2), 0)"), 1)
+        self.assertIn("switch gt(sload(2), 0)", body)
+
+
+if __name__ == '__main__':
+    unittest.main()
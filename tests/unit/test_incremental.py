@@ -0,0 +1,128 @@
+import tempfile
+import unittest
+from src.compiler.cache import DiskCache
+from src.verifier.dafny_verifier import DafnyVerifier
+from src.verifier.incremental import fingerprints, split_units
+
+TOKEN = """
+class Token {
+  var total: int
+  var owner: int
+  var balances: map<int, int>
+
+  predicate Valid()
+    reads this
+  {
+    total >= 0
+  }
+
+  method mint(amount: int)
+    requires Valid()
+    modifies this
+    ensures Valid()
+  {
+    total := total + amount;
+  }
+
+  method setOwner(o: int)
+    modifies this
+  {
+    owner := o;
+  }
+}
+"""
+
+
+class TestFingerprints(unittest.TestCase):
+    def test_split_units(self):
+        """Test methods, predicates and fields are split out per class."""
+        _, units, fields = split_units(TOKEN)
+        self.assertEqual(sorted(units), ['Token.Valid', 'Token.mint', 'Token.setOwner'])
+        self.assertEqual(sorted(fields), ['Token.balances', 'Token.owner', 'Token.total'])
+
+    def test_body_edit_only_changes_that_method(self):
+        """Test editing one method leaves other fingerprints unchanged."""
+        before = fingerprints(TOKEN)
+        after = fingerprints(TOKEN.replace("owner := o;", "owner := o + 1;"))
+        self.assertNotEqual(before['Token.setOwner'], after['Token.setOwner'])
+        self.assertEqual(before['Token.mint'], after['Token.mint'])
+        self.assertEqual(before['Token.Valid'], after['Token.Valid'])
+
+    def test_whitespace_and_comments_ignored(self):
+        """Test formatting-only edits keep every fingerprint."""
+        edited = TOKEN.replace("total := total + amount;", "total := total +   amount; // bump")
+        self.assertEqual(fingerprints(TOKEN), fingerprints(edited))
+
+    def test_dependencies_propagate(self):
+        """Test changing a predicate invalidates methods that rely on it."""
+        before = fingerprints(TOKEN)
+        after = fingerprints(TOKEN.replace("total >= 0", "total >= 1"))
+        self.assertNotEqual(before['Token.mint'], after['Token.mint'])
+        self.assertEqual(before['Token.setOwner'], after['Token.setOwner'])
+
+    def test_field_changes_only_affect_users(self):
+        """Test a field declaration change only affects methods touching it."""
+        before = fingerprints(TOKEN)
+        after = fingerprints(TOKEN.replace("var owner: int", "var owner: nat"))
+        self.assertNotEqual(before['Token.setOwner'], after['Token.setOwner'])
+        self.assertEqual(before['Token.mint'], after['Token.mint'])
+
+
+def seed_unit_outcomes(verifier, source, failing=()):
+    """Store an outcome for every unit of source so dafny is never invoked."""
+    verifier._dafny_version = '4.4.0'
+    processed, _ = verifier._preprocess_for_verification(source)
+    for name, fingerprint in fingerprints(processed).items():
+        verified = name not in failing
+        verifier.cache.put(verifier._unit_cache_key(fingerprint), {
+            'verified': verified,
+            'output': f"Dafny program verifier finished with {int(verified)} verified, {int(not verified)} errors",
+            'errors': [] if verified else [f"{name}: Error: a postcondition could not be proved"],
+            'return_code': 0 if verified else 4,
+        })
+    return processed
+
+
+class TestIncrementalVerify(unittest.TestCase):
+    def test_unchanged_methods_reuse_cached_outcomes(self):
+        """Test units with cached outcomes are not re-verified."""
+        with tempfile.TemporaryDirectory() as tmp:
+            verifier = DafnyVerifier(dafny_path='dafny-that-does-not-exist',
+                                     cache=DiskCache(tmp), incremental=True)
+            seed_unit_outcomes(verifier, TOKEN)
+            result = verifier.verify(TOKEN)
+            self.assertTrue(result['verified'])
+            self.assertFalse(result['cache_hit'])
+            self.assertEqual(set(result['units']), {'Token.Valid', 'Token.mint', 'Token.setOwner'})
+            self.assertTrue(all(unit['cache_hit'] for unit in result['units'].values()))
+
+
+
+class TestParallelVerify(unittest.TestCase):
+    def test_outcomes_stream_through_callback(self):
+        """Test on_unit is called once per method with its outcome."""
+        with tempfile.TemporaryDirectory() as tmp:
+            verifier = DafnyVerifier(dafny_path='dafny-that-does-not-exist',
+                                     cache=DiskCache(tmp), jobs=4)
+            seed_unit_outcomes(verifier, TOKEN, failing={'Token.mint'})
+            seen = {}
+            result = verifier.verify(TOKEN, on_unit=lambda name, outcome: seen.update({name: outcome['verified']}))
+            self.assertEqual(seen, {'Token.Valid': True, 'Token.mint': False, 'Token.setOwner': True})
+            self.assertFalse(result['verified'])
+            self.assertEqual(len(result['errors']), 1)
+
+    def test_fail_fast_cancels_outstanding_units(self):
+        """Test a known failure cancels units that have not started."""
+        source = TOKEN.replace("owner := o;", "owner := o + 1;")
+        with tempfile.TemporaryDirectory() as tmp:
+            verifier = DafnyVerifier(dafny_path='dafny-that-does-not-exist',
+                                     cache=DiskCache(tmp), jobs=2, fail_fast=True)
+            seed_unit_outcomes(verifier, TOKEN, failing={'Token.mint'})
+            # setOwner changed, so it has no cached outcome and must be cancelled
+            result = verifier.verify(source)
+            self.assertFalse(result['verified'])
+            self.assertTrue(result['units']['Token.setOwner'].get('cancelled'))
+
+
+if __name__ == '__main__':
+    unittest.main()
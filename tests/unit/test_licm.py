@@ -0,0 +1,162 @@
+import unittest
+from src.parser.dafny_parser import DafnyParser
+from src.translator.licm import move_loop_invariants
+from src.translator.yul_ast import format_stmt, parse_function
+from src.translator.yul_generator import YulGenerator
+
+COUNTER = """
+class Counter {
+    var total: uint256
+    var limit: uint256
+    var values: array<uint256>
+
+    method bump(n: uint256)
+        modifies this
+    {
+        var i: uint256 := 0;
+        while (i < n) {
+            total := total + limit;
+            i := i + 1;
+        }
+    }
+
+    method count() returns (hits: uint256)
+    {
+        var i: uint256 := 0;
+        var found: uint256 := 0;
+        while (i < values.length) {
+            if (values[i] < limit) {
+                found := found + 1;
+            }
+            i := i + 1;
+        }
+        return found;
+    }
+}
+"""
+
+
+def optimize(function: str) -> list:
+    body = move_loop_invariants(parse_function(function).body)
+    return [line.strip() for stmt in body.statements for line in format_stmt(stmt)]
+
+
+def loop_lines(lines: list) -> list:
+    start = next(i for i, line in enumerate(lines) if line.startswith("for "))
+    return lines[start:lines.index("}", start) + 1]
+
+
+class TestHoisting(unittest.TestCase):
+    def test_invariant_loads_hoisted(self):
+        """Test loads of slots the loop never writes move in front of it, from the condition and the body."""
+        lines = optimize("function f(n) { let i := 0 for { } lt(i, sload(2)) { } { "
+                         "mstore(0, add(sload(1), i)) i := add(i, 1) } }")
+        self.assertEqual(lines[1:3], ["let _licm_0 := sload(2)", "let _licm_1 := sload(1)"])
+        self.assertNotIn("sload", " ".join(loop_lines(lines)))
+
+    def test_written_slot_not_hoisted(self):
+        """Test a load of a slot the loop may write stays in the loop."""
+        lines = optimize("function f(n, x) { for { let i := 0 } lt(i, n) { i := add(i, 1) } { "
+                         "sstore(keccak256_mapping(1, i), sload(keccak256_mapping(1, x))) } }")
+        self.assertIn("sload(_licm_0)", " ".join(loop_lines(lines)))
+        self.assertEqual(lines[0], "let _licm_0 := keccak256_mapping(1, x)")
+
+    def test_hash_of_loop_variable_not_hoisted(self):
+        """Test slot hashes move out only when their arguments do not change in the loop."""
+        lines = optimize("function f(n) { for { let i := 0 } lt(i, n) { i := add(i, 1) } { "
+                         "mstore(0, sload(add(keccak256_single(4), i))) } }")
+        self.assertEqual(lines[0], "let _licm_0 := keccak256_single(4)")
+        self.assertIn("sload(add(_licm_0, i))", " ".join(loop_lines(lines)))
+
+    def test_loop_variables_not_hoisted(self):
+        """Test nothing that uses a variable declared in the loop moves out of it."""
+        lines = optimize("function f(n) { for { let i := 0 let k := n } lt(i, n) { i := add(i, 1) } { "
+                         "let key := caller() mstore(0, sload(keccak256_mapping(1, key))) "
+                         "mstore(0, sload(keccak256_mapping(1, k))) } }")
+        self.assertTrue(lines[0].startswith("for "))
+
+    def test_no_loads_hoisted_past_storage_writing_call(self):
+        """Test loads stay in a loop that calls a function that may write storage."""
+        lines = optimize("function f(n) { for { let i := 0 } lt(i, n) { i := add(i, 1) } { "
+                         "mstore(0, sload(1)) update() } }")
+        self.assertIn("mstore(0, sload(1))", lines)
+
+    def test_nested_loops(self):
+        """Test a load invariant in both loops moves in front of the outer one."""
+        lines = optimize("function f(n) { for { let i := 0 } lt(i, n) { i := add(i, 1) } { "
+                         "for { let j := 0 } lt(j, sload(1)) { j := add(j, 1) } { mstore(j, i) } } }")
+        self.assertEqual(lines[0], "let _licm_0 := sload(1)")
+        self.assertIn("for { let j := 0 } lt(j, _licm_0) { j := add(j, 1) } {", lines)
+
+
+class TestSinking(unittest.TestCase):
+    def test_counter_sunk(self):
+        """Test a slot updated every iteration is loaded once before the loop and stored once after it."""
+        lines = optimize("function f(n) { let i := 0 for { } lt(i, n) { } { "
+                         "sstore(0, add(sload(0), i)) i := add(i, 1) } return(0, 0) }")
+        self.assertEqual(lines, [
+            "let i := 0",
+            "let _licm_0 := sload(0)",
+            "for { } lt(i, n) { } {",
+            "_licm_0 := add(_licm_0, i)",
+            "i := add(i, 1)",
+            "}",
+            "sstore(0, _licm_0)",
+            "return(0, 0)",
+        ])
+
+    def test_conditional_store_sunk(self):
+        """Test a store under a branch is sunk too: the original value is stored back otherwise."""
+        lines = optimize("function f(n) { for { let i := 0 } lt(i, n) { i := add(i, 1) } { "
+                         "if gt(i, 3) { sstore(keccak256_mapping(2, caller()), i) } } }")
+        self.assertEqual(lines[0], "let _licm_0 := sload(keccak256_mapping(2, caller()))")
+        self.assertEqual(lines[-1], "sstore(keccak256_mapping(2, caller()), _licm_0)")
+
+    def test_not_sunk_when_loop_can_exit(self):
+        """Test stores stay in loops that can return, leave or call out."""
+        for exit_ in ("if gt(i, 3) { return(0, 0) }", "if gt(i, 3) { leave }",
+                      "pop(call(gas(), caller(), 0, 0, 0, 0, 0))", "update()"):
+            lines = optimize("function f(n) { for { let i := 0 } lt(i, n) { i := add(i, 1) } { "
+                             f"sstore(0, add(sload(0), 1)) {exit_} }} }}")
+            self.assertIn("sstore(0, add(sload(0), 1))", lines, exit_)
+
+    def test_revert_and_break_allow_sinking(self):
+        """Test a loop that only reverts or breaks early still has its store sunk."""
+        lines = optimize("function f(n) { for { let i := 0 } lt(i, n) { i := add(i, 1) } { "
+                         "if gt(i, 9) { revert(0, 0) } if eq(i, 5) { break } sstore(0, i) } }")
+        self.assertEqual(lines[-1], "sstore(0, _licm_0)")
+
+    def test_aliasing_access_prevents_sinking(self):
+        """Test a slot is not sunk when another access in the loop may name it."""
+        lines = optimize("function f(n, x) { for { let i := 0 } lt(i, n) { i := add(i, 1) } { "
+                         "sstore(keccak256_mapping(1, x), i) mstore(0, sload(keccak256_mapping(1, i))) } }")
+        self.assertIn("sstore(_licm_0, i)", lines)
+
+
+class TestGeneratedLoops(unittest.TestCase):
+    def setUp(self):
+        contract = DafnyParser(COUNTER).parse()
+        self.yul = YulGenerator().generate(contract)
+        self.unoptimized = YulGenerator(licm=False).generate(contract)
+
+    def function(self, yul: str, name: str) -> str:
+        start = yul.index(f"function {name}(")
+        return yul[start:yul.index("\n      }", start)]
+
+    def test_while_counter(self):
+        """Test a field updated in a while loop is stored once, with its invariant operand read once."""
+        bump = self.function(self.yul, "bump")
+        self.assertEqual(bump.count("sstore"), 1)
+        self.assertEqual(bump.count("sload"), 2)
+        self.assertGreater(bump.index("sstore(0,"), bump.index("for "))
+        self.assertIn("sstore(0, add(sload(0), sload(1)))", self.function(self.unoptimized, "bump"))
+
+    def test_array_length_hoisted(self):
+        """Test `values.length` in the loop condition is read once."""
+        count = self.function(self.yul, "count")
+        self.assertIn("let _licm_0 := sload(2)", count)
+        self.assertIn("lt(i, _licm_0)", count)
+
+
+if __name__ == '__main__':
+    unittest.main()
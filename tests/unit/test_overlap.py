@@ -0,0 +1,86 @@
+import tempfile
+import unittest
+from src.dafny_compiler import DafnyEVMCompiler
+from src.verifier.dafny_verifier import DafnyVerifier
+from tests.unit.fake_tools import fake_solc, write_tool
+
+SOURCE = """
+class Counter {
+    var count: uint256
+
+    method increment()
+        modifies this
+    {
+        count := count + 1;
+    }
+}
+"""
+
+# Stand-ins for dafny and solc that take a noticeable, fixed time
+FAKE_DAFNY = """
+import sys, time
+if sys.argv[1] == '--version':
+    print('4.4.0')
+    sys.exit(0)
+time.sleep(0.5)
+if 'FAILS' in open(sys.argv[-1]).read():
+    print('contract.dfy(3,4): Error: a postcondition could not be proved')
+    print('Dafny program verifier finished with 0 verified, 1 error')
+    sys.exit(4)
+print('Dafny program verifier finished with 1 verified, 0 errors')
+"""
+
+class TestOverlappedVerification(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dafny = write_tool(self.tmp.name, 'dafny', FAKE_DAFNY)
+        self.solc = fake_solc(self.tmp.name, delay=0.2)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _compiler(self, overlap: bool) -> DafnyEVMCompiler:
+        compiler = DafnyEVMCompiler(self.solc, verify=False, use_cache=False, profile=True,
+                                    overlap_verification=overlap)
+        compiler.verifier = DafnyVerifier(self.dafny)
+        compiler.verify_enabled = True
+        return compiler
+
+    @staticmethod
+    def _spans(result: dict) -> dict:
+        return {record['name']: record for record in result['profile']['stages']}
+
+    def test_solc_runs_during_verification(self):
+        """Test the compile stages overlap the verify stage."""
+        result = self._compiler(overlap=True).compile(SOURCE)
+        self.assertTrue(result['success'])
+        self.assertTrue(result['verified'])
+        spans = self._spans(result)
+        verify_end = spans['verify']['start'] + spans['verify']['wall']
+        self.assertLess(spans['solc']['start'] + spans['solc']['wall'], verify_end)
+        self.assertNotEqual(spans['verify']['thread'], spans['solc']['thread'])
+
+    def test_serial_mode_unchanged(self):
+        """Test without overlap, solc starts only after verification ends."""
+        spans = self._spans(self._compiler(overlap=False).compile(SOURCE))
+        self.assertGreaterEqual(spans['solc']['start'], spans['verify']['start'] + spans['verify']['wall'])
+
+    def test_same_result_as_serial(self):
+        """Test overlapping does not change the compiled output."""
+        serial = self._compiler(overlap=False).compile(SOURCE)
+        overlapped = self._compiler(overlap=True).compile(SOURCE)
+        for key in ('success', 'verified', 'yul_code', 'abi', 'bytecode'):
+            self.assertEqual(serial[key], overlapped[key])
+
+    def test_verification_failure_gates_result(self):
+        """Test a failed verification fails the build even though codegen finished."""
+        source = SOURCE.replace('count + 1', 'count + 1 // FAILS')
+        result = self._compiler(overlap=True).compile(source)
+        self.assertFalse(result['success'])
+        self.assertEqual(result['error'], 'Formal verification failed')
+        self.assertNotIn('bytecode', result)
+        self.assertIn('postcondition', result['verification_errors'][0])
+
+
+if __name__ == '__main__':
+    unittest.main()
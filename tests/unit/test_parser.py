@@ -0,0 +1,188 @@
+import unittest
+from src.parser.dafny_lexer import LexerError, tokenize
+from src.parser.dafny_parser import DafnyParser
+from src.parser.dafny_ast import *
+
+
+class TestLexer(unittest.TestCase):
+    def test_tokens_and_spans(self):
+        """Test tokens carry kind, value and source span."""
+        source = 'x := 0x1F + y; // trailing'
+        tokens = tokenize(source)
+        self.assertEqual([t.value for t in tokens], ['x', ':=', '0x1F', '+', 'y', ';'])
+        self.assertEqual([t.kind for t in tokens], ['IDENT', 'OP', 'NUMBER', 'OP', 'IDENT', 'OP'])
+        for tok in tokens:
+            self.assertEqual(source[tok.start:tok.end], tok.value)
+
+    def test_comments_skipped(self):
+        """Test line and block comments produce no tokens."""
+        tokens = tokenize('a /* b\n c */ d // e\n f')
+        self.assertEqual([t.value for t in tokens], ['a', 'd', 'f'])
+
+    def test_multi_char_operators(self):
+        """Test longest-match for multi-character operators."""
+        tokens = tokenize('a ==> b <==> c && d || e <= f')
+        self.assertEqual([t.value for t in tokens if t.kind == 'OP'], ['==>', '<==>', '&&', '||', '<='])
+
+    def test_invalid_character_reports_line(self):
+        """Test lexer errors include the line number."""
+        with self.assertRaises(LexerError) as ctx:
+            tokenize('class A {\n  "unterminated\n}')
+        self.assertIn('Line 2', str(ctx.exception))
+
+
+class TestParser(unittest.TestCase):
+    def parse(self, code):
+        return DafnyParser(code).parse()
+
+    def test_nested_if_statements(self):
+        """Test nested if/else blocks keep their structure and trailing statements."""
+        contract = self.parse("""
+        class C {
+          var x: uint256
+          method f(a: uint256) returns (r: bool)
+            modifies this
+          {
+            if a > 1 {
+              if a > 2 {
+                x := 2;
+              } else {
+                x := 1;
+              }
+            }
+            return false;
+          }
+        }
+        """)
+        body = contract.methods[0].body
+        self.assertEqual(len(body), 2)
+        self.assertIsInstance(body[0], IfStatement)
+        self.assertIsInstance(body[0].then_body[0], IfStatement)
+        self.assertIsNotNone(body[0].then_body[0].else_body)
+        self.assertIsInstance(body[1], Return)
+
+    def test_nested_mapping_field(self):
+        """Test nested mapping fields are typed as mappings."""
+        contract = self.parse("""
+        class C {
+          var allowance: mapping<address, mapping<address, uint256>>
+        }
+        """)
+        field_type = contract.fields[0].type
+        self.assertEqual(field_type.base, Type.MAPPING)
+        self.assertEqual(field_type.value_type.base, Type.MAPPING)
+
+    def test_locals_are_not_fields(self):
+        """Test local variable declarations do not leak into contract fields."""
+        contract = self.parse("""
+        class C {
+          var total: uint256
+          method f() modifies this {
+            var tmp: uint256 := 1;
+            total := tmp;
+          }
+        }
+        """)
+        self.assertEqual([f.name for f in contract.fields], ['total'])
+
+    def test_method_modifiers(self):
+        """Test custom modifiers are recorded by name."""
+        contract = self.parse("""
+        class C {
+          var owner: address
+          modifier onlyOwner() {
+            require msg.sender == owner;
+          }
+          method f(amount: uint256) onlyOwner modifies this {
+          }
+        }
+        """)
+        self.assertEqual(contract.methods[0].modifiers, ['onlyOwner'])
+        self.assertEqual(len(contract.modifiers[0].body), 1)
+
+    def test_method_constructor_rejected_with_line(self):
+        """Test 'method constructor' is rejected with its line number."""
+        with self.assertRaises(SyntaxError) as ctx:
+            self.parse("class C {\n\n  method constructor() {}\n}")
+        self.assertIn('Line 3', str(ctx.exception))
+
+
+class TestExpressions(unittest.TestCase):
+    def expr(self, text):
+        code = f"class C {{ method f() returns (r: uint256) {{ return {text}; }} }}"
+        return DafnyParser(code).parse().methods[0].body[0].value
+
+    def test_precedence(self):
+        """Test multiplication binds tighter than addition and comparison."""
+        expr = self.expr("a + b * c == d")
+        self.assertEqual(expr.op, '==')
+        self.assertEqual(expr.left.op, '+')
+        self.assertEqual(expr.left.right.op, '*')
+
+    def test_left_associativity(self):
+        """Test subtraction associates to the left."""
+        expr = self.expr("a - b - c")
+        self.assertEqual(expr.op, '-')
+        self.assertEqual(expr.left.op, '-')
+        self.assertEqual(expr.right, VarRef('c'))
+
+    def test_boolean_operators(self):
+        """Test && binds tighter than || and ! binds tighter than ==."""
+        expr = self.expr("!a == b || c && d")
+        self.assertEqual(expr.op, '||')
+        self.assertEqual(expr.left.op, '==')
+        self.assertIsInstance(expr.left.left, UnaryOp)
+        self.assertEqual(expr.right.op, '&&')
+
+    def test_implication_is_right_associative(self):
+        """Test a ==> b ==> c parses as a ==> (b ==> c)."""
+        expr = self.expr("a ==> b ==> c")
+        self.assertEqual(expr.op, '==>')
+        self.assertEqual(expr.left, VarRef('a'))
+        self.assertEqual(expr.right.op, '==>')
+
+    def test_not_in(self):
+        """Test !in is parsed as a negated membership test."""
+        expr = self.expr("k !in m")
+        self.assertIsInstance(expr, UnaryOp)
+        self.assertEqual(expr.operand.op, 'in')
+
+    def test_nested_if_expression(self):
+        """Test if-then-else expressions nest and extend to the right."""
+        expr = self.expr("if x > 0 then (if y > 0 then 1 else 2) else 3 + 4")
+        self.assertIsInstance(expr, IfExpression)
+        self.assertIsInstance(expr.then_expr, IfExpression)
+        self.assertEqual(expr.else_expr.op, '+')
+
+    def test_postfix_forms(self):
+        """Test indexing, member access, calls and globals."""
+        self.assertEqual(self.expr("m[a][b]"), ArrayAccess(ArrayAccess('m', VarRef('a')), VarRef('b')))
+        self.assertEqual(self.expr("arr.length"), ArrayLength('arr'))
+        self.assertEqual(self.expr("p.age"), StructAccess('p', 'age'))
+        self.assertEqual(self.expr("msg.sender"), GlobalVar('msg.sender'))
+        self.assertEqual(self.expr("f(1, x)").args[1], VarRef('x'))
+
+    def test_map_update(self):
+        """Test chained and nested functional map updates."""
+        expr = self.expr("m[a := 1][b := 2]")
+        self.assertIsInstance(expr, MapUpdate)
+        self.assertIsInstance(expr.base, MapUpdate)
+        nested = self.expr("m[a := m[a][b := v]]")
+        self.assertEqual(nested.base, 'm')
+        self.assertEqual(nested.value.base, 'm')
+        self.assertEqual(nested.value.key, VarRef('b'))
+
+    def test_contract_call(self):
+        """Test low-level calls with and without value."""
+        expr = self.expr("to.call{value: amount}(data)")
+        self.assertIsInstance(expr, ContractCall)
+        self.assertEqual(expr.value, VarRef('amount'))
+        self.assertEqual(expr.data, VarRef('data'))
+
+    def test_unsupported_expression_kept_verbatim(self):
+        """Test expressions outside the subset fall back to VarRef."""
+        self.assertEqual(self.expr("forall i :: i < 3"), VarRef('forall i :: i < 3'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+import tempfile
+import unittest
+from pathlib import Path
+from src.dafny_compiler import DafnyEVMCompiler
+from src.profiling import ProfileHook, Profiler, chrome_trace
+
+SOURCE = """
+class Counter {
+    var count: uint256
+
+    method increment()
+        modifies this
+    {
+        count := count + 1;
+    }
+}
+"""
+
+
+class RecordingHook(ProfileHook):
+    def __init__(self):
+        self.events = []
+
+    def on_stage(self, record):
+        self.events.append(('stage', record['name']))
+
+    def on_subprocess(self, record):
+        self.events.append(('subprocess', record['name']))
+
+    def on_cache(self, name, hit):
+        self.events.append(('cache', name, hit))
+
+    def on_profile(self, report):
+        self.events.append(('profile',))
+
+
+class FailingHook(ProfileHook):
+    def on_stage(self, record):
+        raise RuntimeError("exporter is down")
+
+
+class TestProfiler(unittest.TestCase):
+    def test_stage_and_subprocess_records(self):
+        """Test spans record wall and CPU time and reach the hooks."""
+        hook = RecordingHook()
+        profiler = Profiler([hook])
+        with profiler.stage('parse'):
+            sum(range(10000))
+        with profiler.subprocess('solc', ['solc', '--version']):
+            pass
+        profiler.record_cache('bytecode', True)
+        report = profiler.report()
+        stage = report['stages'][0]
+        self.assertEqual(stage['name'], 'parse')
+        self.assertGreaterEqual(stage['wall'], 0)
+        self.assertGreaterEqual(stage['cpu'], 0)
+        self.assertEqual(report['subprocesses'][0]['command'], ['solc', '--version'])
+        self.assertEqual(report['cache'], {'bytecode': True})
+        self.assertIn('self', report['peak_rss_kb'])
+        self.assertEqual(hook.events, [('stage', 'parse'), ('subprocess', 'solc'),
+                                       ('cache', 'bytecode', True), ('profile',)])
+
+    def test_failing_hook_is_ignored(self):
+        """Test a broken hook never interrupts the profiled code."""
+        profiler = Profiler([FailingHook()])
+        with profiler.stage('yul'):
+            pass
+        self.assertEqual(len(profiler.report()['stages']), 1)
+
+    def test_replay(self):
+        """Test a finished report passes its records to the hooks in the order they are reported."""
+        profiler = Profiler()
+        with profiler.stage('parse'):
+            pass
+        profiler.record_cache('bytecode', False)
+        hook = RecordingHook()
+        Profiler([hook]).replay(profiler.report())
+        self.assertEqual(hook.events, [('stage', 'parse'), ('cache', 'bytecode', False), ('profile',)])
+
+    def test_chrome_trace(self):
+        """Test reports convert to complete events, one process per label."""
+        profiler = Profiler()
+        with profiler.stage('parse'):
+            pass
+        trace = chrome_trace({'A.dfy': profiler.report(), 'B.dfy': profiler.report()})
+        complete = [e for e in trace['traceEvents'] if e['ph'] == 'X']
+        self.assertEqual([(e['pid'], e['name']) for e in complete], [(1, 'parse'), (2, 'parse')])
+        names = [e['args']['name'] for e in trace['traceEvents'] if e['name'] == 'process_name']
+        self.assertEqual(names, ['A.dfy', 'B.dfy'])
+
+
+class TestCompileProfile(unittest.TestCase):
+    def test_profile_in_result(self):
+        """Test compile() reports every pipeline stage, even when solc is missing."""
+        compiler = DafnyEVMCompiler('solc-that-does-not-exist', verify=False, use_cache=False, profile=True)
+        result = compiler.compile(SOURCE)
+        stages = [record['name'] for record in result['profile']['stages']]
+        self.assertEqual(stages, ['parse', 'yul', 'abi', 'solc'])
+        self.assertEqual(result['profile']['subprocesses'][0]['name'], 'solc')
+
+    def test_hooks_enable_profiling(self):
+        """Test passing hooks turns profiling on."""
+        hook = RecordingHook()
+        compiler = DafnyEVMCompiler('solc-that-does-not-exist', verify=False, use_cache=False, profile_hooks=[hook])
+        result = compiler.compile(SOURCE)
+        self.assertIn('profile', result)
+        self.assertIn(('stage', 'yul'), hook.events)
+
+    def test_hooks_see_worker_compiles(self):
+        """Test hooks in this process receive the records of files compiled in worker processes."""
+        hook = RecordingHook()
+        compiler = DafnyEVMCompiler('solc-that-does-not-exist', verify=False, use_cache=False, profile_hooks=[hook])
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = [Path(tmp) / name for name in ('A.dfy', 'B.dfy')]
+            for path in paths:
+                path.write_text(SOURCE)
+            results = compiler.compile_many(paths, jobs=2)
+        self.assertTrue(all('profile' in result for result in results.values()))
+        self.assertEqual(hook.events.count(('stage', 'yul')), 2)
+        self.assertEqual(hook.events.count(('profile',)), 2)
+
+    def test_no_profile_by_default(self):
+        """Test results are unchanged when profiling is off."""
+        compiler = DafnyEVMCompiler('solc-that-does-not-exist', verify=False, use_cache=False)
+        self.assertNotIn('profile', compiler.compile(SOURCE))
+
+
+if __name__ == '__main__':
+    unittest.main()
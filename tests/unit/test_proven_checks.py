@@ -0,0 +1,147 @@
+import tempfile
+import unittest
+from src.dafny_compiler import DafnyEVMCompiler
+from src.parser.dafny_parser import DafnyParser
+from src.translator.yul_generator import YulGenerator
+from src.verifier.dafny_verifier import DafnyVerifier
+from tests.unit.fake_tools import fake_solc, write_tool
+
+VAULT = """
+class Vault {
+    var balances: mapping<address, uint256>
+
+    method fee(amount: uint256) returns (f: uint256)
+        private
+        requires amount >= 100
+    {
+        assert amount > 0;
+        return amount / 100;
+    }
+
+    method withdraw(amount: uint256)
+        requires amount >= 100
+        modifies this
+    {
+        var f := fee(amount);
+        assert f <= amount;
+        balances[msg.sender] := balances[msg.sender] - amount - f;
+    }
+}
+"""
+
+FAKE_DAFNY = """
+import sys
+if sys.argv[1] == '--version':
+    print('4.4.0')
+    sys.exit(0)
+if 'FAILS' in open(sys.argv[-1]).read():
+    print('contract.dfy(3,4): Error: a precondition for this call could not be proved')
+    print('Dafny program verifier finished with 0 verified, 1 error')
+    sys.exit(4)
+print('Dafny program verifier finished with 2 verified, 0 errors')
+"""
+
+def function_body(yul: str, name: str) -> str:
+    start = yul.index(f"function {name}(")
+    return yul[start:yul.index("\n      }", start)]
+
+
+class TestProvenChecks(unittest.TestCase):
+    def setUp(self):
+        self.contract = DafnyParser(VAULT).parse()
+
+    def test_unproven_keeps_checks(self):
+        """Test every check is emitted unless the contract is proven."""
+        generator = YulGenerator()
+        yul = generator.generate(self.contract)
+        self.assertIn("if iszero(iszero(lt(amount, 100))) { revert(0, 0) }", function_body(yul, "fee"))
+        self.assertIn("if iszero(gt(amount, 0)) { revert(0, 0) }", function_body(yul, "fee"))
+        self.assertEqual(generator.elided_checks(), {})
+
+    def test_internal_preconditions_dropped(self):
+        """Test a proven contract's internal method has no precondition or assert checks."""
+        yul = YulGenerator().generate(self.contract, proven=True)
+        self.assertNotIn("revert", function_body(yul, "fee"))
+
+    def test_public_preconditions_kept(self):
+        """Test public methods still check their preconditions, since callers are unverified."""
+        yul = YulGenerator().generate(self.contract, proven=True)
+        withdraw = function_body(yul, "withdraw")
+        self.assertIn("if iszero(iszero(lt(amount, 100))) { revert(0, 0) }", withdraw)
+        # The proven assert is gone
+        self.assertNotIn("gt(f, amount)", withdraw)
+
+    def test_report(self):
+        """Test the report counts elided checks with their callers and estimated savings."""
+        generator = YulGenerator()
+        generator.generate(self.contract, proven=True)
+        report = generator.elided_checks()
+        self.assertEqual(report['fee']['checks'], 2)
+        self.assertEqual(report['fee']['callers'], ['withdraw'])
+        self.assertGreater(report['fee']['gas'], 0)
+        self.assertGreater(report['fee']['bytes'], 0)
+        self.assertEqual(report['withdraw']['checks'], 1)
+        self.assertNotIn('callers', report['withdraw'])
+
+    def test_require_statements_kept(self):
+        """Test require statements are kept even when proven: Dafny does not prove them."""
+        source = VAULT.replace("assert amount > 0;", "require(amount > 0);")
+        yul = YulGenerator().generate(DafnyParser(source).parse(), proven=True)
+        self.assertIn("if iszero(gt(amount, 0)) { revert(0, 0) }", function_body(yul, "fee"))
+
+
+class TestCompilerElision(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dafny = write_tool(self.tmp.name, 'dafny', FAKE_DAFNY)
+        self.solc = fake_solc(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _compiler(self, overlap: bool = False) -> DafnyEVMCompiler:
+        compiler = DafnyEVMCompiler(self.solc, verify=False, use_cache=False, overlap_verification=overlap,
+                                    elide_verified_checks=True)
+        compiler.verifier = DafnyVerifier(self.dafny)
+        compiler.verify_enabled = True
+        return compiler
+
+    def test_elided_after_verification(self):
+        """Test checks are elided and reported when verification passes."""
+        result = self._compiler().compile(VAULT)
+        self.assertTrue(result['verified'])
+        self.assertNotIn("revert", function_body(result['yul_code'], "fee"))
+        self.assertEqual(result['elided_checks']['fee']['checks'], 2)
+
+    def test_overlapped_build_elided_after_verdict(self):
+        """Test overlapped verification gives the same elided output as serial."""
+        serial = self._compiler().compile(VAULT)
+        overlapped = self._compiler(overlap=True).compile(VAULT)
+        self.assertEqual(serial['yul_code'], overlapped['yul_code'])
+        self.assertEqual(serial['elided_checks'], overlapped['elided_checks'])
+
+    def test_overlapped_build_runs_once(self):
+        """Test the overlapped build is used as it is, not rebuilt after the verdict."""
+        compiler = self._compiler(overlap=True)
+        builds = []
+        build = compiler._build
+        compiler._build = lambda *args, **kwargs: builds.append(kwargs) or build(*args, **kwargs)
+        self.assertTrue(compiler.compile(VAULT)['verified'])
+        self.assertEqual(len(builds), 1)
+        self.assertTrue(builds[0]['proven'])
+
+    def test_not_elided_without_verification(self):
+        """Test skipping verification keeps every check."""
+        result = self._compiler().compile(VAULT, skip_verification=True)
+        self.assertIn("revert", function_body(result['yul_code'], "fee"))
+        self.assertEqual(result['elided_checks'], {})
+
+    def test_failed_verification_builds_nothing(self):
+        """Test a failed verification produces no elided build."""
+        result = self._compiler().compile(VAULT.replace("amount / 100", "amount / 100 // FAILS"))
+        self.assertFalse(result['success'])
+        self.assertNotIn('yul_code', result)
+
+
+if __name__ == '__main__':
+    unittest.main()
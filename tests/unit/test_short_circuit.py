@@ -0,0 +1,122 @@
+import unittest
+from src.parser.dafny_parser import DafnyParser
+from src.translator.costs import estimate_gas, is_boolean, is_side_effect_free
+from src.translator.yul_ast import call
+from src.translator.yul_generator import YulGenerator
+
+
+def generate(body: str, requires: str = "") -> str:
+    source = f"""
+class Test {{
+    var owner: address
+    var balances: mapping<address, uint256>
+    var paused: bool
+
+    method f(x: uint256, y: uint256, addr: address) returns (r: uint256)
+{requires}
+        modifies this
+    {{
+{body}
+    }}
+}}
+"""
+    return YulGenerator(cse=False).generate(DafnyParser(source).parse())
+
+
+def method_body(yul: str) -> str:
+    start = yul.index("function f()")
+    return yul[start:yul.index("\n      }", start)]
+
+
+class TestShortCircuit(unittest.TestCase):
+    def test_no_raw_operators(self):
+        """Test && and || never reach the output as operator text."""
+        body = method_body(generate("        var a := x > y && balances[addr] > 0;\n"
+                                    "        var b := x > y || balances[addr] > 0;"))
+        self.assertNotIn("&&", body)
+        self.assertNotIn("||", body)
+
+    def test_and_guards_right_operand(self):
+        """Test the right operand of && is only evaluated when the left holds."""
+        body = method_body(generate("        var a := x > y && balances[addr] > 0;"))
+        self.assertIn("let _and_0 := gt(x, y)\n", body)
+        self.assertIn("if _and_0 { _and_0 := gt(sload(keccak256_mapping(1, addr)), 0) }", body)
+        self.assertIn("let a := _and_0", body)
+
+    def test_or_guards_right_operand(self):
+        """Test the right operand of || is only evaluated when the left fails."""
+        body = method_body(generate("        var a := x > y || balances[addr] > 0;"))
+        self.assertIn("if iszero(_or_0) { _or_0 := gt(sload(keccak256_mapping(1, addr)), 0) }", body)
+
+    def test_cheap_operand_tested_first(self):
+        """Test side-effect-free operands are reordered cheapest first."""
+        body = method_body(generate("        var a := balances[addr] > 0 && x > y;"))
+        self.assertIn("let _and_0 := gt(x, y)\n", body)
+
+    def test_cheap_operands_folded(self):
+        """Test comparisons cheaper than a branch are combined with and/or."""
+        body = method_body(generate("        var a := x > y && y > 0;\n        var b := x > y || y > 0;"))
+        self.assertIn("let a := and(gt(x, y), gt(y, 0))", body)
+        self.assertIn("let b := or(gt(x, y), gt(y, 0))", body)
+        self.assertNotIn("_and_", body)
+
+    def test_side_effects_keep_source_order(self):
+        """Test an operand that calls out is not moved ahead of the left operand."""
+        body = method_body(generate("        var ok := balances[addr] > 0 && addr.call(0);"))
+        self.assertIn("let _and_0 := gt(sload(keccak256_mapping(1, addr)), 0)", body)
+        self.assertIn("_and_0 := call(gas(), addr, 0, 0, 32, 0, 32)", body)
+
+    def test_require_splits_conjunction(self):
+        """Test require(a && b) becomes one check per operand, cheapest first."""
+        body = method_body(generate("        require(balances[addr] >= x && x > 0);"))
+        checks = [line.strip() for line in body.splitlines() if "revert(0, 0)" in line]
+        self.assertEqual(checks[1:], [
+            "if iszero(gt(x, 0)) { revert(0, 0) }",
+            "if iszero(iszero(lt(sload(keccak256_mapping(1, addr)), x))) { revert(0, 0) }",
+        ])
+
+    def test_precondition_disjunction_nested(self):
+        """Test requires a || b reverts only when both operands fail."""
+        body = method_body(generate("        r := x;", "        requires msg.sender == owner || balances[addr] > 0"))
+        self.assertIn("if iszero(eq(caller(), sload(0))) {\n"
+                      "          if iszero(gt(sload(keccak256_mapping(1, addr)), 0)) { revert(0, 0) }\n"
+                      "        }", body)
+
+    def test_if_conjunction_nests(self):
+        """Test if a && b without else becomes nested ifs with no temporary."""
+        body = method_body(generate("        if balances[addr] > 0 && !paused { r := 1; }"))
+        self.assertIn("if iszero(", body)
+        self.assertNotIn("_and_", body)
+        self.assertEqual(body.count("if "), 3)
+
+    def test_if_else_evaluates_condition_once(self):
+        """Test if a || b with else switches on a temporary."""
+        body = method_body(generate("        if balances[addr] > 0 || paused { r := 1; } else { r := 2; }"))
+        self.assertIn("switch _or_0", body)
+
+    def test_operand_prelude_stays_guarded(self):
+        """Test statements computing the right operand run only when it is needed."""
+        body = method_body(generate("        var a := x > 0 && (if y > 0 then balances[addr] else 0) > 1;"))
+        guard = body.index("if _and_1 {")
+        self.assertGreater(body.index("switch gt(y, 0)"), guard)
+
+
+class TestCostModel(unittest.TestCase):
+    def test_storage_reads_dominate(self):
+        """Test a storage read outweighs a comparison of calldata values."""
+        self.assertGreater(estimate_gas(call('sload', 0)), estimate_gas(call('gt', 'x', call('caller'))))
+
+    def test_side_effects(self):
+        """Test reads are side-effect free but external and user calls are not."""
+        self.assertTrue(is_side_effect_free(call('gt', call('sload', call('keccak256_mapping', 1, 'a')), 0)))
+        self.assertFalse(is_side_effect_free(call('eq', call('call', call('gas'), 'a', 0, 0, 32, 0, 32), 1)))
+        self.assertFalse(is_side_effect_free(call('userHelper', 'x')))
+
+    def test_boolean(self):
+        """Test only comparisons and iszero count as 0/1 valued."""
+        self.assertTrue(is_boolean(call('iszero', 'x')))
+        self.assertFalse(is_boolean(call('and', 'x', 'y')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+import tempfile
+import unittest
+from pathlib import Path
+from src.compiler.cache import DiskCache
+from src.compiler.evm_compiler import EVMCompiler
+from src.dafny_compiler import DafnyEVMCompiler
+from tests.unit.fake_tools import fake_solc
+
+CONTRACT = """
+class {name} {{
+    var count: uint256
+
+    method increment()
+        modifies this
+    {{
+        count := count + 1;
+    }}
+}}
+"""
+
+# Stand-in for `solc --standard-json`: logs each invocation, reports a
+# syntax error for sources containing BROKEN, else derives the artifacts
+# from the source length
+STANDARD_JSON = """
+import json, re
+with open(sys.argv[0] + '.log', 'a') as log:
+    log.write(' '.join(sys.argv[1:]) + '\\n')
+request = json.load(sys.stdin)
+assert request['language'] == 'Yul'
+(name, source), = request['sources'].items()
+content = source['content']
+if 'BROKEN' in content:
+    print(json.dumps({'errors': [{'severity': 'error', 'formattedMessage': 'ParserError: BROKEN'}]}))
+    sys.exit(0)
+size = len(content)
+evm = {
+    'bytecode': {'object': '%064x' % size, 'opcodes': 'PUSH1 0x80', 'sourceMap': '0:%d:0:-:0' % size},
+    'deployedBytecode': {'object': '%08x' % size, 'opcodes': 'STOP', 'sourceMap': '1:2:0:-:0'},
+}
+obj = re.search(r'object "(\\w+)"', content).group(1)
+print(json.dumps({'contracts': {name: {obj: {'evm': evm}}},
+                  'errors': [{'severity': 'warning', 'formattedMessage': 'Warning: stand-in'}]}))
+"""
+
+
+def yul(name: str, body: str = "") -> str:
+    return f'object "{name}" {{ code {{ {body} }} }}'
+
+
+class TestStandardJson(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.solc = fake_solc(self.tmp.name, body=STANDARD_JSON)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def invocations(self) -> list:
+        log = Path(self.solc + '.log')
+        return log.read_text().splitlines() if log.exists() else []
+
+    def test_batch_reads_structured_output(self):
+        """Test each source gets creation and deployed bytecode, opcodes and source maps, in input order."""
+        compiler = EVMCompiler(self.solc, backend='standard-json')
+        sources = {'B': yul('B'), 'A': yul('A', 'sstore(0, 1)'), 'C': yul('C', 'stop()')}
+        results = compiler.compile_yul_batch(sources, jobs=2)
+        self.assertEqual(list(results), ['B', 'A', 'C'])
+        for name, result in results.items():
+            self.assertTrue(result['success'])
+            self.assertEqual(int(result['bytecode'], 16), len(sources[name]))
+            self.assertEqual(int(result['runtime_bytecode'], 16), len(sources[name]))
+            self.assertEqual(result['opcodes'], 'PUSH1 0x80')
+            self.assertEqual(result['runtime_opcodes'], 'STOP')
+            self.assertEqual(result['source_map'], f"0:{len(sources[name])}:0:-:0")
+            self.assertIsNone(result['solc_gas_estimates'])
+        # One process per source, reading stdin rather than a file
+        self.assertEqual(self.invocations(), ['--standard-json'] * 3)
+
+    def test_errors_fail_only_their_source(self):
+        """Test an error reported for one source fails it alone, and warnings are not errors."""
+        compiler = EVMCompiler(self.solc, backend='standard-json')
+        results = compiler.compile_yul_batch({'good': yul('Good'), 'bad': yul('Bad', 'BROKEN')}, jobs=2)
+        self.assertTrue(results['good']['success'])
+        self.assertFalse(results['bad']['success'])
+        self.assertIn('ParserError: BROKEN', results['bad']['error'])
+
+    def test_missing_solc(self):
+        """Test a solc that cannot be run gives failed results rather than raising."""
+        compiler = EVMCompiler(str(Path(self.tmp.name) / 'no-solc'), backend='standard-json')
+        self.assertFalse(compiler.compile_yul(yul('A'))['success'])
+
+    def test_cached_sources_skip_solc(self):
+        """Test only sources missing from the cache are sent to solc."""
+        compiler = EVMCompiler(self.solc, cache=DiskCache(Path(self.tmp.name) / 'cache'),
+                               backend='standard-json')
+        compiler.compile_yul_batch({'A': yul('A')})
+        results = compiler.compile_yul_batch({'A': yul('A'), 'B': yul('B')})
+        self.assertTrue(results['A']['cache_hit'])
+        self.assertFalse(results['B']['cache_hit'])
+        self.assertEqual(len(self.invocations()), 2)
+
+    def test_unknown_backend(self):
+        """Test an unknown backend name is rejected."""
+        with self.assertRaises(ValueError):
+            EVMCompiler(backend='combined-json')
+
+    def test_compile_many_assembles_in_one_batch(self):
+        """Test compile_many assembles every file's Yul after code generation, matching one-by-one compiles."""
+        paths = []
+        for name in ('Alpha', 'Beta', 'Gamma'):
+            path = Path(self.tmp.name) / f"{name}.dfy"
+            path.write_text(CONTRACT.format(name=name))
+            paths.append(str(path))
+        compiler = DafnyEVMCompiler(self.solc, verify=False, use_cache=False, solc_backend='standard-json')
+        results = compiler.compile_many(paths, jobs=2)
+        self.assertEqual(len(self.invocations()), 3)
+        for path, result in results.items():
+            self.assertTrue(result['success'])
+            self.assertEqual(result['runtime_opcodes'], 'STOP')
+            single = compiler.compile_file(path)
+            self.assertEqual(result['bytecode'], single['bytecode'])
+            self.assertEqual(result['gas_estimates'], single['gas_estimates'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,131 @@
+import unittest
+from src.parser.dafny_parser import DafnyParser
+from src.translator.storage_layout import compute_layout, compute_struct_layouts
+from src.translator.yul_generator import YulGenerator
+
+TOKEN = """
+class Vault {
+    var owner: address
+    var paused: bool
+    var totalSupply: uint256
+    var decimals: uint8
+    var cap: uint128
+    var floor: uint128
+    var balances: mapping<address, uint256>
+
+    method pause()
+        modifies this
+    {
+        paused := true;
+    }
+
+    method setOwner(newOwner: address)
+        modifies this
+    {
+        owner := newOwner;
+    }
+
+    method isPaused() returns (result: bool)
+    {
+        return paused;
+    }
+}
+"""
+
+
+def layout_of(source: str, **kwargs):
+    contract = DafnyParser(source).parse()
+    _, struct_slots = compute_struct_layouts(contract.structs)
+    return compute_layout(contract.fields, struct_slots, **kwargs)
+
+
+class TestStorageLayout(unittest.TestCase):
+    def test_solidity_style_packing(self):
+        """Test small fields share slots in declaration order, like solc."""
+        locations, slots = layout_of(TOKEN)
+        self.assertEqual((locations['owner'].slot, locations['owner'].offset), (0, 0))
+        self.assertEqual((locations['paused'].slot, locations['paused'].offset), (0, 20))
+        self.assertEqual(locations['totalSupply'].slot, 1)
+        # decimals (1 byte) + cap (16 bytes) fit together; floor needs a new slot
+        self.assertEqual((locations['decimals'].slot, locations['cap'].slot, locations['cap'].offset), (2, 2, 1))
+        self.assertEqual((locations['floor'].slot, locations['floor'].offset), (3, 0))
+        self.assertEqual(locations['balances'].slot, 4)
+        self.assertEqual(slots, 5)
+
+    def test_unpacked_layout(self):
+        """Test pack=False keeps one slot per field."""
+        locations, slots = layout_of(TOKEN, pack=False)
+        self.assertEqual([loc.slot for loc in locations.values()], list(range(7)))
+        self.assertFalse(any(loc.packed for loc in locations.values()))
+
+    def test_reorder_saves_slots(self):
+        """Test first-fit-decreasing reordering packs into fewer slots."""
+        _, declared = layout_of(TOKEN)
+        locations, reordered = layout_of(TOKEN, reorder=True)
+        self.assertLess(reordered, declared)
+        # Full-slot fields come first, in declaration order
+        self.assertEqual((locations['totalSupply'].slot, locations['balances'].slot), (0, 1))
+
+    def test_sole_occupant_is_not_masked(self):
+        """Test a small field alone in its slot is accessed as a full slot."""
+        locations, _ = layout_of(TOKEN)
+        self.assertFalse(locations['floor'].packed)
+        self.assertTrue(locations['cap'].packed)
+
+    def test_struct_members_pack(self):
+        """Test struct members are packed and the struct spans only the slots it needs."""
+        source = """
+        struct Position {
+            owner: address
+            active: bool
+            amount: uint256
+        }
+        class Book {
+            var head: Position
+            var count: uint256
+        }
+        """
+        contract = DafnyParser(source).parse()
+        layouts, struct_slots = compute_struct_layouts(contract.structs)
+        self.assertEqual(struct_slots['Position'], 2)
+        self.assertEqual((layouts['Position']['active'].slot, layouts['Position']['active'].offset), (0, 20))
+        locations, _ = compute_layout(contract.fields, struct_slots)
+        self.assertEqual(locations['count'].slot, 2)
+
+
+class TestPackedCodegen(unittest.TestCase):
+    def setUp(self):
+        self.generator = YulGenerator()
+        self.yul = self.generator.generate(DafnyParser(TOKEN).parse())
+
+    def test_masked_read(self):
+        """Test reading a packed field shifts and masks its bytes."""
+        self.assertIn("and(shr(160, sload(0)), 0xff)", self.yul)
+
+    def test_masked_write_preserves_neighbours(self):
+        """Test writing a packed field clears only its own bytes."""
+        owner_mask = "0xffffffffffffffffffffffffffffffffffffffff"
+        self.assertIn(f"sstore(0, or(and(sload(0), not({owner_mask})), and(newOwner, {owner_mask})))", self.yul)
+        # Constant writes are folded: true at byte 20
+        self.assertIn("sstore(0, or(and(sload(0), not(0xff" + "0" * 40 + ")), 0x1" + "0" * 40 + "))", self.yul)
+
+    def test_constructor_zeroes_each_slot_once(self):
+        """Test packed fields share one initializing store."""
+        yul = YulGenerator(dse=False).generate(DafnyParser(TOKEN).parse())
+        constructor = yul[:yul.index('object "runtime"')]
+        self.assertEqual(constructor.count("sstore(0, 0)"), 1)
+        self.assertNotIn("sstore(5, 0)", constructor)
+
+    def test_layout_artifact(self):
+        """Test the storage layout artifact follows solc's storageLayout shape."""
+        layout = self.generator.storage_layout()
+        paused = next(entry for entry in layout['storage'] if entry['label'] == 'paused')
+        self.assertEqual((paused['slot'], paused['offset'], paused['type']), ('0', 20, 't_bool'))
+        self.assertEqual(layout['types']['t_bool']['numberOfBytes'], '1')
+        balances = layout['types'][next(e['type'] for e in layout['storage'] if e['label'] == 'balances')]
+        self.assertEqual(balances['encoding'], 'mapping')
+        self.assertEqual(balances['value'], 't_uint256')
+
+
+if __name__ == '__main__':
+    unittest.main()
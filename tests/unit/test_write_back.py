@@ -0,0 +1,178 @@
+import unittest
+from pathlib import Path
+from src.parser.dafny_parser import DafnyParser
+from src.translator.write_back import write_back_storage
+from src.translator.yul_ast import Block, Object, format_function, format_stmt, functions_of, parse_function
+from src.translator.yul_generator import YulGenerator
+from src.translator.yul_interpreter import DEFAULT_CALLER, YulInterpreter
+
+EXAMPLES = Path(__file__).resolve().parents[2] / "examples"
+
+VAULT = """
+class Vault {
+    var balance: uint256
+    var fees: uint256
+    var deposits: uint256
+    var credits: mapping<address, uint256>
+
+    method deposit(amount: uint256)
+        modifies this
+    {
+        var fee: uint256 := amount / 100;
+        balance := balance + amount;
+        balance := balance - fee;
+        fees := fees + fee;
+        deposits := deposits + 1;
+        credits[msg.sender] := credits[msg.sender] + amount;
+        credits[msg.sender] := credits[msg.sender] - fee;
+    }
+
+    method settle(amount: uint256)
+        modifies this
+    {
+        require(balance >= amount);
+        balance := balance - amount;
+        if (balance < 10) {
+            balance := 0;
+            return;
+        }
+        deposits := deposits + 1;
+    }
+}
+"""
+
+
+def optimize(function: str) -> list:
+    body = write_back_storage(parse_function(function)).body
+    return [line.strip() for stmt in body.statements for line in format_stmt(stmt)]
+
+
+class TestWriteBack(unittest.TestCase):
+    def test_repeated_stores_written_once(self):
+        """Test a slot stored twice is kept in a local and stored once before the return."""
+        lines = optimize("function f(x) { sstore(0, add(sload(0), x)) sstore(0, sub(sload(0), 1)) return(0, 0) }")
+        self.assertEqual(lines, [
+            "let _wb_0 := sload(0)",
+            "_wb_0 := add(_wb_0, x)",
+            "_wb_0 := sub(_wb_0, 1)",
+            "sstore(0, _wb_0)",
+            "return(0, 0)",
+        ])
+
+    def test_first_store_needs_no_load(self):
+        """Test a slot whose first use overwrites it starts from the stored value."""
+        lines = optimize("function f(x) { sstore(0, x) mstore(0, sload(0)) sstore(0, add(x, 1)) }")
+        self.assertEqual(lines[0], "let _wb_0 := x")
+        self.assertEqual(lines[-1], "sstore(0, _wb_0)")
+        self.assertEqual(" ".join(lines).count("sload"), 0)
+
+    def test_single_store_left_alone(self):
+        """Test a slot stored once and not read afterwards is not cached."""
+        function = "function f(x) { if lt(sload(0), x) { revert(0, 0) } sstore(0, sub(sload(0), x)) }"
+        self.assertNotIn("_wb_0", " ".join(optimize(function)))
+
+    def test_written_back_on_every_exit(self):
+        """Test the slot is written back before an early return and a leave, but not before a revert."""
+        lines = optimize("function f(x) { sstore(0, x) sstore(0, add(sload(0), 1)) "
+                         "if gt(x, 9) { revert(0, 0) } if gt(x, 5) { leave } "
+                         "if gt(x, 3) { return(0, 0) } sstore(0, add(sload(0), 2)) }")
+        self.assertIn("if gt(x, 9) { revert(0, 0) }", lines)
+        self.assertEqual(lines[lines.index("leave") - 1], "sstore(0, _wb_0)")
+        self.assertEqual(lines[lines.index("return(0, 0)") - 1], "sstore(0, _wb_0)")
+        self.assertEqual(lines[-1], "sstore(0, _wb_0)")
+
+    def test_external_call_sees_storage(self):
+        """Test the slot is written back before an external call and read again after it."""
+        lines = optimize("function f(x) { sstore(0, add(sload(0), x)) "
+                         "pop(call(gas(), caller(), 0, 0, 0, 0, 0)) sstore(0, add(sload(0), 1)) }")
+        call = lines.index("pop(call(gas(), caller(), 0, 0, 0, 0, 0))")
+        self.assertEqual(lines[call - 1], "sstore(0, _wb_0)")
+        self.assertEqual(lines[call + 1], "_wb_0 := sload(0)")
+
+    def test_condition_calling_out_evaluated_first(self):
+        """Test a branch condition that may write storage is evaluated before the local is reloaded."""
+        lines = optimize("function f(x) { sstore(0, x) if gt(update(), sload(0)) { sstore(0, 1) } "
+                         "sstore(0, add(sload(0), 1)) }")
+        condition = lines.index("let _wb_condition_0 := gt(update(), sload(0))")
+        self.assertEqual(lines[condition - 1], "sstore(0, _wb_0)")
+        self.assertEqual(lines[condition + 1], "_wb_0 := sload(0)")
+        self.assertTrue(lines[condition + 2].startswith("if _wb_condition_0 {"))
+
+    def test_read_beside_storage_writing_call(self):
+        """Test a read in the same statement as a call that writes the slot sees the call's store."""
+        bump = parse_function("function bump() -> r { sstore(0, add(sload(0), 10)) r := 1 }")
+        method = parse_function("function m() { sstore(0, 5) let x := add(sload(0), bump()) "
+                                "sstore(0, add(sload(0), 1)) mstore(0, x) return(0, 32) }")
+        results = []
+        for function in (method, write_back_storage(method)):
+            machine = YulInterpreter(Object("runtime", Block([function, bump])))
+            result = machine.call("m")
+            results.append((int.from_bytes(result.return_data, "big"), machine.storage))
+        self.assertEqual(results[0], (16, {0: 16}))
+        self.assertEqual(results[1], results[0])
+        self.assertIn("let x := add(sload(0), bump())", optimize(format_function(method)))
+
+    def test_aliasing_access_prevents_caching(self):
+        """Test an entry is not cached when another access in the function may name the same slot."""
+        function = ("function f(x, y) { let s := keccak256_mapping(1, x) sstore(s, add(sload(s), 1)) "
+                    "sstore(s, add(sload(s), 2)) mstore(0, sload(keccak256_mapping(1, y))) }")
+        self.assertNotIn("_wb_0", " ".join(optimize(function)))
+
+    def test_off_by_default(self):
+        """Test the generator only applies the pass when asked to."""
+        contract = DafnyParser(VAULT).parse()
+        self.assertNotIn("_wb_", YulGenerator().generate(contract))
+        self.assertIn("_wb_", YulGenerator(write_back=True).generate(contract))
+
+
+class TestGasRegression(unittest.TestCase):
+    """Gas of generated methods, run on the Yul interpreter, with and without write-back."""
+
+    def run_both(self, contract, calls, storage=None, deploy_args=()):
+        results = []
+        for write_back in (False, True):
+            obj = YulGenerator(write_back=write_back).generate_ir(contract)
+            if storage is None:
+                interpreter, _ = YulInterpreter.deploy(obj, deploy_args)
+            else:
+                interpreter = YulInterpreter(obj.objects[0], storage)
+            outcomes = []
+            for method, args in calls:
+                result = interpreter.call(method, args)
+                outcomes.append((method, result.success, result.return_data, result.logs, result.gas_used))
+            results.append((outcomes, interpreter.storage))
+        return results
+
+    def test_vault_saves_gas(self):
+        """Test repeated field and mapping updates cost less, on every exit path, with the same storage."""
+        calls = [("deposit", [1000]), ("settle", [100]), ("settle", [1385]), ("settle", [10 ** 6])]
+        (before, storage_before), (after, storage_after) = self.run_both(DafnyParser(VAULT).parse(), calls,
+                                                                          storage={0: 500, 2: 1})
+        self.assertEqual(storage_before, storage_after)
+        for (method, *outcome, gas_before), (_, *outcome_after, gas_after) in zip(before, after):
+            self.assertEqual(outcome, outcome_after, method)
+        deposit, settle, settle_to_zero, settle_reverted = [(b[-1], a[-1]) for b, a in zip(before, after)]
+        self.assertLess(deposit[1], deposit[0] - 300)
+        self.assertLess(settle[1], settle[0])
+        self.assertLess(settle_to_zero[1], settle_to_zero[0])
+        self.assertEqual(settle_reverted[1], settle_reverted[0])
+
+    def test_examples_unchanged(self):
+        """Test every example method behaves the same with write-back and never costs more."""
+        for path in sorted(EXAMPLES.glob("*.dfy")):
+            contract = DafnyParser(path.read_text()).parse()
+            runtime = YulGenerator().generate_ir(contract).objects[0]
+            methods = [function.name for function in functions_of(runtime)
+                       if not function.params and not function.name.startswith(("keccak256_", "allocate_"))]
+            calls = [(method, [DEFAULT_CALLER if "owner" in method.lower() else 5, 3, 2, 1]) for method in methods]
+            with self.subTest(example=path.stem):
+                (before, storage_before), (after, storage_after) = self.run_both(contract, calls,
+                                                                                  deploy_args=[1000, 2, 3, 4])
+                self.assertEqual(storage_before, storage_after)
+                for (method, *outcome, gas_before), (_, *outcome_after, gas_after) in zip(before, after):
+                    self.assertEqual(outcome, outcome_after, method)
+                    self.assertLessEqual(gas_after, gas_before, method)
+
+
+if __name__ == '__main__':
+    unittest.main()
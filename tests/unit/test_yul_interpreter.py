@@ -0,0 +1,116 @@
+import unittest
+from src.parser.dafny_parser import DafnyParser
+from src.translator.yul_ast import Block, Object, parse_function
+from src.translator.yul_generator import YulGenerator
+from src.translator.yul_interpreter import DEFAULT_CALLER, YulInterpreter
+
+TOKEN = """
+class Token {
+    var supply: uint256
+    var balances: mapping<address, uint256>
+
+    constructor(initial: uint256)
+    {
+        supply := initial;
+        balances[msg.sender] := initial;
+    }
+
+    method burn(amount: uint256)
+        modifies this
+    {
+        require(balances[msg.sender] >= amount);
+        balances[msg.sender] := balances[msg.sender] - amount;
+        supply := supply - amount;
+    }
+}
+"""
+
+
+def interpreter(*functions: str, storage=None) -> YulInterpreter:
+    obj = Object("runtime", Block([parse_function(function) for function in functions]))
+    return YulInterpreter(obj, storage)
+
+
+class TestExecution(unittest.TestCase):
+    def test_arguments_and_return_data(self):
+        """Test arguments arrive as calldata words and `return` hands back memory."""
+        result = interpreter("function f() { mstore(0, add(calldataload(4), calldataload(36))) return(0, 32) }")\
+            .call("f", [2, 3])
+        self.assertTrue(result.success)
+        self.assertEqual(int.from_bytes(result.return_data, "big"), 5)
+
+    def test_revert_restores_storage(self):
+        """Test storage written before a revert is put back and the call reported as failed."""
+        machine = interpreter("function f() { sstore(0, 7) revert(0, 0) }", storage={0: 1})
+        result = machine.call("f")
+        self.assertFalse(result.success)
+        self.assertEqual(machine.storage, {0: 1})
+        self.assertEqual(result.storage_changes, {})
+
+    def test_loops_and_user_functions(self):
+        """Test for loops, break and user functions with return variables."""
+        machine = interpreter("function double(x) -> y { y := mul(x, 2) }",
+                              "function f() { let total := 0 for { let i := 0 } 1 { i := add(i, 1) } { "
+                              "if eq(i, 4) { break } total := add(total, double(i)) } sstore(0, total) }")
+        self.assertEqual(machine.call("f").storage_changes, {0: 12})
+
+    def test_external_call_hook(self):
+        """Test an external call runs the hook, which can change storage as re-entry would."""
+        def reenter(machine, address, value):
+            machine.storage[1] = address
+            return 1
+        machine = YulInterpreter(Object("runtime", Block([parse_function(
+            "function f() { pop(call(gas(), caller(), 0, 0, 0, 0, 0)) sstore(0, sload(1)) }")])),
+            external_call=reenter)
+        self.assertEqual(machine.call("f").storage_changes, {0: DEFAULT_CALLER, 1: DEFAULT_CALLER})
+
+
+class TestGas(unittest.TestCase):
+    def test_storage_pricing(self):
+        """Test cold and warm reads and the EIP-2200 cost of setting, resetting and rewriting a slot."""
+        read = interpreter("function f() { pop(sload(0)) }").call("f").gas_used
+        read_twice = interpreter("function f() { pop(sload(0)) pop(sload(0)) }").call("f").gas_used
+        # A warm read, plus pushing the slot and popping the value
+        self.assertEqual(read_twice - read, 100 + 3 + 3)
+        set_ = interpreter("function f() { sstore(0, 1) }").call("f").gas_used
+        reset = interpreter("function f() { sstore(0, 2) }", storage={0: 1}).call("f").gas_used
+        same = interpreter("function f() { sstore(0, 1) }", storage={0: 1}).call("f").gas_used
+        self.assertEqual((set_ - same, reset - same), (20000 - 100, 2900 - 100))
+
+    def test_log_pricing(self):
+        """Test a log costs 375, plus 375 per topic and 8 per byte of data."""
+        empty = interpreter("function f() { }").call("f").gas_used
+        log1 = interpreter("function f() { log1(0, 0, 7) }").call("f").gas_used
+        log2 = interpreter("function f() { log2(0, 32, 7, 8) }").call("f").gas_used
+        # LOG1 and pushing its three arguments
+        self.assertEqual(log1 - empty, 750 + 3 * 3)
+        # A fourth push, 32 bytes of data and one word of memory
+        self.assertEqual(log2 - log1, 375 + 3 + 8 * 32 + 3)
+
+    def test_generated_contract(self):
+        """Test a generated contract deploys, and a method's storage changes and gas are reported."""
+        obj = YulGenerator().generate_ir(DafnyParser(TOKEN).parse())
+        machine, deployed = YulInterpreter.deploy(obj, [1000])
+        self.assertTrue(deployed.success)
+        self.assertEqual(machine.storage[0], 1000)
+        result = machine.call("burn", [400])
+        self.assertTrue(result.success)
+        self.assertEqual(machine.storage[0], 600)
+        self.assertEqual(sorted(result.storage_changes.values()), [600, 600])
+        self.assertGreater(result.gas_used, 2 * 2100)
+        self.assertFalse(machine.call("burn", [601]).success)
+
+    def test_constructor_arguments_follow_creation_code(self):
+        """Test constructor arguments are read from after the creation code, not from calldata."""
+        obj = YulGenerator().generate_ir(DafnyParser(TOKEN).parse())
+        creation = YulInterpreter(obj)
+        self.assertTrue(creation.transact((1000).to_bytes(32, "big")).success)
+        self.assertEqual(creation.storage.get(0, 0), 0)
+        creation = YulInterpreter(obj)
+        creation.arguments = (1000).to_bytes(32, "big")
+        self.assertTrue(creation.transact(b"").success)
+        self.assertEqual(creation.storage[0], 1000)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+import unittest
+from src.parser.dafny_parser import DafnyParser
+from src.translator.passes import FunctionPass, Pass, PassManager
+from src.translator.yul_ast import (Block, ExprStmt, FunctionDef, If, Object, VarDecl, call, format_object,
+                                    functions_of, iter_functions)
+from src.translator.yul_generator import YulGenerator
+
+CONTRACT = """
+class Vault {
+    var total: uint256
+    var balances: mapping<address, uint256>
+
+    method deposit(amount: uint256)
+        modifies this
+    {
+        var bonus := if amount > 100 then 1 else 0;
+        balances[msg.sender] := balances[msg.sender] + amount + bonus;
+        total := total + amount;
+    }
+
+    method getTotal() returns (result: uint256)
+    {
+        return total;
+    }
+}
+"""
+
+
+class RenameFunctions(FunctionPass):
+    name = 'rename'
+
+    def prepare(self, obj):
+        return obj.name
+
+    def run_function(self, function, object_name):
+        return FunctionDef(f"{object_name}_{function.name}", function.params, function.returns, function.body)
+
+
+class Record(Pass):
+    def __init__(self, name, log):
+        self.name = name
+        self.log = log
+
+    def run(self, obj):
+        self.log.append(self.name)
+        return obj
+
+
+class TestYulIR(unittest.TestCase):
+    def setUp(self):
+        self.contract = DafnyParser(CONTRACT).parse()
+
+    def test_generate_ir_structure(self):
+        """Test the IR has a constructor object with a runtime sub-object."""
+        obj = YulGenerator().generate_ir(self.contract)
+        self.assertEqual(obj.name, 'Vault')
+        self.assertEqual([child.name for child in obj.objects], ['runtime'])
+        names = [function.name for function in functions_of(obj.objects[0])]
+        self.assertIn('deposit', names)
+        self.assertIn('keccak256_mapping', names)
+
+    def test_printed_ir_matches_generate(self):
+        """Test generate() prints the IR and every function parses back."""
+        generator = YulGenerator()
+        yul = generator.generate(self.contract)
+        self.assertEqual(yul, format_object(generator.generate_ir(self.contract)))
+        parsed = {function.name: function for function, _, _ in iter_functions(yul)}
+        runtime = {function.name: function for function in functions_of(generator.generate_ir(self.contract).objects[0])}
+        self.assertEqual(parsed['deposit'], runtime['deposit'])
+
+    def test_if_expression_lowered_from_ast(self):
+        """Test an if-expression declaration is lowered without text markers."""
+        yul = YulGenerator().generate(self.contract)
+        self.assertNotIn('IF_EXPR', yul)
+        self.assertIn('switch gt(amount, 100)', yul)
+
+    def test_nested_access_hashes_slot(self):
+        """Test nested mapping reads hash the inner slot rather than its value."""
+        source = """
+        class Allowances {
+            var allowed: mapping<address, mapping<address, uint256>>
+            method get(a: address, b: address) returns (r: uint256)
+            {
+                return allowed[a][b];
+            }
+        }
+        """
+        yul = YulGenerator(cse=False).generate(DafnyParser(source).parse())
+        self.assertIn('sload(keccak256_mapping(keccak256_mapping(0, a), b))', yul)
+
+    def test_pass_manager_runs_in_order(self):
+        """Test passes run in the order they were added."""
+        log = []
+        manager = PassManager([Record('first', log)]).add(Record('second', log))
+        obj = Object('Empty', Block())
+        self.assertIs(manager.run(obj), obj)
+        self.assertEqual(log, ['first', 'second'])
+        self.assertEqual(manager.names, ['first', 'second'])
+
+    def test_function_pass_visits_every_object(self):
+        """Test a function pass rewrites functions in nested objects with per-object context."""
+        body = Block([ExprStmt(call('sstore', 0, 1))])
+        inner = Object('runtime', Block([FunctionDef('f', [], [], body), VarDecl(['x'], call('f'))]))
+        outer = Object('Outer', Block([FunctionDef('g', [], [], Block())]), [inner])
+        result = RenameFunctions().run(outer)
+        self.assertEqual([f.name for f in functions_of(result)], ['Outer_g'])
+        self.assertEqual([f.name for f in functions_of(result.objects[0])], ['runtime_f'])
+        # Statements that are not functions are kept
+        self.assertIsInstance(result.objects[0].code.statements[1], VarDecl)
+
+    def test_custom_pass_on_generator(self):
+        """Test passes added to a generator apply to its output."""
+        generator = YulGenerator(cse=False)
+        generator.passes.add(RenameFunctions())
+        yul = generator.generate(self.contract)
+        self.assertIn('function runtime_deposit()', yul)
+
+    def test_printer_layout(self):
+        """Test the printer puts one-statement ifs on one line and separates functions."""
+        obj = Object('T', Block([
+            If(call('callvalue'), Block([ExprStmt(call('revert', 0, 0))])),
+            FunctionDef('f', ['a'], ['r'], Block([VarDecl(['r'], call('add', 'a', 1))])),
+        ]))
+        self.assertEqual(format_object(obj),
+                         'object "T" {\n'
+                         '  code {\n'
+                         '    if callvalue() { revert(0, 0) }\n'
+                         '\n'
+                         '    function f(a) -> r {\n'
+                         '      let r := add(a, 1)\n'
+                         '    }\n'
+                         '  }\n'
+                         '}\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,13 +5,20 @@ Analyze compiled bytecode for security and optimization
 import sys
 from pathlib import Path
 
-def analyze_bytecode(bytecode_hex: str):
-    """Analyze EVM bytecode"""
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.compiler.bytecode import MAX_INITCODE_SIZE, MAX_RUNTIME_SIZE, split_metadata
+
+def analyze_bytecode(bytecode_hex: str, runtime: bool = True):
+    """Analyze EVM bytecode: deployed code (.bin-runtime) unless runtime is False"""
     
-    bytecode = bytes.fromhex(bytecode_hex)
+    code_hex, metadata_hex = split_metadata(bytecode_hex)
+    bytecode = bytes.fromhex(code_hex)
     
     analysis = {
-        'size': len(bytecode),
+        'runtime': runtime,
+        'size': len(bytecode_hex) // 2,
+        'metadata_size': len(metadata_hex) // 2,
         'opcodes': {},
         'storage_ops': 0,
         'memory_ops': 0,
@@ -48,7 +55,9 @@ def analyze_bytecode(bytecode_hex: str):
 def print_analysis(analysis: dict):
     """Print analysis results"""
     print("=== Bytecode Analysis ===")
-    print(f"Size: {analysis['size']} bytes")
+    print(f"Size: {analysis['size']} bytes ({'deployed' if analysis['runtime'] else 'creation'} code)")
+    if analysis['metadata_size']:
+        print(f"Metadata: {analysis['metadata_size']} bytes")
     print(f"Storage operations: {analysis['storage_ops']}")
     print(f"Memory operations: {analysis['memory_ops']}")
     print(f"Jumps: {analysis['jumps']}")
@@ -76,10 +85,12 @@ def print_analysis(analysis: dict):
     else:
         print("✓ Reasonable storage usage")
     
-    if analysis['size'] > 24576:
-        print("❌ Exceeds contract size limit (24KB)")
+    # EIP-170 limits deployed code, EIP-3860 creation code
+    limit = MAX_RUNTIME_SIZE if analysis['runtime'] else MAX_INITCODE_SIZE
+    if analysis['size'] > limit:
+        print(f"❌ Exceeds {'contract' if analysis['runtime'] else 'initcode'} size limit ({limit // 1024}KB)")
     else:
-        print(f"✓ Within size limit ({analysis['size']}/24576 bytes)")
+        print(f"✓ Within size limit ({analysis['size']}/{limit} bytes)")
 
 def compare_bytecodes(file1: str, file2: str):
     """Compare two bytecode files"""
@@ -101,7 +112,7 @@ if __name__ == '__main__':
     import argparse
     
     parser = argparse.ArgumentParser(description='Analyze EVM bytecode')
-    parser.add_argument('bytecode', help='Path to .bin file')
+    parser.add_argument('bytecode', help='Path to .bin-runtime (deployed code) or .bin (creation code) file')
     parser.add_argument('--compare', help='Compare with another bytecode file')
     
     args = parser.parse_args()
@@ -109,7 +120,7 @@ if __name__ == '__main__':
     with open(args.bytecode, 'r') as f:
         bytecode = f.read().strip()
     
-    analysis = analyze_bytecode(bytecode)
+    analysis = analyze_bytecode(bytecode, runtime=not args.bytecode.endswith('.bin'))
     print_analysis(analysis)
     
     if args.compare:
@@ -54,13 +54,21 @@ def estimate_gas(bytecode_file: str):
     with open(bytecode_file, 'r') as f:
         bytecode = f.read().strip()
     
-    # Base cost + per-byte cost
+    # The code deposit is charged on the deployed code, written next to the .bin
+    runtime_file = Path(bytecode_file).with_suffix('.bin-runtime')
+    if runtime_file.exists():
+        runtime_size = len(runtime_file.read_text().strip()) // 2
+    else:
+        print(f"No {runtime_file.name}; charging the deposit on the creation code (an overestimate)")
+        runtime_size = len(bytecode) // 2
+    
+    # Base cost + per-byte deposit of the deployed code
     base_cost = 21000
-    byte_cost = len(bytecode) // 2 * 200  # Approximate
+    byte_cost = runtime_size * 200  # Approximate
     
     total = base_cost + byte_cost
     print(f"Estimated gas: {total}")
-    print(f"Bytecode size: {len(bytecode) // 2} bytes")
+    print(f"Bytecode size: {len(bytecode) // 2} bytes (creation), {runtime_size} bytes (deployed)")
     
     return total
 
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Check or update the gas snapshot of the example contracts
+
+    python tools/gas_snapshot.py            # compare with tests/gas/snapshot.json
+    python tools/gas_snapshot.py --update   # record the current figures
+
+Runs the scenarios in tests/gas/scenarios.json (see src/gas_snapshot.py)
+and prints every deployment and call whose gas changed. Exits with 1 if
+any costs more than the threshold allows or is missing from the snapshot.
+"""
+import argparse
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from src.gas_snapshot import (DEFAULT_THRESHOLD, ScenarioError, compare, format_changes, load, save,
+                              take_snapshot)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Gas snapshot of the example contracts')
+    parser.add_argument('--examples', default=ROOT / 'examples', type=Path, help='Directory of .dfy contracts')
+    parser.add_argument('--scenarios', default=ROOT / 'tests' / 'gas' / 'scenarios.json', type=Path,
+                        help='Call scenario for each contract')
+    parser.add_argument('--snapshot', default=ROOT / 'tests' / 'gas' / 'snapshot.json', type=Path,
+                        help='Recorded gas figures')
+    parser.add_argument('--threshold', default=DEFAULT_THRESHOLD * 100, type=float,
+                        help='Percent increase allowed before a change is a regression')
+    parser.add_argument('--update', action='store_true', help='Write the current figures to the snapshot')
+    args = parser.parse_args()
+
+    try:
+        measured = take_snapshot(args.examples, load(args.scenarios))
+    except ScenarioError as e:
+        print(f"Scenario error: {e}")
+        return 1
+    recorded = load(args.snapshot) if args.snapshot.exists() else {}
+    changes = compare(recorded, measured)
+    print(format_changes(changes, args.threshold / 100))
+
+    if args.update:
+        save(measured, args.snapshot)
+        print(f"Wrote {args.snapshot}")
+        return 0
+    regressions = [change for change in changes if change.is_regression(args.threshold / 100)]
+    if regressions:
+        print(f"{len(regressions)} gas regression(s); run with --update if they are intended")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())